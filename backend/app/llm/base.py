@@ -4,9 +4,11 @@ Base LLM provider interface.
 This module defines the abstract base class that all LLM providers must implement.
 """
 
+import asyncio
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any, Optional
-from app.models.chat import InputMessage, ChatCompletionResponse
+from typing import List, Dict, Any, Optional, AsyncIterator
+from app.models.chat import InputMessage, ChatCompletionResponse, ChatCompletionDelta
+from .streaming import response_to_delta
 
 
 class BaseLLMProvider(ABC):
@@ -47,6 +49,76 @@ class BaseLLMProvider(ABC):
         """
         pass
     
+    async def create_completion_async(
+        self,
+        messages: List[InputMessage],
+        model: str,
+        tools: Optional[List[Dict[str, Any]]] = None,
+        reasoning: Optional[Dict[str, Any]] = None,
+        **kwargs
+    ) -> ChatCompletionResponse:
+        """
+        Create a chat completion without blocking the event loop.
+        
+        Providers with a native async client should override this. The default
+        runs the blocking create_completion in a worker thread.
+        
+        Args:
+            messages: List of conversation messages
+            model: Model name to use
+            tools: Optional list of tools/functions available to the model
+            reasoning: Optional reasoning configuration
+            **kwargs: Additional model-specific parameters
+            
+        Returns:
+            ChatCompletionResponse: Standardized response object
+        """
+        return await asyncio.to_thread(
+            self.create_completion,
+            messages=messages,
+            model=model,
+            tools=tools,
+            reasoning=reasoning,
+            **kwargs
+        )
+    
+    async def stream_completion_async(
+        self,
+        messages: List[InputMessage],
+        model: str,
+        tools: Optional[List[Dict[str, Any]]] = None,
+        reasoning: Optional[Dict[str, Any]] = None,
+        **kwargs
+    ) -> AsyncIterator[ChatCompletionDelta]:
+        """
+        Stream a chat completion as deltas.
+        
+        Providers with native streaming should override this. The default
+        awaits the full completion and yields it as a single delta.
+        
+        Args:
+            messages: List of conversation messages
+            model: Model name to use
+            tools: Optional list of tools/functions available to the model
+            reasoning: Optional reasoning configuration
+            **kwargs: Additional model-specific parameters
+            
+        Yields:
+            ChatCompletionDelta: Increments of the completion
+        """
+        response = await self.create_completion_async(
+            messages=messages,
+            model=model,
+            tools=tools,
+            reasoning=reasoning,
+            **kwargs
+        )
+        yield response_to_delta(response)
+    
+    async def aclose(self) -> None:
+        """Release pooled async connections (no-op unless the provider holds any)"""
+        return None
+    
     def supports_model(self, model: str) -> bool:
         """
         Check if this provider supports the given model.
@@ -0,0 +1,95 @@
+"""
+API-ready chat messages.
+
+Serializing a message (model_dump plus the provider fix-ups) is done once,
+when the message enters the conversation; outbound requests are then
+assembled from the cached dicts instead of re-dumping the whole history on
+every LLM round trip.
+"""
+
+from typing import Any, Dict, List, Optional
+
+from app.models.chat import InputMessage
+
+
+def serialize_message(message: InputMessage) -> Dict[str, Any]:
+    """
+    Convert a message model to the dict sent to the chat completions API.
+
+    Args:
+        message: Message model
+
+    Returns:
+        Dict[str, Any]: API-ready message
+    """
+    msg_dict = message.model_dump(mode="json", exclude_none=True)
+
+    # Remove tool_calls if it's an empty list to avoid API errors
+    if "tool_calls" in msg_dict and not msg_dict["tool_calls"]:
+        del msg_dict["tool_calls"]
+
+    # Handle multimodal content (ensure image_url format is preserved)
+    content = msg_dict.get("content")
+    if isinstance(content, list):
+        formatted_content = []
+        for item in content:
+            if isinstance(item, dict):
+                if item.get("type") == "text":
+                    formatted_content.append({
+                        "type": "text",
+                        "text": item.get("text", "")
+                    })
+                elif item.get("type") == "image_url":
+                    formatted_content.append({
+                        "type": "image_url",
+                        "image_url": {
+                            "url": item.get("image_url", {}).get("url", "")
+                        }
+                    })
+        msg_dict["content"] = formatted_content
+
+    return msg_dict
+
+
+class ToolChainTracker:
+    """
+    Incremental check that tool messages follow an assistant message with tool_calls.
+
+    Feed messages in order with ``check``; each call is O(1), so a whole
+    history is validated in one pass instead of scanning backwards from every
+    tool message.
+    """
+
+    def __init__(self):
+        self._in_tool_chain = False
+
+    def check(self, message: Dict[str, Any]) -> bool:
+        """Record the next message; returns False if it is an orphaned tool message"""
+        role = message.get("role")
+        if role == "tool":
+            return self._in_tool_chain
+        self._in_tool_chain = role == "assistant" and bool(message.get("tool_calls"))
+        return True
+
+
+def first_structure_error(messages: List[Dict[str, Any]]) -> Optional[int]:
+    """Position of the first tool message without a preceding tool call, or None"""
+    tracker = ToolChainTracker()
+    for i, message in enumerate(messages):
+        if not tracker.check(message):
+            return i
+    return None
+
+
+class PreparedMessages(list):
+    """
+    Request messages that are already API-ready and structurally validated.
+
+    A list of the cached message dicts; ``models`` holds the message models
+    they were serialized from, for providers that validate requests against
+    the pydantic schemas.
+    """
+
+    def __init__(self, api_messages: List[Dict[str, Any]], models: List[InputMessage]):
+        super().__init__(api_messages)
+        self.models = models
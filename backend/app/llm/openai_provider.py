@@ -4,12 +4,13 @@ OpenAI provider implementation.
 This module implements the OpenAI LLM provider using the existing OpenAI client logic.
 """
 
-from typing import List, Dict, Any, Optional
-from openai import OpenAI
+from typing import List, Dict, Any, Optional, AsyncIterator
+from openai import OpenAI, AsyncOpenAI
 from loguru import logger
 
 from .base import BaseLLMProvider
-from app.models.chat import InputMessage, ChatCompletionResponse
+from app.models.chat import InputMessage, ChatCompletionResponse, ChatCompletionDelta
+from .messages import PreparedMessages, serialize_message, first_structure_error
 
 
 class OpenAIProvider(BaseLLMProvider):
@@ -30,6 +31,8 @@ class OpenAIProvider(BaseLLMProvider):
         """
         super().__init__(api_key, **kwargs)
         self.client = OpenAI(api_key=api_key, **kwargs)
+        # Shared async client - its httpx pool is reused across conversations
+        self.async_client = AsyncOpenAI(api_key=api_key, **kwargs)
     
     def create_completion(
         self,
@@ -52,114 +55,229 @@ class OpenAIProvider(BaseLLMProvider):
         Returns:
             ChatCompletionResponse: Standardized response object
         """
-        if not self.supports_model(model):
-            raise ValueError(f"Model {model} is not supported by OpenAI provider")
+        openai_params = self._build_request_params(messages, model, tools, **kwargs)
         
-        # Format messages for OpenAI API
-        formatted_messages = self.format_messages_for_api(messages)
+        try:
+            raw_response = self.client.chat.completions.create(**openai_params)
+            return self._convert_response(raw_response)
+            
+        except Exception as e:
+            logger.error(f"OpenAI API call failed: {e}")
+            raise
+    
+    async def create_completion_async(
+        self,
+        messages: List[InputMessage],
+        model: str,
+        tools: Optional[List[Dict[str, Any]]] = None,
+        reasoning: Optional[Dict[str, Any]] = None,
+        **kwargs
+    ) -> ChatCompletionResponse:
+        """
+        Create a chat completion using the pooled AsyncOpenAI client.
         
+        Same contract as create_completion, but awaits the HTTP call so the
+        event loop keeps serving other conversations while the model thinks.
+        """
+        openai_params = self._build_request_params(messages, model, tools, **kwargs)
         
         try:
-            # Prepare standard OpenAI API parameters
-            openai_params = {
-                "model": model,
-                "messages": formatted_messages
-            }
+            raw_response = await self.async_client.chat.completions.create(**openai_params)
+            return self._convert_response(raw_response)
             
-            # Add tools if provided
-            if tools:
-                formatted_tools = self.format_tools_for_api(tools)
-                if formatted_tools:
-                    openai_params["tools"] = formatted_tools
+        except Exception as e:
+            logger.error(f"OpenAI API call failed: {e}")
+            raise
+    
+    async def stream_completion_async(
+        self,
+        messages: List[InputMessage],
+        model: str,
+        tools: Optional[List[Dict[str, Any]]] = None,
+        reasoning: Optional[Dict[str, Any]] = None,
+        **kwargs
+    ) -> AsyncIterator[ChatCompletionDelta]:
+        """
+        Stream a chat completion from OpenAI as deltas.
+        
+        Text, reasoning and tool-call argument fragments are yielded as they
+        arrive; token usage comes with the final delta.
+        """
+        openai_params = self._build_request_params(messages, model, tools, **kwargs)
+        openai_params["stream"] = True
+        openai_params["stream_options"] = {"include_usage": True}
+        
+        try:
+            stream = await self.async_client.chat.completions.create(**openai_params)
+            async for chunk in stream:
+                delta = {
+                    "id": chunk.id,
+                    "created": chunk.created,
+                    "model": chunk.model,
+                    "usage": self._convert_usage(chunk.usage) if chunk.usage else None
+                }
+                
+                if chunk.choices:
+                    choice = chunk.choices[0]
+                    delta["content"] = choice.delta.content
+                    delta["reasoning_content"] = getattr(choice.delta, 'reasoning_content', None)
+                    delta["finish_reason"] = choice.finish_reason
+                    if choice.delta.tool_calls:
+                        delta["tool_calls"] = [
+                            {
+                                "index": tool_call.index,
+                                "id": tool_call.id,
+                                "name": tool_call.function.name if tool_call.function else None,
+                                "arguments": tool_call.function.arguments if tool_call.function else None
+                            }
+                            for tool_call in choice.delta.tool_calls
+                        ]
+                
+                yield ChatCompletionDelta.model_validate(delta)
             
-            # Add other parameters (filter out unsupported ones and None values)
-            supported_params = {
-                'temperature', 'max_tokens', 'top_p', 'frequency_penalty', 
-                'presence_penalty', 'stop', 'stream', 'user', 'seed',
-                'response_format', 'tool_choice', 'reasoning_effort', 'include'
-            }
-            filtered_kwargs = {
-                k: v for k, v in kwargs.items() 
-                if k in supported_params and v is not None
-            }
-            openai_params.update(filtered_kwargs)
+        except Exception as e:
+            logger.error(f"OpenAI streaming API call failed: {e}")
+            raise
+    
+    async def aclose(self) -> None:
+        """Close the async client's connection pool"""
+        await self.async_client.close()
+    
+    def _build_request_params(
+        self,
+        messages: List[InputMessage],
+        model: str,
+        tools: Optional[List[Dict[str, Any]]] = None,
+        **kwargs
+    ) -> Dict[str, Any]:
+        """
+        Build the keyword arguments for chat.completions.create.
+        
+        Args:
+            messages: List of conversation messages
+            model: OpenAI model name
+            tools: Optional list of tools/functions
+            **kwargs: Additional OpenAI parameters
             
-            # Always include reasoning content if reasoning_effort is specified
-            if 'reasoning_effort' in openai_params:
-                openai_params['include'] = ['reasoning.encrypted_content']
+        Returns:
+            Dict[str, Any]: Parameters for the OpenAI client
+        """
+        if not self.supports_model(model):
+            raise ValueError(f"Model {model} is not supported by OpenAI provider")
+        
+        # Format messages for OpenAI API
+        formatted_messages = self.format_messages_for_api(messages)
+        
+        # Prepare standard OpenAI API parameters
+        openai_params = {
+            "model": model,
+            "messages": formatted_messages
+        }
+        
+        # Add tools if provided
+        if tools:
+            formatted_tools = self.format_tools_for_api(tools)
+            if formatted_tools:
+                openai_params["tools"] = formatted_tools
+        
+        # Add other parameters (filter out unsupported ones and None values)
+        supported_params = {
+            'temperature', 'max_tokens', 'top_p', 'frequency_penalty', 
+            'presence_penalty', 'stop', 'stream', 'user', 'seed',
+            'response_format', 'tool_choice', 'reasoning_effort', 'include',
+            'stream_options', 'prompt_cache_key'
+        }
+        filtered_kwargs = {
+            k: v for k, v in kwargs.items() 
+            if k in supported_params and v is not None
+        }
+        openai_params.update(filtered_kwargs)
+        
+        # Always include reasoning content if reasoning_effort is specified
+        if 'reasoning_effort' in openai_params:
+            openai_params['include'] = ['reasoning.encrypted_content']
+        
+        return openai_params
+    
+    def _convert_response(self, raw_response: Any) -> ChatCompletionResponse:
+        """
+        Convert an OpenAI response to our ChatCompletionResponse format.
+        
+        Args:
+            raw_response: Response object from the OpenAI client
             
-            raw_response = self.client.chat.completions.create(**openai_params)
+        Returns:
+            ChatCompletionResponse: Standardized response object
+        """
+        response_dict = {
+            "id": raw_response.id,
+            "request_id": raw_response.id,  # OpenAI doesn't have separate request_id
+            "created": raw_response.created,
+            "model": raw_response.model,
+            "choices": [],
+            "usage": None
+        }
+        
+        # Extract reasoning content from top-level reasoning field if available
+        reasoning_content = None
+        if hasattr(raw_response, 'reasoning') and raw_response.reasoning:
             
-            # Convert OpenAI response to our ChatCompletionResponse format
-            response_dict = {
-                "id": raw_response.id,
-                "request_id": raw_response.id,  # OpenAI doesn't have separate request_id
-                "created": raw_response.created,
-                "model": raw_response.model,
-                "choices": [],
-                "usage": None
+            # Try to get encrypted_content first (when include parameter is used)
+            if hasattr(raw_response.reasoning, 'encrypted_content') and raw_response.reasoning.encrypted_content:
+                reasoning_content = raw_response.reasoning.encrypted_content
+            # Fallback to summary if available
+            elif hasattr(raw_response.reasoning, 'summary') and raw_response.reasoning.summary:
+                reasoning_content = raw_response.reasoning.summary
+        
+        # Convert choices
+        for choice in raw_response.choices:
+            choice_dict = {
+                "index": choice.index,
+                "message": {
+                    "role": choice.message.role,
+                    "content": choice.message.content,
+                    "reasoning_content": reasoning_content,
+                    "tool_calls": None
+                },
+                "finish_reason": choice.finish_reason
             }
             
-            # Extract reasoning content from top-level reasoning field if available
-            reasoning_content = None
-            if hasattr(raw_response, 'reasoning') and raw_response.reasoning:
-                
-                # Try to get encrypted_content first (when include parameter is used)
-                if hasattr(raw_response.reasoning, 'encrypted_content') and raw_response.reasoning.encrypted_content:
-                    reasoning_content = raw_response.reasoning.encrypted_content
-                # Fallback to summary if available
-                elif hasattr(raw_response.reasoning, 'summary') and raw_response.reasoning.summary:
-                    reasoning_content = raw_response.reasoning.summary
-            
-            # Convert choices
-            for choice in raw_response.choices:
-                choice_dict = {
-                    "index": choice.index,
-                    "message": {
-                        "role": choice.message.role,
-                        "content": choice.message.content,
-                        "reasoning_content": reasoning_content,
-                        "tool_calls": None
-                    },
-                    "finish_reason": choice.finish_reason
-                }
-                
-                # Handle tool calls if present
-                if choice.message.tool_calls:
-                    tool_calls = []
-                    for tool_call in choice.message.tool_calls:
-                        # Convert OpenAI tool call to our ToolCall format
-                        from app.models.chat import ToolCall, ToolCallFunction, ToolType
-                        converted_tool_call = ToolCall(
-                            id=tool_call.id,
-                            type=ToolType.FUNCTION,
-                            function=ToolCallFunction(
-                                name=tool_call.function.name,
-                                arguments=tool_call.function.arguments  # OpenAI returns JSON string
-                            )
+            # Handle tool calls if present
+            if choice.message.tool_calls:
+                tool_calls = []
+                for tool_call in choice.message.tool_calls:
+                    # Convert OpenAI tool call to our ToolCall format
+                    from app.models.chat import ToolCall, ToolCallFunction, ToolType
+                    converted_tool_call = ToolCall(
+                        id=tool_call.id,
+                        type=ToolType.FUNCTION,
+                        function=ToolCallFunction(
+                            name=tool_call.function.name,
+                            arguments=tool_call.function.arguments  # OpenAI returns JSON string
                         )
-                        tool_calls.append(converted_tool_call.model_dump())
-                    choice_dict["message"]["tool_calls"] = tool_calls
-                
-                response_dict["choices"].append(choice_dict)
-            
-            # Convert usage
-            if raw_response.usage:
-                response_dict["usage"] = {
-                    "prompt_tokens": raw_response.usage.prompt_tokens,
-                    "completion_tokens": raw_response.usage.completion_tokens,
-                    "total_tokens": raw_response.usage.total_tokens,
-                    "prompt_tokens_details": {
-                        "cached_tokens": 0  # OpenAI doesn't provide this
-                    }
-                }
-            
-            response = ChatCompletionResponse.model_validate(response_dict)
-            return response
+                    )
+                    tool_calls.append(converted_tool_call.model_dump())
+                choice_dict["message"]["tool_calls"] = tool_calls
             
-        except Exception as e:
-            logger.error(f"OpenAI API call failed: {e}")
-            raise
+            response_dict["choices"].append(choice_dict)
+        
+        # Convert usage
+        if raw_response.usage:
+            response_dict["usage"] = self._convert_usage(raw_response.usage)
+        
+        return ChatCompletionResponse.model_validate(response_dict)
+    
+    def _convert_usage(self, usage: Any) -> Dict[str, Any]:
+        """Convert OpenAI usage to our Usage format"""
+        details = getattr(usage, 'prompt_tokens_details', None)
+        return {
+            "prompt_tokens": usage.prompt_tokens,
+            "completion_tokens": usage.completion_tokens,
+            "total_tokens": usage.total_tokens,
+            "prompt_tokens_details": {
+                "cached_tokens": getattr(details, 'cached_tokens', None) or 0
+            }
+        }
     
     
     def _validate_message_structure(self, messages: List[Dict[str, Any]]) -> None:
@@ -167,7 +285,7 @@ class OpenAIProvider(BaseLLMProvider):
         Validate that messages follow OpenAI's structural requirements.
         
         Specifically, ensures that tool messages immediately follow the assistant
-        message with tool_calls that requested them.
+        message with tool_calls that requested them. Single forward pass.
         
         Args:
             messages: Formatted messages to validate
@@ -175,83 +293,41 @@ class OpenAIProvider(BaseLLMProvider):
         Raises:
             ValueError: If message structure is invalid
         """
-        for i, msg in enumerate(messages):
-            if msg.get("role") == "tool":
-                # Tool message must be preceded by assistant message with tool_calls
-                if i == 0:
-                    raise ValueError(
-                        f"Invalid message structure: tool message at position {i} has no preceding message"
-                    )
-                
-                # Look backwards to find the assistant message with tool_calls
-                found_tool_call = False
-                for j in range(i - 1, -1, -1):
-                    prev_msg = messages[j]
-                    if prev_msg.get("role") == "assistant":
-                        if prev_msg.get("tool_calls"):
-                            found_tool_call = True
-                            break
-                        else:
-                            # Found assistant without tool_calls - this is invalid
-                            break
-                    elif prev_msg.get("role") == "tool":
-                        # Another tool message - keep looking backwards
-                        continue
-                    else:
-                        # Found a non-assistant, non-tool message - invalid structure
-                        break
-                
-                if not found_tool_call:
-                    logger.error(
-                        f"Invalid message structure at position {i}. "
-                        f"Messages around error: {messages[max(0, i-2):min(len(messages), i+2)]}"
-                    )
-                    raise ValueError(
-                        f"Invalid message structure: tool message at position {i} "
-                        f"must follow an assistant message with tool_calls"
-                    )
+        i = first_structure_error(messages)
+        if i is None:
+            return
+        
+        if i == 0:
+            raise ValueError(
+                f"Invalid message structure: tool message at position {i} has no preceding message"
+            )
+        
+        logger.error(
+            f"Invalid message structure at position {i}. "
+            f"Messages around error: {messages[max(0, i-2):min(len(messages), i+2)]}"
+        )
+        raise ValueError(
+            f"Invalid message structure: tool message at position {i} "
+            f"must follow an assistant message with tool_calls"
+        )
     
     def format_messages_for_api(self, messages: List[InputMessage]) -> List[Dict[str, Any]]:
         """
         Convert InputMessage objects to OpenAI API format with multimodal support.
         
+        PreparedMessages (serialized and validated when they entered the
+        conversation) are used as-is.
+        
         Args:
             messages: List of InputMessage objects
             
         Returns:
             List[Dict[str, Any]]: Messages formatted for OpenAI API
         """
-        formatted_messages = []
-        for msg in messages:
-            if msg is not None:
-                msg_dict = msg.model_dump()
-                
-                # Remove tool_calls if it's None or empty list to avoid API errors
-                if "tool_calls" in msg_dict and (msg_dict["tool_calls"] is None or msg_dict["tool_calls"] == []):
-                    del msg_dict["tool_calls"]
-                
-                # Handle multimodal content (ensure image_url format is preserved)
-                content = msg_dict["content"]
-                if isinstance(content, list):
-                    # Multimodal content - ensure proper format for OpenAI
-                    formatted_content = []
-                    for item in content:
-                        if isinstance(item, dict):
-                            if item.get("type") == "text":
-                                formatted_content.append({
-                                    "type": "text",
-                                    "text": item.get("text", "")
-                                })
-                            elif item.get("type") == "image_url":
-                                formatted_content.append({
-                                    "type": "image_url",
-                                    "image_url": {
-                                        "url": item.get("image_url", {}).get("url", "")
-                                    }
-                                })
-                    msg_dict["content"] = formatted_content
-                
-                formatted_messages.append(msg_dict)
+        if isinstance(messages, PreparedMessages):
+            return messages
+        
+        formatted_messages = [serialize_message(msg) for msg in messages if msg is not None]
         
         # Validate message structure before returning
         self._validate_message_structure(formatted_messages)
@@ -271,6 +347,10 @@ class OpenAIProvider(BaseLLMProvider):
         if not tools:
             return None
         
+        # Cached registry schemas are already API-ready dicts
+        if all(isinstance(tool, dict) for tool in tools):
+            return tools
+        
         # Tools should already be in the correct OpenAI format when passed here
         # Just convert to dict if they're Pydantic models
         formatted_tools = []
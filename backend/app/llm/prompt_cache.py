@@ -0,0 +1,43 @@
+"""
+Prompt cache accounting.
+
+Providers report how many prompt tokens were served from their prompt cache
+(usage.prompt_tokens_details.cached_tokens); PromptCacheStats adds those up
+per conversation so the hit ratio can be reported.
+"""
+
+from typing import Any, Dict, Optional
+
+from app.models.chat import Usage
+
+
+class PromptCacheStats:
+    """Running prompt and cached-token totals for one conversation"""
+
+    def __init__(self):
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+        self.last_cached_tokens = 0
+
+    def record(self, usage: Optional[Usage]) -> None:
+        """Add one completion's usage"""
+        if usage is None:
+            return
+        details = usage.prompt_tokens_details
+        self.requests += 1
+        self.prompt_tokens += usage.prompt_tokens
+        self.last_cached_tokens = details.cached_tokens if details else 0
+        self.cached_tokens += self.last_cached_tokens
+
+    def hit_ratio(self) -> float:
+        """Share of prompt tokens served from the cache"""
+        return self.cached_tokens / self.prompt_tokens if self.prompt_tokens else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "prompt_tokens": self.prompt_tokens,
+            "cached_tokens": self.cached_tokens,
+            "cache_hit_ratio": round(self.hit_ratio(), 4),
+        }
@@ -5,17 +5,18 @@ This module provides a router that automatically selects the correct LLM provide
 based on the model name and routes requests accordingly.
 """
 
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple, AsyncIterator
 from loguru import logger
 
 from .base import BaseLLMProvider
 from .xlm_provider import XLMProvider
 from .openai_provider import OpenAIProvider
+from .messages import PreparedMessages
 from app.models import (
     Message, 
     ChatCompletionResponse, 
+    ChatCompletionDelta,
     ModelType,
-    ChatCompletionRequest,
     ChatCompletionTextRequest,
     ChatCompletionVisionRequest
 )
@@ -90,9 +91,93 @@ class LLMRouter:
         Returns:
             ChatCompletionResponse: Response object
         """
+        provider, call_kwargs = self._prepare_request(messages, model, tools, **kwargs)
+        return provider.create_completion(**call_kwargs)
+    
+    async def create_completion_async(
+        self,
+        messages: List[Message],
+        model: Optional[str] = None,
+        tools: Optional[List[Dict[str, Any]]] = None,
+        **kwargs
+    ) -> ChatCompletionResponse:
+        """
+        Create a chat completion without blocking the event loop.
+        
+        Routes exactly like create_completion but awaits the provider's
+        pooled async client, so one slow completion never stalls other
+        conversations served by the same process.
+        
+        Args:
+            messages: List of conversation messages
+            model: Model name (defaults to GPT-5)
+            tools: Optional list of tools/functions
+            **kwargs: Additional parameters (temperature, max_tokens, etc.)
+            
+        Returns:
+            ChatCompletionResponse: Response object
+        """
+        provider, call_kwargs = self._prepare_request(messages, model, tools, **kwargs)
+        return await provider.create_completion_async(**call_kwargs)
+    
+    async def stream_completion(
+        self,
+        messages: List[Message],
+        model: Optional[str] = None,
+        tools: Optional[List[Dict[str, Any]]] = None,
+        **kwargs
+    ) -> AsyncIterator[ChatCompletionDelta]:
+        """
+        Stream a chat completion as deltas.
+        
+        Routes exactly like create_completion. Fold the deltas with
+        app.llm.streaming.ChatCompletionAccumulator to get the final response.
+        
+        Args:
+            messages: List of conversation messages
+            model: Model name (defaults to GPT-5)
+            tools: Optional list of tools/functions
+            **kwargs: Additional parameters (temperature, max_tokens, etc.)
+            
+        Yields:
+            ChatCompletionDelta: Increments of the completion
+        """
+        provider, call_kwargs = self._prepare_request(messages, model, tools, **kwargs)
+        call_kwargs.pop('stream', None)
+        async for delta in provider.stream_completion_async(**call_kwargs):
+            yield delta
+    
+    async def aclose(self) -> None:
+        """Close pooled connections held by every provider"""
+        await self.openai_provider.aclose()
+        if self.xlm_provider:
+            await self.xlm_provider.aclose()
+    
+    def _prepare_request(
+        self,
+        messages: List[Message],
+        model: Optional[str] = None,
+        tools: Optional[List[Dict[str, Any]]] = None,
+        **kwargs
+    ) -> Tuple[BaseLLMProvider, Dict[str, Any]]:
+        """
+        Pick the provider and build its create_completion arguments.
+        
+        Args:
+            messages: List of conversation messages
+            model: Model name (defaults to GPT-5)
+            tools: Optional list of tools/functions
+            **kwargs: Additional parameters (temperature, max_tokens, etc.)
+            
+        Returns:
+            Tuple of (provider, keyword arguments for the provider call)
+        """
         target_model = model or self.default_model
         provider = self.get_provider_for_model(target_model)
         
+        # Routing hint for OpenAI's prompt cache; GLM requests don't take it
+        prompt_cache_key = kwargs.pop('prompt_cache_key', None)
+        
         # For OpenAI models, call provider directly to avoid validation issues
         if target_model == ModelType.GPT_5:
             # Filter out GLM-specific parameters and None values
@@ -115,40 +200,40 @@ class LLMRouter:
             if kwargs.get('stream') is not None:
                 openai_kwargs['stream'] = kwargs.get('stream', False)
             
-            # Convert tools to OpenAI format if provided
-            openai_tools = None
-            if tools:
-                from app.tools.registry import tool_registry
-                # Get tools in standard nested format for chat completions API
-                openai_tools = tool_registry.to_openai_format()
-                
-            return provider.create_completion(
+            if prompt_cache_key:
+                openai_kwargs['prompt_cache_key'] = prompt_cache_key
+            
+            # Tools are passed through as given - callers use the registry's
+            # cached schemas (tool_registry.api_tool_schemas()), so nothing is rebuilt here
+            return provider, dict(
                 messages=messages,
                 model=target_model,
-                tools=openai_tools,
+                tools=tools or None,
                 **openai_kwargs
             )
         
-        # For GLM models, use the existing request validation
+        # For GLM models, use the existing request validation. Tool schemas come
+        # pre-validated from the registry cache and are passed through untouched.
+        # Prepared messages validate against their (already built) models and
+        # reach the provider with their cached dicts.
+        message_models = messages.models if isinstance(messages, PreparedMessages) else messages
         if target_model == ModelType.GLM_4_5:
             request = ChatCompletionTextRequest(
                 model=target_model,
-                messages=messages,
-                tools=tools,
+                messages=message_models,
                 **kwargs
             )
         else:  # GLM_4_5V or other vision models
             request = ChatCompletionVisionRequest(
                 model=target_model,
-                messages=messages,
-                tools=tools,
+                messages=message_models,
                 **kwargs
             )
         
-        return provider.create_completion(
-            messages=request.messages,
+        return provider, dict(
+            messages=messages if isinstance(messages, PreparedMessages) else request.messages,
             model=target_model,
-            tools=getattr(request, 'tools', None),
+            tools=tools or None,
             reasoning=getattr(request, 'thinking', None),
             temperature=request.temperature,
             top_p=request.top_p,
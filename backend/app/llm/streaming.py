@@ -0,0 +1,158 @@
+"""
+Helpers for streamed chat completions.
+
+Providers yield ChatCompletionDelta objects; ChatCompletionAccumulator folds
+them back into the same ChatCompletionResponse a non-streamed call returns,
+so history and tool execution stay identical whether streaming is on or off.
+"""
+
+import json
+import time
+from typing import Any, Dict, List, Optional, Set
+
+from app.models.chat import ChatCompletionDelta, ChatCompletionResponse, ToolCall, Usage
+
+
+class ChatCompletionAccumulator:
+    """Assemble streamed deltas into a ChatCompletionResponse."""
+
+    def __init__(self):
+        self.id: Optional[str] = None
+        self.created: Optional[int] = None
+        self.model: Optional[str] = None
+        self.content_parts: List[str] = []
+        self.reasoning_parts: List[str] = []
+        self.tool_calls: Dict[int, Dict[str, Any]] = {}
+        self.finish_reason: Optional[str] = None
+        self.usage: Optional[Usage] = None
+        self._ready_indexes: Set[int] = set()
+
+    def add(self, delta: ChatCompletionDelta) -> None:
+        """Fold one delta into the running response"""
+        self.id = self.id or delta.id
+        self.created = self.created or delta.created
+        self.model = self.model or delta.model
+
+        if delta.content:
+            self.content_parts.append(delta.content)
+        if delta.reasoning_content:
+            self.reasoning_parts.append(delta.reasoning_content)
+
+        for fragment in delta.tool_calls or []:
+            call = self.tool_calls.setdefault(fragment.index, {"id": None, "name": "", "arguments": []})
+            if fragment.id:
+                call["id"] = fragment.id
+            if fragment.name:
+                call["name"] += fragment.name
+            if fragment.arguments:
+                call["arguments"].append(fragment.arguments)
+
+        if delta.finish_reason:
+            self.finish_reason = delta.finish_reason
+        if delta.usage:
+            self.usage = delta.usage
+
+    def pop_ready_tool_calls(self) -> List[ToolCall]:
+        """
+        Return tool calls whose arguments finished streaming since the last call.
+        
+        A call is ready once its argument text parses as a JSON object, or
+        once the model has moved on to a later call. Each call is returned
+        at most once, so callers can dispatch it while the rest of the
+        response is still being generated.
+        """
+        ready = []
+        last_index = max(self.tool_calls) if self.tool_calls else None
+        for index, call in sorted(self.tool_calls.items()):
+            if index in self._ready_indexes or not call["name"]:
+                continue
+            if index != last_index or self._arguments_complete(call):
+                self._ready_indexes.add(index)
+                ready.append(ToolCall.model_validate(self._tool_call_dict(index, call)))
+        return ready
+
+    @staticmethod
+    def _arguments_complete(call: Dict[str, Any]) -> bool:
+        try:
+            return isinstance(json.loads("".join(call["arguments"])), dict)
+        except ValueError:
+            return False
+
+    @staticmethod
+    def _tool_call_dict(index: int, call: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "id": call["id"] or f"call_{index}",
+            "type": "function",
+            "function": {
+                "name": call["name"],
+                # Calls without parameters stream no argument text
+                "arguments": "".join(call["arguments"]) or "{}"
+            }
+        }
+
+    def to_response(self) -> ChatCompletionResponse:
+        """
+        Build the final response.
+
+        Returns:
+            ChatCompletionResponse: Same shape as a non-streamed completion
+        """
+        tool_calls = None
+        if self.tool_calls:
+            tool_calls = [
+                self._tool_call_dict(index, call)
+                for index, call in sorted(self.tool_calls.items())
+            ]
+
+        response_id = self.id or "stream"
+        return ChatCompletionResponse.model_validate({
+            "id": response_id,
+            "request_id": response_id,
+            "created": self.created or int(time.time()),
+            "model": self.model or "",
+            "choices": [{
+                "index": 0,
+                "message": {
+                    "role": "assistant",
+                    "content": "".join(self.content_parts) or None,
+                    "reasoning_content": "".join(self.reasoning_parts) or None,
+                    "tool_calls": tool_calls
+                },
+                "finish_reason": self.finish_reason
+            }],
+            "usage": self.usage.model_dump() if self.usage else None
+        })
+
+
+def response_to_delta(response: ChatCompletionResponse) -> ChatCompletionDelta:
+    """
+    Express a complete response as a single delta.
+
+    Used by providers without native streaming so every provider can be
+    consumed through the same async iterator.
+    """
+    choice = response.choices[0] if response.choices else None
+    message = choice.message if choice else None
+
+    tool_calls = None
+    if message and message.tool_calls:
+        tool_calls = [
+            {
+                "index": index,
+                "id": call.id,
+                "name": call.function.name if call.function else None,
+                "arguments": call.function.arguments if call.function else None
+            }
+            for index, call in enumerate(message.tool_calls)
+        ]
+
+    return ChatCompletionDelta.model_validate({
+        "id": response.id,
+        "created": response.created,
+        "model": response.model,
+        "content": message.content if message else None,
+        "reasoning_content": message.reasoning_content if message else None,
+        "tool_calls": tool_calls,
+        "finish_reason": choice.finish_reason if choice else None,
+        "usage": response.usage.model_dump() if response.usage else None
+    })
@@ -0,0 +1,121 @@
+"""
+Local token estimates for chat messages.
+
+Uses tiktoken's o200k_base encoding when it is installed and falls back to
+~4 characters per token otherwise. Either way the count is an estimate: it
+is only used to keep prompts under a budget, never for billing.
+
+Loading the encoding may download and parse its BPE file, so it never
+happens on the event loop: the app loads it at startup in a thread
+(load_encoding), and a request that arrives before then starts the load in
+the background and estimates from characters until it's ready.
+"""
+
+import asyncio
+import json
+import threading
+from typing import Any, Dict, Optional
+
+from loguru import logger
+
+
+# Prompt token budget per model; requests are compacted to fit
+PROMPT_TOKEN_BUDGETS = {
+    "gpt-5": 48_000,
+    "glm-4.5": 32_000,
+    "glm-4.5v": 16_000,
+}
+DEFAULT_PROMPT_TOKEN_BUDGET = 32_000
+
+# Fixed costs the character count doesn't see
+MESSAGE_OVERHEAD_TOKENS = 4
+IMAGE_TOKENS = 765
+CHARS_PER_TOKEN = 4
+
+_encoding = None
+_encoding_loaded = False
+_encoding_loading = False
+_encoding_lock = threading.Lock()
+# Separate from _encoding_lock, which is held for the whole (slow) load
+_loading_lock = threading.Lock()
+
+
+def load_encoding():
+    """
+    Load the tiktoken encoding. Blocking; call it at startup or off the event loop.
+
+    Returns:
+        The encoding, or None if tiktoken is unavailable or failed to load
+    """
+    global _encoding, _encoding_loaded
+    with _encoding_lock:
+        if not _encoding_loaded:
+            try:
+                import tiktoken
+                _encoding = tiktoken.get_encoding("o200k_base")
+            except Exception as e:
+                logger.debug(f"tiktoken unavailable, estimating tokens from characters: {e}")
+            _encoding_loaded = True
+    return _encoding
+
+
+def _on_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+        return True
+    except RuntimeError:
+        return False
+
+
+def _get_encoding():
+    """tiktoken encoding; None (estimate from characters) while it isn't loaded or if unavailable"""
+    global _encoding_loading
+    if _encoding_loaded:
+        return _encoding
+    if not _on_event_loop():
+        return load_encoding()
+    with _loading_lock:
+        if not _encoding_loading:
+            _encoding_loading = True
+            threading.Thread(target=load_encoding, name="tiktoken-load", daemon=True).start()
+    return None
+
+
+def estimate_text_tokens(text: Optional[str]) -> int:
+    """Estimated token count of a string"""
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def estimate_message_tokens(api_message: Dict[str, Any]) -> int:
+    """
+    Estimated token count of an API-ready message dict.
+
+    Args:
+        api_message: Message as produced by serialize_message
+
+    Returns:
+        int: Estimated tokens, including per-message overhead
+    """
+    tokens = MESSAGE_OVERHEAD_TOKENS
+    content = api_message.get("content")
+    if isinstance(content, str):
+        tokens += estimate_text_tokens(content)
+    elif isinstance(content, list):
+        for item in content:
+            if item.get("type") == "image_url":
+                tokens += IMAGE_TOKENS
+            else:
+                tokens += estimate_text_tokens(item.get("text"))
+    if api_message.get("tool_calls"):
+        tokens += estimate_text_tokens(json.dumps(api_message["tool_calls"]))
+    return tokens
+
+
+def prompt_token_budget(model: str) -> int:
+    """Prompt token budget for a model"""
+    return PROMPT_TOKEN_BUDGETS.get(model, DEFAULT_PROMPT_TOKEN_BUDGET)
@@ -4,8 +4,11 @@ XLM (Z.AI) provider implementation.
 This module implements the XLM LLM provider using the Z.AI API specification.
 """
 
+import asyncio
+import json
+import aiohttp
 import requests
-from typing import List, Dict, Any, Optional, Union
+from typing import List, Dict, Any, Optional, Union, AsyncIterator
 from loguru import logger
 
 from .base import BaseLLMProvider
@@ -13,8 +16,10 @@ from app.models.chat import (
     InputMessage, 
     ChatCompletionTextRequest,
     ChatCompletionVisionRequest,
-    ChatCompletionResponse
+    ChatCompletionResponse,
+    ChatCompletionDelta
 )
+from .messages import PreparedMessages
 
 
 class XLMProvider(BaseLLMProvider):
@@ -29,6 +34,9 @@ class XLMProvider(BaseLLMProvider):
     # API endpoint
     API_BASE_URL = "https://api.z.ai/api"
     
+    # Connection pool size for the async session
+    MAX_CONNECTIONS = 50
+    
     def __init__(self, api_key: str, **kwargs):
         """
         Initialize XLM provider.
@@ -39,6 +47,9 @@ class XLMProvider(BaseLLMProvider):
         """
         super().__init__(api_key, **kwargs)
         self.base_url = kwargs.get('base_url', self.API_BASE_URL)
+        # Pooled aiohttp session, created lazily on the running event loop
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_loop: Optional[asyncio.AbstractEventLoop] = None
     
     def create_completion(
         self,
@@ -61,6 +72,104 @@ class XLMProvider(BaseLLMProvider):
         Returns:
             ChatCompletionResponse: Standardized response object
         """
+        api_params = self._build_request_params(messages, model, tools, reasoning, **kwargs)
+        
+        try:
+            response = self._make_api_request(api_params)
+            chat_response = self._convert_to_chat_completion_response(response)
+            return chat_response
+            
+        except Exception as e:
+            logger.error(f"Z.AI API call failed: {e}")
+            raise
+    
+    async def create_completion_async(
+        self,
+        messages: List[InputMessage],
+        model: str,
+        tools: Optional[List[Dict[str, Any]]] = None,
+        reasoning: Optional[Dict[str, Any]] = None,
+        **kwargs
+    ) -> ChatCompletionResponse:
+        """
+        Create a chat completion using Z.AI API over the pooled aiohttp session.
+        
+        Same contract as create_completion without blocking the event loop.
+        """
+        api_params = self._build_request_params(messages, model, tools, reasoning, **kwargs)
+        
+        try:
+            response = await self._make_api_request_async(api_params)
+            return self._convert_to_chat_completion_response(response)
+            
+        except Exception as e:
+            logger.error(f"Z.AI API call failed: {e}")
+            raise
+    
+    async def stream_completion_async(
+        self,
+        messages: List[InputMessage],
+        model: str,
+        tools: Optional[List[Dict[str, Any]]] = None,
+        reasoning: Optional[Dict[str, Any]] = None,
+        **kwargs
+    ) -> AsyncIterator[ChatCompletionDelta]:
+        """
+        Stream a chat completion from Z.AI (server-sent events) as deltas.
+        """
+        api_params = self._build_request_params(messages, model, tools, reasoning, **kwargs)
+        api_params["stream"] = True
+        
+        try:
+            session = await self._get_session()
+            async with session.post(
+                self._completions_url(),
+                headers=self._headers(),
+                data=self._encode_payload(api_params),
+                timeout=aiohttp.ClientTimeout(total=None, sock_read=60)
+            ) as response:
+                if response.status != 200:
+                    error_text = await response.text()
+                    raise Exception(f"Z.AI API returned status {response.status}: {error_text}")
+                
+                async for raw_line in response.content:
+                    line = raw_line.decode("utf-8").strip()
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":
+                        break
+                    yield self._convert_stream_chunk(json.loads(data))
+            
+        except Exception as e:
+            logger.error(f"Z.AI streaming API call failed: {e}")
+            raise
+    
+    async def aclose(self) -> None:
+        """Close the pooled aiohttp session"""
+        await self._close_session()
+    
+    def _build_request_params(
+        self,
+        messages: List[InputMessage],
+        model: str,
+        tools: Optional[List[Dict[str, Any]]] = None,
+        reasoning: Optional[Dict[str, Any]] = None,
+        **kwargs
+    ) -> Dict[str, Any]:
+        """
+        Validate the request and build the Z.AI API payload.
+        
+        Args:
+            messages: List of conversation messages
+            model: XLM model name
+            tools: Optional list of tools/functions
+            reasoning: Optional reasoning configuration (maps to 'thinking')
+            **kwargs: Additional Z.AI parameters
+            
+        Returns:
+            Dict[str, Any]: API request payload
+        """
         if not self.supports_model(model):
             raise ValueError(f"Model {model} is not supported by XLM provider")
         
@@ -69,8 +178,7 @@ class XLMProvider(BaseLLMProvider):
             # Vision model request
             request = ChatCompletionVisionRequest(
                 model=model,
-                messages=messages,
-                tools=tools,
+                messages=messages.models if isinstance(messages, PreparedMessages) else messages,
                 thinking=reasoning,
                 temperature=kwargs.get("temperature", 0.8),
                 top_p=kwargs.get("top_p", 0.6),
@@ -83,8 +191,7 @@ class XLMProvider(BaseLLMProvider):
             # Text model request  
             request = ChatCompletionTextRequest(
                 model=model,
-                messages=messages,
-                tools=tools,
+                messages=messages.models if isinstance(messages, PreparedMessages) else messages,
                 thinking=reasoning,
                 temperature=kwargs.get("temperature", 0.6),
                 top_p=kwargs.get("top_p", 0.95),
@@ -95,18 +202,48 @@ class XLMProvider(BaseLLMProvider):
                 response_format=kwargs.get("response_format")
             )
         
-        # Convert to dict for API call
-        api_params = request.model_dump(exclude_none=True)
+        # Convert to dict for API call (prepared messages keep their cached dicts)
+        if isinstance(messages, PreparedMessages):
+            api_params = request.model_dump(exclude_none=True, exclude={"messages"})
+            api_params["messages"] = messages
+        else:
+            api_params = request.model_dump(exclude_none=True)
         
-        try:
-            response = self._make_api_request(api_params)
-            chat_response = self._convert_to_chat_completion_response(response)
-            return chat_response
-            
-        except Exception as e:
-            logger.error(f"Z.AI API call failed: {e}")
-            raise
+        # Tool schemas are added after validation so the registry's cached dicts
+        # (and their pre-encoded JSON) reach _encode_payload untouched
+        formatted_tools = self._format_tools(tools)
+        if formatted_tools:
+            api_params["tools"] = formatted_tools
+        return api_params
     
+    def _format_tools(self, tools: Optional[List[Any]]) -> Optional[List[Dict[str, Any]]]:
+        """Tool schemas as API dicts (cached registry schemas pass straight through)"""
+        if not tools:
+            return None
+        if all(isinstance(tool, dict) for tool in tools):
+            return tools
+        return [
+            tool.model_dump(mode="json", exclude_none=True) if hasattr(tool, 'model_dump') else tool
+            for tool in tools
+        ]
+    
+    def _encode_payload(self, params: Dict[str, Any]) -> bytes:
+        """
+        Encode the request body, reusing pre-encoded tool schemas when available.
+        
+        Args:
+            params: API request parameters
+            
+        Returns:
+            bytes: JSON request body
+        """
+        tools = params.get("tools")
+        tools_json = getattr(tools, "json_bytes", None)
+        if tools_json is None:
+            return json.dumps(params, ensure_ascii=False).encode("utf-8")
+        
+        body = json.dumps({k: v for k, v in params.items() if k != "tools"}, ensure_ascii=False).encode("utf-8")
+        return body[:-1] + b', "tools": ' + tools_json + b'}'
     
     def _make_api_request(self, params: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -118,18 +255,14 @@ class XLMProvider(BaseLLMProvider):
         Returns:
             Dict[str, Any]: API response
         """
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json",
-            "Accept-Language": "en-US,en"
-        }
+        headers = self._headers()
         
-        url = f"{self.base_url}/paas/v4/chat/completions"
+        url = self._completions_url()
         
         response = requests.post(
             url,
             headers=headers,
-            json=params,
+            data=self._encode_payload(params),
             timeout=60
         )
         
@@ -139,10 +272,103 @@ class XLMProvider(BaseLLMProvider):
         
         return response.json()
     
+    async def _make_api_request_async(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Make HTTP request to Z.AI API without blocking the event loop.
+        
+        Args:
+            params: API request parameters
+            
+        Returns:
+            Dict[str, Any]: API response
+        """
+        session = await self._get_session()
+        async with session.post(
+            self._completions_url(),
+            headers=self._headers(),
+            data=self._encode_payload(params),
+            timeout=aiohttp.ClientTimeout(total=60)
+        ) as response:
+            if response.status != 200:
+                error_text = await response.text()
+                raise Exception(f"Z.AI API returned status {response.status}: {error_text}")
+            
+            return await response.json()
     
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Return the pooled session, recreating it if closed or bound to another loop"""
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            await self._close_session()
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.MAX_CONNECTIONS)
+            )
+            self._session_loop = loop
+        return self._session
     
+    async def _close_session(self) -> None:
+        """Close the pooled session, on its own loop if that loop is still running elsewhere"""
+        session, loop = self._session, self._session_loop
+        self._session = None
+        self._session_loop = None
+        if session is None or session.closed:
+            return
+        try:
+            if loop is not None and loop is not asyncio.get_running_loop() and loop.is_running():
+                await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(session.close(), loop))
+            else:
+                await session.close()
+        except Exception as e:
+            # Connections left on a closed loop can't be shut down cleanly any more
+            logger.debug(f"Z.AI session from a finished event loop closed uncleanly: {e}")
+            session.detach()
     
+    def _completions_url(self) -> str:
+        return f"{self.base_url}/paas/v4/chat/completions"
     
+    def _headers(self) -> Dict[str, str]:
+        return {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+            "Accept-Language": "en-US,en"
+        }
+    
+    def _convert_stream_chunk(self, chunk: Dict[str, Any]) -> ChatCompletionDelta:
+        """
+        Convert one Z.AI stream chunk to a ChatCompletionDelta.
+        
+        Args:
+            chunk: Parsed `data:` payload from the event stream
+            
+        Returns:
+            ChatCompletionDelta: Delta for the first choice
+        """
+        delta = {
+            "id": chunk.get("id"),
+            "created": chunk.get("created"),
+            "model": chunk.get("model"),
+            "usage": chunk.get("usage")
+        }
+        
+        choices = chunk.get("choices") or []
+        if choices:
+            choice = choices[0]
+            message_delta = choice.get("delta") or {}
+            delta["content"] = message_delta.get("content")
+            delta["reasoning_content"] = message_delta.get("reasoning_content")
+            delta["finish_reason"] = choice.get("finish_reason")
+            if message_delta.get("tool_calls"):
+                delta["tool_calls"] = [
+                    {
+                        "index": tool_call.get("index", i),
+                        "id": tool_call.get("id"),
+                        "name": (tool_call.get("function") or {}).get("name"),
+                        "arguments": (tool_call.get("function") or {}).get("arguments")
+                    }
+                    for i, tool_call in enumerate(message_delta["tool_calls"])
+                ]
+        
+        return ChatCompletionDelta.model_validate(delta)
     
     def _convert_to_chat_completion_response(self, zai_response: Dict[str, Any]) -> ChatCompletionResponse:
         """
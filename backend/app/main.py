@@ -1,6 +1,12 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from .routes import chat
+from .llm.tokens import load_encoding
+from .modules.agent_registry import AGENT_SWEEP_SECONDS
+from .tools import thread_pool_metrics, shutdown_executors
+from .utils.event_bus import event_bus_metrics
+from .utils.persistence import chat_writer
+import asyncio
 import os
 
 app = FastAPI(
@@ -39,6 +45,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Lets the frontend back off when /chat/stream answers 429
+    expose_headers=["Retry-After"],
 )
 
 # Include routers
@@ -48,6 +56,52 @@ app.include_router(chat.router, prefix="/api", tags=["chat"])
 async def root():
     return {"message": "Shopping Deals Chat Agent API is running!"}
 
+@app.on_event("startup")
+async def load_token_encoding():
+    """Load the tokenizer before serving, so no request waits on its download"""
+    await asyncio.to_thread(load_encoding)
+
+@app.on_event("startup")
+async def start_agent_sweep():
+    """Evict idle agents on a timer, so an idle server doesn't keep them resident"""
+    app.state.agent_sweep = asyncio.create_task(chat.agents.sweep(AGENT_SWEEP_SECONDS))
+
+@app.on_event("shutdown")
+async def stop_agent_sweep():
+    """Stop the idle agent sweep"""
+    app.state.agent_sweep.cancel()
+
+@app.on_event("shutdown")
+async def close_llm_clients():
+    """Close pooled LLM client connections"""
+    await chat.llm_router.aclose()
+
+@app.on_event("shutdown")
+async def stop_tool_executors():
+    """Stop tool worker threads"""
+    shutdown_executors()
+
+@app.on_event("shutdown")
+async def flush_chat_persistence():
+    """Write out queued chat history before exiting"""
+    await asyncio.to_thread(chat_writer.shutdown)
+
+@app.on_event("shutdown")
+async def close_state_store():
+    """Close the shared conversation state store"""
+    chat.state_store.close()
+
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
+
+@app.get("/metrics")
+async def metrics():
+    """Runtime gauges for capacity tuning"""
+    return {
+        "tool_thread_pools": thread_pool_metrics(),
+        "chat_persistence": chat_writer.metrics(),
+        "agent_registry": chat.agents.metrics(),
+        "run_admission": chat.admission.metrics(),
+        "sse_event_bus": event_bus_metrics()
+    }
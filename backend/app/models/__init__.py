@@ -54,6 +54,8 @@ __all__ = [
     "ResponseMessage",
     "Choice",
     "ChatCompletionResponse",
+    "ToolCallDelta",
+    "ChatCompletionDelta",
     "Error",
     
     # Streaming response models
@@ -65,6 +67,8 @@ __all__ = [
     "ThinkingEvent",
     "ToolExecutionEvent",
     "MessageEvent",
+    "MessageDeltaEvent",
+    "ThinkingDeltaEvent",
     "ProductGridEvent",
     "ProductEvent",
     "ContentDisplayEvent",
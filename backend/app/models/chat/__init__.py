@@ -57,6 +57,8 @@ from .core import (
     ResponseMessage,
     Choice,
     ChatCompletionResponse,
+    ToolCallDelta,
+    ChatCompletionDelta,
     Error,
     
     # Streaming response models
@@ -68,6 +70,8 @@ from .core import (
     ThinkingEvent,
     ToolExecutionEvent,
     MessageEvent,
+    MessageDeltaEvent,
+    ThinkingDeltaEvent,
     ProductGridEvent,
     ProductEvent,
     ContentDisplayEvent,
@@ -136,6 +140,8 @@ __all__ = [
     "ResponseMessage",
     "Choice",
     "ChatCompletionResponse",
+    "ToolCallDelta",
+    "ChatCompletionDelta",
     "Error",
     
     # Streaming response models
@@ -147,6 +153,8 @@ __all__ = [
     "ThinkingEvent",
     "ToolExecutionEvent",
     "MessageEvent",
+    "MessageDeltaEvent",
+    "ThinkingDeltaEvent",
     "ProductGridEvent",
     "ProductEvent",
     "ContentDisplayEvent",
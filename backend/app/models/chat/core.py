@@ -228,6 +228,24 @@ class ChatCompletionResponse(BaseModel):
     choices: List[Choice] = Field(..., description="List of model responses")
     usage: Optional[Usage] = Field(None, description="Token usage statistics")
 
+class ToolCallDelta(BaseModel):
+    """Fragment of a tool call in a streamed completion"""
+    index: int = Field(..., description="Position of the tool call in the message")
+    id: Optional[str] = Field(None, description="Tool call ID (sent with the first fragment)")
+    name: Optional[str] = Field(None, description="Function name (sent with the first fragment)")
+    arguments: Optional[str] = Field(None, description="Next piece of the JSON arguments string")
+
+class ChatCompletionDelta(BaseModel):
+    """One increment of a streamed chat completion"""
+    id: Optional[str] = Field(None, description="Task ID")
+    created: Optional[int] = Field(None, description="Request creation time, Unix timestamp in seconds")
+    model: Optional[str] = Field(None, description="Model name")
+    content: Optional[str] = Field(None, description="New message text")
+    reasoning_content: Optional[str] = Field(None, description="New reasoning text")
+    tool_calls: Optional[List[ToolCallDelta]] = Field(None, description="Tool call fragments")
+    finish_reason: Optional[str] = Field(None, description="Set on the last delta of the choice")
+    usage: Optional[Usage] = Field(None, description="Token usage, usually on the final delta")
+
 class Error(BaseModel):
     """Error response"""
     code: int = Field(..., description="Error code")
@@ -268,6 +286,8 @@ class StreamEventType(str, Enum):
     THINKING = "thinking"
     TOOL_EXECUTION = "tool_execution"
     MESSAGE = "message"
+    MESSAGE_DELTA = "message_delta"      # Incremental assistant text
+    THINKING_DELTA = "thinking_delta"    # Incremental reasoning text
     PRODUCT = "product"
     PRODUCT_GRID = "product_grid"
     CONTENT_DISPLAY = "content_display"  # New: Direct content streaming
@@ -321,6 +341,16 @@ class MessageEvent(StreamEvent):
     content: str = Field(..., description="Message content")
     final: bool = Field(default=False, description="Whether this is the final message")
 
+class MessageDeltaEvent(StreamEvent):
+    """Incremental assistant text while the completion is still streaming"""
+    type: Literal[StreamEventType.MESSAGE_DELTA] = StreamEventType.MESSAGE_DELTA
+    content: str = Field(..., description="New text since the previous delta")
+
+class ThinkingDeltaEvent(StreamEvent):
+    """Incremental reasoning text while the completion is still streaming"""
+    type: Literal[StreamEventType.THINKING_DELTA] = StreamEventType.THINKING_DELTA
+    content: str = Field(..., description="New reasoning text since the previous delta")
+
 class ProductGridEvent(StreamEvent):
     """Product grid event for streaming products"""
     type: Literal[StreamEventType.PRODUCT_GRID] = StreamEventType.PRODUCT_GRID
@@ -365,6 +395,8 @@ StreamingEvent = Union[
     ThinkingEvent, 
     ToolExecutionEvent,
     MessageEvent,
+    MessageDeltaEvent,
+    ThinkingDeltaEvent,
     ProductGridEvent,
     ProductEvent,
     ContentDisplayEvent,
@@ -190,6 +190,31 @@ class Product(BaseModel):
             description=data.get('description')
         )
     
+    @classmethod
+    def from_extracted(cls, data: Dict[str, Any]) -> "Product":
+        """
+        Create Product from an extractor result dict.
+        
+        Accepts both the fast-path shape (title/brand/price as number) and the
+        Product.to_dict() shape returned by the per-page strategies.
+        
+        Args:
+            data: Product dictionary produced by an extractor
+        """
+        raw_price = data.get('price', 0)
+        
+        return cls(
+            product_name=data.get('title') or data.get('product_name') or '',
+            price=str(raw_price),
+            price_value=data.get('price_value', raw_price),
+            currency=data.get('currency') or 'USD',
+            store=data.get('brand') or data.get('store') or '',
+            product_url=data.get('product_url') or '',
+            image_url=data.get('image_url') or '',
+            sku=data.get('sku'),
+            description=data.get('description', '')
+        )
+    
     @classmethod
     def from_meta_tags(cls, title: str, description: str = "", image_url: str = "", 
                       price: Optional[float] = None, currency: str = "USD", url: str = "") -> "Product":
@@ -4,11 +4,12 @@ import os
 import json
 from datetime import datetime
 from typing import List, Dict, Any, Optional
-from pydantic import BaseModel, Field, computed_field, model_validator
+from pydantic import BaseModel, Field, PrivateAttr, computed_field, model_validator
 from urllib.parse import urlparse
 from loguru import logger
 
 from .product import Product
+from app.utils.storage_codec import read_document, write_document
 
 
 class ProductCollection(BaseModel):
@@ -24,6 +25,12 @@ class ProductCollection(BaseModel):
     site_name: Optional[str] = Field(default=None, description="Human-readable site name (e.g., 'Zara')")
     category: Optional[str] = Field(default=None, description="Product category if known")
     
+    # Set on a combined collection: names of the resources its products come from
+    source_collections: Optional[List[str]] = Field(default=None, description="Resources this collection combines, if it is a combination")
+    
+    # Bumped on every change made through the collection's methods
+    _version: int = PrivateAttr(default=0)
+    
     @computed_field
     @property
     def total_products(self) -> int:
@@ -46,13 +53,33 @@ class ProductCollection(BaseModel):
         
         return values
     
+    @property
+    def version(self) -> int:
+        """Change counter, for persisting only collections that changed"""
+        return self._version
+    
+    def mark_changed(self) -> None:
+        """Record a change made to the collection's fields directly"""
+        self._version += 1
+    
+    def snapshot_key(self) -> tuple:
+        """
+        Identifies the collection's current contents for dirty checks.
+        
+        Includes the product count so appends made straight to ``products``
+        are noticed too.
+        """
+        return (id(self), self._version, len(self.products))
+    
     def add_product(self, product: Product) -> None:
         """Add a product to the collection"""
         self.products.append(product)
+        self._version += 1
     
     def add_products(self, products: List[Product]) -> None:
         """Add multiple products to the collection"""
         self.products.extend(products)
+        self._version += 1
     
     
     def get_products(self, limit: int = 10, summary: bool = False, max_price: Optional[float] = None) -> Dict[str, Any]:
@@ -131,14 +158,17 @@ class ProductCollection(BaseModel):
     
     def save_to_file(self, conversation_id: Optional[str] = None, base_dir: str = "/Users/anshul/code/moleAI/backend/resources/chat_history") -> str:
         """
-        Save the ProductCollection to a JSON file in a conversation-specific folder
+        Save the ProductCollection to a file in a conversation-specific folder
+        
+        Encoded with the storage codec (CHAT_STORAGE_CODEC); load_from_file
+        reads any codec.
         
         Args:
             conversation_id: Optional conversation ID to organize files by conversation
             base_dir: Base directory for storing files (default: chat_history directory)
             
         Returns:
-            The path to the saved JSON file
+            The path to the saved file
         """
         try:
             # Determine the directory structure
@@ -165,9 +195,7 @@ class ProductCollection(BaseModel):
                 "file_type": "product_collection"
             })
             
-            # Save to JSON file
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(collection_data, f, indent=2, ensure_ascii=False)
+            write_document(filepath, collection_data)
             
             logger.info(f"Saved ProductCollection to: {filepath}")
             return filepath
@@ -175,3 +203,19 @@ class ProductCollection(BaseModel):
         except Exception as e:
             logger.error(f"Failed to save ProductCollection for {self.source_name}: {e}")
             return ""
+    
+    @classmethod
+    def load_from_file(cls, filepath: str) -> "ProductCollection":
+        """
+        Load a ProductCollection written by save_to_file (with any storage codec)
+        
+        Args:
+            filepath: Path returned by save_to_file
+            
+        Returns:
+            The collection
+        """
+        data = read_document(filepath)
+        for key in ("saved_at", "conversation_id", "file_type", "total_products"):
+            data.pop(key, None)
+        return cls.model_validate(data)
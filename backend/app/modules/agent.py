@@ -1,4 +1,5 @@
 from typing import List, Optional, Generator, Dict, Any, Callable, AsyncGenerator
+import asyncio
 import json
 from datetime import datetime
 from loguru import logger
@@ -20,6 +21,8 @@ from app.models.chat import (
     ToolExecutionStatus,
     LLMCallEvent,
     ThinkingEvent,
+    MessageDeltaEvent,
+    ThinkingDeltaEvent,
     ToolExecutionEvent,
     MessageEvent,
     ProductGridEvent,
@@ -32,13 +35,27 @@ from app.models.chat import (
 )
 from app.models.resource import Resource
 from app.models.product_collection import ProductCollection
+from app.modules.product_sink import ProductSink
+from app.modules.tool_executor import ToolCallExecutor, DEFAULT_MAX_PARALLEL_TOOL_CALLS
+from app.modules.history_index import HistoryIndex
+from app.modules.context_builder import ContextBuilder
 from app.tools import tool_registry
-from app.utils.chat_storage import chat_storage
+from app.utils.persistence import chat_writer
+from app.utils.blob_store import blob_storage, summarize_blob, BLOB_THRESHOLD_CHARS
 from app.llm.router import LLMRouter
+from app.llm.streaming import ChatCompletionAccumulator
+from app.llm.messages import PreparedMessages, ToolChainTracker, serialize_message
+from app.llm.tokens import CHARS_PER_TOKEN, estimate_message_tokens
+from app.llm.prompt_cache import PromptCacheStats
 
 # Configuration constants
 MAX_TOOL_CALLS_PER_TURN = 45
 
+# Rough resident cost, for the agent registry's memory budget: bytes per
+# character of history (message model plus cached API dict) and per product
+HISTORY_BYTES_PER_CHAR = 3
+PRODUCT_BYTES = 2048
+
 
 class ToolCallLimitHelper:
     """Helper to manage tool call limits and provide clean limit checking"""
@@ -90,14 +107,28 @@ class Agent:
                  reasoning_effort: str = "medium",
                  llm_router: Optional[LLMRouter] = None,
                  stream_callback: Optional[Callable[[Dict[str, Any]], None]] = None,
-                 conversation_id: Optional[str] = None):
+                 conversation_id: Optional[str] = None,
+                 stream_tokens: bool = True,
+                 max_parallel_tool_calls: int = DEFAULT_MAX_PARALLEL_TOOL_CALLS,
+                 history: Optional[List[Message]] = None):
         self.system_prompt = system_prompt
         self.model = model
         self.reasoning_effort = reasoning_effort
         self.message_history: List[Message] = []
+        
+        # API-ready dict for each history message, serialized once on append
+        self._api_messages: List[Dict[str, Any]] = []
+        self._tool_chain = ToolChainTracker()
+        self._orphaned_tool_indexes: List[int] = []
+        self._history_index = HistoryIndex()
+        self._context_builder = ContextBuilder(self._history_index, model)
+        
+        # Prompt tokens served from the provider's prompt cache in this conversation
+        self.prompt_cache = PromptCacheStats()
         self.llm_router = llm_router
         self.stream_callback = stream_callback
         self.conversation_id = conversation_id
+        self.stream_tokens = stream_tokens
         
         # Prepare thinking configuration once
         self.thinking = None
@@ -109,6 +140,18 @@ class Agent:
         
         # Initialize checklist storage
         self.checklist: Optional[Dict[str, Any]] = None
+        
+        # Runs the tool calls of a turn concurrently, capped per conversation
+        self.tool_executor = ToolCallExecutor(self.execute_tool_call, max_parallel_tool_calls)
+        
+        # Tool calls that have been started but not yet added to history, by tool call id
+        self._pending_tool_calls: Dict[str, asyncio.Task] = {}
+        
+        # Sink that extractors push products into one at a time
+        self.product_sink = ProductSink(self.stream_products)
+        
+        # Large tool results live on disk; history keeps a summary and a handle
+        self.blob_store = blob_storage.for_conversation(self.conversation_id)
 
         
         # Define context variables that will be available to tools
@@ -116,15 +159,23 @@ class Agent:
             'resources': self.resources,
             'conversation_id': self.conversation_id,
             'stream_callback': self._emit_tool_event,  # Add streaming callback to context
+            'product_sink': self.product_sink,  # Product-level streaming from extractors
+            'blob_store': self.blob_store,  # Full text of large tool results, by handle
             'agent': self  # Add reference to agent for checklist access
         }
         
-        # Always use registry tools
-        self.tools = tool_registry.to_openai_format()
+        # A resumed conversation (see AgentRegistry) brings its saved history,
+        # which is already persisted, so tracking carries on instead of restarting
+        if history:
+            if getattr(history[0], 'role', None) != "system":
+                self._record_message(SystemMessage(content=self.system_prompt))
+            for message in history:
+                self._record_message(message)
+            return
         
         # Add system message to history
         system_message = SystemMessage(content=self.system_prompt)
-        self.message_history.append(system_message)
+        self._record_message(system_message)
         
         # Start conversation tracking if conversation_id is provided
         if self.conversation_id:
@@ -134,140 +185,111 @@ class Agent:
                     "reasoning_effort": self.reasoning_effort,
                     "started_at": datetime.now().isoformat()
                 }
-                chat_storage.start_conversation(self.conversation_id, metadata)
+                chat_writer.start_conversation(self.conversation_id, metadata)
                 # Save the initial system message
-                chat_storage.append_message(self.conversation_id, system_message)
+                chat_writer.append_message(self.conversation_id, system_message)
             except Exception as e:
                 logger.warning(f"Failed to start conversation tracking: {e}")
 
 
+    @property
+    def tools(self) -> List[Dict[str, Any]]:
+        """Registry tool schemas, API-ready and cached until a tool is (un)registered"""
+        return tool_registry.api_tool_schemas()
+    
+    def _record_message(self, message: Message) -> None:
+        """Append to history, caching the message's API dict and token estimate, checking tool-call structure and updating the pruning index"""
+        api_message = serialize_message(message)
+        if not self._tool_chain.check(api_message):
+            logger.error(f"Tool message at position {len(self.message_history)} does not follow an assistant tool call")
+            self._orphaned_tool_indexes.append(len(self.message_history))
+        self.message_history.append(message)
+        self._api_messages.append(api_message)
+        self._history_index.add(message)
+        self._context_builder.add(message, api_message)
+    
     def add_to_history(self, message: Message):
         """Add a message to the conversation history"""
         if message is None:
             logger.error("Attempted to add None message to history")
             return
-        self.message_history.append(message)
+        self._record_message(message)
         
         # Save message incrementally
         if self.conversation_id:
             try:
-                chat_storage.append_message(self.conversation_id, message)
+                chat_writer.append_message(self.conversation_id, message)
             except Exception as e:
                 logger.warning(f"Failed to save message incrementally: {e}")
     
     def _prune_message_history(self) -> List[Message]:
+        """Pruned history as message models (see _pruned_indexes)"""
+        return [self.message_history[i] for i in self._pruned_indexes()]
+    
+    def _pruned_indexes(self) -> List[int]:
         """
         Prune message history to keep only essential messages while maintaining
         OpenAI's required message structure (tool messages must follow assistant tool_calls).
         
-        Keeps:
-        1. System message (initial system prompt)
-        2. Initial user message (first user message)
-        3. Checklist-related system messages
-        4. Recent context (last N exchanges with proper structure)
-        """
-        if not self.message_history:
-            return []
-        
-        pruned_messages = []
-        
-        # Always keep the first system message (system prompt)
-        system_message = None
-        initial_user_message = None
-        checklist_messages = []
-        
-        # Find essential messages
-        for i, message in enumerate(self.message_history):
-            if hasattr(message, 'role'):
-                if message.role == "system":
-                    if system_message is None:
-                        # First system message is the system prompt
-                        system_message = message
-                    elif hasattr(message, 'content') and message.content and "CHECKLIST" in message.content:
-                        # This is a checklist message
-                        checklist_messages.append(message)
-                elif message.role == "user" and initial_user_message is None:
-                    # First user message
-                    initial_user_message = message
-        
-        # Get recent messages while maintaining tool call integrity
-        recent_count = 30
-        recent_start_idx = max(0, len(self.message_history) - recent_count)
-        
-        # Ensure we don't start with orphaned tool messages
-        # Scan backwards from recent_start_idx to find a safe starting point
-        for i in range(recent_start_idx, len(self.message_history)):
-            msg = self.message_history[i]
-            if hasattr(msg, 'role'):
-                # Safe starting points: system, user, or assistant without tool_calls
-                if msg.role in ["system", "user"]:
-                    recent_start_idx = i
-                    break
-                elif msg.role == "assistant":
-                    # Check if this assistant message has tool_calls
-                    has_tool_calls = (hasattr(msg, 'tool_calls') and 
-                                     msg.tool_calls is not None and 
-                                     len(msg.tool_calls) > 0)
-                    if not has_tool_calls:
-                        # Safe to start here - no tool calls to worry about
-                        recent_start_idx = i
-                        break
-        
-        # Collect recent messages starting from safe point
-        recent_messages = []
-        for message in self.message_history[recent_start_idx:]:
-            if (message != system_message and 
-                message != initial_user_message and 
-                message not in checklist_messages):
-                recent_messages.append(message)
-        
-        # Validate the recent messages don't end with assistant+tool_calls without responses
-        # If the last message is an assistant with tool_calls, remove it to avoid incomplete chains
-        if recent_messages:
-            last_msg = recent_messages[-1]
-            if (hasattr(last_msg, 'role') and last_msg.role == "assistant" and
-                hasattr(last_msg, 'tool_calls') and last_msg.tool_calls):
-                # This assistant message has tool_calls but we may not have the responses yet
-                # Check if there are tool responses after it
-                has_responses = False
-                last_msg_idx = self.message_history.index(last_msg)
-                for msg in self.message_history[last_msg_idx + 1:]:
-                    if hasattr(msg, 'role') and msg.role == "tool":
-                        has_responses = True
-                        break
-                
-                # If no responses found, this is an incomplete chain - remove it
-                if not has_responses:
-                    recent_messages = recent_messages[:-1]
-        
-        # Build pruned history in order
-        if system_message:
-            pruned_messages.append(system_message)
-        
-        if initial_user_message:
-            pruned_messages.append(initial_user_message)
+        Keeps the system prompt, the initial user message, checklist messages and
+        the recent context; the positions come from the index kept up to date in
+        _record_message, so this only walks the recent window.
         
-        # Add checklist messages (they contain current state)
-        pruned_messages.extend(checklist_messages)
+        Returns:
+            Positions in message_history, in request order
+        """
+        return self._history_index.pruned_indexes()
+
+    def _prepare_messages_with_checklist(self) -> PreparedMessages:
+        """
+        Prepare messages including checklist as the last message if it exists.
         
-        # Add recent context
-        pruned_messages.extend(recent_messages)
+        Assembled from the per-message API dicts cached on append, so building a
+        request never re-serializes or re-validates the history. The pruned
+        history is compacted to the model's prompt token budget (see ContextBuilder).
         
-        return pruned_messages
-
-    def _prepare_messages_with_checklist(self) -> List[Message]:
-        """Prepare messages including checklist as the last message if it exists"""
-        # Use pruned history instead of full history
-        messages = self._prune_message_history()
+        Layout is cache-friendly: system prompt, first user message and the
+        history window form a prefix that only grows by appending (the window
+        start is sticky, see HistoryIndex); the checklist, which changes from
+        call to call, always comes last so it never invalidates that prefix.
+        """
+        checklist_message = None
+        checklist_api_message = None
+        reserved_tokens = self._context_builder.schema_tokens(self.tools)
         
         # If checklist exists, add it as the last message
         if self.checklist:
             checklist_content = f"CURRENT CHECKLIST:\n{json.dumps(self.checklist, indent=2)}\n\nAlways check if any checklist items can be marked as completed based on the conversation and use it to guide your actions."
             
             checklist_message = SystemMessage(content=checklist_content)
+            checklist_api_message = serialize_message(checklist_message)
+            reserved_tokens += estimate_message_tokens(checklist_api_message)
+        
+        indexes, api_messages, messages = self._context_builder.build(
+            self.message_history,
+            self._api_messages,
+            reserved_tokens=reserved_tokens,
+            resources=self.resources
+        )
+        
+        orphaned = set(self._orphaned_tool_indexes).intersection(indexes)
+        if orphaned:
+            position = indexes.index(min(orphaned))
+            raise ValueError(
+                f"Invalid message structure: tool message at position {position} "
+                f"must follow an assistant message with tool_calls"
+            )
+        
+        if checklist_message:
             messages.append(checklist_message)
+            api_messages.append(checklist_api_message)
         
-        return messages
+        return PreparedMessages(api_messages, messages)
+    
+    @property
+    def compaction_decisions(self) -> List[Dict[str, Any]]:
+        """Context compaction decisions made so far in this conversation"""
+        return list(self._context_builder.decisions)
     
     def _emit_tool_event(self, tool_name: str, status: str, message: str = None, progress: Dict[str, Any] = None, result: str = None, error: str = None):
         """Emit a tool execution event if streaming callback is available"""
@@ -454,6 +476,135 @@ class Agent:
             return error_msg
     
     
+    async def _call_llm(self, messages: List[Message]) -> AsyncGenerator[Any, None]:
+        """
+        Call the LLM, yielding text/reasoning deltas as they arrive.
+        
+        The last item yielded is always the complete ChatCompletionResponse,
+        assembled from the deltas, so callers handle it exactly like a
+        non-streamed response.
+        """
+        if not self.stream_tokens:
+            response = await self.llm_router.create_completion_async(
+                messages=messages,
+                model=self.model,
+                tools=self.tools,
+                thinking=self.thinking,
+                prompt_cache_key=self.conversation_id
+            )
+            self._record_usage(response)
+            yield response
+            return
+        
+        accumulator = ChatCompletionAccumulator()
+        try:
+            async for delta in self.llm_router.stream_completion(
+                messages=messages,
+                model=self.model,
+                tools=self.tools,
+                thinking=self.thinking,
+                prompt_cache_key=self.conversation_id
+            ):
+                accumulator.add(delta)
+                if delta.reasoning_content:
+                    yield ThinkingDeltaEvent(
+                        content=delta.reasoning_content,
+                        timestamp=datetime.now().isoformat()
+                    )
+                if delta.content:
+                    yield MessageDeltaEvent(
+                        content=delta.content,
+                        timestamp=datetime.now().isoformat()
+                    )
+                # Start each tool call as soon as its arguments are complete
+                for tool_call in accumulator.pop_ready_tool_calls():
+                    yield self._start_tool_call(tool_call)
+        except Exception:
+            self._cancel_pending_tool_calls()
+            raise
+        response = accumulator.to_response()
+        self._record_usage(response)
+        yield response
+    
+    def _record_usage(self, response: ChatCompletionResponse) -> None:
+        """Add a completion's usage to the conversation's prompt cache stats"""
+        self.prompt_cache.record(response.usage)
+        if response.usage:
+            logger.info(
+                f"Prompt cache: {self.prompt_cache.last_cached_tokens}/{response.usage.prompt_tokens} tokens cached "
+                f"(conversation hit ratio {self.prompt_cache.hit_ratio():.0%})"
+            )
+    
+    def _start_tool_call(self, tool_call: ToolCall) -> ToolExecutionEvent:
+        """
+        Hand a tool call to the executor and return its STARTED event.
+        
+        Called while the LLM response is still streaming (as soon as the call's
+        arguments are complete) and again from run() for any call not started
+        yet. run() collects the result by tool call id.
+        """
+        self._pending_tool_calls[tool_call.id] = self.tool_executor.submit(tool_call)
+        return ToolExecutionEvent(
+            tool_name=tool_call.function.name,
+            status=ToolExecutionStatus.STARTED,
+            tool_call_id=tool_call.id,
+            timestamp=datetime.now().isoformat()
+        )
+    
+    def _cancel_pending_tool_calls(self) -> None:
+        """Cancel started tool calls whose results will never be used"""
+        for task in self._pending_tool_calls.values():
+            task.cancel()
+        self._pending_tool_calls.clear()
+    
+    def _tool_result_preview(self, tool_result: Any) -> str:
+        """Serialize a tool result for the COMPLETED event (JSON for dicts/lists, string for others)"""
+        # Check if result is multimodal content (list of VisionMultimodalContentItem)
+        if isinstance(tool_result, list) and tool_result and isinstance(tool_result[0], VisionMultimodalContentItem):
+            # Multimodal content - convert to summary string for display
+            result_str = f"Multimodal content with {len(tool_result)} items"
+        elif isinstance(tool_result, (dict, list)):
+            try:
+                result_str = json.dumps(tool_result, ensure_ascii=False)
+            except TypeError as e:
+                # Fallback if JSON serialization fails
+                result_str = str(tool_result)
+        else:
+            result_str = str(tool_result)
+        
+        # Truncate result if too long for streaming (keep first 2000 chars)
+        return result_str if len(result_str) <= 2000 else result_str[:2000] + "... (truncated)"
+    
+    def _tool_message(self, tool_call: ToolCall, tool_result: Any) -> ToolMessage:
+        """Build the history entry for a tool result - handle multimodal content"""
+        if isinstance(tool_result, list) and tool_result and isinstance(tool_result[0], VisionMultimodalContentItem):
+            # This is multimodal content from tools like get_resource; large
+            # text-only results are stored out of line like any other text
+            text_only = all(isinstance(item, TextContent) for item in tool_result)
+            if not text_only or sum(len(item.text) for item in tool_result) <= BLOB_THRESHOLD_CHARS:
+                return ToolMessage(
+                    content=tool_result,  # Pass multimodal content directly
+                    tool_call_id=tool_call.id
+                )
+            content = "\n".join(item.text for item in tool_result)
+        # Regular string content or other types
+        elif isinstance(tool_result, dict):
+            content = json.dumps(tool_result)
+        else:
+            content = str(tool_result)
+        
+        # Keep large results out of line so history and requests stay small
+        if len(content) > BLOB_THRESHOLD_CHARS:
+            try:
+                content = summarize_blob(content, self.blob_store.put(content))
+            except OSError as e:
+                logger.warning(f"Failed to store large tool result, keeping it inline: {e}")
+        
+        return ToolMessage(
+            content=content,
+            tool_call_id=tool_call.id
+        )
+    
     async def run(self, initial_message: Message) -> AsyncGenerator[StreamingEvent, None]:
         """
         Process a message and handle tool calls, continuing the conversation until completion.
@@ -463,12 +614,12 @@ class Agent:
             raise ValueError("No LLM router configured for this agent")
         
         # Add initial message to history
-        self.message_history.append(initial_message)
+        self._record_message(initial_message)
         
         # Save message incrementally
         if self.conversation_id:
             try:
-                chat_storage.append_message(self.conversation_id, initial_message)
+                chat_writer.append_message(self.conversation_id, initial_message)
             except Exception as e:
                 logger.warning(f"Failed to save message incrementally: {e}")
         
@@ -482,12 +633,11 @@ class Agent:
         try:
             messages_with_checklist = self._prepare_messages_with_checklist()
             
-            response = self.llm_router.create_completion(
-                messages=messages_with_checklist,
-                model=self.model,
-                tools=self.tools,
-                thinking=self.thinking
-            )
+            async for item in self._call_llm(messages_with_checklist):
+                if isinstance(item, ChatCompletionResponse):
+                    response = item
+                else:
+                    yield item
             
             # Yield thinking content if available
             if response.choices and response.choices[0].message.reasoning_content:
@@ -525,64 +675,32 @@ class Agent:
                     tool_calls=choice.message.tool_calls
                 )
                 self.add_to_history(assistant_msg)
-                # Execute each tool call and add results to history
-                for tool_call in choice.message.tool_calls:
-                    # Yield tool execution start event
-                    yield ToolExecutionEvent(
-                        tool_name=tool_call.function.name,
-                        status=ToolExecutionStatus.STARTED,
-                        tool_call_id=tool_call.id,
-                        timestamp=datetime.now().isoformat()
-                    )
-                    
-                    # Execute the tool (tool_call should already be in the right format)
-                    tool_result = await self.execute_tool_call(tool_call)
-                    
-                    # Yield tool execution completion event with result
-                    # Serialize result properly (JSON for dicts/lists, string for others)
-                    # Check if result is multimodal content (list of VisionMultimodalContentItem)
-                    if isinstance(tool_result, list) and tool_result and isinstance(tool_result[0], VisionMultimodalContentItem):
-                        # Multimodal content - convert to summary string for display
-                        result_str = f"Multimodal content with {len(tool_result)} items"
-                    elif isinstance(tool_result, (dict, list)):
-                        try:
-                            result_str = json.dumps(tool_result, ensure_ascii=False)
-                        except TypeError as e:
-                            # Fallback if JSON serialization fails
-                            result_str = str(tool_result)
-                    else:
-                        result_str = str(tool_result)
-                    
-                    # Truncate result if too long for streaming (keep first 2000 chars)
-                    truncated_result = result_str if len(result_str) <= 2000 else result_str[:2000] + "... (truncated)"
-                    
-                    yield ToolExecutionEvent(
-                        tool_name=tool_call.function.name,
-                        status=ToolExecutionStatus.COMPLETED,
-                        tool_call_id=tool_call.id,
-                        result=truncated_result,
-                        timestamp=datetime.now().isoformat()
-                    )
-                    
-                    # Add tool result to history - handle multimodal content
-                    if isinstance(tool_result, list) and tool_result and isinstance(tool_result[0], VisionMultimodalContentItem):
-                        # This is multimodal content from tools like get_resource
-                        tool_msg = ToolMessage(
-                            content=tool_result,  # Pass multimodal content directly
-                            tool_call_id=tool_call.id
-                        )
-                    else:
-                        # Regular string content or other types
-                        if isinstance(tool_result, dict):
-                            content = json.dumps(tool_result)
-                        else:
-                            content = str(tool_result)
-                        
-                        tool_msg = ToolMessage(
-                            content=content,
-                            tool_call_id=tool_call.id
+                # Start every call not already started while the response streamed
+                tool_calls = choice.message.tool_calls
+                tasks = {}
+                for tool_call in tool_calls:
+                    if tool_call.id not in self._pending_tool_calls:
+                        yield self._start_tool_call(tool_call)
+                    tasks[tool_call.id] = self._pending_tool_calls.pop(tool_call.id)
+                
+                # Report each call as it finishes, in completion order
+                calls_by_task = {tasks[tool_call.id]: tool_call for tool_call in tool_calls}
+                pending = set(calls_by_task)
+                while pending:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        tool_call = calls_by_task[task]
+                        yield ToolExecutionEvent(
+                            tool_name=tool_call.function.name,
+                            status=ToolExecutionStatus.COMPLETED,
+                            tool_call_id=tool_call.id,
+                            result=self._tool_result_preview(task.result()),
+                            timestamp=datetime.now().isoformat()
                         )
-                    self.add_to_history(tool_msg)
+                
+                # Add results to history in the original call order
+                for tool_call in tool_calls:
+                    self.add_to_history(self._tool_message(tool_call, tasks[tool_call.id].result()))
                 
                 # Yield continuation LLM call event
                 yield LLMCallEvent(
@@ -591,15 +709,14 @@ class Agent:
                     timestamp=datetime.now().isoformat()
                 )
                 
-                messages_with_checklist = self._prepare_messages_with_checklist()
-                
                 try:
-                    response = self.llm_router.create_completion(
-                        messages=messages_with_checklist,
-                        model=self.model,
-                        tools=self.tools,
-                        thinking=self.thinking
-                    )
+                    messages_with_checklist = self._prepare_messages_with_checklist()
+                    
+                    async for item in self._call_llm(messages_with_checklist):
+                        if isinstance(item, ChatCompletionResponse):
+                            response = item
+                        else:
+                            yield item
                     
                     # Yield thinking content if available
                     if response.choices and response.choices[0].message.reasoning_content:
@@ -631,15 +748,14 @@ class Agent:
                     timestamp=datetime.now().isoformat()
                 )
                 
-                messages_with_checklist = self._prepare_messages_with_checklist()
-                
                 try:
-                    response = self.llm_router.create_completion(
-                        messages=messages_with_checklist,
-                        model=self.model,
-                        tools=self.tools,
-                        thinking=self.thinking
-                    )
+                    messages_with_checklist = self._prepare_messages_with_checklist()
+                    
+                    async for item in self._call_llm(messages_with_checklist):
+                        if isinstance(item, ChatCompletionResponse):
+                            response = item
+                        else:
+                            yield item
                     
                     # Yield thinking content if available
                     if response.choices and response.choices[0].message.reasoning_content:
@@ -657,6 +773,9 @@ class Agent:
                     choice.message.tool_calls = []  # Use empty list instead of None
                     break
         
+        # Calls started for a response that ended the turn are not used
+        self._cancel_pending_tool_calls()
+        
         # Yield final response
         if response.choices and response.choices[0].message.content:
             yield MessageEvent(
@@ -674,6 +793,15 @@ class Agent:
     def get_message_history(self) -> List[Message]:
         return self.message_history.copy()
     
+    def estimated_memory_bytes(self) -> int:
+        """Rough resident size of the history and resources (combined collections share their products)"""
+        history_chars = sum(self._context_builder.tokens) * CHARS_PER_TOKEN
+        products = sum(
+            len(collection.products) for collection in self.resources.values()
+            if hasattr(collection, 'products') and not getattr(collection, 'source_collections', None)
+        )
+        return history_chars * HISTORY_BYTES_PER_CHAR + products * PRODUCT_BYTES
+    
     def get_system_prompt(self) -> str:
         return self.system_prompt
     
@@ -0,0 +1,371 @@
+"""
+Bounded registry of resident agents.
+
+Agents hold a conversation's full history and product collections in memory.
+The registry keeps them in LRU order under a memory budget (estimated, see
+Agent.estimated_memory_bytes), an idle TTL and a count cap. An evicted agent
+is snapshotted through the persistence writer; when its conversation comes
+back, the agent is rebuilt from the saved journal and resource snapshots.
+
+Agents serving a request are pinned with ``acquire``/``release`` and are
+never evicted mid-turn, nor while the commit of their last turn is queued.
+
+With a shared StateStore, several worker processes each keep their own
+registry: ``release`` commits the turn by bumping the conversation's version
+on the writer thread, after the turn's queued writes, and an agent whose
+version is behind (another worker served a later turn) is dropped and rebuilt
+from storage.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from loguru import logger
+
+from app.models import AssistantMessage, Message, SystemMessage, ToolMessage, UserMessage
+from app.models.product_collection import ProductCollection
+from app.modules.agent import Agent
+from app.utils.persistence import PersistenceWriter, chat_writer
+from app.utils.state_store import StateStore, new_owner_id
+
+
+AGENT_MEMORY_BUDGET_BYTES = int(float(os.getenv("AGENT_MEMORY_BUDGET_MB", "512")) * 1024 * 1024)
+AGENT_IDLE_TTL_SECONDS = float(os.getenv("AGENT_IDLE_TTL_SECONDS", "1800"))
+MAX_RESIDENT_AGENTS = int(os.getenv("MAX_RESIDENT_AGENTS", "1000"))
+# How often idle agents are looked for when nothing else triggers an eviction
+AGENT_SWEEP_SECONDS = float(os.getenv("AGENT_SWEEP_SECONDS", "60"))
+
+# How long a rehydration waits for the evicted agent's snapshot to be written
+REHYDRATE_FLUSH_TIMEOUT = 2.0
+
+MESSAGE_TYPES = {
+    "system": SystemMessage,
+    "user": UserMessage,
+    "assistant": AssistantMessage,
+    "tool": ToolMessage,
+}
+
+
+@dataclass
+class SavedConversation:
+    """What a rehydrated agent is rebuilt from"""
+    messages: List[Message]
+    resources: Dict[str, ProductCollection]
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class _Resident:
+    agent: Agent
+    last_used: float
+    size: int
+    busy: int = 0
+    version: int = 0
+    # Turns released but not yet committed on the writer thread
+    committing: int = 0
+
+
+def load_saved_conversation(conversation_id: str, writer: PersistenceWriter = chat_writer) -> Optional[SavedConversation]:
+    """
+    Read a conversation's messages, resources and metadata back from storage
+
+    Returns:
+        The saved conversation, or None if nothing was saved
+    """
+    storage = writer.storage
+    data = storage.load_chat_history(conversation_id)
+    if not data or not data.get("messages"):
+        return None
+
+    messages: List[Message] = []
+    for record in data["messages"]:
+        message_type = MESSAGE_TYPES.get(record.get("role"))
+        if message_type is None or "serialization_error" in record:
+            continue
+        try:
+            messages.append(message_type.model_validate(record))
+        except Exception as e:
+            logger.warning(f"Skipping unreadable {record.get('role')} message in {conversation_id}: {e}")
+
+    resources: Dict[str, ProductCollection] = {}
+    for name, resource_data in (storage.load_resources(conversation_id) or {}).items():
+        if isinstance(resource_data, dict) and "products" in resource_data:
+            try:
+                resources[name] = ProductCollection.model_validate(resource_data)
+            except Exception as e:
+                logger.warning(f"Skipping unreadable resource {name} in {conversation_id}: {e}")
+
+    return SavedConversation(messages=messages, resources=resources, metadata=data.get("metadata") or {})
+
+
+class AgentRegistry:
+    """
+    Conversation id -> Agent, bounded by memory, idle time and count.
+
+    Dict-style access (``in``, ``[]``, ``del``) sees resident agents only;
+    ``get`` and ``get_or_create`` rehydrate evicted ones.
+    """
+
+    def __init__(self,
+                 factory: Callable[[str, str, Optional[SavedConversation]], Agent],
+                 writer: PersistenceWriter = chat_writer,
+                 memory_budget_bytes: int = AGENT_MEMORY_BUDGET_BYTES,
+                 idle_ttl_seconds: float = AGENT_IDLE_TTL_SECONDS,
+                 max_agents: int = MAX_RESIDENT_AGENTS,
+                 clock: Callable[[], float] = time.monotonic,
+                 state_store: Optional[StateStore] = None):
+        self.factory = factory
+        self.writer = writer
+        self.state_store = state_store
+        self.memory_budget_bytes = memory_budget_bytes
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self.max_agents = max_agents
+        self.clock = clock
+
+        self._residents: "OrderedDict[str, _Resident]" = OrderedDict()
+        self._bytes = 0
+        # Evicted here, so their snapshot may still be queued in the writer
+        self._evicted: Set[str] = set()
+        # Cleared through the API; the next request starts over instead of rehydrating
+        self._cleared: Set[str] = set()
+        self._lock = threading.RLock()
+        # Guards _Resident.committing, which the writer thread decrements without the registry lock
+        self._commit_lock = threading.Lock()
+        self._counts = {"created": 0, "rehydrated": 0, "evicted_idle": 0, "evicted_memory": 0, "stale": 0}
+
+    def __contains__(self, conversation_id: str) -> bool:
+        return conversation_id in self._residents
+
+    def __getitem__(self, conversation_id: str) -> Agent:
+        return self._residents[conversation_id].agent
+
+    def __delitem__(self, conversation_id: str) -> None:
+        self.discard(conversation_id)
+
+    def __len__(self) -> int:
+        return len(self._residents)
+
+    def get(self, conversation_id: str, model: Optional[str] = None) -> Optional[Agent]:
+        """Resident agent, or one rehydrated from storage; None if the conversation is unknown"""
+        with self._lock:
+            resident = self._touch(conversation_id)
+            if resident and self.state_store and self.state_store.version(conversation_id) != resident.version:
+                # Another worker has served a later turn
+                self._drop(conversation_id)
+                self._counts["stale"] += 1
+                resident = None
+            if resident:
+                return resident.agent
+            if conversation_id in self._cleared:
+                return None
+            saved = self._load(conversation_id)
+            if saved is None:
+                return None
+            agent = self.factory(conversation_id, model or saved.metadata.get("model"), saved)
+            self._counts["rehydrated"] += 1
+            self._add(conversation_id, agent)
+            return agent
+
+    def get_or_create(self, conversation_id: str, model: str) -> Agent:
+        """Resident or rehydrated agent for the conversation, else a new one"""
+        with self._lock:
+            agent = self.get(conversation_id)
+            if agent is None:
+                self._cleared.discard(conversation_id)
+                agent = self.factory(conversation_id, model, None)
+                self._counts["created"] += 1
+                self._add(conversation_id, agent)
+            return agent
+
+    def acquire(self, conversation_id: str) -> None:
+        """Pin a resident agent while it serves a request"""
+        with self._lock:
+            resident = self._touch(conversation_id)
+            if resident:
+                resident.busy += 1
+
+    def release(self, conversation_id: str, unlock: Optional[Callable[[], Any]] = None) -> None:
+        """
+        Unpin an agent after its turn, re-measure it and evict to stay within bounds
+
+        The turn is committed on the writer thread once everything queued for it
+        is written, and ``unlock`` (the turn's conversation lock) runs after the
+        commit, so another worker never takes the conversation before its
+        writes land. Nothing here waits for them.
+        """
+        with self._lock:
+            resident = self._touch(conversation_id)
+            if resident:
+                resident.busy = max(0, resident.busy - 1)
+                size = resident.agent.estimated_memory_bytes()
+                self._bytes += size - resident.size
+                resident.size = size
+            if self.state_store or unlock:
+                if resident:
+                    with self._commit_lock:
+                        resident.committing += 1
+                self.writer.call(lambda: self._commit(conversation_id, resident, unlock))
+            self.evict()
+
+    def discard(self, conversation_id: str) -> None:
+        """Drop an agent without a snapshot; the conversation starts over next time"""
+        with self._lock:
+            self._drop(conversation_id)
+            self._cleared.add(conversation_id)
+            self._evicted.discard(conversation_id)
+
+    def evict(self) -> int:
+        """
+        Evict idle agents past the TTL, then least recently used ones while over budget
+
+        Returns:
+            Number of agents evicted
+        """
+        evicted = 0
+        with self._lock:
+            now = self.clock()
+            for conversation_id, resident in list(self._residents.items()):
+                if self._idle(resident) and now - resident.last_used > self.idle_ttl_seconds:
+                    self._evict(conversation_id, "evicted_idle")
+                    evicted += 1
+
+            # The most recently used agent always stays, even if it alone is over budget
+            for conversation_id, resident in list(self._residents.items())[:-1]:
+                if self._bytes <= self.memory_budget_bytes and len(self._residents) <= self.max_agents:
+                    break
+                if self._idle(resident):
+                    self._evict(conversation_id, "evicted_memory")
+                    evicted += 1
+        return evicted
+
+    async def sweep(self, interval_seconds: float = AGENT_SWEEP_SECONDS) -> None:
+        """Run ``evict`` every ``interval_seconds`` (off the event loop) until cancelled"""
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                await asyncio.to_thread(self.evict)
+            except Exception as e:
+                logger.warning(f"Agent sweep failed: {e}")
+
+    def metrics(self) -> Dict[str, Any]:
+        """Resident count and estimated memory, per agent and in total"""
+        with self._lock:
+            sizes = [resident.size for resident in self._residents.values()]
+            return {
+                "resident_agents": len(sizes),
+                "busy_agents": sum(1 for resident in self._residents.values() if resident.busy),
+                "estimated_bytes": self._bytes,
+                "memory_budget_bytes": self.memory_budget_bytes,
+                "memory_per_agent": {
+                    "mean": self._bytes // len(sizes) if sizes else 0,
+                    "max": max(sizes, default=0),
+                },
+                "idle_ttl_seconds": self.idle_ttl_seconds,
+                "max_agents": self.max_agents,
+                **self._counts,
+            }
+
+    def _idle(self, resident: _Resident) -> bool:
+        """
+        Not serving a turn, and no turn commit queued; until the commit runs the
+        turn still holds the conversation lock, so a snapshot would be skipped
+        """
+        return resident.busy == 0 and resident.committing == 0
+
+    def _touch(self, conversation_id: str) -> Optional[_Resident]:
+        resident = self._residents.get(conversation_id)
+        if resident:
+            resident.last_used = self.clock()
+            self._residents.move_to_end(conversation_id)
+        return resident
+
+    def _add(self, conversation_id: str, agent: Agent) -> None:
+        size = agent.estimated_memory_bytes()
+        version = self.state_store.version(conversation_id) if self.state_store else 0
+        self._residents[conversation_id] = _Resident(agent=agent, last_used=self.clock(), size=size, version=version)
+        self._bytes += size
+        self.evict()
+    
+    def _drop(self, conversation_id: str) -> Optional[_Resident]:
+        resident = self._residents.pop(conversation_id, None)
+        if resident:
+            self._bytes -= resident.size
+        return resident
+
+    def _load(self, conversation_id: str) -> Optional[SavedConversation]:
+        if conversation_id in self._evicted:
+            # The snapshot was queued at eviction; let it land first
+            self.writer.flush(REHYDRATE_FLUSH_TIMEOUT)
+            self._evicted.discard(conversation_id)
+        try:
+            return load_saved_conversation(conversation_id, self.writer)
+        except Exception as e:
+            logger.warning(f"Could not rehydrate conversation {conversation_id}: {e}")
+            return None
+
+    def _evict(self, conversation_id: str, reason: str) -> None:
+        resident = self._drop(conversation_id)
+        self._counts[reason] += 1
+        self._evicted.add(conversation_id)
+        if self._snapshot(conversation_id, resident):
+            logger.info(f"Evicted agent {conversation_id} ({reason}, ~{resident.size:,} bytes)")
+        else:
+            logger.info(f"Evicted agent {conversation_id} ({reason}, ~{resident.size:,} bytes; newer state elsewhere)")
+
+    def _commit(self, conversation_id: str, resident: Optional[_Resident], unlock: Optional[Callable[[], Any]]) -> None:
+        """Bump the conversation's version for a finished turn, then unlock it (writer thread)"""
+        try:
+            # Not under the registry lock: a rehydration holds it while it waits for the writer
+            if self.state_store and resident:
+                resident.version = self.state_store.bump_version(conversation_id)
+        except Exception as e:
+            logger.warning(f"Failed to commit turn of conversation {conversation_id}: {e}")
+        finally:
+            if unlock:
+                unlock()
+            if resident:
+                with self._commit_lock:
+                    resident.committing -= 1
+
+    def _snapshot(self, conversation_id: str, resident: _Resident) -> bool:
+        """
+        Queue the evicted agent's final state
+
+        With a shared state store the snapshot is only written while holding the
+        conversation's lock, and only if no other worker has committed a later
+        turn; otherwise that worker's state is the newer one.
+        """
+        owner = None
+        try:
+            if self.state_store:
+                owner = new_owner_id()
+                if not self.state_store.try_lock(conversation_id, owner):
+                    return False
+                if self.state_store.version(conversation_id) != resident.version:
+                    self.state_store.unlock(conversation_id, owner)
+                    return False
+
+            agent = resident.agent
+            # Messages are journaled as they are added; this closes the journal
+            # and saves any collections changed since the last turn ended
+            self.writer.end_conversation(
+                conversation_id,
+                metadata={"model": agent.model, "reasoning_effort": agent.reasoning_effort,
+                          "checklist": agent.checklist},
+                end_reason="evicted",
+                resources=agent.resources
+            )
+            if owner:
+                # Unlock once the snapshot is on disk
+                self.writer.call(lambda: self.state_store.unlock(conversation_id, owner))
+            return True
+        except Exception as e:
+            logger.warning(f"Failed to snapshot evicted conversation {conversation_id}: {e}")
+            if owner:
+                self.state_store.unlock(conversation_id, owner)
+            return False
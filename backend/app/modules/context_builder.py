@@ -0,0 +1,182 @@
+"""
+Token-budgeted request context.
+
+Starts from the pruned history (see HistoryIndex) and, while the estimated
+prompt is over the model's budget:
+
+1. Replaces old tool results with short stubs naming the resources (or
+   stored result) they refer to, oldest first; the agent can fetch those
+   again with get_resource / read_tool_result
+2. Drops the oldest turns of the recent window, at safe boundaries
+
+Stubs are sticky, so a compacted result stays compacted on later requests.
+Every decision is recorded once in ``decisions``.
+"""
+
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from app.llm.messages import serialize_message
+from app.llm.tokens import estimate_message_tokens, estimate_text_tokens, prompt_token_budget
+from app.models import Message, ToolMessage
+from app.models.chat import ToolCall
+from app.modules.history_index import HistoryIndex
+
+
+# Tool results smaller than this are never worth stubbing
+STUB_MIN_TOKENS = 200
+
+# How much of a tool call's arguments to repeat in its stub
+STUB_ARGUMENTS_CHARS = 200
+
+# Handle of an out-of-line tool result (see app.utils.blob_store)
+BLOB_HANDLE_PATTERN = re.compile(r"blob:[0-9a-f]+")
+
+
+class ContextBuilder:
+    """
+    Picks the messages for a request so the prompt stays under a token budget.
+
+    Token estimates are taken once per message, in ``add``, alongside the
+    other per-message caches in Agent._record_message.
+    """
+
+    def __init__(self, history_index: HistoryIndex, model: str, budget: Optional[int] = None):
+        self.index = history_index
+        self.budget = budget or prompt_token_budget(model)
+        self.tokens: List[int] = []
+        self.decisions: List[Dict[str, Any]] = []
+        self._tool_calls: Dict[str, ToolCall] = {}
+        self._stubs: Dict[int, Tuple[Dict[str, Any], ToolMessage, int]] = {}
+        self._dropped_before = 0
+        self._schema_tokens: Tuple[Any, int] = (None, 0)
+
+    def add(self, message: Message, api_message: Dict[str, Any]) -> None:
+        """Record the token estimate (and any tool calls) of the next history message"""
+        self.tokens.append(estimate_message_tokens(api_message))
+        for call in getattr(message, 'tool_calls', None) or []:
+            self._tool_calls[call.id] = call
+
+    def schema_tokens(self, tools: Optional[List[Dict[str, Any]]]) -> int:
+        """Estimated tokens of the tool schemas, cached while the registry returns the same list"""
+        if not tools:
+            return 0
+        cached_tools, tokens = self._schema_tokens
+        if cached_tools is not tools:
+            json_bytes = getattr(tools, 'json_bytes', None)
+            text = json_bytes.decode() if json_bytes is not None else str(list(tools))
+            tokens = estimate_text_tokens(text)
+            self._schema_tokens = (tools, tokens)
+        return tokens
+
+    def _message_tokens(self, position: int) -> int:
+        stub = self._stubs.get(position)
+        return stub[2] if stub else self.tokens[position]
+
+    def build(self,
+              history: List[Message],
+              api_messages: List[Dict[str, Any]],
+              reserved_tokens: int = 0,
+              resources: Optional[Dict[str, Any]] = None) -> Tuple[List[int], List[Dict[str, Any]], List[Message]]:
+        """
+        Choose and assemble the request messages.
+
+        Args:
+            history: Agent message history
+            api_messages: Cached API dict for each history message
+            reserved_tokens: Tokens already spoken for (tool schemas, checklist)
+            resources: Agent resources, named in tool result stubs
+
+        Returns:
+            Tuple of history positions, API dicts and message models, in request order
+        """
+        positions = self.index.pruned_indexes()
+        essential = self.index.essential_count()
+        total = reserved_tokens + sum(self._message_tokens(i) for i in positions)
+
+        if total > self.budget:
+            total = self._stub_tool_results(positions[essential:], history, total, resources or {})
+        if total > self.budget:
+            positions, total = self._drop_oldest_turns(positions, essential, total)
+
+        selected_api = []
+        selected_models = []
+        for i in positions:
+            stub = self._stubs.get(i)
+            selected_api.append(stub[0] if stub else api_messages[i])
+            selected_models.append(stub[1] if stub else history[i])
+        return positions, selected_api, selected_models
+
+    def _stub_tool_results(self, recent: List[int], history: List[Message], total: int,
+                           resources: Dict[str, Any]) -> int:
+        """Stub tool results older than the latest tool call, oldest first, until under budget"""
+        for i in recent:
+            if total <= self.budget:
+                break
+            if i >= self.index.last_tool_call_index or i in self._stubs:
+                continue
+            message = history[i]
+            if getattr(message, 'role', None) != "tool" or self.tokens[i] < STUB_MIN_TOKENS:
+                continue
+
+            stub_message, decision = self._stub(i, message, resources)
+            stub_api = serialize_message(stub_message)
+            stub_tokens = estimate_message_tokens(stub_api)
+            self._stubs[i] = (stub_api, stub_message, stub_tokens)
+            total -= self.tokens[i] - stub_tokens
+
+            decision.update(tokens_before=self.tokens[i], tokens_after=stub_tokens)
+            self.decisions.append(decision)
+            logger.info(f"Context compaction: stubbed {decision['tool']} result at position {i} "
+                        f"({self.tokens[i]} -> {stub_tokens} tokens)")
+        return total
+
+    def _stub(self, position: int, message: ToolMessage, resources: Dict[str, Any]) -> Tuple[ToolMessage, Dict[str, Any]]:
+        """Stub for a tool result, pointing at the resources it mentions"""
+        call = self._tool_calls.get(message.tool_call_id)
+        tool_name = call.function.name if call and call.function else "tool"
+        arguments = call.function.arguments if call and call.function else ""
+        if len(arguments) > STUB_ARGUMENTS_CHARS:
+            arguments = arguments[:STUB_ARGUMENTS_CHARS] + "..."
+
+        content = message.content
+        if isinstance(content, list):
+            content = " ".join(getattr(item, 'text', '') or '' for item in content)
+        referenced = [name for name in resources if name in (content or "") or name in arguments]
+        blob = BLOB_HANDLE_PATTERN.search(content or "")
+
+        text = (f"[Compacted to save context: {tool_name}({arguments}) returned "
+                f"~{self.tokens[position]} tokens.")
+        if referenced:
+            text += f" Resources: {', '.join(referenced)}. Use get_resource to read them again.]"
+        elif blob:
+            text += f" Full result stored as {blob.group(0)}; use read_tool_result to read it again.]"
+        else:
+            text += " Call the tool again if you need the full result.]"
+
+        decision = {"action": "stubbed", "position": position, "tool": tool_name, "resources": referenced}
+        return ToolMessage(content=text, tool_call_id=message.tool_call_id), decision
+
+    def _drop_oldest_turns(self, positions: List[int], essential: int, total: int) -> Tuple[List[int], int]:
+        """Advance the start of the recent window one safe boundary at a time until under budget"""
+        head, recent = positions[:essential], positions[essential:]
+        dropped_tokens = 0
+        while total > self.budget and recent:
+            next_start = self.index.next_safe_start(recent[0])
+            if next_start is None or next_start > recent[-1]:
+                # Only the latest turn is left; send it even if it is over budget
+                break
+            while recent and recent[0] < next_start:
+                tokens = self._message_tokens(recent.pop(0))
+                total -= tokens
+                dropped_tokens += tokens
+
+        if recent and recent[0] > self._dropped_before and dropped_tokens:
+            self._dropped_before = recent[0]
+            decision = {"action": "dropped", "before_position": recent[0], "tokens_freed": dropped_tokens}
+            self.decisions.append(decision)
+            logger.info(f"Context compaction: dropped messages before position {recent[0]} "
+                        f"({dropped_tokens} tokens)")
+        return head + recent, total
@@ -3,7 +3,8 @@
 from .brightdata_api_extractor import (
     extract_products_brightdata_api,
     extract_products_from_url_brightdata_api,
-    extract_products_from_multiple_urls
+    extract_products_from_multiple_urls,
+    stream_products_from_multiple_urls
 )
 
 # Import extractor to register tools
@@ -13,5 +14,6 @@ __all__ = [
     'extract_products_brightdata_api',
     'extract_products_from_url_brightdata_api',
     'extract_products_from_multiple_urls',
+    'stream_products_from_multiple_urls',
     'brightdata_api_extractor'
 ]
@@ -16,7 +16,7 @@ import os
 import json
 import asyncio
 import aiohttp
-from typing import List, Dict, Any, Optional, Callable
+from typing import List, Dict, Any, Optional, Callable, AsyncGenerator, Tuple
 from urllib.parse import urljoin, urlparse, quote
 from bs4 import BeautifulSoup
 from loguru import logger
@@ -32,17 +32,25 @@ from .simple_extractor import (
     extract_product_meta_tags_strategy,
     USER_AGENT
 )
+from app.utils.deadline import Deadline
+from app.utils.budget import CostBudget
+from app.modules.product_sink import ProductSink
 
 
 BRIGHTDATA_API_KEY = os.getenv('BRIGHTDATA_API_KEY')
 BRIGHTDATA_ZONE = os.getenv('BRIGHTDATA_ZONE', 'web_unlocker1')
 
+# Extra seconds a store may overrun its deadline before it is abandoned outright
+DEADLINE_GRACE_SECONDS = 2
+
 
 async def get_html_with_brightdata_api(
     url: str,
     render_js: bool = True,
     session: Optional[aiohttp.ClientSession] = None,
-    timeout: int = 120
+    timeout: int = 120,
+    deadline: Optional[Deadline] = None,
+    cost_budget: Optional[CostBudget] = None
 ) -> Optional[str]:
     """
     Fetch HTML using BrightData Web Unlocker API.
@@ -58,6 +66,9 @@ async def get_html_with_brightdata_api(
         render_js: Enable JavaScript rendering (default: True)
         session: Optional aiohttp session for connection pooling
         timeout: Request timeout in seconds (default: 120)
+        deadline: Optional shared deadline; the request timeout is clamped to it
+        cost_budget: Optional shared budget charged one unit per request;
+            the request is skipped once it is spent
         
     Returns:
         HTML content or None if failed
@@ -66,6 +77,16 @@ async def get_html_with_brightdata_api(
         logger.error("BRIGHTDATA_API_KEY not set in environment")
         return None
     
+    if deadline:
+        if deadline.expired():
+            logger.warning(f"Deadline reached, skipping BrightData fetch for {url}")
+            return None
+        timeout = deadline.clamp(timeout)
+    
+    if cost_budget and not cost_budget.charge():
+        logger.warning(f"Cost budget spent ({cost_budget}), skipping BrightData fetch for {url}")
+        return None
+    
     try:
         # BrightData Web Unlocker API endpoint
         api_url = "https://api.brightdata.com/request"
@@ -142,7 +163,10 @@ async def extract_products_brightdata_api(
     url: str,
     max_products: int = 20,
     context_vars=None,
-    timeout: int = 60  # Increased timeout for heavy sites
+    timeout: int = 60,  # Increased timeout for heavy sites
+    deadline: Optional[Deadline] = None,
+    product_sink: Optional[ProductSink] = None,
+    cost_budget: Optional[CostBudget] = None
 ) -> Dict[str, Any]:
     """
     Extract products using BrightData Web Unlocker API.
@@ -158,6 +182,11 @@ async def extract_products_brightdata_api(
         max_products: Maximum number of products to extract
         context_vars: Optional context variables
         timeout: Timeout per request in seconds (default: 120)
+        deadline: Optional deadline for the whole extraction. Every stage checks
+            the remaining budget and returns what it has once it runs out.
+        product_sink: Optional sink; products from the per-page fallback are
+            emitted to it one at a time as each page is parsed
+        cost_budget: Optional request budget shared with every fetch
         
     Returns:
         Dict with:
@@ -165,6 +194,7 @@ async def extract_products_brightdata_api(
         - products: List[Dict] of extracted products
         - meta: Dict with extraction statistics
         - error: str (if failed)
+        - timed_out: bool (True if the deadline cut the extraction short)
     """
     
     if not BRIGHTDATA_API_KEY:
@@ -178,9 +208,16 @@ async def extract_products_brightdata_api(
         logger.info(f"Starting BrightData API extraction for: {url}")
         
         # Step 1: Get HTML using BrightData API with extended timeout
-        html = await get_html_with_brightdata_api(url, render_js=True, timeout=timeout)
+        html = await get_html_with_brightdata_api(url, render_js=True, timeout=timeout, deadline=deadline, cost_budget=cost_budget)
         
         if not html:
+            if deadline and deadline.expired():
+                return {
+                    "success": False,
+                    "error": "Time budget exhausted before the listing page loaded",
+                    "products": [],
+                    "timed_out": True
+                }
             return {
                 "success": False,
                 "error": "Failed to fetch HTML via BrightData API",
@@ -261,6 +298,19 @@ async def extract_products_brightdata_api(
                 }
             }
         
+        # No budget left for the slow path - report the cut-off instead of starting it
+        if deadline and deadline.expired():
+            return {
+                "success": False,
+                "error": "Time budget exhausted before product pages could be fetched",
+                "products": [],
+                "timed_out": True,
+                "meta": {
+                    "total_links_found": len(product_links),
+                    "html_length": len(html)
+                }
+            }
+        
         # Limit number of products
         if len(product_links) > max_products:
             product_links = product_links[:max_products]
@@ -272,14 +322,21 @@ async def extract_products_brightdata_api(
         products = await extract_products_via_brightdata_api(
             product_links, 
             max_concurrent=max_concurrent,
-            timeout=timeout
+            timeout=timeout,
+            deadline=deadline,
+            product_sink=product_sink,
+            source_url=url,
+            cost_budget=cost_budget
         )
+        timed_out = bool(deadline and deadline.expired())
         
-        logger.info(f"Successfully extracted {len(products)} products via BrightData API")
+        logger.info(f"Successfully extracted {len(products)} products via BrightData API"
+                    f"{' (cut off by deadline)' if timed_out else ''}")
         
-        return {
-            "success": True,
+        result = {
+            "success": bool(products) or not timed_out,
             "products": products,
+            "timed_out": timed_out,
             "meta": {
                 "strategy": "brightdata_web_unlocker_api",
                 "total_links_found": len(product_links),
@@ -288,6 +345,9 @@ async def extract_products_brightdata_api(
                 "html_length": len(html)
             }
         }
+        if timed_out and not products:
+            result["error"] = "Time budget exhausted before any product page loaded"
+        return result
         
     except Exception as e:
         logger.error(f"BrightData API extraction failed: {e}")
@@ -301,7 +361,11 @@ async def extract_products_brightdata_api(
 async def extract_products_via_brightdata_api(
     product_links: List[str],
     max_concurrent: int = 5,
-    timeout: int = 20  # Fast timeout for individual products
+    timeout: int = 20,  # Fast timeout for individual products
+    deadline: Optional[Deadline] = None,
+    product_sink: Optional[ProductSink] = None,
+    source_url: Optional[str] = None,
+    cost_budget: Optional[CostBudget] = None
 ) -> List[Dict[str, Any]]:
     """
     Extract products from URLs using BrightData API.
@@ -310,6 +374,11 @@ async def extract_products_via_brightdata_api(
         product_links: List of product URLs
         max_concurrent: Max concurrent requests (default: 5)
         timeout: Timeout per request in seconds (default: 20 for speed)
+        deadline: Optional deadline; when it passes, pending fetches are
+            cancelled and the products gathered so far are returned
+        product_sink: Optional sink that receives each product as soon as it is extracted
+        source_url: Listing page the links came from (groups products in the sink)
+        cost_budget: Optional request budget; retries are charged too
         
     Returns:
         List of extracted products
@@ -319,15 +388,21 @@ async def extract_products_via_brightdata_api(
     async def extract_single_product(session: aiohttp.ClientSession, url: str) -> Optional[Dict[str, Any]]:
         async with semaphore:
             try:
+                if deadline and deadline.expired():
+                    return None
+                if cost_budget and cost_budget.exhausted():
+                    return None
+                
                 # Fetch HTML via BrightData API with retry
                 html = None
                 for attempt in range(2):  # Try twice
                     try:
-                        html = await get_html_with_brightdata_api(url, render_js=True, session=session, timeout=timeout)
+                        html = await get_html_with_brightdata_api(url, render_js=True, session=session, timeout=timeout, deadline=deadline, cost_budget=cost_budget)
                         if html:
                             break
                     except asyncio.TimeoutError:
-                        if attempt == 0:
+                        # Only retry if the budget still covers the backoff
+                        if attempt == 0 and not (deadline and deadline.remaining() <= 2):
                             logger.warning(f"Timeout on {url}, retrying...")
                             await asyncio.sleep(2)
                         else:
@@ -351,6 +426,8 @@ async def extract_products_via_brightdata_api(
                         if not product.get('product_url'):
                             product['product_url'] = url
                         logger.debug(f"✓ {strategy_name} extracted: {product.get('product_name', 'Unknown')}")
+                        if product_sink:
+                            await product_sink.emit(product, source_url or url)
                         return product
                 
                 logger.warning(f"No extraction strategy worked for {url}")
@@ -362,8 +439,19 @@ async def extract_products_via_brightdata_api(
     
     # Create single session for all requests
     async with aiohttp.ClientSession() as session:
-        tasks = [extract_single_product(session, url) for url in product_links]
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        tasks = [asyncio.ensure_future(extract_single_product(session, url)) for url in product_links]
+        
+        if deadline:
+            # Stop waiting once the budget is spent and keep whatever finished
+            done, pending = await asyncio.wait(tasks, timeout=deadline.remaining())
+            if pending:
+                logger.warning(f"Deadline reached: cancelling {len(pending)}/{len(tasks)} product fetches")
+                for task in pending:
+                    task.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+            results = [task.result() for task in tasks if task in done and not task.exception()]
+        else:
+            results = await asyncio.gather(*tasks, return_exceptions=True)
     
     # Filter out None results and exceptions
     products = []
@@ -374,25 +462,37 @@ async def extract_products_via_brightdata_api(
     return products
 
 
-async def extract_products_from_multiple_urls(
+async def stream_products_from_multiple_urls(
     urls: List[str],
     max_products: int = 20,
     timeout: int = 45,  # Balanced timeout for reliability + speed
-    progress_callback: Optional[Callable[[str], None]] = None
-) -> Dict[str, Dict[str, Any]]:
+    progress_callback: Optional[Callable[[str], None]] = None,
+    deadline: Optional[Deadline] = None,
+    product_sink: Optional[ProductSink] = None,
+    cost_budget: Optional[CostBudget] = None
+) -> AsyncGenerator[Tuple[str, Dict[str, Any]], None]:
     """
-    Extract products from multiple URLs in parallel.
+    Extract products from multiple URLs in parallel, yielding each store as it finishes.
+    
+    Unlike extract_products_from_multiple_urls, callers get ``(url, result)``
+    the moment a store completes, so its products can be shown while slower
+    stores are still extracting. Duplicate URLs are extracted once. If the
+    consumer stops iterating early, the remaining extractions are cancelled.
     
     Args:
         urls: List of collection/listing page URLs
         max_products: Max products per URL
         timeout: Timeout per request in seconds
         progress_callback: Optional callback for progress updates
+        deadline: Optional deadline shared by every URL. Stores still running
+            when it passes return partial results with ``timed_out=True``.
+        product_sink: Optional sink for product-level streaming from the slow path
+        cost_budget: Optional request budget shared by every URL
         
-    Returns:
-        Dict mapping URL to extraction result
+    Yields:
+        Tuples of (url, extraction result) in completion order
     """
-    import asyncio
+    urls = list(dict.fromkeys(urls))
     
     async def extract_single_url(url: str, index: int) -> tuple[str, Dict[str, Any]]:
         """Extract from a single URL"""
@@ -400,10 +500,29 @@ async def extract_products_from_multiple_urls(
             if progress_callback:
                 progress_callback(f"[{index+1}/{len(urls)}] 🌐 Fetching {url}...")
             
-            result = await extract_products_brightdata_api(url, max_products=max_products, timeout=timeout)
+            extraction = extract_products_brightdata_api(
+                url,
+                max_products=max_products,
+                timeout=timeout,
+                deadline=deadline,
+                product_sink=product_sink,
+                cost_budget=cost_budget
+            )
+            if deadline:
+                # Hard backstop in case a stage ignores the deadline
+                try:
+                    result = await asyncio.wait_for(extraction, timeout=deadline.remaining() + DEADLINE_GRACE_SECONDS)
+                except asyncio.TimeoutError:
+                    result = {"success": False, "error": "Time budget exhausted", "products": [], "timed_out": True}
+            else:
+                result = await extraction
             
-            if result.get('success'):
-                domain = url.split('//')[-1].split('/')[0]
+            domain = url.split('//')[-1].split('/')[0]
+            if result.get('timed_out'):
+                product_count = len(result.get('products', []))
+                if progress_callback:
+                    progress_callback(f"[{index+1}/{len(urls)}] ⏱️ {domain}: cut off after {deadline.elapsed():.0f}s ({product_count} products)")
+            elif result.get('success'):
                 product_count = len(result.get('products', []))
                 if progress_callback:
                     progress_callback(f"[{index+1}/{len(urls)}] ✅ {domain}: {product_count} products")
@@ -423,11 +542,55 @@ async def extract_products_from_multiple_urls(
     if progress_callback:
         progress_callback(f"⚡ Processing {len(urls)} URLs concurrently...")
     
-    tasks = [extract_single_url(url, i) for i, url in enumerate(urls)]
-    results = await asyncio.gather(*tasks)
+    tasks = [asyncio.ensure_future(extract_single_url(url, i)) for i, url in enumerate(urls)]
+    try:
+        for next_completed in asyncio.as_completed(tasks):
+            yield await next_completed
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+
+async def extract_products_from_multiple_urls(
+    urls: List[str],
+    max_products: int = 20,
+    timeout: int = 45,  # Balanced timeout for reliability + speed
+    progress_callback: Optional[Callable[[str], None]] = None,
+    deadline: Optional[Deadline] = None,
+    cost_budget: Optional[CostBudget] = None
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Extract products from multiple URLs in parallel.
+    
+    Waits for every store; use stream_products_from_multiple_urls to handle
+    each store as soon as it completes.
+    
+    Args:
+        urls: List of collection/listing page URLs
+        max_products: Max products per URL
+        timeout: Timeout per request in seconds
+        progress_callback: Optional callback for progress updates
+        deadline: Optional deadline shared by every URL. Stores still running
+            when it passes return partial results with ``timed_out=True``.
+            Cancelling it (``deadline.cancel()``) winds every store down the same way.
+        cost_budget: Optional request budget shared by every URL
+        
+    Returns:
+        Dict mapping URL to extraction result (in input order)
+    """
+    results = {}
+    async for url, result in stream_products_from_multiple_urls(
+        urls,
+        max_products=max_products,
+        timeout=timeout,
+        progress_callback=progress_callback,
+        deadline=deadline,
+        cost_budget=cost_budget
+    ):
+        results[url] = result
     
-    # Convert to dict
-    return {url: result for url, result in results}
+    return {url: results[url] for url in urls if url in results}
 
 
 # Convenience function
@@ -0,0 +1,117 @@
+"""
+Pruning index for the agent's message history.
+
+The positions the pruning rules care about are recorded as each message is
+appended, so choosing the messages for a request only touches the recent
+window instead of rescanning (and comparing) the whole history.
+
+The recent window's start is sticky: it stays put while the window grows
+and jumps forward only once it holds twice the recent count. Between jumps
+each request is the previous one plus appended messages, so provider-side
+prompt caching can reuse the prefix.
+"""
+
+from bisect import bisect_left, bisect_right
+from typing import List, Optional, Set
+
+from app.models import Message
+
+
+# Minimum number of trailing messages kept as recent context
+RECENT_MESSAGE_COUNT = 30
+
+
+class HistoryIndex:
+    """
+    Essential and boundary positions of a message history, maintained on append.
+
+    Tracks:
+    1. System message (initial system prompt)
+    2. Initial user message (first user message)
+    3. Checklist-related system messages
+    4. Safe starting points for the recent window: system, user, or assistant
+       without tool_calls, so the window never opens inside a tool chain
+    5. The last assistant tool-call message and the last tool message, to drop
+       a trailing tool call whose results haven't been added yet
+    """
+
+    def __init__(self):
+        self.length = 0
+        self.system_index: Optional[int] = None
+        self.initial_user_index: Optional[int] = None
+        self.checklist_indexes: List[int] = []
+        self.safe_starts: List[int] = []
+        self.last_tool_call_index = -1
+        self.last_tool_index = -1
+        self.window_start = 0
+        self._essential: Set[int] = set()
+
+    def add(self, message: Message) -> None:
+        """Index the message appended at position ``length``"""
+        i = self.length
+        role = getattr(message, 'role', None)
+
+        if role == "system":
+            if self.system_index is None:
+                # First system message is the system prompt
+                self.system_index = i
+                self._essential.add(i)
+            elif getattr(message, 'content', None) and "CHECKLIST" in message.content:
+                self.checklist_indexes.append(i)
+                self._essential.add(i)
+        elif role == "user" and self.initial_user_index is None:
+            self.initial_user_index = i
+            self._essential.add(i)
+
+        if role in ("system", "user"):
+            self.safe_starts.append(i)
+        elif role == "assistant":
+            if getattr(message, 'tool_calls', None):
+                self.last_tool_call_index = i
+            else:
+                self.safe_starts.append(i)
+        elif role == "tool":
+            self.last_tool_index = i
+
+        self.length += 1
+
+    def essential_count(self) -> int:
+        """Number of positions pruned_indexes puts ahead of the recent window"""
+        return len(self._essential)
+
+    def next_safe_start(self, position: int) -> Optional[int]:
+        """First safe window start after ``position``, or None"""
+        k = bisect_right(self.safe_starts, position)
+        return self.safe_starts[k] if k < len(self.safe_starts) else None
+
+    def pruned_indexes(self, recent_count: int = RECENT_MESSAGE_COUNT) -> List[int]:
+        """
+        Positions to send, in request order: system prompt, initial user message,
+        checklist messages, then the recent window of between ``recent_count``
+        and twice that many messages. O(recent_count).
+        """
+        if not self.length:
+            return []
+
+        if self.length - self.window_start > 2 * recent_count:
+            recent_start = self.length - recent_count
+            k = bisect_left(self.safe_starts, recent_start)
+            if k < len(self.safe_starts):
+                recent_start = self.safe_starts[k]
+            self.window_start = recent_start
+
+        recent = [i for i in range(self.window_start, self.length) if i not in self._essential]
+
+        # The window runs to the end of the history, so a trailing assistant
+        # tool-call message is the latest one; drop it until its results arrive
+        if recent and recent[-1] == self.last_tool_call_index and self.last_tool_index < recent[-1]:
+            recent.pop()
+
+        pruned = []
+        if self.system_index is not None:
+            pruned.append(self.system_index)
+        if self.initial_user_index is not None:
+            pruned.append(self.initial_user_index)
+        pruned.extend(self.checklist_indexes)
+        pruned.extend(recent)
+        return pruned
@@ -0,0 +1,92 @@
+"""Product sink for streaming extracted products to the frontend one at a time"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Union
+from loguru import logger
+
+from app.models.product import Product
+
+
+# Products arriving within this window are sent to the browser in one frame
+DEFAULT_COALESCE_WINDOW_MS = 150
+
+# A full batch is flushed right away instead of waiting for the window
+DEFAULT_MAX_BATCH = 10
+
+
+class ProductSink:
+    """
+    Async sink that extractors push products into as soon as each one is parsed.
+
+    Products are coalesced per store over a short window and handed to
+    ``stream_products`` (normally ``Agent.stream_products``), which turns them
+    into ``content_display`` frames. The first card therefore reaches the
+    browser one product-page round trip after extraction starts, instead of
+    after the whole store finishes.
+
+    The agent keeps one sink in ``context_vars['product_sink']``; each tool
+    call streams through its own ``for_call`` copy, so ``streamed_sources``
+    only covers that call.
+    """
+
+    def __init__(
+        self,
+        stream_products: Callable[..., Awaitable[None]],
+        window_ms: int = DEFAULT_COALESCE_WINDOW_MS,
+        max_batch: int = DEFAULT_MAX_BATCH
+    ):
+        self._stream_products = stream_products
+        self.window_ms = window_ms
+        self.max_batch = max_batch
+        self._buffers: Dict[str, List[Product]] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+        # Source URLs that have had at least one product streamed through the sink
+        self.streamed_sources: Set[str] = set()
+        self.emitted_count = 0
+
+    def for_call(self) -> "ProductSink":
+        """A fresh sink with the same stream and settings, for one tool invocation"""
+        return ProductSink(self._stream_products, window_ms=self.window_ms, max_batch=self.max_batch)
+
+    async def emit(self, product: Union[Product, Dict[str, Any]], source_url: str) -> None:
+        """Queue one product for display; never raises into the extractor"""
+        try:
+            if isinstance(product, dict):
+                product = Product.from_extracted(product)
+        except Exception as e:
+            logger.warning(f"Product sink skipped unconvertible product: {e}")
+            return
+
+        buffer = self._buffers.setdefault(source_url, [])
+        buffer.append(product)
+        self.streamed_sources.add(source_url)
+
+        if len(buffer) >= self.max_batch:
+            await self._flush_source(source_url)
+        elif self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.ensure_future(self._flush_after_window())
+
+    async def flush(self) -> None:
+        """Send every buffered product now (a pending window timer finds nothing left)"""
+        for source_url in list(self._buffers):
+            await self._flush_source(source_url)
+
+    async def _flush_after_window(self) -> None:
+        await asyncio.sleep(self.window_ms / 1000.0)
+        self._flush_task = None
+        for source_url in list(self._buffers):
+            await self._flush_source(source_url)
+
+    async def _flush_source(self, source_url: str) -> None:
+        async with self._lock:
+            batch = self._buffers.pop(source_url, [])
+            if not batch:
+                return
+            domain = source_url.split('//')[-1].split('/')[0]
+            try:
+                await self._stream_products(products=batch, title=f"Found from {domain}", delay_ms=0)
+                self.emitted_count += len(batch)
+            except Exception as e:
+                logger.warning(f"Product sink failed to stream {len(batch)} products from {domain}: {e}")
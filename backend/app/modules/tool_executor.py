@@ -0,0 +1,65 @@
+"""Concurrent executor for the tool calls of one assistant turn"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, List, Optional, Set
+
+from app.models.chat import ToolCall
+from app.tools import tool_registry
+
+
+# Tool calls of one conversation that may run at the same time
+DEFAULT_MAX_PARALLEL_TOOL_CALLS = 4
+
+
+class ToolCallExecutor:
+    """
+    Runs tool calls concurrently where the tools allow it.
+
+    Calls to tools registered with ``@tool(parallel_safe=True)`` start as
+    soon as they are submitted, up to ``max_concurrency`` at a time. Any other
+    call is a barrier: it waits for every call submitted before it, and calls
+    submitted after it wait for it to finish. A turn made only of unsafe
+    tools therefore runs exactly as the old sequential loop did.
+
+    The agent keeps one executor per conversation, so the cap also applies to
+    calls dispatched speculatively while a response is still streaming.
+    """
+
+    def __init__(
+        self,
+        execute: Callable[[ToolCall], Awaitable[Any]],
+        max_concurrency: int = DEFAULT_MAX_PARALLEL_TOOL_CALLS
+    ):
+        self._execute = execute
+        self.max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._barrier: Optional[asyncio.Task] = None
+        # Parallel-safe calls since the last barrier that haven't finished yet
+        self._in_flight: Set[asyncio.Task] = set()
+
+    def submit(self, tool_call: ToolCall) -> asyncio.Task:
+        """Schedule a tool call and return the task resolving to its result"""
+        waits = [self._barrier] if self._barrier is not None else []
+
+        if self.is_parallel_safe(tool_call):
+            task = asyncio.ensure_future(self._run(waits, tool_call))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+        else:
+            task = asyncio.ensure_future(self._run(waits + list(self._in_flight), tool_call))
+            self._barrier = task
+            self._in_flight = set()
+
+        return task
+
+    @staticmethod
+    def is_parallel_safe(tool_call: ToolCall) -> bool:
+        tool_name = tool_call.function.name if tool_call.function else None
+        tool_func = tool_registry.get_tool(tool_name) if tool_name else None
+        return bool(tool_func and tool_func.parallel_safe)
+
+    async def _run(self, waits: List[asyncio.Task], tool_call: ToolCall) -> Any:
+        if waits:
+            await asyncio.wait(waits)
+        async with self._semaphore:
+            return await self._execute(tool_call)
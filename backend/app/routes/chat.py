@@ -4,13 +4,15 @@ import ast
 import asyncio
 import json
 import traceback
-from typing import Dict, List, Any
-from fastapi import APIRouter, HTTPException
+from typing import Dict, List, Any, Optional
+from fastapi import APIRouter, HTTPException, Query, Request
 from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel
 from enum import Enum
 
 from app.modules.agent import Agent
+from app.modules.agent_registry import AgentRegistry, SavedConversation
 from app.models import (
     Message, 
     UserMessage,
@@ -22,12 +24,21 @@ from app.models import (
 from app.config import OPENAI_API_KEY, XLM_API_KEY
 from app.prompts import BASIC_ASSISTANT_PROMPT
 from app.utils.chat_storage import chat_storage
+from app.utils.admission import RunAdmission, RunRejected
+from app.utils.compression import compressed_json_response
+from app.utils.event_bus import HEARTBEAT, EventBus
+from app.utils.history_pages import DEFAULT_PAGE_LIMIT, MAX_PAGE_LIMIT, paginate_messages
+from app.utils.persistence import chat_writer
+from app.utils.state_store import ConversationBusy, create_state_store
 from app.llm.router import LLMRouter
 # Import tool definitions to register them
 import app.tools.definitions
 
 router = APIRouter()
 
+# How long history reads wait for queued writes to land
+READ_FLUSH_TIMEOUT = 2.0
+
 # Available LLM models enum
 class AvailableModels(str, Enum):
     """Enum of available LLM models"""
@@ -46,25 +57,46 @@ class ChatRequest(BaseModel):
 # Initialize global LLM router
 llm_router = LLMRouter(openai_api_key=OPENAI_API_KEY, xlm_api_key=XLM_API_KEY)
 
-# Store agents by conversation ID
-agents: Dict[str, Agent] = {}
+def _create_agent(conversation_id: str, model: str, saved: Optional[SavedConversation] = None) -> Agent:
+    """Build an agent, resuming a saved conversation when the registry rehydrates one"""
+    agent = Agent(
+        system_prompt=BASIC_ASSISTANT_PROMPT,
+        model=model or AvailableModels.GPT_5.value,
+        reasoning_effort="low",
+        llm_router=llm_router,
+        conversation_id=conversation_id,
+        history=saved.messages if saved else None
+    )
+    if saved:
+        agent.resources.update(saved.resources)
+        agent.checklist = saved.metadata.get("checklist")
+    return agent
 
-def get_or_create_agent(conversation_id: str, stream_callback=None, model: AvailableModels = AvailableModels.GPT_5) -> Agent:
-    """Get existing agent or create new one for conversation"""
-    if conversation_id not in agents:
-        agents[conversation_id] = Agent(
-            system_prompt=BASIC_ASSISTANT_PROMPT,
-            model=model.value,  # Convert enum to string value
-            reasoning_effort="low",
-            llm_router=llm_router,
-            stream_callback=stream_callback,
-            conversation_id=conversation_id
-        )
-    else:
-        # Update existing agent's stream callback
-        agents[conversation_id].stream_callback = stream_callback
-    
-    return agents[conversation_id]
+# Conversation locks and versions shared with the other API workers; the database
+# (next to the chat histories unless STATE_STORE_URL is set) opens on first use
+state_store = create_state_store(base_path=chat_storage.base_path)
+
+# One turn at a time per conversation, and a cap on concurrent runs in this worker
+admission = RunAdmission()
+
+# Resident agents by conversation ID, bounded by memory and idle time
+agents = AgentRegistry(_create_agent, state_store=state_store)
+
+async def get_or_create_agent(conversation_id: str, stream_callback=None, model: AvailableModels = AvailableModels.GPT_5) -> Agent:
+    """
+    Get existing agent (rehydrating an evicted one) or create new one for conversation,
+    pinned until ``agents.release``
+
+    Rehydration reads the saved history and the state store, so it runs off the event loop.
+    """
+    def pinned_agent() -> Agent:
+        agent = agents.get_or_create(conversation_id, model.value)
+        agents.acquire(conversation_id)
+        return agent
+
+    agent = await asyncio.to_thread(pinned_agent)
+    agent.stream_callback = stream_callback
+    return agent
 
 def end_conversation_tracking(conversation_id: str, user_message: str, agent: Agent, end_reason: str = "completed") -> None:
     """Helper method to mark conversation as ended"""
@@ -77,6 +109,9 @@ def end_conversation_tracking(conversation_id: str, user_message: str, agent: Ag
             "model": agent.model,
             "reasoning_effort": agent.reasoning_effort,
             "total_messages": len(agent.get_message_history()),
+            "context_compactions": agent.compaction_decisions,
+            "prompt_cache": agent.prompt_cache.to_dict(),
+            "checklist": agent.checklist,
             "end_reason": end_reason
         }
         
@@ -85,8 +120,8 @@ def end_conversation_tracking(conversation_id: str, user_message: str, agent: Ag
         if hasattr(agent, 'context_vars') and agent.context_vars:
             resources = agent.context_vars.get('resources')
         
-        # Mark conversation as ended
-        chat_storage.end_conversation(
+        # Mark conversation as ended - written in the background, never on the response path
+        chat_writer.end_conversation(
             conversation_id=conversation_id_to_save,
             metadata=metadata,
             end_reason=end_reason,
@@ -141,67 +176,74 @@ async def stream_chat(request: ChatRequest):
         print(f"New message: {request.message}")
         print(f"Conversation ID: {request.conversation_id}")
         
+        conversation_id = request.conversation_id or "default"
+        # Wait behind this conversation's earlier turns and the global run limit; 429 when the queue is full
+        try:
+            ticket = await admission.admit(conversation_id)
+        except RunRejected as e:
+            raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+        
         async def generate_stream():
             agent = None
-            events_to_yield = []
-            
-            def stream_callback(event_data):
-                """Callback to collect streaming events for yielding"""
-                events_to_yield.append(event_data)
+            lease = None
             
             try:
-                # Get or create agent with stream callback
-                agent = get_or_create_agent(request.conversation_id or "default", stream_callback, request.model)
-                
-                # Send start signal
-                yield f"data: {json.dumps({'type': 'start'})}\n\n"
-                
-                # Create user message
-                user_message = UserMessage(content=request.message)
-                
-                # Run the agent conversation and stream events in real-time
-                final_response = None
-                async for event in agent.run(user_message):
-                    # Yield any events collected by stream_callback
-                    while events_to_yield:
-                        callback_event = events_to_yield.pop(0)
-                        # Convert pydantic model to dict if needed
-                        if hasattr(callback_event, 'model_dump'):
-                            callback_event = callback_event.model_dump()
-                        yield f"data: {json.dumps(callback_event)}\n\n"
-                    
-                    if event.type == StreamEventType.COMPLETE:
-                        final_response = event.response
-                        break
-                    else:
-                        # Convert pydantic model to dict for JSON serialization
-                        event_dict = event.model_dump()
-                        yield f"data: {json.dumps(event_dict)}\n\n"
-                
-                # Yield any remaining events from stream_callback
-                while events_to_yield:
-                    callback_event = events_to_yield.pop(0)
-                    # Convert pydantic model to dict if needed
-                    if hasattr(callback_event, 'model_dump'):
-                        callback_event = callback_event.model_dump()
-                    yield f"data: {json.dumps(callback_event)}\n\n"
-                
-                # End conversation tracking
-                end_conversation_tracking(request.conversation_id, request.message, agent, "completed")
-                
-                # Send completion
-                yield f"data: {json.dumps({'type': 'complete'})}\n\n"
-                
-            except Exception as e:
-                print(f"Error in stream: {str(e)}")
-                traceback.print_exc()
-                # End conversation tracking with error reason if agent was created
-                if agent:
-                    try:
-                        end_conversation_tracking(request.conversation_id, request.message, agent, "error")
-                    except:
-                        pass  # Don't fail if ending fails
+                # One turn at a time per conversation, across every worker
+                lease = await state_store.lock_conversation(conversation_id)
+                try:
+                    # Agent and tool events share one queue and are sent as soon as they're produced
+                    bus = EventBus()
+            
+                    # Get or create agent with stream callback, pinned until the stream ends
+                    agent = await get_or_create_agent(conversation_id, bus.publish, request.model)
+            
+                    # Send start signal
+                    yield f"data: {json.dumps({'type': 'start'})}\n\n"
+            
+                    # Create user message
+                    user_message = UserMessage(content=request.message)
+            
+                    # Run the agent conversation and stream events in real-time
+                    final_response = None
+                    is_complete = lambda event: getattr(event, 'type', None) == StreamEventType.COMPLETE
+                    async for event in bus.merge(agent.run(user_message), until=is_complete):
+                        if event is HEARTBEAT:
+                            # SSE comment: keeps the connection open during long tool calls
+                            yield ": keep-alive\n\n"
+                        elif is_complete(event):
+                            final_response = event.response
+                        else:
+                            # Convert pydantic model to dict for JSON serialization
+                            if hasattr(event, 'model_dump'):
+                                event = event.model_dump()
+                            yield f"data: {json.dumps(event)}\n\n"
+            
+                    # End conversation tracking
+                    end_conversation_tracking(request.conversation_id, request.message, agent, "completed")
+            
+                    # Send completion
+                    yield f"data: {json.dumps({'type': 'complete'})}\n\n"
+            
+                except Exception as e:
+                    print(f"Error in stream: {str(e)}")
+                    traceback.print_exc()
+                    # End conversation tracking with error reason if agent was created
+                    if agent:
+                        try:
+                            end_conversation_tracking(request.conversation_id, request.message, agent, "error")
+                        except:
+                            pass  # Don't fail if ending fails
+                    yield f"data: {json.dumps({'type': 'error', 'error': str(e)})}\n\n"
+            except ConversationBusy as e:
                 yield f"data: {json.dumps({'type': 'error', 'error': str(e)})}\n\n"
+            finally:
+                ticket.release()
+                if agent:
+                    # The writer commits the turn and unlocks the conversation once
+                    # this turn's writes are on disk; the stream doesn't wait for them
+                    await asyncio.to_thread(agents.release, conversation_id, lease.release)
+                elif lease:
+                    await asyncio.to_thread(lease.release)
         
         return StreamingResponse(
             generate_stream(),
@@ -211,34 +253,76 @@ async def stream_chat(request: ChatRequest):
                 "Connection": "keep-alive",
                 "Access-Control-Allow-Origin": "*",
                 "Access-Control-Allow-Headers": "*",
-            }
+            },
+            # Also frees the slot if the client disconnects before the stream starts
+            background=BackgroundTask(ticket.release)
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error in route: {str(e)}")
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/chat/history/list")
+async def list_chat_histories(
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    offset: int = Query(0, ge=0)
+):
+    """List saved chat histories, most recent first, one page at a time"""
+    try:
+        await asyncio.to_thread(chat_writer.flush, READ_FLUSH_TIMEOUT)
+        # The first catalog use may build it from the files; keep that off the event loop
+        conversations = await asyncio.to_thread(chat_storage.list_conversations, limit=limit, offset=offset)
+        total = await asyncio.to_thread(chat_storage.count_conversations)
+        return {
+            "status": "success",
+            "conversations": conversations,
+            "count": len(conversations),
+            "total": total,
+            "offset": offset
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error listing chat histories: {str(e)}")
+
 @router.get("/chat/history/{conversation_id}")
-async def get_chat_history(conversation_id: str):
-    """Get chat history for a specific conversation"""
-    if conversation_id not in agents:
+async def get_chat_history(
+    conversation_id: str,
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_LIMIT, ge=1, le=MAX_PAGE_LIMIT),
+    before: Optional[int] = Query(None, ge=0),
+    after: Optional[int] = Query(None, ge=-1),
+    role: Optional[List[str]] = Query(None)
+):
+    """Get one page of a live conversation's history (latest messages by default)"""
+    agent = await asyncio.to_thread(agents.get, conversation_id)
+    if agent is None:
         raise HTTPException(status_code=404, detail="Conversation not found")
     
-    agent = agents[conversation_id]
     history = agent.get_message_history()
-    messages = format_chat_history_for_api(history)
+    page = paginate_messages(
+        ((seq, getattr(msg, 'role', None), msg) for seq, msg in enumerate(history)),
+        limit, before, after, set(role) if role else None
+    )
+    
+    # Only the page is formatted
+    messages = []
+    for seq, msg in page.pop("items"):
+        messages.extend(dict(formatted, seq=seq) for formatted in format_chat_history_for_api([msg]))
     
-    return {
+    return compressed_json_response(request, {
         "conversation_id": conversation_id,
-        "messages": messages
-    }
+        "messages": messages,
+        "page": page,
+        "message_count": len(history),
+        "prompt_cache": agent.prompt_cache.to_dict()
+    })
 
 @router.delete("/chat/history/{conversation_id}")
 async def clear_chat_history(conversation_id: str):
     """Clear chat history for a specific conversation"""
-    if conversation_id in agents:
-        del agents[conversation_id]
+    agents.discard(conversation_id)
     return {"status": "success"}
 
 @router.get("/chat/test")
@@ -246,31 +330,39 @@ async def test_chat():
     """Simple test endpoint"""
     return {"message": "Chat API is working with GPT-5!"}
 
-@router.get("/chat/history/list")
-async def list_chat_histories():
-    """List all available chat histories"""
-    try:
-        conversations = chat_storage.list_conversations()
-        return {
-            "status": "success",
-            "conversations": conversations,
-            "count": len(conversations)
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error listing chat histories: {str(e)}")
-
 @router.get("/chat/history/file/{conversation_id}")
-async def get_saved_chat_history(conversation_id: str, timestamp: str = None):
-    """Get saved chat history from file storage"""
+async def get_saved_chat_history(
+    conversation_id: str,
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_LIMIT, ge=1, le=MAX_PAGE_LIMIT),
+    before: Optional[int] = Query(None, ge=0),
+    after: Optional[int] = Query(None, ge=-1),
+    role: Optional[List[str]] = Query(None),
+    timestamp: str = None
+):
+    """Get one page of a saved chat history, read from its journal (latest messages by default)"""
     try:
-        history_data = chat_storage.load_chat_history(conversation_id, timestamp)
-        if history_data is None:
+        await asyncio.to_thread(chat_writer.flush, READ_FLUSH_TIMEOUT)
+        page = await asyncio.to_thread(
+            chat_storage.read_messages_page, conversation_id, limit, before, after,
+            set(role) if role else None, timestamp
+        )
+        if page is None:
             raise HTTPException(status_code=404, detail="Chat history not found")
         
-        return {
+        messages = page.pop("messages")
+        summary = await asyncio.to_thread(lambda: chat_storage.catalog.get(conversation_id))
+        summary = dict(summary or {"conversation_id": conversation_id})
+        # Server-side storage location, not for clients
+        summary.pop("filepath", None)
+        return compressed_json_response(request, {
             "status": "success",
-            "data": history_data
-        }
+            "data": {
+                **summary,
+                "messages": messages
+            },
+            "page": page
+        })
     except HTTPException:
         raise
     except Exception as e:
@@ -280,7 +372,7 @@ async def get_saved_chat_history(conversation_id: str, timestamp: str = None):
 async def cleanup_old_chat_histories(days_to_keep: int = 30):
     """Clean up old chat history files"""
     try:
-        deleted_count = chat_storage.cleanup_old_files(days_to_keep)
+        deleted_count = await asyncio.to_thread(chat_storage.cleanup_old_files, days_to_keep)
         return {
             "status": "success",
             "message": f"Cleaned up {deleted_count} old chat history files",
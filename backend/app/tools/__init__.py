@@ -2,10 +2,13 @@
 
 from app.tools.decorator import tool, ToolFunction
 from app.tools.registry import ToolRegistry, tool_registry
+from app.tools.executors import thread_pool_metrics, shutdown_executors
 
 __all__ = [
     'tool',
     'ToolFunction', 
     'ToolRegistry',
-    'tool_registry'
+    'tool_registry',
+    'thread_pool_metrics',
+    'shutdown_executors'
 ]
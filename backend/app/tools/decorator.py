@@ -6,6 +6,7 @@ from typing import Any, Dict, List, Optional, Callable, get_type_hints, get_orig
 from functools import wraps
 from loguru import logger
 from app.tools.registry import tool_registry
+from app.tools.executors import DEFAULT_POOL, get_thread_pool, loop_runner
 from app.models.chat import Tool, FunctionObject, FunctionParameters, OpenAITool, OpenAIFunctionTool
 
 
@@ -76,10 +77,18 @@ def _python_type_to_json_schema(py_type: Any, description: str = "") -> Dict[str
 class ToolFunction:
     """Represents a tool function with OpenAI compatibility"""
     
-    def __init__(self, func: Callable, name: str = None, description: str = None):
+    def __init__(self, func: Callable, name: str = None, description: str = None,
+                 parallel_safe: bool = False, thread_pool: str = DEFAULT_POOL,
+                 timeout: Optional[float] = None, max_concurrency: Optional[int] = None,
+                 cost_budget: Optional[float] = None):
         self.func = func
         self.name = name or func.__name__
         self.description = description or ""
+        self.parallel_safe = parallel_safe
+        self.thread_pool = thread_pool
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self.cost_budget = cost_budget
         self.signature = inspect.signature(func)
         self.type_hints = get_type_hints(func)
     
@@ -205,29 +214,9 @@ class ToolFunction:
             
             # Check if the function is async
             if inspect.iscoroutinefunction(self.func):
-                # Handle async function
-                try:
-                    loop = asyncio.get_running_loop()
-                    # We're in an async context, we need to run this in a thread pool
-                    # to avoid blocking the event loop
-                    import concurrent.futures
-                    import threading
-                    
-                    def run_in_thread():
-                        # Create a new event loop for this thread
-                        new_loop = asyncio.new_event_loop()
-                        asyncio.set_event_loop(new_loop)
-                        try:
-                            return new_loop.run_until_complete(self.func(**bound_args.arguments))
-                        finally:
-                            new_loop.close()
-                    
-                    with concurrent.futures.ThreadPoolExecutor() as executor:
-                        future = executor.submit(run_in_thread)
-                        return future.result()
-                except RuntimeError:
-                    # No event loop running, we can use asyncio.run directly
-                    return asyncio.run(self.func(**bound_args.arguments))
+                # Run on the shared background loop, whether or not the caller
+                # is itself inside an event loop
+                return loop_runner.run(self.func(**bound_args.arguments))
             else:
                 # Execute sync function normally
                 result = self.func(**bound_args.arguments)
@@ -266,8 +255,9 @@ class ToolFunction:
                 result = await self.func(**bound_args.arguments)
                 return result
             else:
-                # Execute sync function normally
-                result = self.func(**bound_args.arguments)
+                # Run sync function on its worker pool so it can't block the event loop
+                pool = get_thread_pool(self.thread_pool)
+                result = await pool.run(self.func, **bound_args.arguments)
                 return result
             
         except TypeError as e:
@@ -276,13 +266,26 @@ class ToolFunction:
             raise RuntimeError(f"Error executing {self.name}: {str(e)}")
 
 
-def tool(name: str = None, description: str = None):
+def tool(name: str = None, description: str = None, parallel_safe: bool = False,
+         thread_pool: str = DEFAULT_POOL, timeout: Optional[float] = None,
+         max_concurrency: Optional[int] = None, cost_budget: Optional[float] = None):
     """
     Decorator to convert a function into an OpenAI-compatible tool.
     
     Args:
         name: Optional custom name for the tool (defaults to function name)
         description: Optional custom description (defaults to first line of docstring)
+        parallel_safe: Whether calls may run concurrently with other calls in the
+            same assistant turn. Leave False for tools whose effects depend on
+            ordering (e.g. display_items)
+        thread_pool: Worker pool that runs the tool when it is a sync function
+            (see app.tools.executors.POOL_SIZES); ignored for async tools
+        timeout: Seconds one call may run. The registry exposes it to the tool as
+            context_vars['tool_run'].deadline and cancels the call shortly after it
+            passes, returning a structured partial result
+        max_concurrency: Maximum simultaneous calls of this tool across all conversations
+        cost_budget: Maximum cost units (e.g. paid API requests) one call may spend,
+            exposed as context_vars['tool_run'].cost_budget
         Context variables are passed directly when calling the tool
     
     Example:
@@ -298,7 +301,10 @@ def tool(name: str = None, description: str = None):
     """
     def decorator(func: Callable) -> Callable:
         # Create tool function wrapper
-        tool_func = ToolFunction(func, name, description)
+        tool_func = ToolFunction(
+            func, name, description, parallel_safe, thread_pool,
+            timeout=timeout, max_concurrency=max_concurrency, cost_budget=cost_budget
+        )
         
         # Register the tool
         tool_registry.register(tool_func.name, tool_func)
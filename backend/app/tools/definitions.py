@@ -7,11 +7,19 @@ from app.modules.extractors.simple_extractor import extract_products_simple
 from app.models.product import Product
 from app.models.product_collection import ProductCollection
 from app.models.chat.content import TextContent, ImageContent, VisionMultimodalContentItem, create_multimodal_product_content
+from app.utils.deadline import Deadline
+from app.utils.blob_store import BLOB_PAGE_CHARS
 
 import json
 from datetime import datetime
 from loguru import logger
 
+# Total wall-clock budget for one extract_products call (all stores, all stages)
+EXTRACT_PRODUCTS_TIME_BUDGET = 60
+
+# BrightData requests one extract_products call may make (listing pages + product pages + retries)
+EXTRACT_PRODUCTS_REQUEST_BUDGET = 150
+
 
 class StreamHelper:
     """Centralized helper for tool streaming functionality"""
@@ -97,7 +105,11 @@ class StreamHelper:
     
     Then extract products from the most relevant 3-5 URLs.
     Focus on the product attributes the user wants, not specific brands unless explicitly requested.
-    """
+    """,
+    parallel_safe=True,
+    thread_pool="network",
+    timeout=40,
+    max_concurrency=8
 )
 def search_web_tool(
     query: str,
@@ -179,7 +191,12 @@ def search_web_tool(
     - max_products: Maximum products per URL (default: 10 for speed, use 20 for variety)
     
     TIP: Focus on 3-5 most relevant URLs for best speed/quality balance
-    """
+    """,
+    # Not parallel-safe: every call rewrites the shared resources (all_extracted_products
+    # and products_from_<domain>); one call already extracts its URLs in parallel
+    timeout=EXTRACT_PRODUCTS_TIME_BUDGET,
+    max_concurrency=4,
+    cost_budget=EXTRACT_PRODUCTS_REQUEST_BUDGET
 )
 async def extract_products(
     urls: List[str],
@@ -192,6 +209,9 @@ async def extract_products(
     # Get context
     resources = context_vars.get('resources')
     stream_callback = context_vars.get('stream_callback')
+    # This call's own sink: a URL streamed by an earlier call is displayed again
+    product_sink = context_vars.get('product_sink')
+    product_sink = product_sink.for_call() if product_sink else None
     streamer = StreamHelper.for_scraping(stream_callback, "extract_products")
     
     try:
@@ -199,25 +219,47 @@ async def extract_products(
         streamer.progress(f"🔍 Extracting products from {len(urls)} URLs in parallel", total_urls=len(urls), max_products=max_products)
         
         # Use the BrightData API extractor (handles parallelization internally)
-        from app.modules.extractors import extract_products_from_multiple_urls
+        from app.modules.extractors import stream_products_from_multiple_urls
         from app.models.product import Product
         
         # Track products for progressive display
         all_products = []
         displayed_count = 0
         
-        # Extract from all URLs (parallelized internally)
-        all_results = await extract_products_from_multiple_urls(
+        # Per-store resources the combined collection is made of
+        source_collections = []
+        
+        # One deadline and request budget per tool call, shared by every store and
+        # every stage (the registry's, so it can also cancel the call cooperatively)
+        tool_run = context_vars.get('tool_run')
+        deadline = tool_run.deadline if tool_run and tool_run.deadline else Deadline(EXTRACT_PRODUCTS_TIME_BUDGET)
+        cost_budget = tool_run.cost_budget if tool_run else None
+        cut_off_stores = []
+        if tool_run:
+            tool_run.partial.update({"resources_created": [], "stores_done": [], "stores_failed": []})
+        
+        # Extract from all URLs in parallel and handle each store as soon as it finishes
+        store_results = stream_products_from_multiple_urls(
             urls=urls,
             max_products=max_products,
             timeout=45,  # Balanced timeout for reliability + speed
-            progress_callback=lambda msg: streamer.progress(msg)
+            progress_callback=lambda msg: streamer.progress(msg),
+            deadline=deadline,
+            product_sink=product_sink,
+            cost_budget=cost_budget
         )
         
         # Convert results to Product objects and store in resources
         # Process results as they complete for progressive display
-        for url, result in all_results.items():
+        async for url, result in store_results:
+            if result.get('timed_out'):
+                cut_off_stores.append(url.split('//')[-1].split('/')[0])
+            if tool_run:
+                tool_run.record_timing(url, deadline.elapsed())
+            
             if not result.get('success'):
+                if tool_run:
+                    tool_run.partial["stores_failed"].append(url)
                 logger.warning(f"Failed to extract from {url}: {result.get('error')}")
                 streamer.progress(f"❌ Skipped: {url.split('//')[-1].split('/')[0]}")
                 continue
@@ -226,20 +268,7 @@ async def extract_products(
             url_products = []
             for product_dict in result.get('products', []):
                 try:
-                    raw_price = product_dict.get('price', 0)
-                    
-                    core_product = Product(
-                        product_name=product_dict.get('title', ''),
-                        price=str(raw_price),
-                        price_value=raw_price,
-                        currency=product_dict.get('currency', 'USD'),
-                        store=product_dict.get('brand', ''),
-                        product_url=product_dict.get('product_url', ''),
-                        image_url=product_dict.get('image_url', ''),
-                        sku=product_dict.get('sku'),
-                        description=product_dict.get('description', '')
-                    )
-                    url_products.append(core_product)
+                    url_products.append(Product.from_extracted(product_dict))
                 except Exception as e:
                     logger.warning(f"Failed to convert product: {e}")
                     continue
@@ -258,12 +287,20 @@ async def extract_products(
                     extraction_method="brightdata_api"
                 )
                 resources[resource_name] = collection
+                source_collections.append(resource_name)
+                if tool_run:
+                    tool_run.partial["stores_done"].append(url)
+                    tool_run.partial["resources_created"].append(
+                        {"resource_name": resource_name, "products": len(url_products)}
+                    )
                 
                 streamer.progress(f"✅ {domain}: {len(url_products)} products")
                 
                 # PROGRESSIVE DISPLAY: Show products from this site immediately
                 # Display in batches of 5-10 products as each site completes
-                if len(url_products) >= 5 and displayed_count < 20:
+                # (skipped when the extractor already streamed them one by one)
+                already_streamed = product_sink is not None and url in product_sink.streamed_sources
+                if not already_streamed and len(url_products) >= 5 and displayed_count < 20:
                     # Stream first batch from this site
                     batch = url_products[:min(10, len(url_products))]
                     try:
@@ -278,13 +315,18 @@ async def extract_products(
                     except Exception as e:
                         logger.warning(f"Failed to stream products progressively: {e}")
         
+        # Push out any products still waiting in the coalescing window
+        if product_sink:
+            await product_sink.flush()
+        
         # Store all products combined as a ProductCollection
         if all_products:
             combined_collection = ProductCollection(
                 source_name="all_extracted_products",
                 source_url=urls[0] if len(urls) == 1 else f"combined_from_{len(urls)}_urls",
                 products=all_products,
-                extraction_method="json_ld_schema_org"
+                extraction_method="json_ld_schema_org",
+                source_collections=source_collections
             )
             resources["all_extracted_products"] = combined_collection
         
@@ -294,7 +336,8 @@ async def extract_products(
             streamer.completed(message, {
                 "total_products": len(all_products),
                 "total_urls": len(urls),
-                "resource_name": "all_extracted_products"
+                "resource_name": "all_extracted_products",
+                "cut_off_stores": cut_off_stores
             })
             
             # Return summary
@@ -319,10 +362,21 @@ async def extract_products(
             if len(all_products) > 5:
                 summary_parts.append(f"... and {len(all_products) - 5} more products")
             
+            if cut_off_stores:
+                summary_parts.append(
+                    f"\n⏱️ Cut off by the {deadline.budget_seconds:g}s time budget (results may be partial): "
+                    f"{', '.join(cut_off_stores)}"
+                )
+                if tool_run:
+                    summary_parts.append(f"Timing: {json.dumps(tool_run.timing_breakdown())}")
+            
             return "\n".join(summary_parts)
         else:
             message = f"No products found from {len(urls)} URLs"
-            streamer.completed(message, {"total_products": 0, "total_urls": len(urls)})
+            streamer.completed(message, {"total_products": 0, "total_urls": len(urls), "cut_off_stores": cut_off_stores})
+            if cut_off_stores:
+                return (f"No products were extracted from the provided URLs. "
+                        f"Cut off by the {deadline.budget_seconds:g}s time budget: {', '.join(cut_off_stores)}")
             return f"No products were extracted from the provided URLs"
             
     except Exception as e:
@@ -363,7 +417,8 @@ def get_resource_content(resource_id: str, context_vars) -> tuple[str, Optional[
     Returns list of VisionMultimodalContentItem objects (TextContent and ImageContent) for easy handling in agent.py.
     
     NOTE: Use 'display_items' to stream products to the user for better experience.
-    """
+    """,
+    parallel_safe=True
 )
 def get_resource(
     resource_id: str,
@@ -419,7 +474,8 @@ def get_resource(
     name="list_resources",
     description="""List all product collection resources that have been created so far.
     Returns a summary of all product collections with their metadata.
-    """
+    """,
+    parallel_safe=True
 )
 def list_resources(context_vars=None) -> str:
     resources = context_vars.get('resources')
@@ -434,6 +490,42 @@ def list_resources(context_vars=None) -> str:
     return json.dumps(summary_lines, indent=2)
 
 
+@tool(
+    name="read_tool_result",
+    description="""Read more of a large tool result that was stored out of line.
+    Long tool results are shortened in the conversation to their beginning plus a handle
+    like "blob:3f2a..."; pass that handle here to read the rest.
+
+    Parameters:
+    - handle: The blob handle from the shortened tool result
+    - offset: Character offset to start reading from (default: 0)
+    - limit: Maximum number of characters to return (default and maximum: 3000)
+    """,
+    parallel_safe=True
+)
+def read_tool_result(
+    handle: str,
+    offset: int = 0,
+    limit: int = BLOB_PAGE_CHARS,
+    context_vars=None
+) -> str:
+    # Larger pages would be shortened into a new blob instead of being read
+    limit = max(1, min(limit, BLOB_PAGE_CHARS))
+    blob_store = context_vars.get('blob_store')
+    if blob_store is None:
+        return "Error: No stored tool results in this conversation"
+    
+    size = blob_store.size(handle)
+    if size is None:
+        return f"Error: Unknown handle '{handle}'"
+    
+    chunk = blob_store.read(handle, offset=offset, limit=limit)
+    end = min(size, max(0, offset) + len(chunk))
+    if end < size:
+        chunk += f"\n... [characters {offset}-{end} of {size}; read on with offset={end}]"
+    return chunk
+
+
 @tool(
     name="display_items",
     description="""
@@ -0,0 +1,160 @@
+"""Shared worker threads for running tools off the event loop"""
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Coroutine, Dict, Optional
+from loguru import logger
+
+
+# Pool used by sync tools that don't ask for a specific one
+DEFAULT_POOL = "default"
+
+# Worker counts per named pool; "network" is for tools that block on HTTP
+POOL_SIZES = {
+    DEFAULT_POOL: 4,
+    "network": 16,
+}
+
+
+class ToolThreadPool:
+    """
+    Bounded thread pool for synchronous tools, with queue-depth metrics.
+
+    ``queued`` counts calls waiting for a free worker, ``active`` counts calls
+    running on a worker. A growing ``queued`` means the pool is too small for
+    the tools assigned to it.
+    """
+
+    def __init__(self, name: str, max_workers: int):
+        self.name = name
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"tool-{name}")
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.active = 0
+        self.completed = 0
+        self.max_queued = 0
+
+    async def run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run a blocking function on the pool without blocking the event loop"""
+        with self._lock:
+            self.queued += 1
+            self.max_queued = max(self.max_queued, self.queued)
+
+        dequeued = False
+
+        def leave_queue():
+            # Exactly once: when the job starts, or when the caller gives up before it does
+            nonlocal dequeued
+            if not dequeued:
+                dequeued = True
+                self.queued -= 1
+
+        def call():
+            with self._lock:
+                leave_queue()
+                self.active += 1
+            try:
+                return func(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self.active -= 1
+                    self.completed += 1
+
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._executor, call)
+        finally:
+            # Cancelled while still queued (e.g. a tool timeout): the job never runs
+            with self._lock:
+                leave_queue()
+
+    def metrics(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "queued": self.queued,
+                "active": self.active,
+                "completed": self.completed,
+                "max_queued": self.max_queued,
+            }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False)
+
+
+class LoopRunner:
+    """
+    One long-lived event loop on a background thread.
+
+    Lets synchronous callers (ToolFunction.execute) run async tools without
+    creating a thread pool and a fresh event loop for every call.
+    """
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None or self._loop.is_closed():
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(
+                    target=self._loop.run_forever, name="tool-loop-runner", daemon=True
+                )
+                self._thread.start()
+            return self._loop
+
+    def run(self, coro: Coroutine[Any, Any, Any]) -> Any:
+        """Run a coroutine on the runner loop and block until it finishes"""
+        loop = self._ensure_started()
+        if threading.current_thread() is self._thread:
+            coro.close()
+            raise RuntimeError("LoopRunner.run cannot be called from the runner loop itself")
+        return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._loop is not None and not self._loop.is_closed():
+                self._loop.call_soon_threadsafe(self._loop.stop)
+                self._thread.join(timeout=5)
+                self._loop.close()
+            self._loop = None
+            self._thread = None
+
+
+_pools: Dict[str, ToolThreadPool] = {}
+_pools_lock = threading.Lock()
+
+loop_runner = LoopRunner()
+
+
+def get_thread_pool(name: str = DEFAULT_POOL) -> ToolThreadPool:
+    """Get (creating on first use) the named tool thread pool"""
+    with _pools_lock:
+        pool = _pools.get(name)
+        if pool is None:
+            if name not in POOL_SIZES:
+                logger.warning(f"Unknown tool thread pool '{name}', sizing it like '{DEFAULT_POOL}'")
+            pool = ToolThreadPool(name, POOL_SIZES.get(name, POOL_SIZES[DEFAULT_POOL]))
+            _pools[name] = pool
+        return pool
+
+
+def thread_pool_metrics() -> Dict[str, Dict[str, int]]:
+    """Queue depth and utilisation of every pool created so far"""
+    with _pools_lock:
+        pools = list(_pools.values())
+    return {pool.name: pool.metrics() for pool in pools}
+
+
+def shutdown_executors() -> None:
+    """Stop the tool pools and the loop runner (called on app shutdown)"""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown()
+    loop_runner.shutdown()
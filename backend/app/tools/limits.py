@@ -0,0 +1,103 @@
+"""Per-call limits (timeout, concurrency, cost) enforced by the tool registry"""
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional, Tuple
+
+from app.utils.budget import CostBudget
+from app.utils.deadline import Deadline
+
+
+# Seconds a tool may overrun its timeout to wrap up cooperatively before it is cancelled
+TOOL_TIMEOUT_GRACE_SECONDS = 3
+
+
+class ToolRun:
+    """
+    Limits and bookkeeping for one tool call.
+
+    The registry puts the run in ``context_vars['tool_run']``. Tools that do
+    long multi-stage work should pass ``deadline`` and ``cost_budget`` down
+    to the stages that do I/O, record what they have finished so far in
+    ``partial`` and time their stages with ``record_timing``. If the call is
+    cancelled at the timeout, the model gets ``timeout_result()`` built from
+    that information instead of an exception string.
+    """
+
+    def __init__(
+        self,
+        tool_name: str,
+        timeout: Optional[float] = None,
+        cost_budget: Optional[float] = None,
+        queued_seconds: float = 0.0
+    ):
+        self.tool_name = tool_name
+        self.timeout = timeout
+        self.deadline: Optional[Deadline] = Deadline(timeout) if timeout else None
+        self.cost_budget: Optional[CostBudget] = CostBudget(cost_budget) if cost_budget is not None else None
+        self.queued_seconds = queued_seconds
+        self.started_at = time.monotonic()
+        self.partial: Dict[str, Any] = {}
+        self.timings: Dict[str, float] = {}
+
+    def record_timing(self, stage: str, seconds: float) -> None:
+        self.timings[stage] = round(seconds, 3)
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+    def timing_breakdown(self) -> Dict[str, Any]:
+        breakdown = {
+            "queued_seconds": round(self.queued_seconds, 3),
+            "elapsed_seconds": round(self.elapsed(), 3),
+            "stages": dict(self.timings),
+        }
+        if self.cost_budget is not None:
+            breakdown["cost_spent"] = self.cost_budget.spent
+            breakdown["cost_budget"] = self.cost_budget.limit
+        return breakdown
+
+    def timeout_result(self) -> Dict[str, Any]:
+        """Structured result returned to the model when the call is cut off"""
+        return {
+            "status": "timed_out",
+            "tool": self.tool_name,
+            "message": (
+                f"{self.tool_name} did not finish within its {self.timeout:g}s limit and was stopped. "
+                f"Use the partial result below or retry with a smaller request."
+            ),
+            "partial_result": self.partial,
+            "timing": self.timing_breakdown(),
+        }
+
+
+class ToolConcurrencyLimiter:
+    """
+    Per-tool caps on simultaneous calls across all conversations.
+
+    Semaphores are tied to the event loop they were created on, so each tool
+    gets a fresh one if the loop changes (e.g. between test runs).
+    """
+
+    def __init__(self):
+        self._semaphores: Dict[str, Tuple[asyncio.AbstractEventLoop, asyncio.Semaphore]] = {}
+
+    def _semaphore(self, tool_name: str, limit: int) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        entry = self._semaphores.get(tool_name)
+        if entry is None or entry[0] is not loop:
+            entry = (loop, asyncio.Semaphore(limit))
+            self._semaphores[tool_name] = entry
+        return entry[1]
+
+    @asynccontextmanager
+    async def slot(self, tool_name: str, limit: Optional[int]):
+        """Hold one of the tool's slots; yields the seconds spent waiting for it"""
+        if not limit:
+            yield 0.0
+            return
+        semaphore = self._semaphore(tool_name, limit)
+        waited_from = time.monotonic()
+        async with semaphore:
+            yield time.monotonic() - waited_from
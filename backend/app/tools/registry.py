@@ -1,7 +1,34 @@
 """Tool registry for managing registered tools"""
 
+import asyncio
+import json
 from typing import Dict, List, Any, Optional
+from loguru import logger
 from app.models.chat import Tool, OpenAITool
+from app.tools.limits import ToolRun, ToolConcurrencyLimiter, TOOL_TIMEOUT_GRACE_SECONDS
+
+
+class SerializedToolList(list):
+    """
+    API-ready tool dicts that also carry their JSON encoding.
+    
+    Providers that build the request body themselves can splice in
+    ``json_bytes`` instead of encoding the schemas again. Shared between
+    requests, so treat it as read-only.
+    """
+    
+    def __init__(self, tools: List[Dict[str, Any]]):
+        super().__init__(tools)
+        self.json_bytes = json.dumps(tools, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class ToolSchemas:
+    """Every registered tool's schema, built once per registry version"""
+    
+    def __init__(self, version: int, models: List[Tool]):
+        self.version = version
+        self.models = models
+        self.api_dicts = SerializedToolList([model.model_dump(mode="json") for model in models])
 
 
 class ToolRegistry:
@@ -9,15 +36,29 @@ class ToolRegistry:
     
     def __init__(self):
         self._tools: Dict[str, 'ToolFunction'] = {}
+        self._concurrency = ToolConcurrencyLimiter()
+        self._version = 0
+        self._schemas: Optional[ToolSchemas] = None
+    
+    @property
+    def version(self) -> int:
+        """Bumped whenever the set of tools changes"""
+        return self._version
+    
+    def _invalidate_schemas(self) -> None:
+        self._version += 1
+        self._schemas = None
     
     def register(self, name: str, tool_func: 'ToolFunction') -> None:
         """Register a tool function in the registry"""
         self._tools[name] = tool_func
+        self._invalidate_schemas()
     
     def unregister(self, name: str) -> bool:
         """Unregister a tool function from the registry"""
         if name in self._tools:
             del self._tools[name]
+            self._invalidate_schemas()
             return True
         return False
     
@@ -36,10 +77,23 @@ class ToolRegistry:
     def clear(self) -> None:
         """Clear all registered tools (useful for testing)"""
         self._tools.clear()
+        self._invalidate_schemas()
+    
+    def schemas(self) -> ToolSchemas:
+        """Tool schemas for the current registry version, built on first use"""
+        schemas = self._schemas
+        if schemas is None or schemas.version != self._version:
+            schemas = ToolSchemas(self._version, [tool.to_openai_format() for tool in self._tools.values()])
+            self._schemas = schemas
+        return schemas
+    
+    def api_tool_schemas(self) -> SerializedToolList:
+        """API-ready tool dicts (cached; pass straight to the LLM router)"""
+        return self.schemas().api_dicts
     
     def to_openai_format(self) -> List[Tool]:
         """Convert all registered tools to OpenAI function calling format"""
-        return [tool.to_openai_format() for tool in self._tools.values()]
+        return list(self.schemas().models)
     
     def to_openai_format_direct(self) -> List[OpenAITool]:
         """Convert all registered tools to direct OpenAI function calling format (flattened)"""
@@ -59,17 +113,44 @@ class ToolRegistry:
         return tool.execute(context_vars=context_vars, **kwargs)
     
     async def execute_tool_async(self, name: str, context_vars: Dict[str, Any] = None, **kwargs) -> Any:
-        """Execute a registered tool by name with given parameters and context variables (async version)"""
+        """
+        Execute a registered tool by name with given parameters and context variables (async version).
+        
+        Enforces the tool's max_concurrency, timeout and cost_budget. The call's
+        ToolRun is passed to the tool as context_vars['tool_run']; if the call
+        overruns its timeout (plus a short grace period to finish cooperatively)
+        it is cancelled and ToolRun.timeout_result() is returned instead.
+        """
         tool = self.get_tool(name)
         if not tool:
             raise ValueError(f"Tool '{name}' not found in registry")
         
         # Add logging for display_items specifically
         if name == "display_items":
-            from loguru import logger
             logger.info(f"🔧 Executing display_items with {len(kwargs.get('products', []))} products")
         
-        return await tool.execute_async(context_vars=context_vars, **kwargs)
+        async with self._concurrency.slot(name, tool.max_concurrency) as queued_seconds:
+            tool_run = ToolRun(name, timeout=tool.timeout, cost_budget=tool.cost_budget, queued_seconds=queued_seconds)
+            call_context = dict(context_vars or {})
+            call_context['tool_run'] = tool_run
+            
+            if tool_run.deadline is None:
+                return await tool.execute_async(context_vars=call_context, **kwargs)
+            
+            task = asyncio.ensure_future(tool.execute_async(context_vars=call_context, **kwargs))
+            try:
+                done, _ = await asyncio.wait({task}, timeout=tool_run.deadline.remaining() + TOOL_TIMEOUT_GRACE_SECONDS)
+            except asyncio.CancelledError:
+                task.cancel()
+                raise
+            
+            if task in done:
+                return task.result()
+            
+            logger.warning(f"⏱️ {name} exceeded its {tool.timeout}s timeout, cancelling")
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            return tool_run.timeout_result()
     
     def has_tool(self, name: str) -> bool:
         """Check if a tool is registered"""
@@ -0,0 +1,243 @@
+"""
+Admission control for agent runs.
+
+Every /chat/stream turn is admitted before its response starts:
+
+- per conversation, turns run one at a time in arrival order, so two requests
+  for the same conversation never drive one Agent at once
+- globally, at most MAX_CONCURRENT_RUNS turns run at a time; the rest wait
+  in a FIFO queue
+
+When a queue is already full, or a turn waits longer than the queue timeout,
+the request is rejected with RunRejected and the route answers 429 with a
+Retry-After estimated from recent run times. Queue waits are kept for
+/metrics.
+
+This serializes turns within one worker process; across workers the state
+store's conversation lock does the same.
+"""
+
+import asyncio
+import math
+import os
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional
+
+
+MAX_CONCURRENT_RUNS = int(os.getenv("MAX_CONCURRENT_RUNS", "16"))
+MAX_QUEUED_RUNS = int(os.getenv("MAX_QUEUED_RUNS", "64"))
+# Turns that may wait behind a conversation's running turn
+MAX_QUEUED_PER_CONVERSATION = int(os.getenv("MAX_QUEUED_PER_CONVERSATION", "2"))
+RUN_QUEUE_TIMEOUT_SECONDS = float(os.getenv("RUN_QUEUE_TIMEOUT_SECONDS", "30"))
+
+# Retry-After bounds, and the run time assumed before any run has finished
+MIN_RETRY_AFTER_SECONDS = 1
+MAX_RETRY_AFTER_SECONDS = 120
+INITIAL_RUN_SECONDS = 20.0
+# Weight of the latest run in the moving average of run times
+RUN_SECONDS_SMOOTHING = 0.2
+# Recent queue waits kept for percentiles
+WAIT_SAMPLES = 1000
+
+
+class RunRejected(Exception):
+    """A run was not admitted; retry after ``retry_after`` seconds"""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(f"Server busy ({reason}), retry in {retry_after}s")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class _Gate:
+    """FIFO counting semaphore that knows how many callers are waiting"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self, timeout: Optional[float]) -> None:
+        """
+        Take a slot, waiting in line if none is free
+
+        Raises:
+            asyncio.TimeoutError: If no slot frees up within ``timeout``
+        """
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout)
+        except BaseException:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as we gave up; pass it on
+                self.release()
+            else:
+                waiter.cancel()
+                self._waiters.remove(waiter)
+            raise
+
+    def release(self) -> None:
+        """Free a slot, handing it straight to the next waiter if there is one"""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+
+class RunTicket:
+    """An admitted run; ``release`` it (idempotently) when the run ends"""
+
+    def __init__(self, admission: "RunAdmission", conversation_id: str, admitted_at: float, waited: float):
+        self.admission = admission
+        self.conversation_id = conversation_id
+        self.admitted_at = admitted_at
+        self.waited = waited
+        self.released = False
+
+    def release(self) -> None:
+        if not self.released:
+            self.released = True
+            self.admission._finish(self)
+
+
+class RunAdmission:
+    """
+    Per-conversation run queues under a global concurrency limit.
+
+    Example:
+        ticket = await admission.admit(conversation_id)   # may raise RunRejected
+        try:
+            ...run the agent...
+        finally:
+            ticket.release()
+
+    Not thread-safe: admit and release from the event loop only.
+    """
+
+    def __init__(self,
+                 max_concurrent: int = MAX_CONCURRENT_RUNS,
+                 max_queued: int = MAX_QUEUED_RUNS,
+                 max_queued_per_conversation: int = MAX_QUEUED_PER_CONVERSATION,
+                 queue_timeout: float = RUN_QUEUE_TIMEOUT_SECONDS,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.max_queued_per_conversation = max_queued_per_conversation
+        self.queue_timeout = queue_timeout
+        self.clock = clock
+
+        self._runs = _Gate(max_concurrent)
+        self._conversations: Dict[str, _Gate] = {}
+        self._run_seconds = INITIAL_RUN_SECONDS
+        self._waits: Deque[float] = deque(maxlen=WAIT_SAMPLES)
+        self._counts = {"admitted": 0, "completed": 0, "rejected_conversation_busy": 0,
+                        "rejected_queue_full": 0, "rejected_queue_timeout": 0}
+        self.max_waited = 0.0
+
+    @property
+    def running(self) -> int:
+        return self._runs.active
+
+    @property
+    def queued(self) -> int:
+        """Runs waiting for their conversation or for a global slot"""
+        return self._runs.waiting + sum(gate.waiting for gate in self._conversations.values())
+
+    async def admit(self, conversation_id: str) -> RunTicket:
+        """
+        Wait for the conversation's previous turns and a free run slot
+
+        Raises:
+            RunRejected: If a queue is full or the wait exceeds the queue timeout
+        """
+        conversation = self._conversations.get(conversation_id)
+        if conversation and conversation.active and conversation.waiting >= self.max_queued_per_conversation:
+            raise self._reject("conversation_busy", conversation.waiting + 1)
+        if self.running >= self.max_concurrent and self.queued >= self.max_queued:
+            raise self._reject("queue_full", self._runs.waiting + 1)
+        if conversation is None:
+            conversation = self._conversations[conversation_id] = _Gate(1)
+
+        requested = self.clock()
+        deadline = requested + self.queue_timeout
+        try:
+            await conversation.acquire(self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise self._reject("queue_timeout", conversation.waiting + 1) from None
+        finally:
+            self._forget_idle(conversation_id)
+
+        try:
+            await self._runs.acquire(max(0.0, deadline - self.clock()))
+        except BaseException as e:
+            conversation.release()
+            self._forget_idle(conversation_id)
+            if isinstance(e, asyncio.TimeoutError):
+                raise self._reject("queue_timeout", self._runs.waiting + 1) from None
+            raise
+
+        now = self.clock()
+        waited = now - requested
+        self._waits.append(waited)
+        self.max_waited = max(self.max_waited, waited)
+        self._counts["admitted"] += 1
+        return RunTicket(self, conversation_id, now, waited)
+
+    def retry_after(self, position: int) -> int:
+        """Seconds until roughly ``position`` more runs have finished"""
+        seconds = math.ceil(self._run_seconds * position / max(1, self.max_concurrent))
+        return max(MIN_RETRY_AFTER_SECONDS, min(MAX_RETRY_AFTER_SECONDS, seconds))
+
+    def metrics(self) -> Dict[str, Any]:
+        """Running and queued runs, rejections and recent queue waits"""
+        waits = sorted(self._waits)
+
+        def percentile(p: float) -> float:
+            return round(waits[min(len(waits) - 1, int(p * len(waits)))], 4) if waits else 0.0
+
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_queued": self.max_queued,
+            "running": self.running,
+            "queued": self.queued,
+            "conversations": len(self._conversations),
+            "mean_run_seconds": round(self._run_seconds, 3),
+            "queue_wait_seconds": {
+                "samples": len(waits),
+                "mean": round(sum(waits) / len(waits), 4) if waits else 0.0,
+                "p50": percentile(0.5),
+                "p95": percentile(0.95),
+                "max": round(self.max_waited, 4),
+            },
+            **self._counts,
+        }
+
+    def _finish(self, ticket: RunTicket) -> None:
+        run_seconds = self.clock() - ticket.admitted_at
+        self._run_seconds += RUN_SECONDS_SMOOTHING * (run_seconds - self._run_seconds)
+        self._counts["completed"] += 1
+        self._runs.release()
+        conversation = self._conversations.get(ticket.conversation_id)
+        if conversation:
+            conversation.release()
+            self._forget_idle(ticket.conversation_id)
+
+    def _forget_idle(self, conversation_id: str) -> None:
+        conversation = self._conversations.get(conversation_id)
+        if conversation and not conversation.active and not conversation.waiting:
+            del self._conversations[conversation_id]
+
+    def _reject(self, reason: str, position: int) -> RunRejected:
+        self._counts[f"rejected_{reason}"] += 1
+        return RunRejected(reason, self.retry_after(position))
@@ -0,0 +1,106 @@
+"""Out-of-line storage for large tool results"""
+
+import hashlib
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+from loguru import logger
+
+
+# Tool results longer than this (in characters) are stored as blobs
+BLOB_THRESHOLD_CHARS = 4000
+
+# How much of a stored result is kept inline as its summary
+BLOB_SUMMARY_CHARS = 1500
+
+# Largest page read_tool_result returns; with its "read on" trailer a page stays
+# under BLOB_THRESHOLD_CHARS, so it is never stored out of line again
+BLOB_PAGE_CHARS = 3000
+
+HANDLE_PREFIX = "blob:"
+
+
+class ConversationBlobStore:
+    """
+    Content-addressed blobs for one conversation, kept on disk.
+
+    A blob is written once and referenced by a short handle
+    (``blob:<sha256 prefix>``); identical results share a file. Without a
+    directory, a private temporary one is created on the first write.
+    """
+
+    def __init__(self, directory: Optional[Path] = None):
+        self.directory = Path(directory) if directory else None
+
+    def _path(self, handle: str) -> Optional[Path]:
+        if self.directory is None or not handle.startswith(HANDLE_PREFIX):
+            return None
+        digest = handle[len(HANDLE_PREFIX):]
+        if not digest.isalnum():
+            return None
+        return self.directory / f"{digest}.txt"
+
+    def put(self, data: str) -> str:
+        """Store data and return its handle"""
+        digest = hashlib.sha256(data.encode('utf-8')).hexdigest()[:24]
+        handle = f"{HANDLE_PREFIX}{digest}"
+        if self.directory is None:
+            self.directory = Path(tempfile.mkdtemp(prefix="moleai_blobs_"))
+            logger.debug(f"Storing tool result blobs in {self.directory}")
+        path = self._path(handle)
+        if not path.exists():
+            self.directory.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(".tmp")
+            tmp_path.write_text(data, encoding='utf-8')
+            tmp_path.replace(path)
+        return handle
+
+    def get(self, handle: str) -> Optional[str]:
+        """Full blob for a handle, or None if unknown"""
+        path = self._path(handle)
+        if path is None or not path.exists():
+            return None
+        return path.read_text(encoding='utf-8')
+
+    def read(self, handle: str, offset: int = 0, limit: int = BLOB_THRESHOLD_CHARS) -> Optional[str]:
+        """A slice of a blob, in characters"""
+        data = self.get(handle)
+        if data is None:
+            return None
+        return data[max(0, offset):max(0, offset) + max(0, limit)]
+
+    def size(self, handle: str) -> Optional[int]:
+        """Length of a blob in characters"""
+        data = self.get(handle)
+        return len(data) if data is not None else None
+
+
+class BlobStorage:
+    """Hands out per-conversation blob stores under the chat history folders"""
+
+    def __init__(self, base_path: str = "resources/chat_history"):
+        self.base_path = Path(base_path)
+
+    def for_conversation(self, conversation_id: Optional[str]) -> ConversationBlobStore:
+        """
+        Blob store for a conversation (``<base>/<conversation_id>/blobs``).
+
+        Agents without a conversation id get a private temporary directory.
+        """
+        if conversation_id:
+            return ConversationBlobStore(self.base_path / conversation_id / "blobs")
+        return ConversationBlobStore()
+
+
+def summarize_blob(data: str, handle: str) -> str:
+    """Inline stand-in for a stored result: its beginning plus how to read the rest"""
+    return (
+        f"{data[:BLOB_SUMMARY_CHARS]}\n"
+        f"... [{len(data) - BLOB_SUMMARY_CHARS} more characters stored as {handle}. "
+        f"Call read_tool_result(handle=\"{handle}\", offset={BLOB_SUMMARY_CHARS}) to read on.]"
+    )
+
+
+# Global instance for easy access
+blob_storage = BlobStorage()
@@ -0,0 +1,46 @@
+"""Cost budget helper for bounding how many paid requests one operation may make"""
+
+from typing import Optional
+
+
+class CostBudget:
+    """
+    A spend limit shared by every stage of one operation.
+
+    Units are whatever the caller charges for; the extractors charge one unit
+    per BrightData request. Once the limit is reached, ``charge`` refuses and
+    the stage skips the request and returns what it has, like an expired
+    Deadline.
+
+    Example:
+        budget = CostBudget(100)
+        if not budget.charge():
+            return None
+        html = await fetch(url)
+    """
+
+    def __init__(self, limit: Optional[float]):
+        self.limit = limit
+        self.spent = 0.0
+        self.refused = 0
+
+    def charge(self, units: float = 1) -> bool:
+        """Spend units if the budget allows it; returns False (and spends nothing) otherwise"""
+        if self.limit is not None and self.spent + units > self.limit:
+            self.refused += 1
+            return False
+        self.spent += units
+        return True
+
+    def remaining(self) -> Optional[float]:
+        """Units left, or None for an unlimited budget"""
+        if self.limit is None:
+            return None
+        return max(0.0, self.limit - self.spent)
+
+    def exhausted(self) -> bool:
+        """Check if the next unit would be refused"""
+        return self.limit is not None and self.spent + 1 > self.limit
+
+    def __repr__(self) -> str:
+        return f"CostBudget(spent={self.spent:g}, limit={self.limit})"
@@ -3,11 +3,30 @@
 import json
 import os
 import re
+import shutil
+import threading
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterator, Optional, Set, Tuple
 from pathlib import Path
 
 from app.models.chat import InputMessage
+from app.utils.conversation_catalog import CATALOG_FILENAME, ConversationCatalog
+from app.utils.history_pages import DEFAULT_PAGE_LIMIT, paginate_messages
+from app.utils.storage_codec import read_document, resolve_codec, write_document
+
+
+# Per-conversation files: the journal is appended to turn after turn and
+# compacted into the JSON file when the conversation is evicted from memory,
+# or at the end of a turn once it has grown past COMPACT_JOURNAL_BYTES
+JOURNAL_FILENAME = "chat_history.jsonl"
+CHAT_FILENAME = "chat_history.json"
+COMPACT_JOURNAL_BYTES = int(os.getenv("CHAT_COMPACT_JOURNAL_BYTES", str(1024 * 1024)))
+# End reasons after which the conversation is not expected to go on soon
+COMPACT_END_REASONS = {"evicted"}
+
+# Resources: a manifest plus one file per collection
+RESOURCES_MANIFEST = "resources.json"
+RESOURCES_DIRNAME = "resources"
 
 
 class PrettyJSONEncoder(json.JSONEncoder):
@@ -24,14 +43,67 @@ class PrettyJSONEncoder(json.JSONEncoder):
             yield chunk
 
 
+class SavedCollection:
+    """
+    Stands in for a ProductCollection that storage has already saved with the
+    same snapshot_key(): what its manifest entry needs, without the products
+    """
+    
+    def __init__(self, resource: Any):
+        self.key = resource.snapshot_key()
+        self.product_count = len(resource.products)
+        self.version = getattr(resource, 'version', None)
+        self.source_collections = list(getattr(resource, 'source_collections', None) or [])
+        self.source_name = getattr(resource, 'source_name', None)
+        self.site_name = getattr(resource, 'site_name', None)
+        self.source_url = getattr(resource, 'source_url', None)
+        self.extraction_method = getattr(resource, 'extraction_method', None)
+    
+    def snapshot_key(self) -> Any:
+        return self.key
+
+
+def _is_collection(resource: Any) -> bool:
+    return isinstance(resource, SavedCollection) or hasattr(resource, 'get_products')
+
+
+def _product_count(resource: Any) -> int:
+    return resource.product_count if isinstance(resource, SavedCollection) else len(resource.products)
+
+
 class ChatHistoryStorage:
-    """Handles saving and loading chat history to/from JSON files"""
+    """Handles saving and loading chat history to/from JSON files (and JSONL journals while active)"""
     
-    def __init__(self, base_path: str = "resources/chat_history"):
+    def __init__(self, base_path: str = "resources/chat_history", codec: Optional[str] = None):
         self.base_path = Path(base_path)
         self.base_path.mkdir(parents=True, exist_ok=True)
+        # Encoding of compacted histories and resource files (see app.utils.storage_codec)
+        self.codec = resolve_codec(codec)
         # Track active conversations for incremental updates
         self._active_conversations: Dict[str, str] = {}  # conversation_id -> filepath
+        # Last saved snapshot_key() of each resource, per conversation
+        self._resource_snapshots: Dict[str, Dict[str, Any]] = {}
+        # Index of conversations for listing and retention, opened on first use
+        self._catalog: Optional[ConversationCatalog] = None
+        self._catalog_lock = threading.RLock()
+    
+    @property
+    def catalog(self) -> ConversationCatalog:
+        """
+        The conversation catalog, opened on first use so importing this module
+        touches no database; a new database is filled from the files already on
+        disk (a one-time scan)
+        """
+        if self._catalog is None:
+            with self._catalog_lock:
+                if self._catalog is None:
+                    catalog = ConversationCatalog(self.base_path / CATALOG_FILENAME)
+                    if catalog.created:
+                        indexed = self._fill_catalog(catalog)
+                        if indexed:
+                            print(f"Built conversation catalog: {indexed} conversations")
+                    self._catalog = catalog
+        return self._catalog
     
     def _clean_string(self, text: str) -> str:
         """Remove control characters that can cause JSON parsing issues"""
@@ -111,8 +183,10 @@ class ChatHistoryStorage:
             }
             
             # Save to file with pretty formatting
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(chat_data, f, indent=2, ensure_ascii=False, cls=PrettyJSONEncoder)
+            self._write_document(filepath, chat_data)
+            self._update_catalog(self.catalog.upsert, conversation_id, str(filepath),
+                                 started_at=chat_data["timestamp"], metadata=chat_data["metadata"],
+                                 message_count=chat_data["message_count"], structure='old')
             
             print(f"Chat history saved to: {filepath}")
             return str(filepath)
@@ -123,39 +197,40 @@ class ChatHistoryStorage:
     
     def start_conversation(self, conversation_id: str, metadata: Optional[Dict[str, Any]] = None) -> str:
         """
-        Start a new conversation and create initial file in a conversation-specific folder
+        Start a new conversation and create its journal in a conversation-specific folder
+        
+        Messages are appended to chat_history.jsonl, one line each, and the journal is
+        compacted into chat_history.json when the conversation is evicted or the
+        journal grows past COMPACT_JOURNAL_BYTES.
         
         Args:
             conversation_id: Unique identifier for the conversation
             metadata: Optional metadata about the conversation
             
         Returns:
-            Path to the created file
+            Path to the created journal
         """
         try:
             # Create conversation-specific directory
             conversation_dir = self.base_path / conversation_id
             conversation_dir.mkdir(parents=True, exist_ok=True)
             
-            # Create filename - just use chat_history.json since it's in its own folder
-            filename = "chat_history.json"
-            filepath = conversation_dir / filename
+            filepath = conversation_dir / JOURNAL_FILENAME
             
-            # Prepare initial data structure
-            chat_data = {
+            # Header line holds what the JSON file keeps at the top level
+            header = {
+                "record": "header",
                 "conversation_id": conversation_id,
                 "timestamp": datetime.now().isoformat(),
-                "message_count": 0,
-                "metadata": metadata or {},
-                "messages": []
+                "metadata": metadata or {}
             }
-            
-            # Save initial file with pretty formatting
             with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(chat_data, f, indent=2, ensure_ascii=False, cls=PrettyJSONEncoder)
+                f.write(self._journal_line(header))
             
             # Track this conversation
             self._active_conversations[conversation_id] = str(filepath)
+            self._update_catalog(self.catalog.upsert, conversation_id, str(filepath),
+                                 started_at=header["timestamp"], metadata=header["metadata"])
             
             print(f"Started conversation: {conversation_id} -> {filepath}")
             return str(filepath)
@@ -164,63 +239,109 @@ class ChatHistoryStorage:
             print(f"Error starting conversation: {e}")
             raise
     
+    def _continue_conversation(self, conversation_id: str) -> str:
+        """
+        Open a journal that continues an already compacted chat_history.json
+        
+        Returns:
+            Path to the journal
+        """
+        conversation_dir = self.base_path / conversation_id
+        filepath = conversation_dir / JOURNAL_FILENAME
+        header = {
+            "record": "header",
+            "conversation_id": conversation_id,
+            "timestamp": datetime.now().isoformat(),
+            "continues": CHAT_FILENAME
+        }
+        with open(filepath, 'w', encoding='utf-8') as f:
+            f.write(self._journal_line(header))
+        self._active_conversations[conversation_id] = str(filepath)
+        if self.catalog.get(conversation_id) is None:
+            self._catalog_file(conversation_dir / CHAT_FILENAME)
+        return str(filepath)
+    
+    def _journal_line(self, record: Dict[str, Any]) -> str:
+        """One compact journal line"""
+        return json.dumps(record, ensure_ascii=False, cls=PrettyJSONEncoder) + "\n"
+    
+    def _serialize_message(self, message: InputMessage) -> Dict[str, Any]:
+        """Storage dict for a message, with control characters cleaned"""
+        try:
+            msg_dict = message.model_dump()
+            # Remove tool_calls if it's None or empty list to keep storage clean
+            if "tool_calls" in msg_dict and (msg_dict["tool_calls"] is None or msg_dict["tool_calls"] == []):
+                del msg_dict["tool_calls"]
+            # Clean any control characters that might cause JSON issues
+            return self._clean_control_characters(msg_dict)
+        except Exception as e:
+            # Fallback for messages that can't be serialized
+            print(f"Warning: Could not serialize message: {e}")
+            return {
+                "role": getattr(message, 'role', 'unknown'),
+                "content": self._clean_string(str(getattr(message, 'content', ''))),
+                "type": type(message).__name__,
+                "serialization_error": str(e)
+            }
+    
+    def message_record(self, message: InputMessage) -> Dict[str, Any]:
+        """Journal record for a message, serialized now"""
+        return {
+            "record": "message",
+            "timestamp": datetime.now().isoformat(),
+            "message": self._serialize_message(message)
+        }
+    
     def append_message(self, conversation_id: str, message: InputMessage) -> bool:
         """
         Append a single message to an existing conversation
         
+        Writes one line to the conversation's journal, so the cost doesn't grow
+        with the length of the conversation.
+        
         Args:
             conversation_id: Unique identifier for the conversation
             message: Message to append
             
+        Returns:
+            True if successful, False otherwise
+        """
+        if message is None:
+            return self.append_records(conversation_id, [])
+        return self.append_records(conversation_id, [self.message_record(message)])
+    
+    def append_records(self, conversation_id: str, records: List[Dict[str, Any]], fsync: bool = False) -> bool:
+        """
+        Append message records (see message_record) to a conversation's journal in one write
+        
+        Args:
+            conversation_id: Unique identifier for the conversation
+            records: Journal records to append
+            fsync: Force the journal to disk before returning
+            
         Returns:
             True if successful, False otherwise
         """
         try:
-            # Get the filepath for this conversation
+            # Get the journal for this conversation
             filepath = self._active_conversations.get(conversation_id)
             if not filepath or not Path(filepath).exists():
-                # Try to find the conversation folder and chat_history.json
                 conversation_dir = self.base_path / conversation_id
-                chat_file = conversation_dir / "chat_history.json"
-                if chat_file.exists():
-                    filepath = str(chat_file)
+                journal_file = conversation_dir / JOURNAL_FILENAME
+                if journal_file.exists():
+                    filepath = str(journal_file)
                     self._active_conversations[conversation_id] = filepath
+                elif (conversation_dir / CHAT_FILENAME).exists():
+                    # Conversation was ended (compacted) and is going on again
+                    filepath = self._continue_conversation(conversation_id)
                 else:
                     # Start a new conversation if none exists
                     filepath = self.start_conversation(conversation_id)
             
-            # Load existing data
-            with open(filepath, 'r', encoding='utf-8') as f:
-                chat_data = json.load(f)
-            
-            # Convert message to serializable format
-            if message is not None:
-                try:
-                    msg_dict = message.model_dump()
-                    # Remove tool_calls if it's None or empty list to keep storage clean
-                    if "tool_calls" in msg_dict and (msg_dict["tool_calls"] is None or msg_dict["tool_calls"] == []):
-                        del msg_dict["tool_calls"]
-                    # Clean any control characters that might cause JSON issues
-                    msg_dict = self._clean_control_characters(msg_dict)
-                    chat_data["messages"].append(msg_dict)
-                    chat_data["message_count"] = len(chat_data["messages"])
-                    chat_data["last_updated"] = datetime.now().isoformat()
-                except Exception as e:
-                    # Fallback for messages that can't be serialized
-                    print(f"Warning: Could not serialize message: {e}")
-                    fallback_msg = {
-                        "role": getattr(message, 'role', 'unknown'),
-                        "content": self._clean_string(str(getattr(message, 'content', ''))),
-                        "type": type(message).__name__,
-                        "serialization_error": str(e)
-                    }
-                    chat_data["messages"].append(fallback_msg)
-                    chat_data["message_count"] = len(chat_data["messages"])
-                    chat_data["last_updated"] = datetime.now().isoformat()
-            
-            # Save updated data with pretty formatting
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(chat_data, f, indent=2, ensure_ascii=False, cls=PrettyJSONEncoder)
+            if records:
+                self._write(Path(filepath), "".join(self._journal_line(r) for r in records), 'a', fsync)
+                self._update_catalog(self.catalog.record_messages, conversation_id, len(records),
+                                     records[-1].get("timestamp") or datetime.now().isoformat())
             
             return True
             
@@ -228,15 +349,35 @@ class ChatHistoryStorage:
             print(f"Error appending message to conversation {conversation_id}: {e}")
             return False
     
-    def end_conversation(self, conversation_id: str, metadata: Optional[Dict[str, Any]] = None, end_reason: str = "completed", resources: Optional[Dict[str, Any]] = None) -> bool:
+    def _write(self, filepath: Path, text: str, mode: str = 'w', fsync: bool = False) -> None:
+        """Write text to a file, optionally forcing it to disk"""
+        with open(filepath, mode, encoding='utf-8') as f:
+            f.write(text)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+    
+    def _write_document(self, filepath: Path, data: Any, fsync: bool = False) -> None:
+        """Write a whole document (history, resources) atomically with the storage codec"""
+        write_document(filepath, data, self.codec, fsync=fsync)
+    
+    def end_conversation(self, conversation_id: str, metadata: Optional[Dict[str, Any]] = None, end_reason: str = "completed", resources: Optional[Dict[str, Any]] = None, fsync: bool = False, compact: Optional[bool] = None, resource_keys: Optional[Dict[str, Any]] = None) -> bool:
         """
         Mark a conversation as ended and update metadata
         
+        Writes a footer to the journal. The journal is only compacted into
+        chat_history.json (which rewrites the whole history) when the end reason
+        is in COMPACT_END_REASONS or the journal has grown past
+        COMPACT_JOURNAL_BYTES, so ending a turn costs one appended line.
+        
         Args:
             conversation_id: Unique identifier for the conversation
             metadata: Optional final metadata
             end_reason: Reason for ending the conversation (e.g., "completed", "error", "timeout")
-            resources: Optional resources dictionary to save as resources.json
+            resources: Optional resources dictionary to save (changed collections only)
+            fsync: Force the footer (or compacted history) and resources to disk before returning
+            compact: Compact (True) or keep (False) the journal regardless of the rules above
+            resource_keys: snapshot_key() of the collections ``resources`` were copied from
             
         Returns:
             True if successful, False otherwise
@@ -244,28 +385,38 @@ class ChatHistoryStorage:
         try:
             filepath = self._active_conversations.get(conversation_id)
             if not filepath or not Path(filepath).exists():
-                return False
-            
-            # Load existing data
-            with open(filepath, 'r', encoding='utf-8') as f:
-                chat_data = json.load(f)
-            
-            # Update metadata
-            if metadata:
-                chat_data["metadata"].update(metadata)
-            chat_data["ended_at"] = datetime.now().isoformat()
-            chat_data["end_reason"] = end_reason
-            
-            # Save updated data with pretty formatting
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(chat_data, f, indent=2, ensure_ascii=False, cls=PrettyJSONEncoder)
+                # The journal may have been opened by another worker process
+                journal_file = self.base_path / conversation_id / JOURNAL_FILENAME
+                if not journal_file.exists():
+                    return False
+                filepath = str(journal_file)
+            
+            footer = {
+                "record": "footer",
+                "ended_at": datetime.now().isoformat(),
+                "end_reason": end_reason,
+                "metadata": metadata or {}
+            }
+            journal_path = Path(filepath)
+            if compact is None:
+                compact = end_reason in COMPACT_END_REASONS or journal_path.stat().st_size >= COMPACT_JOURNAL_BYTES
+            self._write(journal_path, self._journal_line(footer), 'a', fsync and not compact)
+            
+            if compact:
+                chat_data = self._compact_journal(journal_path, fsync=fsync)
+                self._update_catalog(self.catalog.record_end, conversation_id, footer["ended_at"], end_reason,
+                                     chat_data.get("metadata", {}), chat_data["message_count"],
+                                     str(journal_path.parent / CHAT_FILENAME))
+            else:
+                # The catalog already counts the journal's messages; only merge the footer
+                self._update_catalog(self._record_footer, conversation_id, footer)
             
-            # Save resources.json if resources are provided
+            # Save resources if provided
             if resources:
-                self._save_resources_json(conversation_id, resources)
+                self._save_resources(conversation_id, resources, fsync=fsync, keys=resource_keys)
             
             # Remove from active conversations
-            del self._active_conversations[conversation_id]
+            self._active_conversations.pop(conversation_id, None)
             
             print(f"Ended conversation: {conversation_id} (reason: {end_reason})")
             return True
@@ -274,13 +425,92 @@ class ChatHistoryStorage:
             print(f"Error ending conversation {conversation_id}: {e}")
             return False
     
-    def _save_resources_json(self, conversation_id: str, resources: Dict[str, Any]) -> bool:
+    def _record_footer(self, conversation_id: str, footer: Dict[str, Any]) -> None:
+        """Catalog a conversation's end without re-reading its journal"""
+        entry = self.catalog.get(conversation_id)
+        if entry is None:
+            return
+        metadata = {**entry["metadata"], **footer["metadata"]}
+        self.catalog.record_end(conversation_id, footer["ended_at"], footer["end_reason"], metadata)
+    
+    def _read_journal(self, journal_path: Path) -> Dict[str, Any]:
         """
-        Save resources as resources.json in the conversation directory
+        Rebuild the chat_history.json structure from a journal
+        
+        A journal that continues an ended conversation starts from the compacted
+        JSON next to it. A torn last line (crash mid-write) is skipped.
+        """
+        chat_data: Dict[str, Any] = {}
+        messages: List[Dict[str, Any]] = []
+        
+        with open(journal_path, 'r', encoding='utf-8') as f:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    print(f"Warning: Skipping unreadable line {line_number} in {journal_path}")
+                    continue
+                
+                kind = record.get("record")
+                if kind == "header":
+                    base_file = journal_path.parent / record["continues"] if record.get("continues") else None
+                    if base_file and base_file.exists():
+                        chat_data = read_document(base_file)
+                        messages = chat_data.get("messages", [])
+                    else:
+                        chat_data = {
+                            "conversation_id": record.get("conversation_id", journal_path.parent.name),
+                            "timestamp": record.get("timestamp", ""),
+                            "message_count": 0,
+                            "metadata": record.get("metadata", {}),
+                            "messages": []
+                        }
+                        messages = chat_data["messages"]
+                elif kind == "message":
+                    messages.append(record["message"])
+                    chat_data["last_updated"] = record.get("timestamp")
+                elif kind == "footer":
+                    chat_data.setdefault("metadata", {}).update(record.get("metadata") or {})
+                    chat_data["ended_at"] = record.get("ended_at")
+                    chat_data["end_reason"] = record.get("end_reason")
+        
+        chat_data.setdefault("conversation_id", journal_path.parent.name)
+        chat_data.setdefault("timestamp", "")
+        chat_data.setdefault("metadata", {})
+        chat_data["messages"] = messages
+        chat_data["message_count"] = len(messages)
+        return chat_data
+    
+    def _compact_journal(self, journal_path: Path, fsync: bool = False) -> Dict[str, Any]:
+        """
+        Fold a journal into chat_history.json (written atomically) and remove it
+        
+        Returns:
+            The compacted chat data
+        """
+        chat_data = self._read_journal(journal_path)
+        self._write_document(journal_path.parent / CHAT_FILENAME, chat_data, fsync=fsync)
+        journal_path.unlink()
+        return chat_data
+    
+    def _save_resources(self, conversation_id: str, resources: Dict[str, Any], fsync: bool = False,
+                        keys: Optional[Dict[str, Any]] = None) -> bool:
+        """
+        Save resources in the conversation directory, writing only what changed
+        
+        Each ProductCollection goes to its own file under resources/ and is
+        rewritten only when its snapshot_key() differs from the last save. A
+        combined collection whose products are exactly those of its
+        source_collections is stored as references to them. resources.json is a
+        small manifest pointing at the files.
         
         Args:
             conversation_id: Unique identifier for the conversation
             resources: Dictionary of resources to save
+            fsync: Force the files to disk before returning
+            keys: snapshot_key() to record per resource, when ``resources`` are copies
             
         Returns:
             True if successful, False otherwise
@@ -292,37 +522,138 @@ class ChatHistoryStorage:
                 print(f"Conversation directory not found: {conversation_dir}")
                 return False
             
-            # Prepare resources data with full product information
-            resources_data = {}
+            resources_dir = conversation_dir / RESOURCES_DIRNAME
+            resources_dir.mkdir(exist_ok=True)
+            
+            previous = self._resource_snapshots.get(conversation_id, {})
+            snapshots: Dict[str, Any] = {}
+            entries: Dict[str, Any] = {}
+            written = 0
+            
             for resource_name, resource in resources.items():
-                if hasattr(resource, 'get_products'):
+                if not _is_collection(resource):
+                    # Fallback for non-ProductCollection resources
+                    entries[resource_name] = {"value": str(resource)}
+                    continue
+                
+                sources = self._combined_sources(resource, resources)
+                if sources:
+                    entries[resource_name] = {
+                        "sources": sources,
+                        "total_products": _product_count(resource),
+                        "collection": {
+                            "source_name": resource.source_name,
+                            "site_name": resource.site_name,
+                            "source_url": resource.source_url,
+                            "extraction_method": resource.extraction_method
+                        }
+                    }
+                    continue
+                
+                filename = f"{RESOURCES_DIRNAME}/{self._resource_filename(resource_name)}"
+                if keys and resource_name in keys:
+                    key = keys[resource_name]
+                else:
+                    key = resource.snapshot_key() if hasattr(resource, 'snapshot_key') else None
+                entries[resource_name] = {
+                    "file": filename,
+                    "total_products": _product_count(resource),
+                    "version": getattr(resource, 'version', None)
+                }
+                if isinstance(resource, SavedCollection):
+                    if previous.get(resource_name) != key or not (conversation_dir / filename).exists():
+                        print(f"Warning: {resource_name} was expected to be saved already; its file is not rewritten")
+                elif key is None or previous.get(resource_name) != key or not (conversation_dir / filename).exists():
                     # Get all products with full details (limit=-1, summary=False)
                     resource_data = resource.get_products(limit=-1, summary=False)
-                    resources_data[resource_name] = resource_data
-                else:
-                    # Fallback for non-ProductCollection resources
-                    resources_data[resource_name] = str(resource)
-            
-            # Add metadata
-            full_resources_data = {
+                    self._write_document(conversation_dir / filename, resource_data, fsync=fsync)
+                    written += 1
+                snapshots[resource_name] = key
+            
+            # Drop files of resources that no longer exist
+            for resource_name in previous.keys() - snapshots.keys():
+                stale_file = resources_dir / self._resource_filename(resource_name)
+                if stale_file.exists():
+                    stale_file.unlink()
+            
+            # Manifest
+            manifest = {
                 "conversation_id": conversation_id,
                 "saved_at": datetime.now().isoformat(),
-                "total_resources": len(resources_data),
-                "resources": resources_data
+                "total_resources": len(entries),
+                "resources": entries
             }
+            resources_filepath = conversation_dir / RESOURCES_MANIFEST
+            self._write_document(resources_filepath, manifest, fsync=fsync)
+            self._resource_snapshots[conversation_id] = snapshots
             
-            # Save to resources.json
-            resources_filepath = conversation_dir / "resources.json"
-            with open(resources_filepath, 'w', encoding='utf-8') as f:
-                json.dump(full_resources_data, f, indent=2, ensure_ascii=False, cls=PrettyJSONEncoder)
-            
-            print(f"Saved resources to: {resources_filepath}")
+            print(f"Saved resources to: {resources_filepath} ({written} of {len(entries)} changed)")
             return True
             
         except Exception as e:
             print(f"Error saving resources for conversation {conversation_id}: {e}")
             return False
     
+    def _resource_filename(self, resource_name: str) -> str:
+        """File name for a resource (resource names come from domains and tool arguments)"""
+        return re.sub(r'[^A-Za-z0-9._-]', '_', resource_name) + ".json"
+    
+    def _combined_sources(self, resource: Any, resources: Dict[str, Any]) -> Optional[List[str]]:
+        """Source resource names if the collection is exactly their combination, else None"""
+        names = list(dict.fromkeys(getattr(resource, 'source_collections', None) or []))
+        if not names or not all(_is_collection(resources.get(name)) for name in names):
+            return None
+        if sum(_product_count(resources[name]) for name in names) != _product_count(resource):
+            return None
+        return names
+    
+    def saved_resource_key(self, conversation_id: str, resource_name: str) -> Any:
+        """snapshot_key() of a resource as last saved, or None"""
+        return self._resource_snapshots.get(conversation_id, {}).get(resource_name)
+    
+    def load_resources(self, conversation_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Load saved resources as {resource_name: get_products(limit=-1) data}
+        
+        Resolves per-resource files and combined references; also reads the
+        older resources.json that held every collection inline.
+        
+        Returns:
+            Resources data, or None if nothing was saved
+        """
+        conversation_dir = self.base_path / conversation_id
+        manifest_file = conversation_dir / RESOURCES_MANIFEST
+        if not manifest_file.exists():
+            return None
+        
+        entries = read_document(manifest_file).get("resources", {})
+        
+        loaded: Dict[str, Any] = {}
+        for resource_name, entry in entries.items():
+            if not isinstance(entry, dict):
+                loaded[resource_name] = entry
+            elif "file" in entry:
+                loaded[resource_name] = read_document(conversation_dir / entry["file"])
+            elif "value" in entry:
+                loaded[resource_name] = entry["value"]
+            elif "sources" not in entry:
+                # Old format: full collection inline
+                loaded[resource_name] = entry
+        
+        for resource_name, entry in entries.items():
+            if isinstance(entry, dict) and "sources" in entry:
+                products = [p for name in entry["sources"] for p in loaded.get(name, {}).get("products", [])]
+                loaded[resource_name] = {
+                    **entry.get("collection", {}),
+                    "source_collections": entry["sources"],
+                    "total_products": len(products),
+                    "filtered_products": len(products),
+                    "showing_products": len(products),
+                    "max_price_filter": None,
+                    "products": products
+                }
+        return loaded
+    
     def load_chat_history(self, conversation_id: str, timestamp: Optional[str] = None) -> Optional[Dict[str, Any]]:
         """
         Load chat history from a JSON file
@@ -335,12 +666,15 @@ class ChatHistoryStorage:
             Dictionary containing the chat history data, or None if not found
         """
         try:
-            # Try new folder structure first
+            # Try new folder structure first - a live journal, then the compacted file
             conversation_dir = self.base_path / conversation_id
-            chat_file = conversation_dir / "chat_history.json"
+            journal_file = conversation_dir / JOURNAL_FILENAME
+            if journal_file.exists():
+                return self._read_journal(journal_file)
+            
+            chat_file = conversation_dir / CHAT_FILENAME
             if chat_file.exists():
-                with open(chat_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
+                return read_document(chat_file)
             
             # Fallback to old structure for backward compatibility
             if timestamp:
@@ -348,8 +682,7 @@ class ChatHistoryStorage:
                 filename = f"{conversation_id}_{timestamp}.json"
                 filepath = self.base_path / filename
                 if filepath.exists():
-                    with open(filepath, 'r', encoding='utf-8') as f:
-                        return json.load(f)
+                    return read_document(filepath)
             else:
                 # Find the most recent file for this conversation in old structure
                 pattern = f"{conversation_id}_*.json"
@@ -357,8 +690,7 @@ class ChatHistoryStorage:
                 if matching_files:
                     # Sort by filename (which includes timestamp) to get the most recent
                     latest_file = sorted(matching_files)[-1]
-                    with open(latest_file, 'r', encoding='utf-8') as f:
-                        return json.load(f)
+                    return read_document(latest_file)
             
             return None
             
@@ -366,9 +698,91 @@ class ChatHistoryStorage:
             print(f"Error loading chat history: {e}")
             return None
     
-    def list_conversations(self) -> List[Dict[str, Any]]:
+    def _history_file(self, conversation_id: str, timestamp: Optional[str] = None) -> Optional[Path]:
+        """The file holding a conversation's messages: live journal, compacted JSON or legacy file"""
+        conversation_dir = self.base_path / conversation_id
+        for candidate in (conversation_dir / JOURNAL_FILENAME, conversation_dir / CHAT_FILENAME):
+            if candidate.exists():
+                return candidate
+        if timestamp:
+            filepath = self.base_path / f"{conversation_id}_{timestamp}.json"
+            return filepath if filepath.exists() else None
+        matching_files = sorted(self.base_path.glob(f"{conversation_id}_*.json"))
+        return matching_files[-1] if matching_files else None
+    
+    def _iter_messages(self, filepath: Path) -> Iterator[Tuple[int, str, Dict[str, Any]]]:
+        """
+        Yield (seq, role, message) from a history file
+        
+        A journal is read a line at a time; only the messages of a compacted
+        conversation it continues (and JSON files) are loaded whole, so a page
+        of a compacted conversation costs a full decode of chat_history.json.
         """
-        List all available conversations (supports both old and new folder structures)
+        if filepath.name != JOURNAL_FILENAME:
+            messages = read_document(filepath).get("messages", [])
+            for seq, message in enumerate(messages):
+                yield seq, message.get("role"), message
+            return
+        
+        seq = 0
+        with open(filepath, 'r', encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                kind = record.get("record")
+                if kind == "header" and record.get("continues"):
+                    base_file = filepath.parent / record["continues"]
+                    if base_file.exists():
+                        for item in self._iter_messages(base_file):
+                            yield item
+                            seq = item[0] + 1
+                elif kind == "message":
+                    message = record["message"]
+                    yield seq, message.get("role"), message
+                    seq += 1
+    
+    def read_messages_page(
+        self,
+        conversation_id: str,
+        limit: int = DEFAULT_PAGE_LIMIT,
+        before: Optional[int] = None,
+        after: Optional[int] = None,
+        roles: Optional[Set[str]] = None,
+        timestamp: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        One page of a saved conversation's messages (see app.utils.history_pages)
+        
+        Cheap for a live journal; for a compacted conversation the whole
+        chat_history.json is decoded to serve the page.
+        
+        Args:
+            conversation_id: Unique identifier for the conversation
+            limit: Maximum number of messages on the page
+            before: Only messages with seq < before
+            after: Only messages with seq > after
+            roles: Only messages with one of these roles (default: all)
+            timestamp: Optional specific timestamp of a legacy file
+            
+        Returns:
+            The page, with each message carrying its "seq", or None if not found
+        """
+        filepath = self._history_file(conversation_id, timestamp)
+        if filepath is None:
+            return None
+        page = paginate_messages(self._iter_messages(filepath), limit, before, after, roles)
+        page["messages"] = [dict(message, seq=seq) for seq, message in page.pop("items")]
+        return page
+    
+    def _scan_conversations(self) -> List[Dict[str, Any]]:
+        """
+        Read every conversation on disk (supports both old and new folder structures)
+        
+        Opens every file, so it's only used to (re)build the catalog.
         
         Returns:
             List of dictionaries with conversation metadata
@@ -379,22 +793,28 @@ class ChatHistoryStorage:
             # Scan new folder structure first
             for conversation_dir in self.base_path.iterdir():
                 if conversation_dir.is_dir():
-                    chat_file = conversation_dir / "chat_history.json"
+                    journal_file = conversation_dir / JOURNAL_FILENAME
+                    chat_file = journal_file if journal_file.exists() else conversation_dir / CHAT_FILENAME
                     if chat_file.exists():
                         try:
-                            with open(chat_file, 'r', encoding='utf-8') as f:
-                                data = json.load(f)
+                            if chat_file == journal_file:
+                                data = self._read_journal(journal_file)
+                            else:
+                                data = read_document(chat_file)
                             
                             conv_id = data.get('conversation_id', conversation_dir.name)
                             timestamp = data.get('timestamp', '')
                             
                             conversations[conv_id] = {
                                 'conversation_id': conv_id,
-                                'timestamp': timestamp,
+                                'timestamp': timestamp or self._mtime(chat_file),
                                 'message_count': data.get('message_count', 0),
                                 'filepath': str(chat_file),
                                 'metadata': data.get('metadata', {}),
-                                'structure': 'new'  # Mark as new folder structure
+                                'structure': 'new',  # Mark as new folder structure
+                                'last_updated': data.get('last_updated'),
+                                'ended_at': data.get('ended_at'),
+                                'end_reason': data.get('end_reason')
                             }
                             
                         except Exception as e:
@@ -404,8 +824,7 @@ class ChatHistoryStorage:
             # Scan old file structure for backward compatibility
             for filepath in self.base_path.glob("*.json"):
                 try:
-                    with open(filepath, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
+                    data = read_document(filepath)
                     
                     conv_id = data.get('conversation_id', 'unknown')
                     timestamp = data.get('timestamp', '')
@@ -414,7 +833,7 @@ class ChatHistoryStorage:
                     if conv_id not in conversations:
                         conversations[conv_id] = {
                             'conversation_id': conv_id,
-                            'timestamp': timestamp,
+                            'timestamp': timestamp or self._mtime(filepath),
                             'message_count': data.get('message_count', 0),
                             'filepath': str(filepath),
                             'metadata': data.get('metadata', {}),
@@ -441,34 +860,110 @@ class ChatHistoryStorage:
             print(f"Error listing conversations: {e}")
             return []
     
+    def _mtime(self, filepath: Path) -> str:
+        """File modification time as an ISO timestamp"""
+        return datetime.fromtimestamp(filepath.stat().st_mtime).isoformat()
+    
+    def _update_catalog(self, update, *args, **kwargs) -> None:
+        """Apply a catalog update; the files stay the source of truth if it fails"""
+        try:
+            update(*args, **kwargs)
+        except Exception as e:
+            print(f"Warning: Could not update conversation catalog: {e}")
+    
+    def _catalog_file(self, chat_file: Path) -> None:
+        """Catalog one conversation from its chat history file"""
+        data = read_document(chat_file)
+        self._update_catalog(
+            self.catalog.upsert, data.get('conversation_id', chat_file.parent.name), str(chat_file),
+            started_at=data.get('timestamp') or self._mtime(chat_file), metadata=data.get('metadata', {}),
+            message_count=data.get('message_count', 0), last_updated=data.get('last_updated'),
+            ended_at=data.get('ended_at'), end_reason=data.get('end_reason')
+        )
+    
+    def rebuild_catalog(self) -> int:
+        """
+        Re-create the conversation catalog by scanning the files once
+        
+        Returns:
+            Number of conversations indexed
+        """
+        return self._fill_catalog(self.catalog)
+    
+    def _fill_catalog(self, catalog: ConversationCatalog) -> int:
+        conversations = self._scan_conversations()
+        catalog.clear()
+        for entry in conversations:
+            catalog.upsert(
+                entry['conversation_id'], entry['filepath'], started_at=entry['timestamp'],
+                metadata=entry['metadata'], message_count=entry['message_count'],
+                last_updated=entry.get('last_updated'), ended_at=entry.get('ended_at'),
+                end_reason=entry.get('end_reason'), structure=entry['structure']
+            )
+        return len(conversations)
+    
+    def list_conversations(self, limit: Optional[int] = None, offset: int = 0) -> List[Dict[str, Any]]:
+        """
+        List conversations from the catalog, most recently started first
+        
+        Args:
+            limit: Maximum number of conversations to return (default: all)
+            offset: Number of conversations to skip
+            
+        Returns:
+            List of dictionaries with conversation metadata
+        """
+        try:
+            return self.catalog.list(limit=limit, offset=offset)
+        except Exception as e:
+            print(f"Error listing conversations: {e}")
+            return []
+    
+    def count_conversations(self) -> int:
+        """Number of conversations in the catalog"""
+        return self.catalog.count()
+    
     def cleanup_old_files(self, days_to_keep: int = 30) -> int:
         """
-        Clean up old chat history files
+        Delete conversations with no activity in the last ``days_to_keep`` days
+        
+        Candidates come from the catalog, so only expired conversations are
+        touched; activity is the latest of start, last message and end. Unlike
+        the old cleanup, which only removed top-level legacy *.json files by
+        mtime, an expired folder conversation is removed whole: its journal or
+        chat_history.json, resources and stored blobs. A legacy file is deleted
+        on its own, and a conversation with an open journal here is kept.
         
         Args:
-            days_to_keep: Number of days to keep files (default: 30)
+            days_to_keep: Number of days to keep conversations (default: 30)
             
         Returns:
-            Number of files deleted
+            Number of conversations deleted
         """
         try:
             from datetime import timedelta
             
-            cutoff_date = datetime.now() - timedelta(days=days_to_keep)
+            cutoff = (datetime.now() - timedelta(days=days_to_keep)).isoformat()
             deleted_count = 0
             
-            for filepath in self.base_path.glob("*.json"):
+            for entry in self.catalog.inactive_since(cutoff):
+                conversation_id = entry['conversation_id']
+                if conversation_id in self._active_conversations:
+                    continue
                 try:
-                    # Get file modification time
-                    file_mtime = datetime.fromtimestamp(filepath.stat().st_mtime)
+                    filepath = Path(entry['filepath'])
+                    if entry['structure'] == 'old':
+                        if filepath.exists():
+                            filepath.unlink()
+                    elif filepath.parent.exists() and filepath.parent != self.base_path:
+                        shutil.rmtree(filepath.parent)
+                    self.catalog.delete(conversation_id)
+                    self._resource_snapshots.pop(conversation_id, None)
+                    deleted_count += 1
+                    print(f"Deleted old conversation: {conversation_id}")
                     
-                    if file_mtime < cutoff_date:
-                        filepath.unlink()
-                        deleted_count += 1
-                        print(f"Deleted old chat history file: {filepath}")
-                        
                 except Exception as e:
-                    print(f"Error processing file {filepath}: {e}")
+                    print(f"Error deleting conversation {conversation_id}: {e}")
                     continue
             
             return deleted_count
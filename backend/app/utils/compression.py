@@ -0,0 +1,66 @@
+"""
+Compressed JSON responses for the history endpoints.
+
+Uses brotli when the package is installed and the client accepts it, gzip
+otherwise. Applied per endpoint rather than as middleware so the SSE chat
+stream is never buffered by a compressor.
+"""
+
+import gzip
+import json
+from typing import Any, Optional
+
+from fastapi import Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Bodies smaller than this are sent as is
+MINIMUM_COMPRESS_SIZE = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def _accepted_encodings(request: Request) -> set:
+    header = request.headers.get("accept-encoding", "")
+    return {part.split(";")[0].strip().lower() for part in header.split(",") if part.strip()}
+
+
+def choose_encoding(request: Request) -> Optional[str]:
+    """The best Content-Encoding the client accepts, or None"""
+    accepted = _accepted_encodings(request)
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+def compressed_json_response(request: Request, content: Any, status_code: int = 200) -> Response:
+    """
+    Serialize ``content`` to JSON, compressed if the client accepts it.
+
+    Args:
+        request: Incoming request (for Accept-Encoding)
+        content: JSON-serializable payload
+        status_code: HTTP status code
+
+    Returns:
+        Response with Content-Encoding set when compressed
+    """
+    body = json.dumps(jsonable_encoder(content), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    headers = {"Vary": "Accept-Encoding"}
+
+    encoding = choose_encoding(request) if len(body) >= MINIMUM_COMPRESS_SIZE else None
+    if encoding == "br":
+        body = brotli.compress(body, quality=BROTLI_QUALITY)
+    elif encoding == "gzip":
+        body = gzip.compress(body, compresslevel=GZIP_LEVEL)
+    if encoding:
+        headers["Content-Encoding"] = encoding
+
+    return Response(content=body, status_code=status_code, media_type="application/json", headers=headers)
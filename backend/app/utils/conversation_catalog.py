@@ -0,0 +1,160 @@
+"""
+SQLite catalog of saved conversations.
+
+ChatHistoryStorage keeps one row per conversation up to date as it starts,
+appends to and ends conversations, so listing and retention cleanup are
+index queries instead of opening every chat_history.json.
+
+Rebuild from the files on disk (e.g. after upgrading or restoring a backup):
+
+    python -m app.utils.conversation_catalog [base_path]
+"""
+
+import json
+import sqlite3
+import sys
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+CATALOG_FILENAME = "catalog.sqlite3"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS conversations (
+    conversation_id TEXT PRIMARY KEY,
+    started_at      TEXT NOT NULL DEFAULT '',
+    last_updated    TEXT,
+    ended_at        TEXT,
+    end_reason      TEXT,
+    message_count   INTEGER NOT NULL DEFAULT 0,
+    model           TEXT,
+    filepath        TEXT NOT NULL,
+    structure       TEXT NOT NULL DEFAULT 'new',
+    metadata        TEXT NOT NULL DEFAULT '{}'
+);
+CREATE INDEX IF NOT EXISTS conversations_started_at ON conversations (started_at);
+CREATE INDEX IF NOT EXISTS conversations_last_activity ON conversations (COALESCE(ended_at, last_updated, started_at));
+"""
+
+
+class ConversationCatalog:
+    """
+    One row per conversation: id, timestamps, message count, model and file location.
+
+    A single connection shared across threads behind a lock; the database
+    runs in WAL mode so reads don't wait on the persistence writer.
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self.created = not self.db_path.exists()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(SCHEMA)
+
+    def upsert(self, conversation_id: str, filepath: str, started_at: str = "",
+               metadata: Optional[Dict[str, Any]] = None, message_count: int = 0,
+               last_updated: Optional[str] = None, ended_at: Optional[str] = None,
+               end_reason: Optional[str] = None, structure: str = "new") -> None:
+        """Insert or replace a conversation's row"""
+        metadata = metadata or {}
+        with self._lock, self._conn:
+            self._conn.execute(
+                """INSERT OR REPLACE INTO conversations
+                   (conversation_id, started_at, last_updated, ended_at, end_reason,
+                    message_count, model, filepath, structure, metadata)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                (conversation_id, started_at, last_updated, ended_at, end_reason, message_count,
+                 metadata.get("model"), filepath, structure, json.dumps(metadata, default=str))
+            )
+
+    def record_messages(self, conversation_id: str, count: int, last_updated: str) -> None:
+        """Add appended messages to a conversation's count"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE conversations SET message_count = message_count + ?, last_updated = ? WHERE conversation_id = ?",
+                (count, last_updated, conversation_id)
+            )
+
+    def record_end(self, conversation_id: str, ended_at: str, end_reason: str,
+                   metadata: Dict[str, Any], message_count: Optional[int] = None,
+                   filepath: Optional[str] = None) -> None:
+        """Store a conversation's end and final metadata (and its compacted file, if it was compacted)"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                """UPDATE conversations
+                   SET ended_at = ?, end_reason = ?, metadata = ?, model = COALESCE(?, model),
+                       message_count = COALESCE(?, message_count), filepath = COALESCE(?, filepath)
+                   WHERE conversation_id = ?""",
+                (ended_at, end_reason, json.dumps(metadata, default=str), metadata.get("model"),
+                 message_count, filepath, conversation_id)
+            )
+
+    def get(self, conversation_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM conversations WHERE conversation_id = ?", (conversation_id,)
+            ).fetchone()
+        return self._entry(row) if row else None
+
+    def list(self, limit: Optional[int] = None, offset: int = 0) -> List[Dict[str, Any]]:
+        """Conversations, most recently started first"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM conversations ORDER BY started_at DESC, conversation_id LIMIT ? OFFSET ?",
+                (-1 if limit is None else limit, offset)
+            ).fetchall()
+        return [self._entry(row) for row in rows]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM conversations").fetchone()[0]
+
+    def inactive_since(self, cutoff: str) -> List[Dict[str, Any]]:
+        """Conversations with no activity (start, message or end) since the ISO timestamp ``cutoff``"""
+        with self._lock:
+            rows = self._conn.execute(
+                """SELECT * FROM conversations
+                   WHERE MAX(COALESCE(ended_at, ''), COALESCE(last_updated, ''), started_at) < ?""",
+                (cutoff,)
+            ).fetchall()
+        return [self._entry(row) for row in rows]
+
+    def delete(self, conversation_id: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM conversations WHERE conversation_id = ?", (conversation_id,))
+
+    def clear(self) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM conversations")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _entry(self, row: sqlite3.Row) -> Dict[str, Any]:
+        """Row in the shape list_conversations has always returned"""
+        return {
+            "conversation_id": row["conversation_id"],
+            "timestamp": row["started_at"],
+            "message_count": row["message_count"],
+            "filepath": row["filepath"],
+            "metadata": json.loads(row["metadata"]),
+            "structure": row["structure"],
+            "model": row["model"],
+            "last_updated": row["last_updated"],
+            "ended_at": row["ended_at"],
+            "end_reason": row["end_reason"],
+        }
+
+
+if __name__ == "__main__":
+    from app.utils.chat_storage import ChatHistoryStorage
+
+    storage = ChatHistoryStorage(sys.argv[1]) if len(sys.argv) > 1 else ChatHistoryStorage()
+    indexed = storage.rebuild_catalog()
+    print(f"Indexed {indexed} conversations into {storage.catalog.db_path}")
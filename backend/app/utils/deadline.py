@@ -0,0 +1,50 @@
+"""Deadline helper for bounding the total wall-clock time of a multi-stage operation"""
+
+import time
+from typing import Optional
+
+
+class Deadline:
+    """
+    A fixed point in time shared by every stage of one operation.
+
+    Per-request timeouts only bound a single HTTP call; a Deadline bounds the
+    whole chain (listing fetch -> retries -> product fetches). Each stage asks
+    for the remaining budget and returns whatever it has once it runs out.
+
+    Example:
+        deadline = Deadline(60)
+        html = await fetch(url, timeout=deadline.clamp(45))
+        if deadline.expired():
+            return partial_results
+    """
+
+    def __init__(self, budget_seconds: float):
+        self.budget_seconds = budget_seconds
+        self.started_at = time.monotonic()
+        self.expires_at = self.started_at + budget_seconds
+
+    def remaining(self) -> float:
+        """Seconds left before the deadline (never negative)"""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def elapsed(self) -> float:
+        """Seconds since the deadline was created"""
+        return time.monotonic() - self.started_at
+
+    def expired(self) -> bool:
+        """Check if the budget has been used up"""
+        return time.monotonic() >= self.expires_at
+
+    def cancel(self) -> None:
+        """Expire the deadline now so every stage wraps up at its next check"""
+        self.expires_at = min(self.expires_at, time.monotonic())
+
+    def clamp(self, timeout: Optional[float]) -> float:
+        """Shrink a per-call timeout so it never runs past the deadline"""
+        if timeout is None:
+            return self.remaining()
+        return min(timeout, self.remaining())
+
+    def __repr__(self) -> str:
+        return f"Deadline(budget={self.budget_seconds}s, remaining={self.remaining():.1f}s)"
@@ -0,0 +1,195 @@
+"""
+Event bus that merges an agent run with its callback events for SSE.
+
+The agent's own events come from its async generator; tool progress and
+streamed content (product grids) arrive through ``stream_callback``, from the
+event loop or from tool worker threads. Both go into one asyncio.Queue, and
+the stream reads from it, so every event is sent as soon as it is produced
+rather than when the agent yields its next event. When nothing has been
+produced for HEARTBEAT_SECONDS the stream gets a HEARTBEAT, which keeps
+proxies from closing a connection that is waiting on a long tool call.
+
+The queue is bounded (MAX_BUFFERED_EVENTS). When the client falls behind:
+
+- the agent generator waits for room
+- tool threads wait for room, up to PUBLISH_TIMEOUT_SECONDS
+- progress updates are dropped; the next update supersedes them
+- other events from the event loop wait their turn behind the queue
+"""
+
+import asyncio
+import os
+import threading
+from typing import Any, AsyncIterator, Callable, Dict, Optional, Set
+
+from loguru import logger
+
+
+MAX_BUFFERED_EVENTS = int(os.getenv("SSE_MAX_BUFFERED_EVENTS", "256"))
+HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+# How long a tool thread waits for room before its event is dropped
+PUBLISH_TIMEOUT_SECONDS = 5.0
+
+# Tool statuses that are safe to drop under pressure
+DROPPABLE_STATUSES = {"progress"}
+
+# Yielded by EventBus.merge when the stream has been idle for heartbeat_seconds
+HEARTBEAT = object()
+_END = object()
+
+_totals = {"streams": 0, "published": 0, "dropped": 0, "heartbeats": 0, "max_depth": 0}
+_totals_lock = threading.Lock()
+
+
+class _SourceFailed:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+def _droppable(event: Any) -> bool:
+    status = event.get("status") if isinstance(event, dict) else getattr(event, "status", None)
+    return status in DROPPABLE_STATUSES
+
+
+def _count(name: str, amount: int = 1) -> None:
+    with _totals_lock:
+        _totals[name] += amount
+
+
+def event_bus_metrics() -> Dict[str, int]:
+    """Totals over every stream served by this worker"""
+    with _totals_lock:
+        return dict(_totals)
+
+
+class EventBus:
+    """
+    One stream's events, in the order they were produced.
+
+    Create it on the event loop that serves the stream, pass ``publish`` as
+    the agent's stream_callback, and iterate ``merge(agent.run(...))``.
+    """
+
+    def __init__(self,
+                 max_buffered: int = MAX_BUFFERED_EVENTS,
+                 heartbeat_seconds: float = HEARTBEAT_SECONDS,
+                 publish_timeout: float = PUBLISH_TIMEOUT_SECONDS):
+        self.heartbeat_seconds = heartbeat_seconds
+        self.publish_timeout = publish_timeout
+        self._loop = asyncio.get_running_loop()
+        self._queue: "asyncio.Queue[Any]" = asyncio.Queue(maxsize=max_buffered)
+        # Loop-thread events waiting for room; later events queue behind them
+        self._waiting: Set[asyncio.Task] = set()
+        self._closed = False
+        self.published = 0
+        self.dropped = 0
+        self.max_depth = 0
+
+    def publish(self, event: Any) -> None:
+        """Add a callback event; safe to call from any thread"""
+        if self._closed:
+            return
+        try:
+            on_loop = asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            on_loop = False
+
+        if on_loop:
+            self._offer(event)
+            return
+
+        # A tool worker thread: wait for room, so a chatty tool slows to the client's pace
+        try:
+            future = asyncio.run_coroutine_threadsafe(self._put(event), self._loop)
+        except RuntimeError:
+            return  # the stream's loop has shut down
+        try:
+            future.result(self.publish_timeout)
+        except Exception:
+            future.cancel()
+            self._drop()
+
+    async def merge(self,
+                    source: AsyncIterator[Any],
+                    until: Optional[Callable[[Any], bool]] = None) -> AsyncIterator[Any]:
+        """
+        Yield events from ``source`` and from ``publish`` as they are produced
+
+        Ends when ``source`` is exhausted, or after the first event for which
+        ``until`` is true, once everything published before it has been
+        yielded. Yields HEARTBEAT while idle; re-raises errors from ``source``.
+        """
+        _count("streams")
+
+        async def pump():
+            try:
+                async for event in source:
+                    await self._put(event, droppable=False)
+                    if until and until(event):
+                        break
+            except Exception as e:
+                await self._queue.put(_SourceFailed(e))
+                return
+            await self._queue.put(_END)
+
+        pumping = asyncio.create_task(pump())
+        getter: Optional[asyncio.Task] = None
+        try:
+            while True:
+                if getter is None:
+                    getter = asyncio.create_task(self._queue.get())
+                done, _ = await asyncio.wait({getter}, timeout=self.heartbeat_seconds)
+                if not done:
+                    _count("heartbeats")
+                    yield HEARTBEAT
+                    continue
+                event, getter = getter.result(), None
+                if event is _END:
+                    return
+                if isinstance(event, _SourceFailed):
+                    raise event.error
+                yield event
+        finally:
+            self.close()
+            for task in (getter, pumping, *self._waiting):
+                if task is not None:
+                    task.cancel()
+
+    def close(self) -> None:
+        """Stop accepting events (the stream has ended or the client went away)"""
+        if self._closed:
+            return
+        self._closed = True
+        if self.dropped:
+            logger.info(f"SSE stream dropped {self.dropped} events (client too slow)")
+
+    def _offer(self, event: Any) -> None:
+        if not self._waiting and not self._queue.full():
+            self._queue.put_nowait(event)
+            self._record()
+        elif self._queue.full() and _droppable(event):
+            self._drop()
+        else:
+            task = self._loop.create_task(self._put(event, droppable=False))
+            self._waiting.add(task)
+            task.add_done_callback(self._waiting.discard)
+
+    async def _put(self, event: Any, droppable: bool = True) -> None:
+        if droppable and self._queue.full() and _droppable(event):
+            self._drop()
+            return
+        await self._queue.put(event)
+        self._record()
+
+    def _record(self) -> None:
+        self.published += 1
+        depth = self._queue.qsize()
+        if depth > self.max_depth:
+            self.max_depth = depth
+            with _totals_lock:
+                _totals["max_depth"] = max(_totals["max_depth"], depth)
+        _count("published")
+
+    def _drop(self) -> None:
+        self.dropped += 1
+        _count("dropped")
@@ -0,0 +1,87 @@
+"""
+Cursor pagination over a conversation's messages.
+
+Messages are addressed by ``seq``, their position in the conversation, which
+never changes as messages are appended. A page is read in one pass over the
+messages while holding at most ``limit + 1`` of them, so a page can come
+straight from a journal on disk without loading the rest of it.
+
+That holds for journals only. A compacted chat_history.json (an evicted
+conversation, or one whose journal outgrew COMPACT_JOURNAL_BYTES) is one
+document, so reading any page of it decodes the whole file: O(N) time and
+memory in the conversation's length.
+"""
+
+from collections import deque
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+DEFAULT_PAGE_LIMIT = 50
+MAX_PAGE_LIMIT = 500
+
+
+def paginate_messages(
+    messages: Iterable[Tuple[int, str, Any]],
+    limit: int = DEFAULT_PAGE_LIMIT,
+    before: Optional[int] = None,
+    after: Optional[int] = None,
+    roles: Optional[Set[str]] = None
+) -> Dict[str, Any]:
+    """
+    Select one page of messages.
+
+    Without cursors the page is the latest ``limit`` messages. With ``before``
+    it is the latest ``limit`` messages older than that seq; with ``after``
+    the earliest ``limit`` newer than it (both together bound a range).
+
+    Args:
+        messages: (seq, role, message) in seq order
+        limit: Maximum number of messages on the page
+        before: Only messages with seq < before
+        after: Only messages with seq > after
+        roles: Only messages with one of these roles (default: all)
+
+    Returns:
+        Dict with the (seq, message) pairs under "items", plus has_more_before,
+        has_more_after and the before/after cursors for the neighbouring pages
+    """
+    has_more_before = False
+    has_more_after = False
+
+    if after is not None:
+        # Earliest page after the cursor: stop as soon as it is full
+        items = []
+        for seq, role, message in messages:
+            if roles and role not in roles:
+                continue
+            if seq <= after:
+                has_more_before = True
+                continue
+            if before is not None and seq >= before:
+                has_more_after = True
+                break
+            if len(items) == limit:
+                has_more_after = True
+                break
+            items.append((seq, message))
+    else:
+        # Latest page before the cursor: keep a sliding window of limit + 1
+        window = deque(maxlen=limit + 1)
+        for seq, role, message in messages:
+            if roles and role not in roles:
+                continue
+            if before is not None and seq >= before:
+                has_more_after = True
+                break
+            window.append((seq, message))
+        if len(window) > limit:
+            window.popleft()
+            has_more_before = True
+        items = list(window)
+
+    return {
+        "items": items,
+        "has_more_before": has_more_before,
+        "has_more_after": has_more_after,
+        "before": items[0][0] if items else before,
+        "after": items[-1][0] if items else after,
+    }
@@ -0,0 +1,288 @@
+"""
+Background writer for chat history persistence.
+
+Agent and route code enqueue chat_storage operations here and return right
+away; one writer thread applies them in order. Operations queued while the
+writer is busy are handled as one batch: consecutive appends to the same
+conversation become a single journal write, and only the last resources
+snapshot of a conversation in the batch is written.
+
+The queue is unbounded, so enqueueing never blocks the event loop; a disk
+that falls behind shows up as queue depth in ``metrics()``.
+"""
+
+import copy
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from app.models.chat import InputMessage
+from app.utils.chat_storage import ChatHistoryStorage, SavedCollection, chat_storage
+
+
+# When to force writes to disk:
+#   "never"  - leave it to the OS
+#   "on_end" - fsync the journal footer (or compacted history) and resources when a conversation ends
+#   "always" - also fsync every batch of appended messages
+FSYNC_POLICIES = ("never", "on_end", "always")
+DEFAULT_FSYNC_POLICY = os.getenv("CHAT_PERSISTENCE_FSYNC", "on_end")
+
+# How long the writer waits for more operations before writing a batch
+DEFAULT_LINGER_SECONDS = 0.02
+
+# Queue depth past which enqueues are counted and logged (the queue itself is unbounded)
+DEFAULT_QUEUE_WARNING_DEPTH = 10_000
+
+
+class PersistenceWriter:
+    """
+    Queue of chat_storage writes applied by a dedicated thread.
+
+    Mirrors the write side of ChatHistoryStorage (start_conversation,
+    append_message, end_conversation). Messages are serialized and resources
+    copied when they are enqueued, so changes made by the next turn don't leak
+    into what the writer thread saves. Enqueueing never blocks: past
+    ``queue_warning_depth`` queued operations, enqueues are counted in
+    ``metrics()`` and logged.
+    """
+
+    def __init__(self,
+                 storage: ChatHistoryStorage,
+                 fsync: str = DEFAULT_FSYNC_POLICY,
+                 linger_seconds: float = DEFAULT_LINGER_SECONDS,
+                 queue_warning_depth: int = DEFAULT_QUEUE_WARNING_DEPTH):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy '{fsync}', expected one of {FSYNC_POLICIES}")
+        self.storage = storage
+        self.fsync = fsync
+        self.linger_seconds = linger_seconds
+        self.queue_warning_depth = queue_warning_depth
+
+        self._ops: Deque[Tuple] = deque()
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self._in_flight = 0
+
+        self.enqueued = 0
+        self.written = 0
+        self.coalesced = 0
+        self.failed = 0
+        self.batches = 0
+        self.max_queued = 0
+        self.deep_enqueues = 0
+        self.last_batch_seconds = 0.0
+        self.max_batch_seconds = 0.0
+
+    # ------------------------------------------------------------------
+    # ChatHistoryStorage write API
+    # ------------------------------------------------------------------
+
+    def start_conversation(self, conversation_id: str, metadata: Optional[Dict[str, Any]] = None) -> None:
+        self._enqueue(("start", conversation_id, dict(metadata or {})))
+
+    def append_message(self, conversation_id: str, message: InputMessage) -> None:
+        if message is None:
+            return
+        self._enqueue(("append", conversation_id, [self.storage.message_record(message)]))
+
+    def end_conversation(self, conversation_id: str, metadata: Optional[Dict[str, Any]] = None,
+                         end_reason: str = "completed", resources: Optional[Dict[str, Any]] = None) -> None:
+        copies, keys = self._copy_resources(conversation_id, resources) if resources else (None, None)
+        self._enqueue(("end", conversation_id, copy.deepcopy(dict(metadata or {})), end_reason, copies, keys))
+
+    def call(self, fn: Callable[[], Any]) -> None:
+        """Run ``fn`` on the writer thread once everything queued before it is written"""
+        self._enqueue(("call", None, fn))
+
+    def _copy_resources(self, conversation_id: str, resources: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Snapshot resources on the caller's side
+
+        A collection is deep-copied only when its snapshot_key() differs from
+        the one storage last saved; an unchanged one is passed as a
+        SavedCollection, which holds no products. Nothing is kept here between
+        turns.
+
+        Returns:
+            (copies, snapshot_key() of each original) for storage
+        """
+        copies: Dict[str, Any] = {}
+        keys: Dict[str, Any] = {}
+        for name, resource in resources.items():
+            key = resource.snapshot_key() if hasattr(resource, 'snapshot_key') else None
+            if key is not None and self.storage.saved_resource_key(conversation_id, name) == key:
+                copies[name] = SavedCollection(resource)
+            elif hasattr(resource, 'model_copy'):
+                copies[name] = resource.model_copy(deep=True)
+            else:
+                copies[name] = copy.deepcopy(resource)
+            if key is not None:
+                keys[name] = key
+        return copies, keys
+
+    # ------------------------------------------------------------------
+    # Queue
+    # ------------------------------------------------------------------
+
+    def _enqueue(self, op: Tuple) -> None:
+        with self._cond:
+            if self._closed:
+                # Writer is gone (shutdown); don't lose the write
+                self._apply([op])
+                return
+            self._ops.append(op)
+            self.enqueued += 1
+            depth = len(self._ops)
+            self.max_queued = max(self.max_queued, depth)
+            if depth > self.queue_warning_depth:
+                self.deep_enqueues += 1
+                if self.deep_enqueues == 1 or self.deep_enqueues % 1000 == 0:
+                    logger.warning(f"Chat persistence queue is {depth} deep (warning at {self.queue_warning_depth}); disk is falling behind")
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="chat-persistence-writer", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._ops and not self._closed:
+                    self._cond.wait()
+                if not self._ops and self._closed:
+                    return
+
+            # Let a burst of operations collect into one batch
+            if self.linger_seconds and not self._closed:
+                time.sleep(self.linger_seconds)
+
+            with self._cond:
+                batch = list(self._ops)
+                self._ops.clear()
+                self._in_flight = len(batch)
+
+            start = time.perf_counter()
+            try:
+                self._apply(batch)
+            except Exception as e:
+                logger.error(f"Chat persistence batch failed: {e}")
+                self.failed += len(batch)
+            elapsed = time.perf_counter() - start
+
+            with self._cond:
+                self._in_flight = 0
+                self.batches += 1
+                self.last_batch_seconds = elapsed
+                self.max_batch_seconds = max(self.max_batch_seconds, elapsed)
+                self._cond.notify_all()
+
+    def _coalesce(self, batch: List[Tuple]) -> List[Tuple]:
+        """Merge consecutive appends per conversation; keep only the last resources snapshot"""
+        plan: List[Tuple] = []
+        open_appends: Dict[str, int] = {}
+        for op in batch:
+            kind, conversation_id = op[0], op[1]
+            if kind == "append" and conversation_id in open_appends:
+                plan[open_appends[conversation_id]][2].extend(op[2])
+                self.coalesced += 1
+                continue
+            if kind == "append":
+                op = ("append", conversation_id, list(op[2]))
+                open_appends[conversation_id] = len(plan)
+            else:
+                open_appends.pop(conversation_id, None)
+            plan.append(op)
+
+        seen_resources = set()
+        for i in range(len(plan) - 1, -1, -1):
+            op = plan[i]
+            if op[0] == "end" and op[4] is not None:
+                if op[1] in seen_resources:
+                    plan[i] = op[:4] + (None, None)
+                    self.coalesced += 1
+                seen_resources.add(op[1])
+        return plan
+
+    def _apply(self, batch: List[Tuple]) -> None:
+        for op in self._coalesce(batch):
+            kind, conversation_id = op[0], op[1]
+            try:
+                if kind == "start":
+                    self.storage.start_conversation(conversation_id, op[2])
+                    ok = True
+                elif kind == "call":
+                    op[2]()
+                    ok = True
+                elif kind == "append":
+                    ok = self.storage.append_records(conversation_id, op[2], fsync=self.fsync == "always")
+                else:
+                    ok = self.storage.end_conversation(
+                        conversation_id, metadata=op[2], end_reason=op[3], resources=op[4], resource_keys=op[5],
+                        fsync=self.fsync in ("on_end", "always")
+                    )
+            except Exception as e:
+                logger.warning(f"Chat persistence {kind} failed for {conversation_id}: {e}")
+                ok = False
+            if ok:
+                self.written += 1
+            else:
+                self.failed += 1
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until everything queued so far is written.
+
+        Returns:
+            True if the queue drained within the timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._ops or self._in_flight:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def shutdown(self, timeout: float = 10.0) -> bool:
+        """Write out the queue and stop the writer thread; later writes are applied inline"""
+        drained = self.flush(timeout)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread:
+            thread.join(timeout)
+        if not drained:
+            logger.warning(f"Chat persistence queue not drained at shutdown ({len(self._ops)} operations left)")
+        return drained
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "fsync": self.fsync,
+                "queued": len(self._ops),
+                "in_flight": self._in_flight,
+                "max_queued": self.max_queued,
+                "queue_warning_depth": self.queue_warning_depth,
+                "deep_enqueues": self.deep_enqueues,
+                "enqueued": self.enqueued,
+                "written": self.written,
+                "coalesced": self.coalesced,
+                "failed": self.failed,
+                "batches": self.batches,
+                "last_batch_seconds": round(self.last_batch_seconds, 4),
+                "max_batch_seconds": round(self.max_batch_seconds, 4),
+            }
+
+
+# Global instance for easy access
+chat_writer = PersistenceWriter(chat_storage)
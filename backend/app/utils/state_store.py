@@ -0,0 +1,406 @@
+"""
+Conversation state shared between API worker processes.
+
+Any uvicorn worker can serve any turn of any conversation: history and
+resources live in shared storage, and the state store holds the rest:
+
+- a per-conversation lock (a lease with a TTL, renewed while a turn runs),
+  so only one worker runs a conversation's turn at a time
+- a per-conversation version, bumped when a turn is committed, so a worker
+  holding an agent from an older turn knows to rebuild it (see AgentRegistry)
+
+Two implementations: SQLiteStateStore (WAL; workers on one host) and
+RedisStateStore (any Redis-protocol server; workers on many hosts). Pick one
+with STATE_STORE_URL:
+
+    sqlite:///path/to/state.sqlite3
+    redis://localhost:6379/0
+
+Without STATE_STORE_URL, state.sqlite3 sits next to the chat histories (the
+storage base_path). Neither store touches its database until first used.
+"""
+
+import asyncio
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, AsyncIterator, Optional, Union
+from urllib.parse import urlparse
+
+from loguru import logger
+
+
+DEFAULT_STATE_STORE_URL = os.getenv("STATE_STORE_URL")
+# Default SQLite state database, inside the chat history directory
+STATE_FILENAME = "state.sqlite3"
+
+# A lock whose holder stops renewing it (crashed worker) frees up after this
+LOCK_TTL_SECONDS = 30.0
+# How long a turn waits for another worker to finish the conversation's previous turn
+LOCK_WAIT_SECONDS = 120.0
+LOCK_POLL_SECONDS = 0.05
+
+
+class ConversationBusy(Exception):
+    """The conversation's lock could not be acquired in time"""
+
+
+def new_owner_id() -> str:
+    """Unique lock owner: host, process and a random suffix"""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class StateStore(ABC):
+    """Per-conversation locks and versions shared by every worker."""
+
+    @abstractmethod
+    def try_lock(self, conversation_id: str, owner: str, ttl_seconds: float = LOCK_TTL_SECONDS) -> bool:
+        """Take the conversation's lock if it is free (or expired); never waits"""
+
+    @abstractmethod
+    def refresh_lock(self, conversation_id: str, owner: str, ttl_seconds: float = LOCK_TTL_SECONDS) -> bool:
+        """Extend a held lock; False if ``owner`` no longer holds it"""
+
+    @abstractmethod
+    def unlock(self, conversation_id: str, owner: str) -> bool:
+        """Release a held lock; False if ``owner`` no longer held it"""
+
+    @abstractmethod
+    def version(self, conversation_id: str) -> int:
+        """Number of committed turns (0 for a new conversation)"""
+
+    @abstractmethod
+    def bump_version(self, conversation_id: str) -> int:
+        """Record a committed turn; returns the new version"""
+
+    def close(self) -> None:
+        pass
+
+    async def lock_conversation(self,
+                                conversation_id: str,
+                                wait_seconds: float = LOCK_WAIT_SECONDS,
+                                ttl_seconds: float = LOCK_TTL_SECONDS) -> "ConversationLease":
+        """
+        Wait for the conversation's lock and hold it until the lease is released
+
+        The lease is renewed in the background every third of its TTL, so long
+        turns keep it; a crashed worker's lease simply runs out.
+
+        Raises:
+            ConversationBusy: If the lock isn't free within ``wait_seconds``
+        """
+        owner = new_owner_id()
+        deadline = time.monotonic() + wait_seconds
+        while not await asyncio.to_thread(self.try_lock, conversation_id, owner, ttl_seconds):
+            if time.monotonic() >= deadline:
+                raise ConversationBusy(f"Conversation {conversation_id} is busy")
+            await asyncio.sleep(LOCK_POLL_SECONDS)
+        return ConversationLease(self, conversation_id, owner, ttl_seconds)
+
+    @asynccontextmanager
+    async def conversation_lock(self,
+                                conversation_id: str,
+                                wait_seconds: float = LOCK_WAIT_SECONDS,
+                                ttl_seconds: float = LOCK_TTL_SECONDS) -> AsyncIterator[str]:
+        """
+        Hold the conversation's lock for the duration of the block (see lock_conversation)
+
+        Raises:
+            ConversationBusy: If the lock isn't free within ``wait_seconds``
+        """
+        lease = await self.lock_conversation(conversation_id, wait_seconds, ttl_seconds)
+        try:
+            yield lease.owner
+        finally:
+            await asyncio.to_thread(lease.release)
+
+
+class ConversationLease:
+    """
+    A held conversation lock, renewed on the event loop it was taken on.
+
+    ``release`` may be called from any thread, so the unlock can be handed to
+    the persistence writer and run after the turn's writes (see AgentRegistry.release).
+    """
+
+    def __init__(self, store: StateStore, conversation_id: str, owner: str, ttl_seconds: float = LOCK_TTL_SECONDS):
+        self.store = store
+        self.conversation_id = conversation_id
+        self.owner = owner
+        self.ttl_seconds = ttl_seconds
+        self.released = False
+        self._loop = asyncio.get_running_loop()
+        self._renewer = self._loop.create_task(self._renew())
+
+    async def _renew(self) -> None:
+        while True:
+            await asyncio.sleep(self.ttl_seconds / 3)
+            if not await asyncio.to_thread(self.store.refresh_lock, self.conversation_id, self.owner, self.ttl_seconds):
+                logger.warning(f"Lost the lock on conversation {self.conversation_id}")
+                return
+
+    def release(self) -> None:
+        """Stop renewing and unlock (blocking; idempotent)"""
+        if self.released:
+            return
+        self.released = True
+        try:
+            self._loop.call_soon_threadsafe(self._renewer.cancel)
+        except RuntimeError:
+            pass  # the loop has shut down, and the renewer with it
+        self.store.unlock(self.conversation_id, self.owner)
+
+
+class SQLiteStateStore(StateStore):
+    """
+    State in a SQLite database (WAL) that every worker on the host opens.
+
+    Each statement is atomic, so a lock is taken with one conditional upsert.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS conversation_locks (
+        conversation_id TEXT PRIMARY KEY,
+        owner           TEXT NOT NULL,
+        expires_at      REAL NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS conversation_versions (
+        conversation_id TEXT PRIMARY KEY,
+        version         INTEGER NOT NULL
+    );
+    """
+
+    def __init__(self, db_path: Path, busy_timeout: float = 5.0):
+        self.db_path = Path(db_path)
+        self.busy_timeout = busy_timeout
+        self._lock = threading.Lock()
+        # Opened on first use, so creating the store touches no file
+        self._connection: Optional[sqlite3.Connection] = None
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        """The connection, opened (and the schema created) on first use; hold _lock"""
+        if self._connection is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.db_path), timeout=self.busy_timeout, check_same_thread=False)
+            with conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                conn.executescript(self.SCHEMA)
+            self._connection = conn
+        return self._connection
+
+    def _execute(self, sql: str, params: tuple) -> sqlite3.Cursor:
+        with self._lock, self._conn:
+            return self._conn.execute(sql, params)
+
+    def try_lock(self, conversation_id: str, owner: str, ttl_seconds: float = LOCK_TTL_SECONDS) -> bool:
+        now = time.time()
+        cursor = self._execute(
+            """INSERT INTO conversation_locks (conversation_id, owner, expires_at) VALUES (?, ?, ?)
+               ON CONFLICT (conversation_id) DO UPDATE
+               SET owner = excluded.owner, expires_at = excluded.expires_at
+               WHERE conversation_locks.expires_at < ? OR conversation_locks.owner = excluded.owner""",
+            (conversation_id, owner, now + ttl_seconds, now)
+        )
+        return cursor.rowcount == 1
+
+    def refresh_lock(self, conversation_id: str, owner: str, ttl_seconds: float = LOCK_TTL_SECONDS) -> bool:
+        cursor = self._execute(
+            "UPDATE conversation_locks SET expires_at = ? WHERE conversation_id = ? AND owner = ?",
+            (time.time() + ttl_seconds, conversation_id, owner)
+        )
+        return cursor.rowcount == 1
+
+    def unlock(self, conversation_id: str, owner: str) -> bool:
+        cursor = self._execute(
+            "DELETE FROM conversation_locks WHERE conversation_id = ? AND owner = ?", (conversation_id, owner)
+        )
+        return cursor.rowcount == 1
+
+    def version(self, conversation_id: str) -> int:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT version FROM conversation_versions WHERE conversation_id = ?", (conversation_id,)
+            ).fetchone()
+        return row[0] if row else 0
+
+    def bump_version(self, conversation_id: str) -> int:
+        with self._lock, self._conn:
+            return self._conn.execute(
+                """INSERT INTO conversation_versions (conversation_id, version) VALUES (?, 1)
+                   ON CONFLICT (conversation_id) DO UPDATE SET version = version + 1
+                   RETURNING version""",
+                (conversation_id,)
+            ).fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+class RedisError(Exception):
+    """Error reply from a Redis-protocol server"""
+
+
+class RespConnection:
+    """
+    Minimal blocking client for the Redis serialization protocol (RESP2).
+
+    Just enough for the state store's commands; one connection, used under a lock.
+    """
+
+    def __init__(self, host: str = "localhost", port: int = 6379, db: int = 0,
+                 password: Optional[str] = None, timeout: float = 5.0):
+        self.address = (host, port)
+        self.db = db
+        self.password = password
+        self.timeout = timeout
+        self._sock: Optional[socket.socket] = None
+        self._reader = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> None:
+        self._sock = socket.create_connection(self.address, timeout=self.timeout)
+        self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._reader = self._sock.makefile('rb')
+        if self.password:
+            self._call("AUTH", self.password)
+        if self.db:
+            self._call("SELECT", self.db)
+
+    def execute(self, *args: Any) -> Any:
+        """Send one command and return its reply"""
+        with self._lock:
+            return self._call(*args)
+
+    def compare_and_exec(self, key: str, expected: str, *command: Any) -> bool:
+        """Run ``command`` only if ``key`` holds ``expected`` until it runs (WATCH/MULTI/EXEC)"""
+        with self._lock:
+            self._call("WATCH", key)
+            if self._call("GET", key) != expected:
+                self._call("UNWATCH")
+                return False
+            self._call("MULTI")
+            self._call(*command)
+            return self._call("EXEC") is not None
+
+    def _call(self, *args: Any) -> Any:
+        if self._sock is None:
+            self._connect()
+        try:
+            self._sock.sendall(self._encode(args))
+            return self._read_reply()
+        except (OSError, ConnectionError):
+            self.close()
+            raise
+
+    def _encode(self, args: tuple) -> bytes:
+        parts = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode()
+            parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        return b"".join(parts)
+
+    def _read_reply(self) -> Any:
+        line = self._reader.readline()
+        if not line:
+            raise ConnectionError("Connection closed by server")
+        kind, payload = line[:1], line[1:-2]
+        if kind == b"+":
+            return payload.decode()
+        if kind == b"-":
+            raise RedisError(payload.decode())
+        if kind == b":":
+            return int(payload)
+        if kind == b"$":
+            length = int(payload)
+            if length == -1:
+                return None
+            data = self._reader.read(length + 2)[:-2]
+            return data.decode()
+        if kind == b"*":
+            length = int(payload)
+            if length == -1:
+                return None
+            return [self._read_reply() for _ in range(length)]
+        raise RedisError(f"Unexpected reply: {line!r}")
+
+    def close(self) -> None:
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            finally:
+                self._sock = None
+                self._reader = None
+
+
+class RedisStateStore(StateStore):
+    """
+    State in a Redis-protocol server shared by every worker.
+
+    Locks are ``SET NX PX`` keys; release and renewal are check-and-set
+    transactions (WATCH/MULTI/EXEC), so a worker never touches a lock that
+    has expired and been taken over.
+    """
+
+    def __init__(self, connection: RespConnection, prefix: str = "moleai:"):
+        self.connection = connection
+        self.prefix = prefix
+
+    def _lock_key(self, conversation_id: str) -> str:
+        return f"{self.prefix}lock:{conversation_id}"
+
+    def _version_key(self, conversation_id: str) -> str:
+        return f"{self.prefix}version:{conversation_id}"
+
+    def try_lock(self, conversation_id: str, owner: str, ttl_seconds: float = LOCK_TTL_SECONDS) -> bool:
+        reply = self.connection.execute("SET", self._lock_key(conversation_id), owner, "NX", "PX", int(ttl_seconds * 1000))
+        return reply == "OK"
+
+    def refresh_lock(self, conversation_id: str, owner: str, ttl_seconds: float = LOCK_TTL_SECONDS) -> bool:
+        key = self._lock_key(conversation_id)
+        return self.connection.compare_and_exec(key, owner, "PEXPIRE", key, int(ttl_seconds * 1000))
+
+    def unlock(self, conversation_id: str, owner: str) -> bool:
+        key = self._lock_key(conversation_id)
+        return self.connection.compare_and_exec(key, owner, "DEL", key)
+
+    def version(self, conversation_id: str) -> int:
+        value = self.connection.execute("GET", self._version_key(conversation_id))
+        return int(value) if value is not None else 0
+
+    def bump_version(self, conversation_id: str) -> int:
+        return self.connection.execute("INCR", self._version_key(conversation_id))
+
+    def close(self) -> None:
+        self.connection.close()
+
+
+def create_state_store(url: Optional[str] = DEFAULT_STATE_STORE_URL,
+                       base_path: Union[str, Path] = "resources/chat_history") -> StateStore:
+    """
+    State store for a STATE_STORE_URL
+
+    Args:
+        url: sqlite:///relative/path, sqlite:////absolute/path or redis://[:password@]host:port/db;
+            None for a SQLite database in ``base_path``
+        base_path: The chat history directory (ChatHistoryStorage.base_path)
+    """
+    if not url:
+        return SQLiteStateStore(Path(base_path) / STATE_FILENAME)
+    parsed = urlparse(url)
+    if parsed.scheme == "sqlite":
+        return SQLiteStateStore(Path(parsed.path[1:] if parsed.path.startswith("/") else parsed.path))
+    if parsed.scheme == "redis":
+        db = int(parsed.path.lstrip("/") or 0)
+        return RedisStateStore(RespConnection(parsed.hostname or "localhost", parsed.port or 6379, db, parsed.password))
+    raise ValueError(f"Unsupported state store URL '{url}' (expected sqlite:// or redis://)")
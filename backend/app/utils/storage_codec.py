@@ -0,0 +1,193 @@
+"""
+Storage codecs for chat history and resource files.
+
+Documents (compacted chat histories, resource snapshots, saved product
+collections) are written with the configured codec and read back with
+whichever codec wrote them, detected from the leading bytes:
+
+    json          plain pretty-printed JSON (starts with "{" or "[")
+    json+gzip     compact JSON, gzip (magic 1f 8b)
+    json+zstd     compact JSON, zstd (magic 28 b5 2f fd)
+    msgpack+zstd  msgpack, zstd
+
+Inside a compressed frame, JSON starts with "{" or "[" and anything else is
+msgpack. zstandard and msgpack are listed in requirements.txt; if they are
+missing anyway, writes fall back to json+gzip (with a warning), which only
+needs the standard library.
+
+Files keep their ``.json`` names whatever the codec, so switching codecs (or
+migrating with ``python -m app.utils.storage_codec``) needs no other change.
+With a compressed codec those files hold binary data: read them with
+read_document, or convert a tree back to plain JSON with
+``python -m app.utils.storage_codec resources/chat_history json``.
+
+The codec is set with CHAT_STORAGE_CODEC. The default is plain json, so
+existing readers and tools that open chat_history.json or resources.json
+keep working; compression is opt-in. JSONL journals are not encoded: they
+are appended a line at a time and compacted through the codec.
+"""
+
+import gzip
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Any, Optional, Tuple
+
+from loguru import logger
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+CODECS = ("json", "json+gzip", "json+zstd", "msgpack+zstd")
+DEFAULT_STORAGE_CODEC = os.getenv("CHAT_STORAGE_CODEC", "json")
+
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+ZSTD_LEVEL = 3
+GZIP_LEVEL = 6
+
+_warned = set()
+
+
+def resolve_codec(codec: Optional[str] = None) -> str:
+    """The codec to write with: ``codec`` (or the default) if its packages are installed, else json+gzip"""
+    codec = codec or DEFAULT_STORAGE_CODEC
+    if codec not in CODECS:
+        raise ValueError(f"Unknown storage codec '{codec}'. Supported codecs: {', '.join(CODECS)}")
+
+    missing = []
+    if codec.endswith("+zstd") and zstandard is None:
+        missing.append("zstandard")
+    if codec.startswith("msgpack") and msgpack is None:
+        missing.append("msgpack")
+    if missing:
+        if codec not in _warned:
+            _warned.add(codec)
+            logger.warning(f"Storage codec {codec} needs {', '.join(missing)}; writing json+gzip instead")
+        return "json+gzip"
+    return codec
+
+
+def encode(data: Any, codec: Optional[str] = None) -> bytes:
+    """Serialize ``data`` with ``codec`` (default: CHAT_STORAGE_CODEC)"""
+    codec = resolve_codec(codec)
+    if codec == "json":
+        return json.dumps(data, indent=2, ensure_ascii=False).encode("utf-8")
+
+    if codec.startswith("msgpack"):
+        payload = msgpack.packb(data, use_bin_type=True)
+    else:
+        payload = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    if codec.endswith("+zstd"):
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(payload)
+    return gzip.compress(payload, compresslevel=GZIP_LEVEL)
+
+
+def detect_codec(raw: bytes) -> str:
+    """The codec that wrote ``raw``, from its leading bytes"""
+    if raw.startswith(ZSTD_MAGIC):
+        if zstandard is None:
+            raise RuntimeError("File is zstd-compressed; install zstandard to read it")
+        inner = zstandard.ZstdDecompressor().decompressobj().decompress(raw)[:1]
+        return "json+zstd" if inner in (b"{", b"[") else "msgpack+zstd"
+    if raw.startswith(GZIP_MAGIC):
+        return "json+gzip"
+    return "json"
+
+
+def decode(raw: bytes) -> Any:
+    """Deserialize bytes written by any codec"""
+    if raw.startswith(ZSTD_MAGIC):
+        if zstandard is None:
+            raise RuntimeError("File is zstd-compressed; install zstandard to read it")
+        payload = zstandard.ZstdDecompressor().decompressobj().decompress(raw)
+    elif raw.startswith(GZIP_MAGIC):
+        payload = gzip.decompress(raw)
+    else:
+        return json.loads(raw.decode("utf-8"))
+
+    if payload.lstrip()[:1] in (b"{", b"["):
+        return json.loads(payload.decode("utf-8"))
+    if msgpack is None:
+        raise RuntimeError("File is msgpack-encoded; install msgpack to read it")
+    return msgpack.unpackb(payload, raw=False)
+
+
+def write_document(path: Path, data: Any, codec: Optional[str] = None, fsync: bool = False) -> int:
+    """
+    Write ``data`` to ``path`` atomically (temp file, then rename)
+
+    Returns:
+        Number of bytes written
+    """
+    path = Path(path)
+    body = encode(data, codec)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, 'wb') as f:
+        f.write(body)
+        if fsync:
+            f.flush()
+            os.fsync(f.fileno())
+    tmp_path.replace(path)
+    return len(body)
+
+
+def read_document(path: Path) -> Any:
+    """Read a document written by any codec"""
+    with open(path, 'rb') as f:
+        return decode(f.read())
+
+
+def migrate_file(path: Path, codec: Optional[str] = None) -> Optional[Tuple[int, int]]:
+    """
+    Re-encode one document with ``codec``
+
+    Returns:
+        (bytes before, bytes after), or None if it was already in that codec
+    """
+    path = Path(path)
+    raw = path.read_bytes()
+    target = resolve_codec(codec)
+    if detect_codec(raw) == target:
+        return None
+    return len(raw), write_document(path, decode(raw), target)
+
+
+def migrate_tree(base_path: Path, codec: Optional[str] = None) -> Tuple[int, int, int]:
+    """
+    Re-encode every JSON document under ``base_path`` (journals are skipped)
+
+    Returns:
+        (files migrated, bytes before, bytes after) for the migrated files
+    """
+    files = before_total = after_total = 0
+    for path in sorted(Path(base_path).rglob("*.json")):
+        try:
+            sizes = migrate_file(path, codec)
+        except Exception as e:
+            logger.warning(f"Skipping {path}: {e}")
+            continue
+        if sizes:
+            files += 1
+            before_total += sizes[0]
+            after_total += sizes[1]
+    return files, before_total, after_total
+
+
+if __name__ == "__main__":
+    # python -m app.utils.storage_codec [base_path] [codec]
+    base = Path(sys.argv[1]) if len(sys.argv) > 1 else Path("resources/chat_history")
+    target = resolve_codec(sys.argv[2] if len(sys.argv) > 2 else None)
+    migrated, size_before, size_after = migrate_tree(base, target)
+    print(f"Migrated {migrated} files under {base} to {target}: "
+          f"{size_before:,} -> {size_after:,} bytes")
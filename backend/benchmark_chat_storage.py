@@ -0,0 +1,90 @@
+"""
+Benchmark: appending messages to chat history storage
+
+Appends N messages to one conversation and compares:
+
+1. JSON rewrite - load chat_history.json, append, rewrite it with indent=2
+                  for every message (how append_message used to work)
+2. Journal      - ChatHistoryStorage: one JSONL line per message, compacted
+                  into chat_history.json once at end_conversation
+
+The rewrite costs O(N) per message, O(N²) per conversation; the journal is
+O(1) per message. Files go to a temporary directory.
+
+Usage:
+    python benchmark_chat_storage.py [num_messages]
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.models import AssistantMessage, Message, UserMessage
+from app.utils.chat_storage import ChatHistoryStorage
+
+
+def build_messages(count: int) -> List[Message]:
+    messages: List[Message] = []
+    for i in range(count):
+        if i % 2:
+            messages.append(AssistantMessage(content=f"Here are some dresses for round {i}. " * 20))
+        else:
+            messages.append(UserMessage(content=f"find me dresses under $50, round {i}"))
+    return messages
+
+
+def run_rewrite(base: Path, messages: List[Message]) -> float:
+    """The old append path: whole-file load and rewrite per message"""
+    filepath = base / "chat_history.json"
+    with open(filepath, 'w', encoding='utf-8') as f:
+        json.dump({"conversation_id": "bench", "message_count": 0, "metadata": {}, "messages": []}, f, indent=2)
+
+    start = time.perf_counter()
+    for message in messages:
+        with open(filepath, 'r', encoding='utf-8') as f:
+            chat_data = json.load(f)
+        chat_data["messages"].append(message.model_dump())
+        chat_data["message_count"] = len(chat_data["messages"])
+        with open(filepath, 'w', encoding='utf-8') as f:
+            json.dump(chat_data, f, indent=2, ensure_ascii=False)
+    return time.perf_counter() - start
+
+
+def run_journal(base: Path, messages: List[Message]) -> tuple:
+    storage = ChatHistoryStorage(str(base))
+    storage.start_conversation("bench")
+
+    start = time.perf_counter()
+    for message in messages:
+        storage.append_message("bench", message)
+    appended = time.perf_counter() - start
+
+    storage.end_conversation("bench")
+    return appended, time.perf_counter() - start
+
+
+def main(num_messages: int = 500):
+    messages = build_messages(num_messages)
+
+    print(f"\n{'='*80}")
+    print(f"💾 Appending {num_messages} messages to one conversation")
+    print(f"{'='*80}\n")
+
+    with tempfile.TemporaryDirectory() as rewrite_dir, tempfile.TemporaryDirectory() as journal_dir:
+        rewrite = run_rewrite(Path(rewrite_dir), messages)
+        appended, total = run_journal(Path(journal_dir), messages)
+
+    print(f"🐌 JSON rewrite: {rewrite * 1000:8.1f}ms  ({rewrite / num_messages * 1e6:7.1f}µs per message)")
+    print(f"🚀 Journal:      {appended * 1000:8.1f}ms  ({appended / num_messages * 1e6:7.1f}µs per message)"
+          f"  + compaction = {total * 1000:.1f}ms")
+    print(f"\n📊 Speedup: {rewrite / total:.1f}x")
+
+
+if __name__ == "__main__":
+    args: List[str] = sys.argv[1:]
+    main(num_messages=int(args[0]) if args else 500)
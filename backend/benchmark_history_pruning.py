@@ -0,0 +1,110 @@
+"""
+Micro-benchmark: pruning a long message history
+
+Builds histories of 1k and 10k messages (user turns, assistant tool calls,
+tool results, a checklist update every 50 messages) and times picking the
+messages for one request:
+
+1. Full scan  - walk the whole history for the system prompt, first user
+                message and checklists on every request (the old pruning)
+2. Index      - HistoryIndex, maintained on append; only the recent window
+                is walked
+
+Also checks that both pick the same positions. No API keys or network access needed.
+
+Usage:
+    python benchmark_history_pruning.py [repeats]
+"""
+import sys
+import os
+import time
+from typing import List
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.models import AssistantMessage, Message, SystemMessage, ToolMessage, UserMessage
+from app.models.chat import ToolCall
+from app.modules.history_index import HistoryIndex, RECENT_MESSAGE_COUNT
+
+
+def build_history(size: int) -> List[Message]:
+    history: List[Message] = [SystemMessage(content="You are a shopping assistant")]
+    turn = 0
+    while len(history) < size:
+        if len(history) % 50 == 1:
+            history.append(SystemMessage(content=f"CHECKLIST update {turn}"))
+        history.append(UserMessage(content=f"find dresses, round {turn}"))
+        call = ToolCall.model_validate({
+            "id": f"call_{turn}", "type": "function",
+            "function": {"name": "search_web_tool", "arguments": "{\"query\": \"dresses\"}"}
+        })
+        history.append(AssistantMessage(content=None, tool_calls=[call]))
+        history.append(ToolMessage(content="results " * 50, tool_call_id=f"call_{turn}"))
+        history.append(AssistantMessage(content=f"Here are some dresses ({turn})"))
+        turn += 1
+    return history[:size]
+
+
+def full_scan(history: List[Message]) -> List[int]:
+    """Pruning as it was before the index: every request rescans the history"""
+    system_index = None
+    initial_user_index = None
+    checklist_indexes = []
+    for i, message in enumerate(history):
+        if message.role == "system":
+            if system_index is None:
+                system_index = i
+            elif message.content and "CHECKLIST" in message.content:
+                checklist_indexes.append(i)
+        elif message.role == "user" and initial_user_index is None:
+            initial_user_index = i
+
+    recent_start = max(0, len(history) - RECENT_MESSAGE_COUNT)
+    for i in range(recent_start, len(history)):
+        msg = history[i]
+        if msg.role in ["system", "user"] or (msg.role == "assistant" and not msg.tool_calls):
+            recent_start = i
+            break
+
+    essential = {system_index, initial_user_index, *checklist_indexes}
+    recent = [i for i in range(recent_start, len(history)) if i not in essential]
+    if recent:
+        last = history[recent[-1]]
+        if last.role == "assistant" and last.tool_calls:
+            if not any(m.role == "tool" for m in history[recent[-1] + 1:]):
+                recent = recent[:-1]
+
+    pruned = [i for i in (system_index, initial_user_index) if i is not None]
+    return pruned + checklist_indexes + recent
+
+
+def time_per_call(fn, repeats: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) / repeats
+
+
+def main(repeats: int = 200):
+    print(f"\n{'='*80}")
+    print(f"✂️  History pruning, {repeats} requests per size")
+    print(f"{'='*80}\n")
+
+    for size in (1_000, 10_000):
+        history = build_history(size)
+        index = HistoryIndex()
+        for message in history:
+            index.add(message)
+
+        assert index.pruned_indexes() == full_scan(history), "index and full scan disagree"
+
+        scan = time_per_call(lambda: full_scan(history), repeats)
+        indexed = time_per_call(index.pruned_indexes, repeats)
+
+        print(f"📚 {size:>6} messages:  full scan {scan * 1e6:9.1f}µs   "
+              f"index {indexed * 1e6:7.1f}µs   ({scan / indexed:.0f}x)")
+
+
+if __name__ == "__main__":
+    args: List[str] = sys.argv[1:]
+    main(repeats=int(args[0]) if args else 200)
@@ -0,0 +1,104 @@
+"""
+Benchmark: storage codecs for chat history and resource files
+
+Writes and reads a synthetic conversation (messages with tool payloads) and a
+product collection with every codec available here and reports write time,
+read time and size:
+
+1. json          - pretty JSON, how files used to be written
+2. json+gzip     - compact JSON, gzip (standard library)
+3. json+zstd     - compact JSON, zstd (needs zstandard)
+4. msgpack+zstd  - msgpack, zstd (needs zstandard and msgpack)
+
+Files go to a temporary directory.
+
+Usage:
+    python benchmark_storage_codec.py [num_messages] [num_products] [repeats]
+"""
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.utils.storage_codec import CODECS, read_document, resolve_codec, write_document
+
+
+def build_history(count: int) -> Dict[str, Any]:
+    messages: List[Dict[str, Any]] = []
+    for i in range(count):
+        if i % 3 == 0:
+            messages.append({"role": "user", "content": f"find me summer dresses under $50, round {i}"})
+        elif i % 3 == 1:
+            messages.append({"role": "assistant", "content": None, "tool_calls": [{
+                "id": f"call_{i}", "type": "function",
+                "function": {"name": "search_web_tool", "arguments": '{"query": "summer dresses"}'}
+            }]})
+        else:
+            messages.append({"role": "tool", "tool_call_id": f"call_{i - 1}", "content": "\n".join(
+                f"{j}. Floral midi dress - https://shop{j}.example.com/products/dress-{i}-{j} - $4{j}.99"
+                for j in range(10)
+            )})
+    return {"conversation_id": "bench", "timestamp": "2025-01-01T00:00:00",
+            "message_count": count, "metadata": {"model": "gpt-5"}, "messages": messages}
+
+
+def build_products(count: int) -> Dict[str, Any]:
+    return {"source_name": "bench", "source_url": "https://shop.example.com", "products": [{
+        "product_name": f"Linen Wrap Dress {i}", "store": "Shop", "price": f"${40 + i % 20}.00",
+        "price_value": 40.0 + i % 20, "currency": "USD",
+        "product_url": f"https://shop.example.com/products/linen-wrap-dress-{i}",
+        "image_url": f"https://cdn.example.com/images/linen-wrap-dress-{i}.jpg",
+        "description": "Breathable linen wrap dress with a tie waist and flutter sleeves. " * 4
+    } for i in range(count)]}
+
+
+def bench_codec(base: Path, name: str, document: Dict[str, Any], codec: str, repeats: int) -> Dict[str, float]:
+    path = base / f"{name}.{codec}.json"
+    start = time.perf_counter()
+    for _ in range(repeats):
+        size = write_document(path, document, codec)
+    write_time = (time.perf_counter() - start) / repeats
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        read_document(path)
+    read_time = (time.perf_counter() - start) / repeats
+    return {"write": write_time, "read": read_time, "size": size}
+
+
+def main(num_messages: int = 300, num_products: int = 500, repeats: int = 5):
+    documents = {
+        f"history ({num_messages} messages)": build_history(num_messages),
+        f"products ({num_products} items)": build_products(num_products),
+    }
+    codecs = [codec for codec in CODECS if resolve_codec(codec) == codec]
+    skipped = [codec for codec in CODECS if codec not in codecs]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, document in documents.items():
+            print(f"\n{'='*80}")
+            print(f"💾 {name}")
+            print(f"{'='*80}\n")
+
+            baseline = None
+            for codec in codecs:
+                result = bench_codec(Path(tmp), name.split()[0], document, codec, repeats)
+                baseline = baseline or result
+                print(f"  {codec:<13} write {result['write'] * 1000:7.2f}ms  read {result['read'] * 1000:7.2f}ms"
+                      f"  {result['size']:>10,} bytes  ({baseline['size'] / result['size']:5.1f}x smaller)")
+
+    if skipped:
+        print(f"\n⚠️  Skipped {', '.join(skipped)} (install zstandard / msgpack)")
+
+
+if __name__ == "__main__":
+    args: List[str] = sys.argv[1:]
+    main(
+        num_messages=int(args[0]) if len(args) > 0 else 300,
+        num_products=int(args[1]) if len(args) > 1 else 500,
+        repeats=int(args[2]) if len(args) > 2 else 5,
+    )
@@ -0,0 +1,102 @@
+"""
+Load test: concurrent conversations vs. LLM latency
+
+Runs N agent conversations at once against a fake provider that takes
+LATENCY seconds per completion, and compares:
+
+1. Blocking path  - LLMRouter.create_completion (sync client) called from the event loop
+2. Async path     - Agent.run -> LLMRouter.create_completion_async (pooled async client)
+
+With the blocking client every conversation waits for the previous one, so
+wall time is ~N x LATENCY. With the async client they overlap, so wall time
+stays ~LATENCY regardless of N. No API keys or network access needed.
+
+Usage:
+    python load_test_async_llm.py [num_conversations] [latency_seconds]
+"""
+import asyncio
+import sys
+import os
+import time
+from typing import List
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.llm.base import BaseLLMProvider
+from app.llm.router import LLMRouter
+from app.models import ChatCompletionResponse, UserMessage
+from app.modules.agent import Agent
+
+
+class FakeSlowProvider(BaseLLMProvider):
+    """Provider that answers after a fixed delay, like a reasoning model would"""
+
+    SUPPORTED_MODELS = ["gpt-5"]
+
+    def __init__(self, latency: float):
+        super().__init__(api_key="fake")
+        self.latency = latency
+
+    def _response(self) -> ChatCompletionResponse:
+        return ChatCompletionResponse.model_validate({
+            "id": "fake", "request_id": "fake", "created": int(time.time()), "model": "gpt-5",
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": "done"}, "finish_reason": "stop"}]
+        })
+
+    def create_completion(self, messages, model, tools=None, reasoning=None, **kwargs):
+        time.sleep(self.latency)  # What the sync OpenAI / requests clients do
+        return self._response()
+
+    async def create_completion_async(self, messages, model, tools=None, reasoning=None, **kwargs):
+        await asyncio.sleep(self.latency)  # What AsyncOpenAI / aiohttp do
+        return self._response()
+
+
+def build_router(latency: float) -> LLMRouter:
+    router = LLMRouter(openai_api_key="fake")
+    router.openai_provider = FakeSlowProvider(latency)
+    return router
+
+
+async def run_blocking(router: LLMRouter, num_conversations: int) -> float:
+    async def conversation(i: int):
+        router.create_completion(messages=[UserMessage(content=f"hi {i}")], model="gpt-5")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(conversation(i) for i in range(num_conversations)))
+    return time.perf_counter() - start
+
+
+async def run_async(router: LLMRouter, num_conversations: int) -> float:
+    async def conversation(i: int):
+        agent = Agent(system_prompt="test", model="gpt-5", llm_router=router)
+        async for _ in agent.run(UserMessage(content=f"hi {i}")):
+            pass
+
+    start = time.perf_counter()
+    await asyncio.gather(*(conversation(i) for i in range(num_conversations)))
+    return time.perf_counter() - start
+
+
+async def main(num_conversations: int = 10, latency: float = 1.0):
+    router = build_router(latency)
+
+    print(f"\n{'='*80}")
+    print(f"⚡ {num_conversations} concurrent conversations, {latency:.1f}s per LLM call")
+    print(f"{'='*80}\n")
+
+    blocking = await run_blocking(router, num_conversations)
+    print(f"🐌 Blocking client: {blocking:6.2f}s  (serialized: ~{num_conversations * latency:.1f}s expected)")
+
+    concurrent = await run_async(router, num_conversations)
+    print(f"🚀 Async client:    {concurrent:6.2f}s  (overlapped: ~{latency:.1f}s expected)")
+
+    print(f"\n📊 Speedup: {blocking / concurrent:.1f}x")
+
+
+if __name__ == "__main__":
+    args: List[str] = sys.argv[1:]
+    asyncio.run(main(
+        num_conversations=int(args[0]) if len(args) > 0 else 10,
+        latency=float(args[1]) if len(args) > 1 else 1.0
+    ))
@@ -0,0 +1,186 @@
+"""
+Load test: several API worker processes sharing conversations
+
+Starts W worker processes (like uvicorn --workers W). Each runs T concurrent
+turns at a time against C shared conversations chosen at random, the way
+chat.py serves a turn:
+
+    conversation lock -> get_or_create agent (rebuilt if another worker moved
+    the conversation on) -> user message -> simulated LLM latency ->
+    assistant message -> end tracking -> release (the writer commits the turn
+    and unlocks the conversation after its writes)
+
+Afterwards every conversation's saved history is checked: each user message
+must be directly followed by its reply and no turn may be lost, duplicated
+or interleaved. No API keys or network access needed; the Redis store runs
+against the local stand-in from the tests.
+
+Usage:
+    python load_test_multi_worker.py [workers] [turns_per_worker] [conversations] [sqlite|redis] [latency_seconds]
+"""
+import asyncio
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+CONCURRENT_TURNS = 8
+
+
+def _state_store(store_kind: str, base: str, redis_port: int):
+    from app.utils.state_store import RedisStateStore, RespConnection, SQLiteStateStore
+    if store_kind == "redis":
+        return RedisStateStore(RespConnection("127.0.0.1", redis_port))
+    return SQLiteStateStore(Path(base) / "state.sqlite3")
+
+
+def run_worker(worker: int, base: str, store_kind: str, redis_port: int, turns: int,
+               conversations: int, latency: float, results) -> None:
+    from app.models import AssistantMessage, UserMessage
+    from app.modules.agent import Agent
+    from app.modules.agent_registry import AgentRegistry
+    from app.utils.chat_storage import ChatHistoryStorage
+    from app.utils.persistence import chat_writer
+
+    # This worker's process-wide writer, pointed at the shared test directory
+    chat_writer.storage = ChatHistoryStorage(base)
+    store = _state_store(store_kind, base, redis_port)
+
+    def factory(conversation_id, model, saved=None):
+        return Agent(system_prompt="load test", model=model or "gpt-5", conversation_id=conversation_id,
+                     history=saved.messages if saved else None)
+
+    registry = AgentRegistry(factory, writer=chat_writer, state_store=store)
+    lock_waits: List[float] = []
+    rng = random.Random(worker)
+
+    async def turn(n: int):
+        conversation_id = f"conv-{rng.randrange(conversations)}"
+        requested = time.perf_counter()
+        lease = await store.lock_conversation(conversation_id, wait_seconds=300)
+        lock_waits.append(time.perf_counter() - requested)
+        agent = await asyncio.to_thread(registry.get_or_create, conversation_id, "gpt-5")
+        registry.acquire(conversation_id)
+        try:
+            agent.add_to_history(UserMessage(content=f"w{worker}-t{n}"))
+            await asyncio.sleep(latency)
+            agent.add_to_history(AssistantMessage(content=f"re w{worker}-t{n}"))
+            chat_writer.end_conversation(conversation_id, metadata={"worker": worker})
+        finally:
+            await asyncio.to_thread(registry.release, conversation_id, lease.release)
+
+    async def main():
+        semaphore = asyncio.Semaphore(CONCURRENT_TURNS)
+
+        async def bounded(n: int):
+            async with semaphore:
+                await turn(n)
+
+        await asyncio.gather(*(bounded(n) for n in range(turns)))
+
+    start = time.perf_counter()
+    asyncio.run(main())
+    chat_writer.shutdown(timeout=10)
+    results.put({
+        "worker": worker,
+        "seconds": time.perf_counter() - start,
+        "lock_waits": lock_waits,
+        "registry": registry.metrics(),
+    })
+
+
+def verify(base: str, conversations: int) -> Dict[str, Any]:
+    from app.utils.chat_storage import ChatHistoryStorage
+
+    storage = ChatHistoryStorage(base)
+    turns = 0
+    errors: List[str] = []
+    seen = set()
+    for c in range(conversations):
+        data = storage.load_chat_history(f"conv-{c}")
+        if not data:
+            continue
+        messages = data["messages"]
+        if [m["role"] for m in messages[:1]] != ["system"] or any(m["role"] == "system" for m in messages[1:]):
+            errors.append(f"conv-{c}: system prompt missing or repeated")
+        body = messages[1:]
+        for user, assistant in zip(body[::2], body[1::2]):
+            if user["role"] != "user" or assistant["content"] != f"re {user['content']}":
+                errors.append(f"conv-{c}: turn {user['content']} interleaved")
+            if user["content"] in seen:
+                errors.append(f"conv-{c}: turn {user['content']} duplicated")
+            seen.add(user["content"])
+            turns += 1
+        if len(body) % 2:
+            errors.append(f"conv-{c}: unanswered message")
+    return {"turns": turns, "errors": errors}
+
+
+def percentile(values: List[float], p: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(p * len(ordered)))] if ordered else 0.0
+
+
+def main(workers: int = 4, turns: int = 50, conversations: int = 10, store_kind: str = "sqlite", latency: float = 0.02):
+    print(f"\n{'='*80}")
+    print(f"🔀 {workers} workers x {turns} turns on {conversations} shared conversations ({store_kind} state store)")
+    print(f"{'='*80}\n")
+
+    stand_in = None
+    redis_port = 0
+    if store_kind == "redis":
+        from tests.app.utils.resp_stand_in import RespStandIn
+        stand_in = RespStandIn().start()
+        redis_port = stand_in.port
+
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    with tempfile.TemporaryDirectory() as base:
+        start = time.perf_counter()
+        processes = [
+            context.Process(target=run_worker, args=(w, base, store_kind, redis_port, turns, conversations, latency, results))
+            for w in range(workers)
+        ]
+        for process in processes:
+            process.start()
+        reports = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+        elapsed = time.perf_counter() - start
+
+        check = verify(base, conversations)
+
+    if stand_in:
+        stand_in.stop()
+
+    lock_waits = [wait for report in reports for wait in report["lock_waits"]]
+    stale = sum(report["registry"]["stale"] for report in reports)
+    print(f"⏱️  {workers * turns} turns in {elapsed:.2f}s  ({workers * turns / elapsed:.1f} turns/s)")
+    print(f"🔒 Lock wait: p50 {percentile(lock_waits, 0.5) * 1000:.1f}ms  p95 {percentile(lock_waits, 0.95) * 1000:.1f}ms"
+          f"  max {max(lock_waits, default=0) * 1000:.1f}ms")
+    print(f"♻️  Agents rebuilt after another worker's turn: {stale}")
+    print(f"📚 Saved turns: {check['turns']} of {workers * turns}")
+
+    if check["errors"] or check["turns"] != workers * turns:
+        print(f"\n❌ {len(check['errors'])} consistency errors")
+        for error in check["errors"][:10]:
+            print(f"   {error}")
+        sys.exit(1)
+    print("\n✅ Every turn saved once, in order, with no interleaving")
+
+
+if __name__ == "__main__":
+    args: List[str] = sys.argv[1:]
+    main(
+        workers=int(args[0]) if len(args) > 0 else 4,
+        turns=int(args[1]) if len(args) > 1 else 50,
+        conversations=int(args[2]) if len(args) > 2 else 10,
+        store_kind=args[3] if len(args) > 3 else "sqlite",
+        latency=float(args[4]) if len(args) > 4 else 0.02,
+    )
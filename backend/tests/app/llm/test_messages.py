@@ -0,0 +1,93 @@
+"""
+Tests for app.llm.messages and the agent's serialized-message cache
+"""
+
+import pytest
+
+from app.llm.messages import PreparedMessages, first_structure_error, serialize_message
+from app.llm.openai_provider import OpenAIProvider
+from app.models import AssistantMessage, ToolMessage, UserMessage
+from app.models.chat import ToolCall
+from app.modules.agent import Agent
+
+
+def _tool_call(call_id: str) -> ToolCall:
+    return ToolCall.model_validate({
+        "id": call_id, "type": "function", "function": {"name": "search_web_tool", "arguments": "{}"}
+    })
+
+
+class TestSerializeMessage:
+    """Per-message API dicts"""
+
+    def test_empty_tool_calls_and_nones_are_dropped(self):
+        api_message = serialize_message(AssistantMessage(content="hi", tool_calls=[]))
+        assert api_message == {"role": "assistant", "content": "hi"}
+
+    def test_tool_calls_are_kept(self):
+        api_message = serialize_message(AssistantMessage(content=None, tool_calls=[_tool_call("a")]))
+        assert api_message["tool_calls"][0]["id"] == "a"
+        assert "content" not in api_message
+
+
+class TestStructureValidation:
+    """Tool messages must follow an assistant tool call"""
+
+    def test_first_structure_error(self):
+        valid = [
+            {"role": "user", "content": "q"},
+            {"role": "assistant", "tool_calls": [{"id": "a"}, {"id": "b"}]},
+            {"role": "tool", "tool_call_id": "a", "content": "1"},
+            {"role": "tool", "tool_call_id": "b", "content": "2"},
+            {"role": "assistant", "content": "done"},
+        ]
+        assert first_structure_error(valid) is None
+        assert first_structure_error(valid + [{"role": "tool", "tool_call_id": "c", "content": "3"}]) == 5
+
+    def test_provider_rejects_orphaned_tool_message(self):
+        provider = OpenAIProvider(api_key="fake")
+        with pytest.raises(ValueError):
+            provider.format_messages_for_api([UserMessage(content="q"), ToolMessage(content="x", tool_call_id="a")])
+
+
+class TestAgentMessageCache:
+    """Requests are assembled from dicts cached on append"""
+
+    def _agent(self) -> Agent:
+        agent = Agent(system_prompt="be helpful", model="gpt-5")
+        agent.add_to_history(UserMessage(content="find dresses"))
+        agent.add_to_history(AssistantMessage(content=None, tool_calls=[_tool_call("a")]))
+        agent.add_to_history(ToolMessage(content="results", tool_call_id="a"))
+        return agent
+
+    def test_requests_reuse_cached_dicts(self):
+        agent = self._agent()
+
+        first = agent._prepare_messages_with_checklist()
+        second = agent._prepare_messages_with_checklist()
+
+        assert isinstance(first, PreparedMessages)
+        assert [m["role"] for m in first] == ["system", "user", "assistant", "tool"]
+        assert all(a is b for a, b in zip(first, second))
+        assert first.models[1].content == "find dresses"
+
+    def test_prepared_messages_pass_through_provider(self):
+        prepared = self._agent()._prepare_messages_with_checklist()
+        assert OpenAIProvider(api_key="fake").format_messages_for_api(prepared) is prepared
+
+    def test_checklist_is_appended_last(self):
+        agent = self._agent()
+        agent.checklist = {"items": ["find dresses"]}
+
+        prepared = agent._prepare_messages_with_checklist()
+
+        assert prepared[-1]["role"] == "system"
+        assert prepared[-1]["content"].startswith("CURRENT CHECKLIST")
+
+    def test_orphaned_tool_message_is_reported_at_request_time(self):
+        agent = Agent(system_prompt="be helpful", model="gpt-5")
+        agent.add_to_history(UserMessage(content="find dresses"))
+        agent.add_to_history(ToolMessage(content="stray", tool_call_id="x"))
+
+        with pytest.raises(ValueError):
+            agent._prepare_messages_with_checklist()
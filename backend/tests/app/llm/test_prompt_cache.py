@@ -0,0 +1,80 @@
+"""
+Tests for prompt-cache-friendly requests and cached-token accounting
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+from app.llm.openai_provider import OpenAIProvider
+from app.llm.prompt_cache import PromptCacheStats
+from app.llm.router import LLMRouter
+from app.models import AssistantMessage, UserMessage
+from app.models.chat import Usage
+from app.modules.agent import Agent
+from tests.app.llm.test_router import FakeSlowProvider
+
+
+def _usage(prompt_tokens: int, cached_tokens: int) -> Usage:
+    return Usage.model_validate({
+        "prompt_tokens": prompt_tokens, "completion_tokens": 10, "total_tokens": prompt_tokens + 10,
+        "prompt_tokens_details": {"cached_tokens": cached_tokens}
+    })
+
+
+class TestCachedTokenAccounting:
+    """Cached tokens are read from the API and totalled per conversation"""
+
+    def test_openai_usage_keeps_cached_tokens(self):
+        raw = SimpleNamespace(prompt_tokens=1200, completion_tokens=30, total_tokens=1230,
+                              prompt_tokens_details=SimpleNamespace(cached_tokens=1024))
+
+        usage = OpenAIProvider(api_key="fake")._convert_usage(raw)
+
+        assert usage["prompt_tokens_details"]["cached_tokens"] == 1024
+
+    def test_missing_details_count_as_uncached(self):
+        raw = SimpleNamespace(prompt_tokens=10, completion_tokens=1, total_tokens=11, prompt_tokens_details=None)
+        assert OpenAIProvider(api_key="fake")._convert_usage(raw)["prompt_tokens_details"]["cached_tokens"] == 0
+
+    def test_hit_ratio(self):
+        stats = PromptCacheStats()
+        stats.record(_usage(1000, 0))
+        stats.record(_usage(1000, 800))
+        stats.record(None)
+
+        assert stats.to_dict() == {
+            "requests": 2, "prompt_tokens": 2000, "cached_tokens": 800, "cache_hit_ratio": 0.4
+        }
+
+
+class TestStablePrefix:
+    """Consecutive requests extend the previous one"""
+
+    def test_requests_only_grow_by_appending_between_window_jumps(self):
+        agent = Agent(system_prompt="be helpful", model="gpt-5")
+        agent.checklist = {"items": ["find dresses"]}
+
+        previous = None
+        jumps = 0
+        for i in range(60):
+            agent.add_to_history(UserMessage(content=f"q{i}"))
+            agent.add_to_history(AssistantMessage(content=f"a{i}"))
+            # Everything but the trailing checklist is the cacheable prefix
+            prefix = list(agent._prepare_messages_with_checklist())[:-1]
+            if previous is not None and prefix[:len(previous)] != previous:
+                jumps += 1
+            previous = prefix
+
+        # The window start moves once per 30 messages, not on every request
+        assert 0 < jumps <= 4
+
+    def test_conversation_id_is_sent_as_prompt_cache_key(self):
+        provider = FakeSlowProvider(latency=0)
+        router = LLMRouter(openai_api_key="fake")
+        router.openai_provider = provider
+
+        asyncio.run(router.create_completion_async(
+            messages=[UserMessage(content="hi")], model="gpt-5", prompt_cache_key="conv-1"
+        ))
+
+        assert provider.calls[-1]["prompt_cache_key"] == "conv-1"
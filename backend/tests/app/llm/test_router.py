@@ -0,0 +1,88 @@
+"""
+Tests for app.llm.router
+
+Uses a fake provider so no API keys or network access are needed.
+"""
+
+import asyncio
+import time
+
+from app.llm.base import BaseLLMProvider
+from app.llm.router import LLMRouter
+from app.models import ChatCompletionResponse, UserMessage
+
+
+class FakeSlowProvider(BaseLLMProvider):
+    """Provider that answers after a fixed delay"""
+
+    SUPPORTED_MODELS = ["gpt-5"]
+
+    def __init__(self, latency: float):
+        super().__init__(api_key="fake")
+        self.latency = latency
+        self.calls = []
+        self.tools = []
+
+    def create_completion(self, messages, model, tools=None, reasoning=None, **kwargs):
+        time.sleep(self.latency)
+        self.calls.append(kwargs)
+        self.tools.append(tools)
+        return ChatCompletionResponse.model_validate({
+            "id": "fake", "request_id": "fake", "created": 0, "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": "ok"}, "finish_reason": "stop"}]
+        })
+
+
+def _router(provider: BaseLLMProvider) -> LLMRouter:
+    router = LLMRouter(openai_api_key="fake")
+    router.openai_provider = provider
+    return router
+
+
+class TestAsyncCompletion:
+    """Non-blocking completions through LLMRouter.create_completion_async"""
+
+    def test_concurrent_calls_overlap(self):
+        """Five 0.3s completions finish together instead of back to back"""
+        router = _router(FakeSlowProvider(latency=0.3))
+        messages = [UserMessage(content="hi")]
+
+        async def run():
+            start = time.perf_counter()
+            responses = await asyncio.gather(*(
+                router.create_completion_async(messages=messages, model="gpt-5") for _ in range(5)
+            ))
+            return responses, time.perf_counter() - start
+
+        responses, elapsed = asyncio.run(run())
+
+        assert all(r.choices[0].message.content == "ok" for r in responses)
+        assert elapsed < 1.0
+
+    def test_async_path_routes_like_sync_path(self):
+        """GLM-only kwargs are stripped and reasoning is mapped the same way"""
+        provider = FakeSlowProvider(latency=0)
+        router = _router(provider)
+        messages = [UserMessage(content="hi")]
+
+        router.create_completion(messages=messages, model="gpt-5", thinking={"type": "enabled"}, reasoning="low")
+        asyncio.run(router.create_completion_async(
+            messages=messages, model="gpt-5", thinking={"type": "enabled"}, reasoning="low"
+        ))
+
+        assert provider.calls[0] == provider.calls[1]
+        assert provider.calls[0]["reasoning_effort"] == "low"
+        assert "thinking" not in provider.calls[0]
+
+    def test_cached_tool_schemas_pass_through_untouched(self):
+        """The router forwards the registry's cached schemas instead of rebuilding them"""
+        import app.tools.definitions  # noqa: F401 - registers the real tools
+        from app.tools import tool_registry
+
+        provider = FakeSlowProvider(latency=0)
+        router = _router(provider)
+        tools = tool_registry.api_tool_schemas()
+
+        router.create_completion(messages=[UserMessage(content="hi")], model="gpt-5", tools=tools)
+
+        assert provider.tools[0] is tools
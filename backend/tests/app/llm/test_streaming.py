@@ -0,0 +1,160 @@
+"""
+Tests for app.llm.streaming and token streaming through Agent.run
+"""
+
+import asyncio
+import time
+
+from app.llm.base import BaseLLMProvider
+from app.llm.router import LLMRouter
+from app.llm.streaming import ChatCompletionAccumulator
+from app.models import ChatCompletionDelta, ChatCompletionResponse, ToolMessage, UserMessage
+from app.models.chat import StreamEventType, ToolExecutionStatus
+from app.modules.agent import Agent
+from app.tools import ToolFunction, tool_registry
+
+
+def _delta(**fields) -> ChatCompletionDelta:
+    return ChatCompletionDelta.model_validate({"id": "resp", "created": 1, "model": "gpt-5", **fields})
+
+
+class FakeStreamingProvider(BaseLLMProvider):
+    """Provider that streams a fixed answer in three pieces"""
+
+    SUPPORTED_MODELS = ["gpt-5"]
+
+    def __init__(self):
+        super().__init__(api_key="fake")
+
+    def create_completion(self, messages, model, tools=None, reasoning=None, **kwargs):
+        raise AssertionError("streaming path should be used")
+
+    async def stream_completion_async(self, messages, model, tools=None, reasoning=None, **kwargs):
+        yield _delta(reasoning_content="Looking up dresses")
+        yield _delta(content="Here are ")
+        yield _delta(content="some dresses", finish_reason="stop")
+
+
+class TestChatCompletionAccumulator:
+    """Folding deltas back into a ChatCompletionResponse"""
+
+    def test_text_and_tool_call_fragments_are_joined(self):
+        accumulator = ChatCompletionAccumulator()
+        accumulator.add(_delta(content="Let me "))
+        accumulator.add(_delta(content="search"))
+        accumulator.add(_delta(tool_calls=[{"index": 0, "id": "call_a", "name": "search_web", "arguments": '{"que'}]))
+        accumulator.add(_delta(tool_calls=[{"index": 0, "arguments": 'ry": "dress"}'}]))
+        accumulator.add(_delta(tool_calls=[{"index": 1, "id": "call_b", "name": "get_checklist"}]))
+        accumulator.add(_delta(finish_reason="tool_calls", usage={"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15}))
+
+        response = accumulator.to_response()
+        message = response.choices[0].message
+
+        assert message.content == "Let me search"
+        assert [call.id for call in message.tool_calls] == ["call_a", "call_b"]
+        assert message.tool_calls[0].parse_arguments() == {"query": "dress"}
+        assert message.tool_calls[1].function.arguments == "{}"
+        assert response.choices[0].finish_reason == "tool_calls"
+        assert response.usage.total_tokens == 15
+
+    def test_non_streaming_provider_yields_one_delta(self):
+        class BlockingProvider(FakeStreamingProvider):
+            stream_completion_async = BaseLLMProvider.stream_completion_async
+
+            def create_completion(self, messages, model, tools=None, reasoning=None, **kwargs):
+                return ChatCompletionResponse.model_validate({
+                    "id": "x", "request_id": "x", "created": 0, "model": model,
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": "ok"}, "finish_reason": "stop"}]
+                })
+
+        router = LLMRouter(openai_api_key="fake")
+        router.openai_provider = BlockingProvider()
+
+        async def collect():
+            return [d async for d in router.stream_completion(messages=[UserMessage(content="hi")], model="gpt-5")]
+
+        deltas = asyncio.run(collect())
+        assert len(deltas) == 1
+        assert deltas[0].content == "ok"
+
+
+class TestAgentTokenStreaming:
+    """Agent.run emits deltas before the final message"""
+
+    def test_deltas_precede_final_message(self):
+        router = LLMRouter(openai_api_key="fake")
+        router.openai_provider = FakeStreamingProvider()
+        agent = Agent(system_prompt="test", model="gpt-5", llm_router=router)
+
+        async def run():
+            return [event async for event in agent.run(UserMessage(content="dresses"))]
+
+        events = asyncio.run(run())
+        types = [event.type for event in events]
+
+        deltas = [e.content for e in events if e.type == StreamEventType.MESSAGE_DELTA]
+        assert deltas == ["Here are ", "some dresses"]
+        assert types.index(StreamEventType.THINKING_DELTA) < types.index(StreamEventType.THINKING)
+        assert types.index(StreamEventType.MESSAGE_DELTA) < types.index(StreamEventType.MESSAGE)
+        assert agent.message_history[-1].content == "Here are some dresses"
+
+
+class ToolCallStreamingProvider(BaseLLMProvider):
+    """Streams two tool calls with a pause between them, then a final answer"""
+
+    SUPPORTED_MODELS = ["gpt-5"]
+
+    def __init__(self):
+        super().__init__(api_key="fake")
+        self.turns = 0
+        self.first_stream_finished_at = None
+
+    def create_completion(self, messages, model, tools=None, reasoning=None, **kwargs):
+        raise AssertionError("streaming path should be used")
+
+    async def stream_completion_async(self, messages, model, tools=None, reasoning=None, **kwargs):
+        self.turns += 1
+        if self.turns > 1:
+            yield _delta(content="done", finish_reason="stop")
+            return
+        yield _delta(tool_calls=[{"index": 0, "id": "call_1", "name": "record_call", "arguments": '{"label": '}])
+        yield _delta(tool_calls=[{"index": 0, "arguments": '"first"}'}])
+        await asyncio.sleep(0.2)
+        yield _delta(tool_calls=[{"index": 1, "id": "call_2", "name": "record_call", "arguments": '{"label": "second"}'}])
+        yield _delta(finish_reason="tool_calls")
+        self.first_stream_finished_at = time.perf_counter()
+
+
+class TestSpeculativeToolExecution:
+    """Tool calls start while the rest of the response is streaming"""
+
+    def test_first_call_runs_before_stream_ends(self):
+        started = {}
+
+        async def record_call(label: str) -> str:
+            started[label] = time.perf_counter()
+            return f"ran {label}"
+
+        tool_registry.register("record_call", ToolFunction(record_call, "record_call"))
+        try:
+            provider = ToolCallStreamingProvider()
+            router = LLMRouter(openai_api_key="fake")
+            router.openai_provider = provider
+            agent = Agent(system_prompt="test", model="gpt-5", llm_router=router)
+
+            async def run():
+                return [event async for event in agent.run(UserMessage(content="go"))]
+
+            events = asyncio.run(run())
+        finally:
+            tool_registry.unregister("record_call")
+
+        assert started["first"] < provider.first_stream_finished_at
+
+        started_events = [e.tool_call_id for e in events
+                          if e.type == StreamEventType.TOOL_EXECUTION and e.status == ToolExecutionStatus.STARTED]
+        assert started_events == ["call_1", "call_2"]
+
+        tool_messages = [m for m in agent.message_history if isinstance(m, ToolMessage)]
+        assert [(m.tool_call_id, m.content) for m in tool_messages] == [("call_1", "ran first"), ("call_2", "ran second")]
+        assert agent.message_history[-1].content == "done"
@@ -0,0 +1,52 @@
+"""
+Tests for local token estimates
+"""
+
+import asyncio
+import sys
+import threading
+from types import SimpleNamespace
+
+from app.llm import tokens
+
+
+class FakeEncoding:
+    def encode(self, text, disallowed_special=()):
+        return text.split()
+
+
+def _reset(monkeypatch, get_encoding):
+    monkeypatch.setitem(sys.modules, "tiktoken", SimpleNamespace(get_encoding=get_encoding))
+    monkeypatch.setattr(tokens, "_encoding", None)
+    monkeypatch.setattr(tokens, "_encoding_loaded", False)
+    monkeypatch.setattr(tokens, "_encoding_loading", False)
+
+
+class TestEncodingLoad:
+    """The encoding is never loaded on the event loop"""
+
+    def test_event_loop_estimates_from_characters_while_loading(self, monkeypatch):
+        release = threading.Event()
+
+        def slow_get_encoding(name):
+            assert release.wait(5)
+            return FakeEncoding()
+
+        _reset(monkeypatch, slow_get_encoding)
+
+        async def estimate():
+            return tokens.estimate_text_tokens("one two three four")
+
+        # Loading is stuck; the estimate must not wait for it
+        assert asyncio.run(estimate()) == 5
+        release.set()
+        assert tokens.load_encoding() is not None
+        assert asyncio.run(estimate()) == 4
+
+    def test_failed_load_falls_back_to_characters(self, monkeypatch):
+        def broken_get_encoding(name):
+            raise OSError("no network")
+
+        _reset(monkeypatch, broken_get_encoding)
+        assert tokens.load_encoding() is None
+        assert tokens.estimate_text_tokens("one two three four") == 5
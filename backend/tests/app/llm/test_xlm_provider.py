@@ -0,0 +1,57 @@
+"""
+Tests for the XLM provider's pooled session
+"""
+
+import asyncio
+import threading
+
+from app.llm.xlm_provider import XLMProvider
+
+
+class TestSessionPool:
+    """One session per event loop, closing the one it replaces"""
+
+    def test_session_is_reused_on_the_same_loop(self):
+        provider = XLMProvider(api_key="test")
+
+        async def main():
+            first = await provider._get_session()
+            second = await provider._get_session()
+            await provider.aclose()
+            return first, second
+
+        first, second = asyncio.run(main())
+        assert first is second
+        assert first.closed
+
+    def test_session_of_a_finished_loop_is_closed_when_replaced(self):
+        provider = XLMProvider(api_key="test")
+        old = asyncio.run(provider._get_session())
+
+        async def main():
+            new = await provider._get_session()
+            await provider.aclose()
+            return new
+
+        new = asyncio.run(main())
+        assert new is not old
+        assert old.closed
+
+    def test_session_of_a_running_loop_is_closed_on_that_loop(self):
+        provider = XLMProvider(api_key="test")
+        other_loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=other_loop.run_forever, daemon=True)
+        thread.start()
+        try:
+            old = asyncio.run_coroutine_threadsafe(provider._get_session(), other_loop).result(5)
+
+            async def main():
+                await provider._get_session()
+                await provider.aclose()
+
+            asyncio.run(main())
+            assert old.closed
+        finally:
+            other_loop.call_soon_threadsafe(other_loop.stop)
+            thread.join(5)
+            other_loop.close()
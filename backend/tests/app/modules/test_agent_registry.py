@@ -0,0 +1,238 @@
+"""
+Tests for the bounded agent registry
+"""
+
+import asyncio
+import threading
+
+import pytest
+
+from app.models import AssistantMessage, UserMessage
+from app.models.product import Product
+from app.models.product_collection import ProductCollection
+from app.modules.agent import Agent
+from app.modules.agent_registry import AgentRegistry
+from app.utils.chat_storage import ChatHistoryStorage
+from app.utils.persistence import PersistenceWriter
+from app.utils.state_store import SQLiteStateStore
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _factory(conversation_id, model, saved=None):
+    agent = Agent(system_prompt="be helpful", model=model or "gpt-5", conversation_id=conversation_id,
+                  history=saved.messages if saved else None)
+    if saved:
+        agent.resources.update(saved.resources)
+        agent.checklist = saved.metadata.get("checklist")
+    return agent
+
+
+@pytest.fixture
+def writer(tmp_path, monkeypatch):
+    """Agents persist through the module-level writer; point it at tmp_path"""
+    writer = PersistenceWriter(ChatHistoryStorage(str(tmp_path)))
+    monkeypatch.setattr("app.modules.agent.chat_writer", writer)
+    yield writer
+    writer.shutdown(timeout=5)
+
+
+def _registry(writer, **kwargs) -> AgentRegistry:
+    return AgentRegistry(_factory, writer=writer, **kwargs)
+
+
+def _chat(registry: AgentRegistry, conversation_id: str, text: str) -> Agent:
+    agent = registry.get_or_create(conversation_id, "gpt-5")
+    registry.acquire(conversation_id)
+    agent.add_to_history(UserMessage(content=text))
+    agent.add_to_history(AssistantMessage(content=f"re: {text}"))
+    registry.release(conversation_id)
+    return agent
+
+
+class TestAgentRegistry:
+    """Agents are bounded, snapshotted on eviction and rehydrated on return"""
+
+    def test_idle_agents_are_evicted_and_rehydrated(self, writer):
+        clock = FakeClock()
+        registry = _registry(writer, idle_ttl_seconds=60, clock=clock)
+        agent = _chat(registry, "c1", "find dresses")
+        agent.checklist = {"items": ["find dresses"]}
+        agent.resources["shop"] = ProductCollection(source_name="shop", source_url="https://shop.com", products=[
+            Product(product_name="dress", store="Shop", price="$10", price_value=10.0, currency="USD",
+                    product_url="https://shop.com/dress", image_url="https://shop.com/dress.jpg")
+        ])
+
+        clock.now = 61
+        assert registry.evict() == 1
+        assert "c1" not in registry
+
+        restored = registry.get_or_create("c1", "gpt-5")
+
+        assert restored is not agent
+        assert [m.content for m in restored.get_message_history()] == ["be helpful", "find dresses", "re: find dresses"]
+        assert [p.product_name for p in restored.resources["shop"].products] == ["dress"]
+        assert restored.checklist == {"items": ["find dresses"]}
+        assert registry.metrics()["rehydrated"] == 1
+
+        # The resumed conversation keeps appending to the same saved history
+        _chat(registry, "c1", "cheaper")
+        registry.writer.flush(5)
+        saved = registry.writer.storage.load_chat_history("c1")
+        assert [m["content"] for m in saved["messages"]][-2:] == ["cheaper", "re: cheaper"]
+
+    def test_least_recently_used_is_evicted_first(self, writer):
+        registry = _registry(writer, max_agents=2)
+        _chat(registry, "c1", "one")
+        _chat(registry, "c2", "two")
+        registry.get_or_create("c1", "gpt-5")
+        _chat(registry, "c3", "three")
+
+        assert "c1" in registry and "c3" in registry and "c2" not in registry
+        assert registry.metrics()["evicted_memory"] == 1
+
+    def test_memory_budget_keeps_only_the_latest_agent(self, writer):
+        registry = _registry(writer, memory_budget_bytes=1)
+        _chat(registry, "c1", "one")
+        _chat(registry, "c2", "two")
+
+        assert list(registry._residents) == ["c2"]
+        assert registry.metrics()["estimated_bytes"] == registry["c2"].estimated_memory_bytes()
+
+    def test_busy_agents_are_never_evicted(self, writer):
+        clock = FakeClock()
+        registry = _registry(writer, idle_ttl_seconds=1, clock=clock)
+        registry.get_or_create("c1", "gpt-5")
+        registry.acquire("c1")
+
+        clock.now = 10
+        assert registry.evict() == 0
+        registry.release("c1")
+        clock.now = 20
+        assert registry.evict() == 1
+
+    def test_sweep_evicts_idle_agents_without_other_activity(self, writer):
+        clock = FakeClock()
+        registry = _registry(writer, idle_ttl_seconds=1, clock=clock)
+        _chat(registry, "c1", "hello")
+        clock.now = 10
+
+        async def main():
+            sweep = asyncio.create_task(registry.sweep(0.01))
+            await asyncio.sleep(0.2)
+            sweep.cancel()
+
+        asyncio.run(main())
+        assert "c1" not in registry
+        assert registry.metrics()["evicted_idle"] == 1
+
+    def test_cleared_conversation_starts_over(self, writer):
+        registry = _registry(writer)
+        _chat(registry, "c1", "hello")
+
+        del registry["c1"]
+        agent = registry.get_or_create("c1", "gpt-5")
+
+        assert len(agent.get_message_history()) == 1
+        assert registry.get("unknown") is None
+
+    def test_metrics_report_memory_per_agent(self, writer):
+        registry = _registry(writer)
+        _chat(registry, "c1", "x" * 4000)
+        _chat(registry, "c2", "y")
+
+        metrics = registry.metrics()
+
+        assert metrics["resident_agents"] == 2
+        assert metrics["memory_per_agent"]["max"] > metrics["memory_per_agent"]["mean"] > 0
+        assert metrics["estimated_bytes"] == sum(registry[c].estimated_memory_bytes() for c in ("c1", "c2"))
+
+
+class TestSharedState:
+    """Registries in different workers hand a conversation back and forth"""
+
+    def test_stale_agent_is_rebuilt_after_another_worker_commits(self, writer, tmp_path):
+        store = SQLiteStateStore(tmp_path / "state.sqlite3")
+        worker_a = _registry(writer, state_store=store)
+        worker_b = _registry(writer, state_store=store)
+
+        _chat(worker_a, "c1", "one")
+        writer.flush(5)
+        _chat(worker_b, "c1", "two")
+        writer.flush(5)
+        agent = _chat(worker_a, "c1", "three")
+
+        assert [m.content for m in agent.get_message_history()][1:] == [
+            "one", "re: one", "two", "re: two", "three", "re: three"
+        ]
+        assert worker_a.metrics()["stale"] == 1
+        writer.flush(5)
+        assert store.version("c1") == 3
+
+    def test_turn_is_committed_and_unlocked_after_its_writes(self, writer, tmp_path):
+        store = SQLiteStateStore(tmp_path / "state.sqlite3")
+        registry = _registry(writer, state_store=store)
+        store.try_lock("c1", "turn")
+        unlocked = []
+
+        def unlock():
+            saved = writer.storage.load_chat_history("c1")
+            unlocked.append((store.version("c1"), len(saved["messages"])))
+            store.unlock("c1", "turn")
+
+        gate = threading.Event()
+        writer.call(gate.wait)  # hold the writer thread
+        agent = registry.get_or_create("c1", "gpt-5")
+        registry.acquire("c1")
+        agent.add_to_history(UserMessage(content="hi"))
+        registry.release("c1", unlock)
+
+        # release doesn't wait for the writes
+        assert store.version("c1") == 0 and not unlocked
+        gate.set()
+        writer.flush(5)
+
+        assert unlocked == [(1, 2)]
+        assert store.try_lock("c1", "next-turn")
+        assert registry.get("c1") is agent
+
+    def test_agent_is_not_evicted_before_its_turn_is_committed(self, writer, tmp_path):
+        store = SQLiteStateStore(tmp_path / "state.sqlite3")
+        clock = FakeClock()
+        registry = _registry(writer, state_store=store, idle_ttl_seconds=1, clock=clock)
+        store.try_lock("c1", "turn")
+        gate = threading.Event()
+        writer.call(gate.wait)  # hold the writer thread
+        agent = registry.get_or_create("c1", "gpt-5")
+        registry.acquire("c1")
+        agent.add_to_history(UserMessage(content="hi"))
+        registry.release("c1", lambda: store.unlock("c1", "turn"))
+
+        clock.now = 10
+        assert registry.evict() == 0
+        gate.set()
+        writer.flush(5)
+
+        assert registry.evict() == 1
+        writer.flush(5)
+        assert writer.storage.load_chat_history("c1")["end_reason"] == "evicted"
+
+    def test_eviction_skips_snapshot_while_another_worker_holds_the_conversation(self, writer, tmp_path):
+        store = SQLiteStateStore(tmp_path / "state.sqlite3")
+        clock = FakeClock()
+        registry = _registry(writer, state_store=store, idle_ttl_seconds=1, clock=clock)
+        _chat(registry, "c1", "one")
+        writer.flush(5)
+        store.try_lock("c1", "other-worker")
+
+        clock.now = 10
+        registry.evict()
+        writer.flush(5)
+
+        assert writer.storage.load_chat_history("c1").get("end_reason") != "evicted"
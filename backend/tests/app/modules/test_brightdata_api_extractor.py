@@ -0,0 +1,91 @@
+"""
+Tests for app.modules.extractors.brightdata_api_extractor
+
+These tests stub out the BrightData HTTP layer so they run without API keys.
+"""
+
+import asyncio
+import pytest
+
+from app.modules.extractors import brightdata_api_extractor as extractor
+from app.utils.deadline import Deadline
+
+
+def _product(url):
+    return {"title": url, "product_url": url, "price": 10}
+
+
+class TestDeadlinePropagation:
+    """Deadline handling across the extraction stages"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self, monkeypatch):
+        monkeypatch.setattr(extractor, "BRIGHTDATA_API_KEY", "test-key")
+
+    def test_product_fetches_return_partial_results(self, monkeypatch):
+        """Slow product pages are cancelled and fast ones are kept"""
+        async def fake_get_html(url, render_js=True, session=None, timeout=120, deadline=None, cost_budget=None):
+            await asyncio.sleep(5 if "slow" in url else 0)
+            return f"<html>{url}</html>"
+
+        monkeypatch.setattr(extractor, "get_html_with_brightdata_api", fake_get_html)
+        monkeypatch.setattr(extractor, "extract_product_json_ld_strategy", lambda html, url: _product(url))
+
+        links = ["https://a.com/fast-1", "https://a.com/slow-1", "https://a.com/fast-2"]
+        products = asyncio.run(
+            extractor.extract_products_via_brightdata_api(links, deadline=Deadline(0.2))
+        )
+
+        assert [p["product_url"] for p in products] == ["https://a.com/fast-1", "https://a.com/fast-2"]
+
+    def test_multiple_urls_marks_cut_off_stores(self, monkeypatch):
+        """Stores that overrun the shared deadline are reported as timed out"""
+        async def fake_extract(url, max_products=20, context_vars=None, timeout=60, deadline=None, product_sink=None, cost_budget=None):
+            if "slow" in url:
+                await asyncio.sleep(10)
+            return {"success": True, "products": [_product(url)]}
+
+        monkeypatch.setattr(extractor, "extract_products_brightdata_api", fake_extract)
+        monkeypatch.setattr(extractor, "DEADLINE_GRACE_SECONDS", 0)
+
+        results = asyncio.run(extractor.extract_products_from_multiple_urls(
+            ["https://fast.com/c", "https://slow.com/c"],
+            deadline=Deadline(0.2)
+        ))
+
+        assert results["https://fast.com/c"]["success"] is True
+        assert results["https://slow.com/c"]["timed_out"] is True
+        assert results["https://slow.com/c"]["products"] == []
+
+    def test_expired_deadline_skips_fetch(self):
+        """No HTTP request is made once the budget is gone"""
+        html = asyncio.run(extractor.get_html_with_brightdata_api("https://a.com", deadline=Deadline(0)))
+        assert html is None
+
+
+class TestStreamingResults:
+    """Per-store streaming from stream_products_from_multiple_urls"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self, monkeypatch):
+        async def fake_extract(url, max_products=20, context_vars=None, timeout=60, deadline=None, product_sink=None, cost_budget=None):
+            await asyncio.sleep(0.3 if "slow" in url else 0)
+            return {"success": True, "products": [_product(url)]}
+
+        monkeypatch.setattr(extractor, "extract_products_brightdata_api", fake_extract)
+
+    def test_yields_in_completion_order(self):
+        """A fast store is yielded before a slow one listed ahead of it"""
+        async def collect():
+            return [url async for url, _ in extractor.stream_products_from_multiple_urls(
+                ["https://slow.com/c", "https://fast.com/c", "https://fast.com/c"]
+            )]
+
+        assert asyncio.run(collect()) == ["https://fast.com/c", "https://slow.com/c"]
+
+    def test_dict_wrapper_keeps_input_order(self):
+        """extract_products_from_multiple_urls still returns every store keyed by URL"""
+        results = asyncio.run(extractor.extract_products_from_multiple_urls(
+            ["https://slow.com/c", "https://fast.com/c"]
+        ))
+        assert list(results) == ["https://slow.com/c", "https://fast.com/c"]
@@ -0,0 +1,70 @@
+"""
+Tests for token-budgeted context compaction
+"""
+
+from app.models import AssistantMessage, ToolMessage, UserMessage
+from app.models.chat import ToolCall
+from app.modules.agent import Agent
+
+
+def _tool_call(call_id: str, name: str, arguments: str = "{}") -> ToolCall:
+    return ToolCall.model_validate({
+        "id": call_id, "type": "function", "function": {"name": name, "arguments": arguments}
+    })
+
+
+def _agent(budget: int) -> Agent:
+    agent = Agent(system_prompt="be helpful", model="gpt-5")
+    # Budget on top of whatever tool schemas are registered
+    agent._context_builder.budget = budget + agent._context_builder.schema_tokens(agent.tools)
+    agent.resources["products_from_shop.com"] = object()
+    agent.add_to_history(UserMessage(content="find dresses"))
+    agent.add_to_history(AssistantMessage(content=None, tool_calls=[
+        _tool_call("a", "get_resource", '{"resource_id": "products_from_shop.com", "summary": false}')
+    ]))
+    agent.add_to_history(ToolMessage(content="dress " * 8000, tool_call_id="a"))
+    agent.add_to_history(AssistantMessage(content="Found some dresses"))
+    agent.add_to_history(UserMessage(content="cheaper ones?"))
+    agent.add_to_history(AssistantMessage(content=None, tool_calls=[_tool_call("b", "search_web_tool")]))
+    agent.add_to_history(ToolMessage(content="result " * 2000, tool_call_id="b"))
+    return agent
+
+
+class TestContextBuilder:
+    """Prompts are compacted to the model's token budget"""
+
+    def test_under_budget_history_is_sent_as_is(self):
+        agent = _agent(budget=1_000_000)
+
+        prepared = agent._prepare_messages_with_checklist()
+
+        assert len(prepared) == 8
+        assert agent.compaction_decisions == []
+
+    def test_old_tool_results_become_stubs_pointing_at_resources(self):
+        agent = _agent(budget=4_000)
+
+        prepared = agent._prepare_messages_with_checklist()
+
+        stub = prepared[3]
+        assert stub["role"] == "tool" and stub["tool_call_id"] == "a"
+        assert "products_from_shop.com" in stub["content"] and "get_resource" in stub["content"]
+        # The latest tool result is kept in full
+        assert prepared[-1]["content"].startswith("result result")
+
+        decision, = agent.compaction_decisions
+        assert decision["action"] == "stubbed" and decision["tool"] == "get_resource"
+        assert decision["tokens_after"] < decision["tokens_before"]
+
+        # Stubs are reused, not re-decided, on the next request
+        assert agent._prepare_messages_with_checklist()[3] is stub
+        assert len(agent.compaction_decisions) == 1
+
+    def test_oldest_turns_are_dropped_when_stubs_are_not_enough(self):
+        agent = _agent(budget=2_500)
+
+        prepared = agent._prepare_messages_with_checklist()
+
+        # System prompt and first user message stay; the first turn's replies go
+        assert [m["role"] for m in prepared] == ["system", "user", "user", "assistant", "tool"]
+        assert [d["action"] for d in agent.compaction_decisions] == ["stubbed", "dropped"]
@@ -0,0 +1,70 @@
+"""
+Tests for the incrementally maintained pruning index
+"""
+
+from app.models import AssistantMessage, SystemMessage, ToolMessage, UserMessage
+from app.models.chat import ToolCall
+from app.modules.agent import Agent
+from app.modules.history_index import HistoryIndex
+
+
+def _tool_call(call_id: str) -> ToolCall:
+    return ToolCall.model_validate({
+        "id": call_id, "type": "function", "function": {"name": "search_web_tool", "arguments": "{}"}
+    })
+
+
+def _index(messages) -> HistoryIndex:
+    index = HistoryIndex()
+    for message in messages:
+        index.add(message)
+    return index
+
+
+class TestHistoryIndex:
+    """Pruned positions come from the index, not a rescan"""
+
+    def test_essentials_are_kept_ahead_of_recent_window(self):
+        messages = [SystemMessage(content="prompt"), UserMessage(content="first")]
+        messages.append(SystemMessage(content="CHECKLIST v1"))
+        for i in range(20):
+            messages.append(UserMessage(content=f"q{i}"))
+            messages.append(AssistantMessage(content=f"a{i}"))
+
+        pruned = _index(messages).pruned_indexes(recent_count=4)
+
+        assert pruned == [0, 1, 2, 39, 40, 41, 42]
+
+    def test_window_never_opens_inside_a_tool_chain(self):
+        messages = [SystemMessage(content="prompt"), UserMessage(content="first"),
+                    AssistantMessage(content=None, tool_calls=[_tool_call("a"), _tool_call("b")]),
+                    ToolMessage(content="1", tool_call_id="a"),
+                    ToolMessage(content="2", tool_call_id="b"),
+                    AssistantMessage(content="done")]
+
+        # Window would start at the second tool message; it moves to the next safe start
+        assert _index(messages).pruned_indexes(recent_count=2) == [0, 1, 5]
+
+    def test_trailing_tool_call_without_results_is_dropped(self):
+        messages = [SystemMessage(content="prompt"), UserMessage(content="first"),
+                    AssistantMessage(content="thinking"),
+                    AssistantMessage(content=None, tool_calls=[_tool_call("a")])]
+        index = _index(messages)
+
+        assert index.pruned_indexes() == [0, 1, 2]
+
+        index.add(ToolMessage(content="1", tool_call_id="a"))
+        assert index.pruned_indexes() == [0, 1, 2, 3, 4]
+
+    def test_agent_keeps_index_in_step_with_history(self):
+        agent = Agent(system_prompt="be helpful", model="gpt-5")
+        for i in range(40):
+            agent.add_to_history(UserMessage(content=f"q{i}"))
+            agent.add_to_history(AssistantMessage(content=f"a{i}"))
+
+        pruned = agent._prune_message_history()
+
+        assert len(pruned) == 2 + 30
+        assert pruned[0].content == "be helpful"
+        assert pruned[1].content == "q0"
+        assert pruned[-1].content == "a39"
@@ -0,0 +1,84 @@
+"""
+Tests for app.modules.product_sink
+"""
+
+import asyncio
+
+from app.modules.product_sink import ProductSink
+
+
+def _product(name):
+    return {"title": name, "price": 25.0, "brand": "Shop", "product_url": f"https://shop.com/{name}"}
+
+
+class RecordingStream:
+    """Stand-in for Agent.stream_products that records each frame"""
+
+    def __init__(self):
+        self.frames = []
+
+    async def __call__(self, products, title, delay_ms=100):
+        self.frames.append((title, [p.product_name for p in products]))
+
+
+class TestProductSink:
+    """Coalescing behaviour of ProductSink"""
+
+    def test_products_within_window_share_one_frame(self):
+        stream = RecordingStream()
+
+        async def run():
+            sink = ProductSink(stream, window_ms=50)
+            for name in ["a", "b", "c"]:
+                await sink.emit(_product(name), "https://shop.com/dresses")
+            assert stream.frames == []
+            await asyncio.sleep(0.1)
+            return sink
+
+        sink = asyncio.run(run())
+        assert stream.frames == [("Found from shop.com", ["a", "b", "c"])]
+        assert sink.emitted_count == 3
+        assert "https://shop.com/dresses" in sink.streamed_sources
+
+    def test_full_batch_flushes_immediately(self):
+        stream = RecordingStream()
+
+        async def run():
+            sink = ProductSink(stream, window_ms=10_000, max_batch=2)
+            await sink.emit(_product("a"), "https://shop.com/c")
+            await sink.emit(_product("b"), "https://shop.com/c")
+            await sink.emit(_product("c"), "https://other.com/c")
+            assert stream.frames == [("Found from shop.com", ["a", "b"])]
+            await sink.flush()
+
+        asyncio.run(run())
+        assert stream.frames[-1] == ("Found from other.com", ["c"])
+
+    def test_unconvertible_product_is_skipped(self):
+        stream = RecordingStream()
+
+        async def run():
+            sink = ProductSink(stream, window_ms=0)
+            await sink.emit({"title": "bad", "price": 1, "currency": 5}, "https://shop.com/c")
+            await sink.flush()
+            return sink
+
+        sink = asyncio.run(run())
+        assert stream.frames == []
+        assert sink.emitted_count == 0
+
+    def test_each_call_tracks_its_own_streamed_sources(self):
+        stream = RecordingStream()
+
+        async def run():
+            sink = ProductSink(stream, window_ms=0)
+            first = sink.for_call()
+            await first.emit(_product("a"), "https://shop.com/c")
+            await first.flush()
+            second = sink.for_call()
+            return first, second
+
+        first, second = asyncio.run(run())
+        assert "https://shop.com/c" in first.streamed_sources
+        assert second.streamed_sources == set()
+        assert stream.frames == [("Found from shop.com", ["a"])]
@@ -0,0 +1,204 @@
+"""
+Tests for app.modules.tool_executor and parallel tool calls in Agent.run
+"""
+
+import asyncio
+import json
+import time
+
+import pytest
+
+from app.llm.base import BaseLLMProvider
+from app.llm.router import LLMRouter
+from app.models import ChatCompletionResponse, ToolMessage, UserMessage
+from app.models.chat import StreamEventType, ToolCall, ToolExecutionStatus
+from app.modules.agent import Agent
+from app.modules.tool_executor import ToolCallExecutor
+from app.tools import ToolFunction, tool_registry
+
+
+async def sleepy(label: str, seconds: float = 0.2) -> str:
+    await asyncio.sleep(seconds)
+    return f"slept {label}"
+
+
+@pytest.fixture
+def sleepy_tools():
+    """Register the same coroutine as a parallel-safe and an ordered tool"""
+    tool_registry.register("sleepy_parallel", ToolFunction(sleepy, "sleepy_parallel", parallel_safe=True))
+    tool_registry.register("sleepy_ordered", ToolFunction(sleepy, "sleepy_ordered"))
+    yield
+    tool_registry.unregister("sleepy_parallel")
+    tool_registry.unregister("sleepy_ordered")
+
+
+def _call(call_id: str, name: str, **arguments) -> ToolCall:
+    return ToolCall.model_validate({
+        "id": call_id, "type": "function",
+        "function": {"name": name, "arguments": json.dumps(arguments)}
+    })
+
+
+class RecordingExecute:
+    """Stand-in for Agent.execute_tool_call that logs start/end order"""
+
+    def __init__(self):
+        self.log = []
+        self.running = 0
+        self.max_running = 0
+
+    async def __call__(self, tool_call: ToolCall):
+        args = tool_call.parse_arguments()
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        self.log.append(("start", tool_call.id))
+        await asyncio.sleep(args.get("seconds", 0.1))
+        self.log.append(("end", tool_call.id))
+        self.running -= 1
+        return tool_call.id
+
+
+class TestToolCallExecutor:
+    """Scheduling rules of ToolCallExecutor"""
+
+    def test_parallel_safe_calls_overlap_under_cap(self, sleepy_tools):
+        execute = RecordingExecute()
+
+        async def run():
+            executor = ToolCallExecutor(execute, max_concurrency=2)
+            start = time.perf_counter()
+            results = await asyncio.gather(*(
+                executor.submit(_call(f"c{i}", "sleepy_parallel", label=str(i))) for i in range(4)
+            ))
+            return results, time.perf_counter() - start
+
+        results, elapsed = asyncio.run(run())
+
+        assert results == ["c0", "c1", "c2", "c3"]
+        assert execute.max_running == 2
+        assert elapsed < 0.35
+
+    def test_unsafe_call_is_a_barrier(self, sleepy_tools):
+        execute = RecordingExecute()
+
+        async def run():
+            executor = ToolCallExecutor(execute)
+            tasks = [
+                executor.submit(_call("a", "sleepy_parallel", label="a")),
+                executor.submit(_call("b", "sleepy_ordered", label="b")),
+                executor.submit(_call("c", "sleepy_parallel", label="c")),
+            ]
+            await asyncio.gather(*tasks)
+
+        asyncio.run(run())
+
+        assert execute.log == [("start", "a"), ("end", "a"), ("start", "b"), ("end", "b"), ("start", "c"), ("end", "c")]
+
+    def test_finished_calls_are_not_kept_without_a_barrier(self, sleepy_tools):
+        async def run():
+            executor = ToolCallExecutor(RecordingExecute())
+            for i in range(20):
+                await executor.submit(_call(f"c{i}", "sleepy_parallel", label=str(i), seconds=0))
+            await asyncio.sleep(0)
+            return executor._in_flight
+
+        assert asyncio.run(run()) == set()
+
+
+class ToolCallingProvider(BaseLLMProvider):
+    """Returns three tool calls, then a final answer"""
+
+    SUPPORTED_MODELS = ["gpt-5"]
+
+    def __init__(self):
+        super().__init__(api_key="fake")
+        self.turns = 0
+
+    def create_completion(self, messages, model, tools=None, reasoning=None, **kwargs):
+        self.turns += 1
+        if self.turns > 1:
+            message = {"role": "assistant", "content": "done"}
+            finish_reason = "stop"
+        else:
+            message = {"role": "assistant", "content": None, "tool_calls": [
+                _call("slow", "sleepy_parallel", label="slow", seconds=0.3).model_dump(),
+                _call("fast", "sleepy_parallel", label="fast", seconds=0.05).model_dump(),
+                _call("medium", "sleepy_parallel", label="medium", seconds=0.15).model_dump(),
+            ]}
+            finish_reason = "tool_calls"
+        return ChatCompletionResponse.model_validate({
+            "id": "fake", "request_id": "fake", "created": 0, "model": model,
+            "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}]
+        })
+
+
+class TestAgentParallelToolCalls:
+    """Agent.run runs independent calls together and keeps history ordered"""
+
+    def test_completed_events_stream_as_calls_finish(self, sleepy_tools):
+        router = LLMRouter(openai_api_key="fake")
+        router.openai_provider = ToolCallingProvider()
+        agent = Agent(system_prompt="test", model="gpt-5", llm_router=router, stream_tokens=False)
+
+        async def run():
+            start = time.perf_counter()
+            events = [event async for event in agent.run(UserMessage(content="go"))]
+            return events, time.perf_counter() - start
+
+        events, elapsed = asyncio.run(run())
+
+        completed = [e.tool_call_id for e in events
+                     if e.type == StreamEventType.TOOL_EXECUTION and e.status == ToolExecutionStatus.COMPLETED]
+        assert completed == ["fast", "medium", "slow"]
+        assert elapsed < 0.5
+
+        tool_messages = [m for m in agent.message_history if isinstance(m, ToolMessage)]
+        assert [m.tool_call_id for m in tool_messages] == ["slow", "fast", "medium"]
+
+
+class TestExtractProductsOrdering:
+    """extract_products calls of one turn must not clobber each other's resources"""
+
+    def test_concurrent_calls_run_one_after_another(self, monkeypatch):
+        import app.modules.extractors as extractors
+        import app.tools.definitions  # registers extract_products
+        running = []
+        overlaps = []
+
+        async def fake_stream(urls, **kwargs):
+            running.append(urls[0])
+            if len(running) > 1:
+                overlaps.append(list(running))
+            await asyncio.sleep(0.05)
+            running.remove(urls[0])
+            for url in urls:
+                yield url, {"success": True, "products": [
+                    {"title": f"{url} item {i}", "price": 10.0 + i, "brand": "Shop", "product_url": f"{url}/p{i}"}
+                    for i in range(2)
+                ]}
+
+        monkeypatch.setattr(extractors, "stream_products_from_multiple_urls", fake_stream)
+        resources = {}
+        context_vars = {"resources": resources}
+
+        async def execute(tool_call: ToolCall):
+            return await tool_registry.execute_tool_async(
+                tool_call.function.name, context_vars=context_vars, **tool_call.parse_arguments()
+            )
+
+        async def run():
+            executor = ToolCallExecutor(execute)
+            return await asyncio.gather(
+                executor.submit(_call("a", "extract_products", urls=["https://a.com/c"])),
+                executor.submit(_call("b", "extract_products", urls=["https://b.com/c"])),
+            )
+
+        first, second = asyncio.run(run())
+
+        assert overlaps == []
+        assert "https://a.com/c item 0" in first
+        combined = resources["all_extracted_products"]
+        # The combined collection is the last call's, and its tool result says so
+        assert combined.source_url == "https://b.com/c"
+        assert f"all_extracted_products: {len(combined.products)} products" in second
+        assert set(resources) == {"products_from_a.com", "products_from_b.com", "all_extracted_products"}
@@ -0,0 +1,114 @@
+"""
+Tests for app.tools.executors and how ToolFunction uses them
+"""
+
+import asyncio
+import threading
+import time
+
+from app.tools import ToolFunction
+from app.tools.executors import ToolThreadPool, get_thread_pool, loop_runner, thread_pool_metrics
+
+
+def blocking_search(query: str) -> str:
+    time.sleep(0.2)  # Like requests.post in search_web_tool
+    return f"results for {query}"
+
+
+async def async_tool(label: str) -> str:
+    await asyncio.sleep(0)
+    return f"{label} on {threading.current_thread().name}"
+
+
+class TestToolThreadPool:
+    """Sync tools run on worker threads"""
+
+    def test_sync_tools_do_not_block_the_loop(self):
+        tool_func = ToolFunction(blocking_search, "blocking_search", thread_pool="network")
+        ticks = []
+
+        async def heartbeat():
+            for _ in range(5):
+                ticks.append(time.perf_counter())
+                await asyncio.sleep(0.02)
+
+        async def run():
+            start = time.perf_counter()
+            results = await asyncio.gather(
+                *(tool_func.execute_async(query=q) for q in ["a", "b", "c"]),
+                heartbeat()
+            )
+            return results, time.perf_counter() - start
+
+        results, elapsed = asyncio.run(run())
+
+        assert results[:3] == ["results for a", "results for b", "results for c"]
+        assert elapsed < 0.4
+        assert len(ticks) == 5
+        assert get_thread_pool("network").metrics()["completed"] >= 3
+
+    def test_queue_depth_is_tracked(self):
+        pool = ToolThreadPool("test", max_workers=1)
+
+        async def run():
+            tasks = [asyncio.ensure_future(pool.run(time.sleep, 0.1)) for _ in range(3)]
+            await asyncio.sleep(0.05)
+            snapshot = pool.metrics()
+            await asyncio.gather(*tasks)
+            return snapshot
+
+        snapshot = asyncio.run(run())
+        pool.shutdown()
+
+        assert snapshot["active"] == 1
+        assert snapshot["queued"] == 2
+        assert pool.metrics()["completed"] == 3
+        assert pool.metrics()["max_queued"] >= 2
+
+    def test_cancelled_queued_calls_leave_the_queue(self):
+        pool = ToolThreadPool("test", max_workers=1)
+
+        async def run():
+            running = asyncio.ensure_future(pool.run(time.sleep, 0.1))
+            waiting = [asyncio.ensure_future(pool.run(time.sleep, 0.1)) for _ in range(2)]
+            await asyncio.sleep(0.02)
+            for task in waiting:
+                task.cancel()  # like a tool timeout while the call is still queued
+            await asyncio.gather(*waiting, return_exceptions=True)
+            snapshot = pool.metrics()
+            await running
+            return snapshot
+
+        snapshot = asyncio.run(run())
+        pool.shutdown()
+
+        assert snapshot["queued"] == 0
+        assert pool.metrics()["queued"] == 0
+        assert pool.metrics()["active"] == 0
+        assert pool.metrics()["completed"] == 1
+
+    def test_metrics_list_created_pools(self):
+        get_thread_pool("default")
+        assert "default" in thread_pool_metrics()
+
+
+class TestLoopRunner:
+    """Sync execute() of async tools reuses one background loop"""
+
+    def test_execute_reuses_the_runner_thread(self):
+        tool_func = ToolFunction(async_tool, "async_tool")
+
+        first = tool_func.execute(label="first")
+        second = tool_func.execute(label="second")
+
+        assert first == "first on tool-loop-runner"
+        assert second == "second on tool-loop-runner"
+
+    def test_execute_from_inside_a_running_loop(self):
+        tool_func = ToolFunction(async_tool, "async_tool")
+
+        async def caller():
+            return tool_func.execute(label="nested")
+
+        assert asyncio.run(caller()) == "nested on tool-loop-runner"
+        assert loop_runner.run(async_tool("direct")) == "direct on tool-loop-runner"
@@ -0,0 +1,117 @@
+"""
+Tests for per-tool timeouts, concurrency caps and cost budgets
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from app.modules.extractors import brightdata_api_extractor
+from app.tools import ToolFunction, ToolRegistry
+from app.tools import limits
+from app.utils.budget import CostBudget
+
+
+async def stuck_extraction(stores: int, context_vars=None) -> str:
+    """Finishes one store per 0.1s and ignores its deadline"""
+    tool_run = context_vars['tool_run']
+    tool_run.partial["stores_done"] = []
+    for i in range(stores):
+        await asyncio.sleep(0.1)
+        tool_run.partial["stores_done"].append(f"store{i}")
+        tool_run.record_timing(f"store{i}", tool_run.elapsed())
+    return "all done"
+
+
+async def polite_extraction(context_vars=None) -> str:
+    """Stops as soon as its deadline passes"""
+    deadline = context_vars['tool_run'].deadline
+    while not deadline.expired():
+        await asyncio.sleep(0.01)
+    return "partial, cut off by deadline"
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    monkeypatch.setattr(limits, "TOOL_TIMEOUT_GRACE_SECONDS", 0.1)
+    monkeypatch.setattr("app.tools.registry.TOOL_TIMEOUT_GRACE_SECONDS", 0.1)
+    return ToolRegistry()
+
+
+class TestToolTimeouts:
+    """The registry bounds how long a tool may run"""
+
+    def test_overrunning_tool_returns_structured_partial_result(self, registry):
+        registry.register("stuck", ToolFunction(stuck_extraction, "stuck", timeout=0.25))
+
+        start = time.perf_counter()
+        result = asyncio.run(registry.execute_tool_async("stuck", context_vars={}, stores=20))
+        elapsed = time.perf_counter() - start
+
+        assert elapsed < 1.0
+        assert result["status"] == "timed_out"
+        assert result["partial_result"]["stores_done"][:2] == ["store0", "store1"]
+        assert "store0" in result["timing"]["stages"]
+        assert result["timing"]["elapsed_seconds"] >= 0.25
+
+    def test_cooperative_tool_keeps_its_own_result(self, registry):
+        registry.register("polite", ToolFunction(polite_extraction, "polite", timeout=0.1))
+
+        result = asyncio.run(registry.execute_tool_async("polite", context_vars={}))
+
+        assert result == "partial, cut off by deadline"
+
+    def test_context_vars_are_not_mutated(self, registry):
+        registry.register("polite", ToolFunction(polite_extraction, "polite", timeout=0.01))
+        context_vars = {"resources": {}}
+
+        asyncio.run(registry.execute_tool_async("polite", context_vars=context_vars))
+
+        assert "tool_run" not in context_vars
+
+
+class TestToolConcurrency:
+    """max_concurrency caps simultaneous calls of one tool"""
+
+    def test_calls_beyond_the_cap_queue(self, registry):
+        running = {"now": 0, "max": 0}
+
+        async def busy(context_vars=None) -> float:
+            running["now"] += 1
+            running["max"] = max(running["max"], running["now"])
+            await asyncio.sleep(0.05)
+            running["now"] -= 1
+            return context_vars['tool_run'].queued_seconds
+
+        registry.register("busy", ToolFunction(busy, "busy", max_concurrency=2))
+
+        async def run():
+            return await asyncio.gather(*(registry.execute_tool_async("busy", context_vars={}) for _ in range(4)))
+
+        queued = asyncio.run(run())
+
+        assert running["max"] == 2
+        assert max(queued) >= 0.04
+
+
+class TestCostBudget:
+    """cost_budget stops paid requests once spent"""
+
+    def test_budget_refuses_past_limit(self):
+        budget = CostBudget(2)
+        assert budget.charge() and budget.charge()
+        assert not budget.charge()
+        assert budget.exhausted()
+        assert budget.spent == 2 and budget.refused == 1
+
+    def test_http_layer_skips_requests_when_spent(self, monkeypatch):
+        monkeypatch.setattr(brightdata_api_extractor, "BRIGHTDATA_API_KEY", "fake")
+        budget = CostBudget(0)
+
+        html = asyncio.run(brightdata_api_extractor.get_html_with_brightdata_api(
+            "https://shop.com/dresses", cost_budget=budget
+        ))
+
+        assert html is None
+        assert budget.refused == 1
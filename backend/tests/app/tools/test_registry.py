@@ -0,0 +1,62 @@
+"""
+Tests for the ToolRegistry schema cache
+"""
+
+import json
+
+from app.llm.xlm_provider import XLMProvider
+from app.tools import ToolFunction, ToolRegistry
+
+
+def lookup(query: str, limit: int = 5, context_vars=None) -> str:
+    return query
+
+
+def other(name: str) -> str:
+    return name
+
+
+class TestToolSchemaCache:
+    """Schemas are built once per registry version"""
+
+    def test_schemas_are_reused_until_tools_change(self):
+        registry = ToolRegistry()
+        registry.register("lookup", ToolFunction(lookup, "lookup", "Look something up"))
+
+        first = registry.api_tool_schemas()
+        assert registry.api_tool_schemas() is first
+        assert first[0]["function"]["name"] == "lookup"
+        assert first[0]["function"]["parameters"]["required"] == ["query"]
+        assert "context_vars" not in first[0]["function"]["parameters"]["properties"]
+
+        version = registry.version
+        registry.register("other", ToolFunction(other, "other", "Other"))
+        second = registry.api_tool_schemas()
+
+        assert registry.version == version + 1
+        assert second is not first
+        assert [t["function"]["name"] for t in second] == ["lookup", "other"]
+
+        registry.unregister("lookup")
+        assert [t["function"]["name"] for t in registry.api_tool_schemas()] == ["other"]
+
+    def test_json_bytes_match_dicts(self):
+        registry = ToolRegistry()
+        registry.register("lookup", ToolFunction(lookup, "lookup", "Look something up"))
+
+        schemas = registry.api_tool_schemas()
+
+        assert json.loads(schemas.json_bytes) == list(schemas)
+        assert registry.to_openai_format()[0].function.name == "lookup"
+
+    def test_glm_payload_splices_cached_tool_json(self):
+        registry = ToolRegistry()
+        registry.register("lookup", ToolFunction(lookup, "lookup", "Look something up"))
+        provider = XLMProvider(api_key="fake")
+
+        params = {"model": "glm-4.5", "messages": [{"role": "user", "content": "hi"}],
+                  "tools": registry.api_tool_schemas()}
+        body = json.loads(provider._encode_payload(params))
+
+        assert body["model"] == "glm-4.5"
+        assert body["tools"] == list(registry.api_tool_schemas())
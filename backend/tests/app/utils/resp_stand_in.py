@@ -0,0 +1,172 @@
+"""
+Local stand-in for a Redis server, for testing RedisStateStore.
+
+Speaks RESP2 over TCP and implements the commands the state store uses
+(GET, SET with NX/PX, DEL, INCR, PEXPIRE, WATCH/UNWATCH/MULTI/EXEC, plus
+PING, SELECT and FLUSHDB). One thread per client; a single lock makes every
+command atomic, like Redis' single-threaded command loop.
+"""
+
+import socketserver
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class _Data:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values: Dict[str, Tuple[str, Optional[float]]] = {}
+        # Bumped on every write to a key, for WATCH
+        self.revisions: Dict[str, int] = {}
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self.values.get(key)
+        if entry and entry[1] is not None and entry[1] <= time.monotonic():
+            del self.values[key]
+            self.touch(key)
+            return None
+        return entry[0] if entry else None
+
+    def set(self, key: str, value: str, expires_at: Optional[float] = None) -> None:
+        self.values[key] = (value, expires_at)
+        self.touch(key)
+
+    def touch(self, key: str) -> None:
+        self.revisions[key] = self.revisions.get(key, 0) + 1
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        self.watched: Dict[str, int] = {}
+        self.queued: Optional[List[List[str]]] = None
+        while True:
+            try:
+                command = self._read_command()
+            except (ConnectionError, ValueError):
+                return
+            if command is None:
+                return
+            self.wfile.write(self._encode(self._dispatch(command)))
+
+    def _read_command(self) -> Optional[List[str]]:
+        line = self.rfile.readline()
+        if not line:
+            return None
+        count = int(line[1:-2])
+        args = []
+        for _ in range(count):
+            length = int(self.rfile.readline()[1:-2])
+            args.append(self.rfile.read(length + 2)[:-2].decode())
+        return args
+
+    def _encode(self, reply: Any) -> bytes:
+        if isinstance(reply, Exception):
+            return b"-ERR %s\r\n" % str(reply).encode()
+        if reply is None:
+            return b"$-1\r\n"
+        if reply is True:
+            return b"+OK\r\n"
+        if isinstance(reply, int):
+            return b":%d\r\n" % reply
+        if isinstance(reply, list):
+            return b"*%d\r\n" % len(reply) + b"".join(self._encode(item) for item in reply)
+        if isinstance(reply, tuple):  # simple string
+            return b"+%s\r\n" % reply[0].encode()
+        data = str(reply).encode()
+        return b"$%d\r\n%s\r\n" % (len(data), data)
+
+    def _dispatch(self, command: List[str]) -> Any:
+        name = command[0].upper()
+        data: _Data = self.server.data
+        with data.lock:
+            if self.queued is not None and name not in ("EXEC", "MULTI", "WATCH"):
+                self.queued.append(command)
+                return ("QUEUED",)
+            if name == "WATCH":
+                for key in command[1:]:
+                    data.get(key)
+                    self.watched[key] = data.revisions.get(key, 0)
+                return True
+            if name == "UNWATCH":
+                self.watched = {}
+                return True
+            if name == "MULTI":
+                self.queued = []
+                return True
+            if name == "EXEC":
+                queued, self.queued = self.queued or [], None
+                watched, self.watched = self.watched, {}
+                for key, revision in watched.items():
+                    data.get(key)
+                    if data.revisions.get(key, 0) != revision:
+                        return None
+                return [self._run(data, queued_command) for queued_command in queued]
+            return self._run(data, command)
+
+    def _run(self, data: _Data, command: List[str]) -> Any:
+        name, args = command[0].upper(), command[1:]
+        if name == "PING":
+            return ("PONG",)
+        if name in ("SELECT", "AUTH"):
+            return True
+        if name == "FLUSHDB":
+            for key in list(data.values):
+                data.touch(key)
+            data.values.clear()
+            return True
+        if name == "GET":
+            return data.get(args[0])
+        if name == "SET":
+            key, value, options = args[0], args[1], [option.upper() for option in args[2:]]
+            expires_at = None
+            if "PX" in options:
+                expires_at = time.monotonic() + int(args[2 + options.index("PX") + 1]) / 1000
+            if "NX" in options and data.get(key) is not None:
+                return None
+            data.set(key, value, expires_at)
+            return True
+        if name == "DEL":
+            deleted = 0
+            for key in args:
+                if data.get(key) is not None:
+                    del data.values[key]
+                    data.touch(key)
+                    deleted += 1
+            return deleted
+        if name == "INCR":
+            value = int(data.get(args[0]) or 0) + 1
+            data.set(args[0], str(value), data.values.get(args[0], (None, None))[1])
+            return value
+        if name == "PEXPIRE":
+            value = data.get(args[0])
+            if value is None:
+                return 0
+            data.set(args[0], value, time.monotonic() + int(args[1]) / 1000)
+            return 1
+        return ValueError(f"unknown command '{name}'")
+
+
+class RespStandIn(socketserver.ThreadingTCPServer):
+    """In-process Redis-protocol server on localhost; ``port`` 0 picks a free one"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, port: int = 0):
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.data = _Data()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def start(self) -> "RespStandIn":
+        self._thread = threading.Thread(target=self.serve_forever, name="resp-stand-in", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
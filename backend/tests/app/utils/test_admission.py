@@ -0,0 +1,114 @@
+"""
+Tests for run admission control
+"""
+
+import asyncio
+
+import pytest
+
+from app.utils.admission import MAX_RETRY_AFTER_SECONDS, RunAdmission, RunRejected
+
+
+class TestRunAdmission:
+    """Per-conversation serialization and the global run limit"""
+
+    def test_turns_of_one_conversation_run_one_at_a_time_in_order(self):
+        admission = RunAdmission(max_concurrent=4, max_queued_per_conversation=5)
+        order = []
+
+        async def turn(n):
+            ticket = await admission.admit("c1")
+            order.append(("start", n))
+            await asyncio.sleep(0.01)
+            order.append(("end", n))
+            ticket.release()
+
+        async def main():
+            await asyncio.gather(*(turn(n) for n in range(3)))
+
+        asyncio.run(main())
+        assert order == [("start", 0), ("end", 0), ("start", 1), ("end", 1), ("start", 2), ("end", 2)]
+        assert admission.metrics()["conversations"] == 0
+
+    def test_global_limit_queues_other_conversations(self):
+        admission = RunAdmission(max_concurrent=2)
+        peak = running = 0
+
+        async def turn(conversation_id):
+            nonlocal peak, running
+            ticket = await admission.admit(conversation_id)
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            ticket.release()
+
+        async def main():
+            await asyncio.gather(*(turn(f"c{n}") for n in range(6)))
+
+        asyncio.run(main())
+        metrics = admission.metrics()
+        assert peak == 2
+        assert metrics["admitted"] == metrics["completed"] == 6
+        assert metrics["running"] == metrics["queued"] == 0
+        assert metrics["queue_wait_seconds"]["samples"] == 6
+        assert metrics["queue_wait_seconds"]["max"] > 0
+
+    def test_full_queues_are_rejected_with_retry_after(self):
+        admission = RunAdmission(max_concurrent=1, max_queued=1, max_queued_per_conversation=1)
+
+        async def main():
+            first = await admission.admit("c1")
+            waiting = asyncio.ensure_future(admission.admit("c1"))
+            await asyncio.sleep(0)
+
+            with pytest.raises(RunRejected) as busy:
+                await admission.admit("c1")
+            assert busy.value.reason == "conversation_busy"
+            assert busy.value.retry_after >= 1
+
+            with pytest.raises(RunRejected) as full:
+                await admission.admit("c2")
+            assert full.value.reason == "queue_full"
+
+            first.release()
+            (await waiting).release()
+
+        asyncio.run(main())
+        metrics = admission.metrics()
+        assert metrics["rejected_conversation_busy"] == 1
+        assert metrics["rejected_queue_full"] == 1
+        assert metrics["conversations"] == 0
+
+    def test_queue_timeout_rejects_and_frees_the_place_in_line(self):
+        admission = RunAdmission(max_concurrent=1, queue_timeout=0.02)
+
+        async def main():
+            first = await admission.admit("c1")
+            with pytest.raises(RunRejected) as timeout:
+                await admission.admit("c2")
+            assert timeout.value.reason == "queue_timeout"
+            assert admission.queued == 0
+
+            first.release()
+            first.release()  # idempotent
+            (await admission.admit("c2")).release()
+
+        asyncio.run(main())
+        assert admission.running == 0
+
+    def test_retry_after_follows_run_times(self):
+        now = [0.0]
+        admission = RunAdmission(max_concurrent=2, clock=lambda: now[0])
+
+        async def main():
+            for _ in range(30):
+                ticket = await admission.admit("c1")
+                now[0] += 4.0
+                ticket.release()
+
+        asyncio.run(main())
+        assert admission.metrics()["mean_run_seconds"] == pytest.approx(4.0, abs=0.1)
+        # Two runs ahead, two slots: about one run time
+        assert admission.retry_after(2) in (4, 5)
+        assert admission.retry_after(10_000) == MAX_RETRY_AFTER_SECONDS
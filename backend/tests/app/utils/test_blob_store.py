@@ -0,0 +1,101 @@
+"""
+Tests for out-of-line tool result storage
+"""
+
+import json
+
+from app.models.chat import ToolCall
+from app.models.chat.content import TextContent
+from app.modules.agent import Agent
+from app.tools import tool_registry
+from app.utils.blob_store import BLOB_SUMMARY_CHARS, BlobStorage, ConversationBlobStore
+
+import app.tools.definitions  # noqa: F401 - registers read_tool_result
+
+
+def _tool_call(call_id: str) -> ToolCall:
+    return ToolCall.model_validate({
+        "id": call_id, "type": "function", "function": {"name": "extract_products", "arguments": "{}"}
+    })
+
+
+class TestConversationBlobStore:
+    """Blobs are content addressed and read back by handle"""
+
+    def test_put_get_read(self, tmp_path):
+        store = BlobStorage(str(tmp_path)).for_conversation("conv-1")
+
+        handle = store.put("abcdef" * 1000)
+
+        assert handle.startswith("blob:")
+        assert store.put("abcdef" * 1000) == handle
+        assert (tmp_path / "conv-1" / "blobs").is_dir()
+        assert store.get(handle) == "abcdef" * 1000
+        assert store.read(handle, offset=2, limit=4) == "cdef"
+        assert store.get("blob:ffff") is None
+        assert store.get("blob:../../etc/passwd") is None
+
+    def test_store_without_directory_uses_temporary_one(self):
+        store = ConversationBlobStore()
+        assert store.get("blob:abc") is None
+
+        handle = store.put("x" * 10)
+
+        assert store.directory.is_dir()
+        assert store.get(handle) == "x" * 10
+
+
+class TestAgentToolResults:
+    """Large tool results are kept out of line in history"""
+
+    def _agent(self, tmp_path) -> Agent:
+        agent = Agent(system_prompt="be helpful", model="gpt-5")
+        agent.blob_store = ConversationBlobStore(tmp_path)
+        agent.context_vars['blob_store'] = agent.blob_store
+        return agent
+
+    def test_large_result_becomes_summary_and_handle(self, tmp_path):
+        agent = self._agent(tmp_path)
+        result = {"products": [{"name": f"dress {i}", "price": "$10"} for i in range(2000)]}
+
+        message = agent._tool_message(_tool_call("a"), result)
+
+        assert len(message.content) < BLOB_SUMMARY_CHARS + 300
+        handle = message.content.split("stored as ")[1].split(".")[0]
+        assert json.loads(agent.blob_store.get(handle)) == result
+
+        chunk = tool_registry.execute_tool("read_tool_result", context_vars=agent.context_vars,
+                                           handle=handle, offset=BLOB_SUMMARY_CHARS, limit=100)
+        assert chunk.startswith(json.dumps(result)[BLOB_SUMMARY_CHARS:BLOB_SUMMARY_CHARS + 100])
+        assert "read on with offset" in chunk
+
+    def test_pages_at_the_default_limit_stay_inline(self, tmp_path):
+        agent = self._agent(tmp_path)
+        text = "".join(f"line {i}\n" for i in range(3000))
+        handle = agent.blob_store.put(text)
+
+        pages, offset = [], 0
+        while True:
+            chunk = tool_registry.execute_tool("read_tool_result", context_vars=agent.context_vars, handle=handle, offset=offset)
+            message = agent._tool_message(_tool_call(f"r{offset}"), chunk)
+            assert message.content == chunk  # not blobbed again
+            pages.append(chunk.split("\n... [characters")[0])
+            if "read on with offset=" not in chunk:
+                break
+            offset = int(chunk.rsplit("offset=", 1)[1].rstrip("]"))
+
+        assert "".join(pages) == text
+
+    def test_small_and_multimodal_results_stay_inline(self, tmp_path):
+        agent = self._agent(tmp_path)
+
+        assert agent._tool_message(_tool_call("a"), "short").content == "short"
+        content = [TextContent(text="a few products")]
+        assert agent._tool_message(_tool_call("b"), content).content == content
+
+    def test_large_text_only_content_is_stored(self, tmp_path):
+        agent = self._agent(tmp_path)
+
+        message = agent._tool_message(_tool_call("a"), [TextContent(text="p" * 10000)])
+
+        assert isinstance(message.content, str) and "blob:" in message.content
@@ -0,0 +1,109 @@
+"""
+Tests for the chat history journal
+"""
+
+import json
+
+from app.models import AssistantMessage, SystemMessage, UserMessage
+from app.utils.chat_storage import CHAT_FILENAME, JOURNAL_FILENAME, ChatHistoryStorage
+from app.utils.storage_codec import read_document
+
+
+class TestChatHistoryJournal:
+    """Messages are appended as journal lines and compacted on eviction"""
+
+    def test_append_writes_one_line_per_message(self, tmp_path):
+        storage = ChatHistoryStorage(str(tmp_path))
+        storage.start_conversation("c1", {"model": "gpt-5"})
+
+        storage.append_message("c1", SystemMessage(content="prompt"))
+        storage.append_message("c1", UserMessage(content="find dresses"))
+
+        lines = (tmp_path / "c1" / JOURNAL_FILENAME).read_text().splitlines()
+        assert [json.loads(line)["record"] for line in lines] == ["header", "message", "message"]
+
+        data = storage.load_chat_history("c1")
+        assert data["message_count"] == 2
+        assert data["metadata"] == {"model": "gpt-5"}
+        assert data["messages"][1]["content"] == "find dresses"
+
+    def test_end_compacts_to_json_shape(self, tmp_path):
+        storage = ChatHistoryStorage(str(tmp_path))
+        storage.start_conversation("c1", {"model": "gpt-5"})
+        storage.append_message("c1", UserMessage(content="hi"))
+        storage.append_message("c1", AssistantMessage(content="hello"))
+
+        assert storage.end_conversation("c1", metadata={"end": 1}, end_reason="evicted")
+
+        assert not (tmp_path / "c1" / JOURNAL_FILENAME).exists()
+        data = read_document(tmp_path / "c1" / CHAT_FILENAME)
+        assert data["conversation_id"] == "c1"
+        assert data["message_count"] == 2
+        assert data["metadata"] == {"model": "gpt-5", "end": 1}
+        assert data["end_reason"] == "evicted"
+        assert "last_updated" in data and "ended_at" in data
+
+    def test_end_of_a_turn_only_appends_a_footer(self, tmp_path):
+        storage = ChatHistoryStorage(str(tmp_path))
+        storage.start_conversation("c1", {"model": "gpt-5"})
+        storage.append_message("c1", UserMessage(content="hi"))
+        assert storage.end_conversation("c1", metadata={"turn": 1}, end_reason="completed")
+        storage.append_message("c1", UserMessage(content="again"))
+        assert storage.end_conversation("c1", metadata={"turn": 2}, end_reason="completed")
+
+        assert not (tmp_path / "c1" / CHAT_FILENAME).exists()
+        lines = (tmp_path / "c1" / JOURNAL_FILENAME).read_text().splitlines()
+        assert [json.loads(line)["record"] for line in lines] == ["header", "message", "footer", "message", "footer"]
+
+        data = storage.load_chat_history("c1")
+        assert [m["content"] for m in data["messages"]] == ["hi", "again"]
+        assert data["metadata"] == {"model": "gpt-5", "turn": 2}
+        assert data["end_reason"] == "completed"
+        assert storage.read_messages_page("c1", limit=1)["messages"][0]["content"] == "again"
+
+    def test_large_journals_are_compacted_at_the_end_of_a_turn(self, tmp_path, monkeypatch):
+        monkeypatch.setattr("app.utils.chat_storage.COMPACT_JOURNAL_BYTES", 1000)
+        storage = ChatHistoryStorage(str(tmp_path))
+        storage.start_conversation("c1")
+        storage.append_message("c1", UserMessage(content="short"))
+        storage.end_conversation("c1")
+        assert (tmp_path / "c1" / JOURNAL_FILENAME).exists()
+
+        storage.append_message("c1", UserMessage(content="x" * 1000))
+        storage.end_conversation("c1")
+
+        assert not (tmp_path / "c1" / JOURNAL_FILENAME).exists()
+        data = read_document(tmp_path / "c1" / CHAT_FILENAME)
+        assert [m["content"] for m in data["messages"]] == ["short", "x" * 1000]
+
+    def test_conversation_continues_after_end(self, tmp_path):
+        storage = ChatHistoryStorage(str(tmp_path))
+        storage.start_conversation("c1")
+        storage.append_message("c1", UserMessage(content="first"))
+        storage.end_conversation("c1", end_reason="evicted")
+
+        storage.append_message("c1", UserMessage(content="second"))
+        assert [m["content"] for m in storage.load_chat_history("c1")["messages"]] == ["first", "second"]
+
+        storage.end_conversation("c1", end_reason="evicted")
+        data = read_document(tmp_path / "c1" / CHAT_FILENAME)
+        assert [m["content"] for m in data["messages"]] == ["first", "second"]
+
+    def test_old_json_files_are_still_read(self, tmp_path):
+        (tmp_path / "c1").mkdir()
+        old = {"conversation_id": "c1", "timestamp": "2025-01-01T00:00:00", "message_count": 1,
+               "metadata": {}, "messages": [{"role": "user", "content": "old"}]}
+        (tmp_path / "c1" / CHAT_FILENAME).write_text(json.dumps(old, indent=2))
+        storage = ChatHistoryStorage(str(tmp_path))
+
+        assert storage.load_chat_history("c1") == old
+        assert storage.list_conversations()[0]["message_count"] == 1
+
+    def test_torn_last_line_is_skipped(self, tmp_path):
+        storage = ChatHistoryStorage(str(tmp_path))
+        storage.start_conversation("c1")
+        storage.append_message("c1", UserMessage(content="kept"))
+        with open(tmp_path / "c1" / JOURNAL_FILENAME, 'a') as f:
+            f.write('{"record": "message", "mess')
+
+        assert [m["content"] for m in storage.load_chat_history("c1")["messages"]] == ["kept"]
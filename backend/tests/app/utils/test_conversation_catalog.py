@@ -0,0 +1,112 @@
+"""
+Tests for the SQLite conversation catalog
+"""
+
+import json
+from pathlib import Path
+
+from app.models import AssistantMessage, UserMessage
+from app.utils.chat_storage import CHAT_FILENAME, JOURNAL_FILENAME, ChatHistoryStorage
+from app.utils.conversation_catalog import CATALOG_FILENAME
+
+
+class TestConversationCatalog:
+    """Listing and retention read the catalog instead of the files"""
+
+    def test_lifecycle_updates_the_row(self, tmp_path):
+        storage = ChatHistoryStorage(str(tmp_path))
+        storage.start_conversation("c1", {"model": "gpt-5"})
+        storage.append_message("c1", UserMessage(content="hi"))
+        storage.append_message("c1", AssistantMessage(content="hello"))
+
+        entry = storage.catalog.get("c1")
+        assert entry["message_count"] == 2
+        assert entry["model"] == "gpt-5"
+        assert entry["ended_at"] is None
+
+        storage.end_conversation("c1", metadata={"turns": 1}, end_reason="completed")
+
+        entry = storage.catalog.get("c1")
+        assert entry["end_reason"] == "completed"
+        assert entry["filepath"].endswith(JOURNAL_FILENAME)
+        assert entry["message_count"] == 2
+        assert entry["metadata"] == {"model": "gpt-5", "turns": 1}
+
+        storage.end_conversation("c1", end_reason="evicted")
+
+        entry = storage.catalog.get("c1")
+        assert entry["end_reason"] == "evicted"
+        assert entry["filepath"].endswith(CHAT_FILENAME)
+        assert entry["message_count"] == 2
+
+    def test_catalog_opens_on_first_use(self, tmp_path):
+        storage = ChatHistoryStorage(str(tmp_path))
+        assert not (tmp_path / CATALOG_FILENAME).exists()
+
+        storage.start_conversation("c1", {"model": "gpt-5"})
+
+        assert (tmp_path / CATALOG_FILENAME).exists()
+        assert storage.catalog.get("c1") is not None
+
+    def test_list_is_paginated_newest_first(self, tmp_path):
+        storage = ChatHistoryStorage(str(tmp_path))
+        for i in range(5):
+            storage.catalog.upsert(f"c{i}", f"/x/c{i}", started_at=f"2025-01-0{i + 1}T00:00:00")
+
+        page = storage.list_conversations(limit=2, offset=1)
+
+        assert [c["conversation_id"] for c in page] == ["c3", "c2"]
+        assert storage.count_conversations() == 5
+
+    def test_existing_files_are_indexed_when_catalog_is_created(self, tmp_path):
+        (tmp_path / "c1").mkdir()
+        (tmp_path / "c1" / CHAT_FILENAME).write_text(json.dumps({
+            "conversation_id": "c1", "timestamp": "2025-01-01T00:00:00", "message_count": 3,
+            "metadata": {"model": "gpt-5"}, "messages": []
+        }))
+        (tmp_path / "legacy_20250102_000000.json").write_text(json.dumps({
+            "conversation_id": "legacy", "timestamp": "2025-01-02T00:00:00", "message_count": 1,
+            "metadata": {}, "messages": []
+        }))
+
+        storage = ChatHistoryStorage(str(tmp_path))
+        conversations = storage.list_conversations()
+
+        assert (tmp_path / CATALOG_FILENAME).exists()
+        assert [(c["conversation_id"], c["structure"]) for c in conversations] == [("legacy", "old"), ("c1", "new")]
+        assert ChatHistoryStorage(str(tmp_path)).count_conversations() == 2
+
+    def test_cleanup_deletes_only_expired_conversations(self, tmp_path):
+        storage = ChatHistoryStorage(str(tmp_path))
+        for conversation_id in ("old", "recent"):
+            storage.start_conversation(conversation_id)
+            storage.append_message(conversation_id, UserMessage(content="hi"))
+            storage.end_conversation(conversation_id)
+        (tmp_path / "old" / "blobs").mkdir()
+        (tmp_path / "old" / "blobs" / "b1.txt").write_text("tool output")
+        storage.save_chat_history("legacy", [UserMessage(content="hi")])
+        legacy_file = Path(storage.catalog.get("legacy")["filepath"])
+        (tmp_path / "notes.json").write_text("{}")
+        for entry in (storage.catalog.get("old"), storage.catalog.get("legacy")):
+            storage.catalog.upsert(entry["conversation_id"], entry["filepath"], started_at="2000-01-01T00:00:00",
+                                   ended_at="2000-01-01T00:00:00", structure=entry["structure"])
+
+        assert storage.cleanup_old_files(days_to_keep=30) == 2
+
+        # The expired folder goes whole; the legacy file goes on its own
+        assert not (tmp_path / "old").exists()
+        assert not legacy_file.exists()
+        assert (tmp_path / "recent" / JOURNAL_FILENAME).exists()
+        assert (tmp_path / "notes.json").exists()
+        assert (tmp_path / CATALOG_FILENAME).exists()
+        assert [c["conversation_id"] for c in storage.list_conversations()] == ["recent"]
+
+    def test_resumed_conversation_is_not_expired_by_an_old_end(self, tmp_path):
+        storage = ChatHistoryStorage(str(tmp_path))
+        storage.start_conversation("c1")
+        storage.end_conversation("c1")
+        storage.catalog.record_end("c1", "2000-01-01T00:00:00", "completed", {})
+        storage.append_message("c1", UserMessage(content="back again"))
+
+        assert storage.catalog.inactive_since("2020-01-01T00:00:00") == []
+        assert storage.cleanup_old_files(days_to_keep=30) == 0
@@ -0,0 +1,124 @@
+"""
+Tests for the SSE event bus
+"""
+
+import asyncio
+import threading
+
+import pytest
+
+from app.utils.event_bus import HEARTBEAT, EventBus
+
+
+async def collect(bus, source, until=None):
+    return [event async for event in bus.merge(source, until=until)]
+
+
+class TestEventBus:
+    """Merging the agent generator with callback events"""
+
+    def test_callback_events_are_sent_before_the_next_agent_event(self):
+        received = []
+
+        async def main():
+            bus = EventBus(heartbeat_seconds=5)
+            released = asyncio.Event()
+
+            async def agent_run():
+                yield "llm_call"
+                # A long tool call that reports progress as it goes
+                bus.publish({"status": "progress", "n": 1})
+                await released.wait()
+                yield "tool_done"
+
+            async for event in bus.merge(agent_run()):
+                received.append(event)
+                if event == {"status": "progress", "n": 1}:
+                    released.set()
+
+        asyncio.run(asyncio.wait_for(main(), 2))
+        assert received == ["llm_call", {"status": "progress", "n": 1}, "tool_done"]
+
+    def test_events_from_worker_threads_keep_their_order(self):
+        async def main():
+            bus = EventBus(heartbeat_seconds=5)
+
+            def tool():
+                for n in range(50):
+                    bus.publish({"status": "grid", "n": n})
+
+            async def agent_run():
+                await asyncio.to_thread(tool)
+                yield "done"
+
+            return await collect(bus, agent_run())
+
+        events = asyncio.run(asyncio.wait_for(main(), 5))
+        assert events == [{"status": "grid", "n": n} for n in range(50)] + ["done"]
+
+    def test_heartbeats_while_idle(self):
+        async def main():
+            bus = EventBus(heartbeat_seconds=0.01)
+
+            async def agent_run():
+                await asyncio.sleep(0.2)
+                yield "done"
+
+            return await collect(bus, agent_run())
+
+        events = asyncio.run(main())
+        assert events[-1] == "done"
+        assert events.count(HEARTBEAT) >= 2
+
+    def test_stops_after_until_with_earlier_events_flushed(self):
+        async def main():
+            bus = EventBus(heartbeat_seconds=5)
+
+            async def agent_run():
+                bus.publish("grid")
+                yield "complete"
+                yield "never"
+
+            return await collect(bus, agent_run(), until=lambda event: event == "complete")
+
+        assert asyncio.run(main()) == ["grid", "complete"]
+
+    def test_bounded_buffer_drops_progress_but_keeps_other_events(self):
+        async def main():
+            bus = EventBus(max_buffered=2, heartbeat_seconds=5)
+
+            async def agent_run():
+                # Nothing is read while the agent publishes
+                for n in range(5):
+                    bus.publish({"status": "progress", "n": n})
+                bus.publish({"status": "completed"})
+                yield "done"
+
+            events = await collect(bus, agent_run())
+            return bus, events
+
+        bus, events = asyncio.run(main())
+        assert events == [{"status": "progress", "n": 0}, {"status": "progress", "n": 1},
+                          {"status": "completed"}, "done"]
+        assert bus.dropped == 3
+        assert bus.max_depth == 2
+
+    def test_source_errors_are_raised_and_publishing_stops(self):
+        async def main():
+            bus = EventBus(heartbeat_seconds=5)
+
+            async def agent_run():
+                yield "llm_call"
+                raise RuntimeError("llm down")
+
+            with pytest.raises(RuntimeError, match="llm down"):
+                await collect(bus, agent_run())
+
+            # Late events from a tool thread are ignored, not blocked on
+            thread = threading.Thread(target=bus.publish, args=("late",))
+            thread.start()
+            thread.join(1)
+            assert not thread.is_alive()
+            return bus
+
+        assert asyncio.run(main()).published == 1
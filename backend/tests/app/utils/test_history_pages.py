@@ -0,0 +1,98 @@
+"""
+Tests for paginated chat history reads
+"""
+
+import gzip
+import json
+
+from starlette.requests import Request
+
+from app.models import AssistantMessage, UserMessage
+from app.utils.chat_storage import ChatHistoryStorage
+from app.utils.compression import compressed_json_response
+from app.utils.history_pages import paginate_messages
+
+
+def _messages(count: int):
+    return [(seq, "user" if seq % 2 == 0 else "assistant", f"m{seq}") for seq in range(count)]
+
+
+def _seqs(page):
+    return [seq for seq, _ in page["items"]]
+
+
+class TestPaginateMessages:
+    """Cursor pages over (seq, role, message)"""
+
+    def test_default_page_is_latest(self):
+        page = paginate_messages(_messages(10), limit=3)
+        assert _seqs(page) == [7, 8, 9]
+        assert page["has_more_before"] and not page["has_more_after"]
+        assert page["before"] == 7
+
+    def test_before_and_after_cursors(self):
+        older = paginate_messages(_messages(10), limit=3, before=7)
+        assert _seqs(older) == [4, 5, 6]
+        assert older["has_more_before"] and older["has_more_after"]
+
+        newer = paginate_messages(_messages(10), limit=3, after=5)
+        assert _seqs(newer) == [6, 7, 8]
+        assert newer["has_more_before"] and newer["has_more_after"]
+
+        between = paginate_messages(_messages(10), limit=10, before=5, after=1)
+        assert _seqs(between) == [2, 3, 4]
+
+    def test_role_filter_keeps_seq(self):
+        page = paginate_messages(_messages(10), limit=2, roles={"user"})
+        assert _seqs(page) == [6, 8]
+        assert page["has_more_before"]
+
+
+class TestStoragePages:
+    """Pages are read from the journal and the compacted file alike"""
+
+    def _storage(self, tmp_path, count: int) -> ChatHistoryStorage:
+        storage = ChatHistoryStorage(str(tmp_path))
+        storage.start_conversation("c1")
+        for i in range(count):
+            storage.append_message("c1", UserMessage(content=f"q{i}"))
+            storage.append_message("c1", AssistantMessage(content=f"a{i}"))
+        return storage
+
+    def test_page_from_live_journal(self, tmp_path):
+        storage = self._storage(tmp_path, 5)
+
+        page = storage.read_messages_page("c1", limit=2, before=4, roles={"user"})
+
+        assert [(m["seq"], m["content"]) for m in page["messages"]] == [(0, "q0"), (2, "q1")]
+        assert page["has_more_after"] and not page["has_more_before"]
+        assert storage.read_messages_page("missing") is None
+
+    def test_continued_conversation_keeps_seq(self, tmp_path):
+        storage = self._storage(tmp_path, 2)
+        storage.end_conversation("c1")
+        storage.append_message("c1", UserMessage(content="again"))
+
+        page = storage.read_messages_page("c1", limit=2)
+
+        assert [(m["seq"], m["content"]) for m in page["messages"]] == [(3, "a1"), (4, "again")]
+
+
+class TestCompressedJsonResponse:
+    """History responses honour Accept-Encoding"""
+
+    def _request(self, accept_encoding: str) -> Request:
+        return Request({"type": "http", "headers": [(b"accept-encoding", accept_encoding.encode())]})
+
+    def test_gzip_when_accepted(self):
+        payload = {"messages": ["x" * 100] * 50}
+
+        response = compressed_json_response(self._request("gzip, deflate"), payload)
+
+        assert response.headers["content-encoding"] == "gzip"
+        assert json.loads(gzip.decompress(response.body)) == payload
+
+    def test_small_or_unaccepted_bodies_are_plain(self):
+        assert "content-encoding" not in compressed_json_response(self._request("gzip"), {"a": 1}).headers
+        plain = compressed_json_response(self._request("identity"), {"messages": ["x" * 2000]})
+        assert "content-encoding" not in plain.headers
@@ -0,0 +1,132 @@
+"""
+Tests for the background chat persistence writer
+"""
+
+import threading
+import time
+
+import pytest
+
+from app.models import UserMessage
+from app.models.product import Product
+from app.models.product_collection import ProductCollection
+from app.utils.chat_storage import ChatHistoryStorage, SavedCollection
+from app.utils.persistence import PersistenceWriter
+
+
+def _product(name):
+    return Product.from_extracted({"title": name, "price": 10.0, "brand": "Shop", "product_url": f"https://shop.com/{name}"})
+
+
+class SlowStorage(ChatHistoryStorage):
+    """Storage whose journal writes take a while and are recorded"""
+
+    def __init__(self, base_path: str, delay: float):
+        super().__init__(base_path)
+        self.delay = delay
+        self.append_calls = []
+        self.fsyncs = []
+
+    def append_records(self, conversation_id, records, fsync=False):
+        time.sleep(self.delay)
+        self.append_calls.append(len(records))
+        self.fsyncs.append(fsync)
+        return super().append_records(conversation_id, records, fsync=fsync)
+
+
+class TestPersistenceWriter:
+    """Writes are queued, batched and applied off the caller's thread"""
+
+    def test_enqueue_never_waits_on_disk(self, tmp_path):
+        storage = SlowStorage(str(tmp_path), delay=0.05)
+        writer = PersistenceWriter(storage, linger_seconds=0)
+        writer.start_conversation("c1")
+
+        start = time.perf_counter()
+        for i in range(20):
+            writer.append_message("c1", UserMessage(content=f"m{i}"))
+        enqueue_time = time.perf_counter() - start
+
+        assert enqueue_time < 0.05
+        assert writer.flush(timeout=5)
+        assert storage.load_chat_history("c1")["message_count"] == 20
+        # Appends queued behind a slow write are written together
+        assert len(storage.append_calls) < 20
+        assert writer.metrics()["coalesced"] == 20 - len(storage.append_calls)
+        writer.shutdown()
+
+    def test_end_compacts_after_pending_appends(self, tmp_path):
+        storage = ChatHistoryStorage(str(tmp_path))
+        writer = PersistenceWriter(storage)
+        writer.start_conversation("c1", {"model": "gpt-5"})
+        writer.append_message("c1", UserMessage(content="hi"))
+        writer.end_conversation("c1", metadata={"total_messages": 1}, resources={"r": "v1"})
+        writer.append_message("c1", UserMessage(content="again"))
+        writer.end_conversation("c1", resources={"r": "v2"})
+
+        assert writer.shutdown(timeout=5)
+
+        data = storage.load_chat_history("c1")
+        assert [m["content"] for m in data["messages"]] == ["hi", "again"]
+        assert data["metadata"]["total_messages"] == 1
+        assert storage.load_resources("c1") == {"r": "v2"}
+
+    def test_resources_are_saved_as_they_were_when_queued(self, tmp_path):
+        storage = ChatHistoryStorage(str(tmp_path))
+        writer = PersistenceWriter(storage)
+        collection = ProductCollection(source_name="dresses", source_url="https://shop.com/dresses", products=[_product("a")])
+        writer.start_conversation("c1")
+        gate = threading.Event()
+        writer.call(gate.wait)  # hold the writer thread
+
+        writer.end_conversation("c1", resources={"dresses": collection})
+        # The next turn changes the collection while the write is still queued
+        collection.add_product(_product("b"))
+        gate.set()
+
+        assert writer.shutdown(timeout=5)
+        assert storage.load_resources("c1")["dresses"]["total_products"] == 1
+
+    def test_only_changed_collections_are_copied(self, tmp_path):
+        storage = ChatHistoryStorage(str(tmp_path))
+        writer = PersistenceWriter(storage)
+        collection = ProductCollection(source_name="dresses", source_url="https://shop.com/dresses", products=[_product("a")])
+        writer.start_conversation("c1")
+
+        first = writer._copy_resources("c1", {"dresses": collection})[0]["dresses"]
+        writer.end_conversation("c1", resources={"dresses": collection})
+        writer.flush(5)
+        unchanged = writer._copy_resources("c1", {"dresses": collection})[0]["dresses"]
+        collection.add_product(_product("b"))
+        changed = writer._copy_resources("c1", {"dresses": collection})[0]["dresses"]
+
+        assert first is not collection and len(first.products) == 1
+        assert isinstance(unchanged, SavedCollection) and unchanged.product_count == 1
+        assert isinstance(changed, ProductCollection) and len(changed.products) == 2
+        assert not hasattr(writer, "_resource_copies")
+
+        writer.end_conversation("c1", resources={"dresses": collection})
+        writer.end_conversation("c1", resources={"dresses": collection})
+        assert writer.shutdown(timeout=5)
+        assert storage.load_resources("c1")["dresses"]["total_products"] == 2
+
+    def test_fsync_policy(self, tmp_path):
+        storage = SlowStorage(str(tmp_path), delay=0)
+        writer = PersistenceWriter(storage, fsync="always")
+        writer.append_message("c1", UserMessage(content="hi"))
+        writer.flush(timeout=5)
+
+        assert storage.fsyncs == [True]
+        with pytest.raises(ValueError):
+            PersistenceWriter(storage, fsync="sometimes")
+        writer.shutdown()
+
+    def test_writes_after_shutdown_are_applied_inline(self, tmp_path):
+        storage = ChatHistoryStorage(str(tmp_path))
+        writer = PersistenceWriter(storage)
+        writer.shutdown()
+
+        writer.append_message("c1", UserMessage(content="late"))
+
+        assert storage.load_chat_history("c1")["message_count"] == 1
+        assert writer.metrics()["enqueued"] == 0
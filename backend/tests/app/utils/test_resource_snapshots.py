@@ -0,0 +1,81 @@
+"""
+Tests for dirty-tracked resource snapshots
+"""
+
+from app.models.product import Product
+from app.models.product_collection import ProductCollection
+from app.utils.chat_storage import ChatHistoryStorage
+from app.utils.storage_codec import read_document
+
+
+def _product(name: str) -> Product:
+    return Product(product_name=name, store="Shop", price="$10", price_value=10.0, currency="USD",
+                   image_url="https://shop.com/i.jpg", product_url=f"https://shop.com/{name}")
+
+
+def _collection(name: str, products) -> ProductCollection:
+    return ProductCollection(source_name=name, source_url="https://shop.com/dresses", products=list(products))
+
+
+def _resources():
+    a = _collection("products_from_a.com", [_product("a1"), _product("a2")])
+    b = _collection("products_from_b.com", [_product("b1")])
+    combined = _collection("all_extracted_products", a.products + b.products)
+    combined.source_collections = ["products_from_a.com", "products_from_b.com"]
+    return {"products_from_a.com": a, "products_from_b.com": b, "all_extracted_products": combined}
+
+
+class TestResourceSnapshots:
+    """Only changed collections are rewritten; combinations are references"""
+
+    def _storage(self, tmp_path) -> ChatHistoryStorage:
+        storage = ChatHistoryStorage(str(tmp_path))
+        storage.start_conversation("c1")
+        return storage
+
+    def test_unchanged_collections_are_not_rewritten(self, tmp_path):
+        storage = self._storage(tmp_path)
+        resources = _resources()
+        storage._save_resources("c1", resources)
+        files = {p.name: p.stat().st_mtime_ns for p in (tmp_path / "c1" / "resources").iterdir()}
+
+        resources["products_from_b.com"].add_product(_product("b2"))
+        resources["all_extracted_products"].add_product(_product("b2"))
+        written = []
+        original = storage._write_document
+        storage._write_document = lambda path, *args, **kwargs: (written.append(path.name), original(path, *args, **kwargs))
+        storage._save_resources("c1", resources)
+
+        assert sorted(written) == ["products_from_b.com.json", "resources.json"]
+        assert set(files) == {"products_from_a.com.json", "products_from_b.com.json"}
+
+    def test_combined_collection_is_stored_as_references(self, tmp_path):
+        storage = self._storage(tmp_path)
+        storage._save_resources("c1", _resources())
+
+        manifest = read_document(tmp_path / "c1" / "resources.json")
+        assert manifest["resources"]["all_extracted_products"]["sources"] == [
+            "products_from_a.com", "products_from_b.com"
+        ]
+
+        loaded = storage.load_resources("c1")
+        assert [p["product_name"] for p in loaded["all_extracted_products"]["products"]] == ["a1", "a2", "b1"]
+        assert loaded["products_from_a.com"]["total_products"] == 2
+
+    def test_combination_that_doesnt_match_its_sources_is_stored_in_full(self, tmp_path):
+        storage = self._storage(tmp_path)
+        resources = _resources()
+        resources["all_extracted_products"].add_product(_product("extra"))
+
+        storage._save_resources("c1", resources)
+
+        manifest = read_document(tmp_path / "c1" / "resources.json")
+        assert "file" in manifest["resources"]["all_extracted_products"]
+
+    def test_direct_product_appends_are_noticed(self):
+        collection = _collection("c", [_product("a")])
+        key = collection.snapshot_key()
+
+        collection.products.append(_product("b"))
+
+        assert collection.snapshot_key() != key
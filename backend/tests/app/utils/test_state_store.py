@@ -0,0 +1,112 @@
+"""
+Tests for the shared conversation state stores
+"""
+
+import asyncio
+
+import pytest
+
+from app.utils.state_store import (
+    ConversationBusy, RedisStateStore, RespConnection, SQLiteStateStore, create_state_store
+)
+from tests.app.utils.resp_stand_in import RespStandIn
+
+
+@pytest.fixture(params=["sqlite", "redis"])
+def store(request, tmp_path):
+    if request.param == "sqlite":
+        store = SQLiteStateStore(tmp_path / "state.sqlite3")
+        yield store
+        store.close()
+    else:
+        server = RespStandIn().start()
+        store = RedisStateStore(RespConnection("127.0.0.1", server.port))
+        yield store
+        store.close()
+        server.stop()
+
+
+class TestStateStore:
+    """Both implementations behave the same"""
+
+    def test_lock_is_exclusive_until_released(self, store):
+        assert store.try_lock("c1", "a")
+        assert not store.try_lock("c1", "b")
+        assert store.try_lock("c2", "b")
+
+        assert not store.unlock("c1", "b")
+        assert store.unlock("c1", "a")
+        assert store.try_lock("c1", "b")
+
+    def test_expired_lock_can_be_taken_over(self, store):
+        assert store.try_lock("c1", "a", ttl_seconds=0.05)
+        assert store.refresh_lock("c1", "a", ttl_seconds=0.05)
+        asyncio.run(asyncio.sleep(0.1))
+
+        assert store.try_lock("c1", "b")
+        assert not store.refresh_lock("c1", "a")
+        assert not store.unlock("c1", "a")
+
+    def test_versions_count_committed_turns(self, store):
+        assert store.version("c1") == 0
+        assert store.bump_version("c1") == 1
+        assert store.bump_version("c1") == 2
+        assert store.version("c1") == 2
+        assert store.version("c2") == 0
+
+    def test_conversation_lock_serializes_turns(self, store):
+        order = []
+
+        async def turn(name: str):
+            async with store.conversation_lock("c1", wait_seconds=5):
+                order.append(f"{name} start")
+                await asyncio.sleep(0.05)
+                order.append(f"{name} end")
+
+        async def main():
+            await asyncio.gather(turn("a"), turn("b"))
+
+        asyncio.run(main())
+
+        assert order in (["a start", "a end", "b start", "b end"], ["b start", "b end", "a start", "a end"])
+
+    def test_lease_can_be_released_from_another_thread(self, store):
+        async def main():
+            lease = await store.lock_conversation("c1", wait_seconds=1)
+            assert not store.try_lock("c1", "other")
+            await asyncio.to_thread(lease.release)
+            lease.release()  # idempotent
+            return lease
+
+        lease = asyncio.run(main())
+        assert lease.released
+        assert store.try_lock("c1", "other")
+
+    def test_busy_conversation_times_out(self, store):
+        store.try_lock("c1", "other")
+
+        async def main():
+            async with store.conversation_lock("c1", wait_seconds=0.1):
+                pass
+
+        with pytest.raises(ConversationBusy):
+            asyncio.run(main())
+
+
+def test_sqlite_store_opens_on_first_use(tmp_path):
+    store = create_state_store(None, base_path=tmp_path)
+    assert store.db_path == tmp_path / "state.sqlite3"
+    assert not store.db_path.exists()
+
+    assert store.bump_version("c1") == 1
+    assert store.db_path.exists()
+    store.close()
+
+
+def test_create_state_store_from_url(tmp_path):
+    store = create_state_store(f"sqlite:///{tmp_path}/state.sqlite3")
+    assert isinstance(store, SQLiteStateStore) and store.db_path == tmp_path / "state.sqlite3"
+    store.close()
+    assert isinstance(create_state_store("redis://:secret@cache:6380/2"), RedisStateStore)
+    with pytest.raises(ValueError):
+        create_state_store("memcached://localhost")
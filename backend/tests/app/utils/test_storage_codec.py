@@ -0,0 +1,70 @@
+"""
+Tests for the storage codec layer
+"""
+
+import json
+
+import pytest
+
+from app.models.product import Product
+from app.models.product_collection import ProductCollection
+from app.utils import storage_codec
+from app.utils.storage_codec import (
+    GZIP_MAGIC, detect_codec, migrate_tree, read_document, resolve_codec, write_document
+)
+
+DOCUMENT = {"conversation_id": "c1", "messages": [{"role": "user", "content": "robe d'été — 50 €"}] * 20}
+
+
+class TestStorageCodec:
+    """Documents round-trip through every codec and are detected on read"""
+
+    @pytest.mark.parametrize("codec", ["json", "json+gzip"])
+    def test_round_trip(self, tmp_path, codec):
+        path = tmp_path / "doc.json"
+        write_document(path, DOCUMENT, codec)
+
+        assert detect_codec(path.read_bytes()) == codec
+        assert read_document(path) == DOCUMENT
+
+    @pytest.mark.parametrize("codec", ["json+zstd", "msgpack+zstd"])
+    def test_zstd_round_trip(self, tmp_path, codec):
+        pytest.importorskip("zstandard")
+        if codec.startswith("msgpack"):
+            pytest.importorskip("msgpack")
+        path = tmp_path / "doc.json"
+        write_document(path, DOCUMENT, codec)
+
+        assert detect_codec(path.read_bytes()) == codec
+        assert read_document(path) == DOCUMENT
+
+    def test_missing_packages_fall_back_to_gzip(self, monkeypatch):
+        monkeypatch.setattr(storage_codec, "zstandard", None)
+        assert resolve_codec("json+zstd") == "json+gzip"
+        with pytest.raises(ValueError):
+            resolve_codec("xml")
+
+    def test_migrate_tree_reencodes_documents_only(self, tmp_path):
+        (tmp_path / "c1").mkdir()
+        (tmp_path / "c1" / "chat_history.json").write_text(json.dumps(DOCUMENT, indent=2))
+        (tmp_path / "c1" / "chat_history.jsonl").write_text('{"record": "header"}\n')
+
+        migrated, before, after = migrate_tree(tmp_path, "json+gzip")
+
+        assert migrated == 1 and after < before
+        assert (tmp_path / "c1" / "chat_history.json").read_bytes().startswith(GZIP_MAGIC)
+        assert read_document(tmp_path / "c1" / "chat_history.json") == DOCUMENT
+        assert (tmp_path / "c1" / "chat_history.jsonl").read_text() == '{"record": "header"}\n'
+        assert migrate_tree(tmp_path, "json+gzip")[0] == 0
+
+    def test_product_collection_round_trip(self, tmp_path):
+        collection = ProductCollection(source_name="shop", source_url="https://shop.com", products=[
+            Product(product_name="dress", store="Shop", price="$10", price_value=10.0, currency="USD",
+                    product_url="https://shop.com/dress", image_url="https://shop.com/dress.jpg")
+        ])
+
+        path = collection.save_to_file("c1", base_dir=str(tmp_path))
+        loaded = ProductCollection.load_from_file(path)
+
+        assert loaded.source_name == "shop"
+        assert [p.product_name for p in loaded.products] == ["dress"]
@@ -64,6 +64,14 @@ export function useChat() {
 
       const reader = response.body.getReader()
       const decoder = new TextDecoder()
+
+      // Token previews for the LLM call in flight; the final 'message' and
+      // 'thinking' events replace them with the authoritative text
+      let streamingText = ''
+      let streamingThinking = false
+
+      const dropStreamingMessage = (prev: Message[]) =>
+        prev.filter(m => !(m.streaming && m.turnId === turnId))
       
       while (true) {
         const { done, value } = await reader.read()
@@ -87,24 +95,61 @@ export function useChat() {
                       timestamp: new Date().toISOString(),
                       turnId: turnId
                     }
-                    setMessages(prev => [...prev, message])
+                    streamingText = ''
+                    setMessages(prev => [...dropStreamingMessage(prev), message])
                     setCurrentTurnId(null)
                   }
                   break
                 
+                case 'message_delta':
+                  if (data.content) {
+                    streamingText += data.content
+                    const preview: Message = {
+                      role: 'assistant',
+                      content: streamingText,
+                      timestamp: new Date().toISOString(),
+                      turnId: turnId,
+                      streaming: true
+                    }
+                    setMessages(prev => [...dropStreamingMessage(prev), preview])
+                  }
+                  break
+                
                 case 'thinking':
                   // Handle thinking content (same as ephemeral)
                   if (data.content && data.content.trim().length > 0) {
-                    setEphemeralHistory(prev => ({
-                      ...prev,
-                      [turnId]: [...(prev[turnId] || []), data.content]
-                    }))
+                    const replacePreview = streamingThinking
+                    streamingThinking = false
+                    setEphemeralHistory(prev => {
+                      const entries = prev[turnId] || []
+                      const kept = replacePreview ? entries.slice(0, -1) : entries
+                      return { ...prev, [turnId]: [...kept, data.content] }
+                    })
+                  }
+                  break
+                
+                case 'thinking_delta':
+                  if (data.content) {
+                    const appendToPreview = streamingThinking
+                    streamingThinking = true
+                    setEphemeralHistory(prev => {
+                      const entries = prev[turnId] || []
+                      if (!appendToPreview) {
+                        return { ...prev, [turnId]: [...entries, data.content] }
+                      }
+                      const last = entries[entries.length - 1] || ''
+                      return { ...prev, [turnId]: [...entries.slice(0, -1), last + data.content] }
+                    })
                   }
                   break
                 
                 case 'llm_call':
-                  // Handle LLM call status - could show loading indicators
+                  // A new LLM call starts; text streamed by the previous one
+                  // accompanied tool calls and is not the final answer
                   console.log('LLM Call:', data.status, data.message)
+                  streamingText = ''
+                  streamingThinking = false
+                  setMessages(prev => dropStreamingMessage(prev))
                   break
                 
                 case 'product_grid':
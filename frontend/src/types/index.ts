@@ -7,6 +7,7 @@ export interface Message {
   products?: Product[]  // For product grid messages
   productGridTitle?: string  // Title for product grid
   toolExecutions?: ToolExecutionEvent[]  // For tool execution tracking
+  streaming?: boolean  // Token preview replaced by the final message
 }
 
 export interface Product {
@@ -128,7 +129,7 @@ export interface ContentUpdateEvent {
 }
 
 export interface StreamMessage {
-  type: 'start' | 'message' | 'product' | 'complete' | 'error' | 'tool_execution' | 'thinking' | 'llm_call' | 'content_display' | 'content_update'
+  type: 'start' | 'message' | 'product' | 'complete' | 'error' | 'tool_execution' | 'thinking' | 'llm_call' | 'content_display' | 'content_update' | 'message_delta' | 'thinking_delta'
   content?: string
   product?: Product
   error?: string